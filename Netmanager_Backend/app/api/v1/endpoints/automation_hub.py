@@ -239,8 +239,8 @@ def _deploy_template_worker(target: Dict[str, Any], template_content: str):
         info = DeviceInfo(**target["device_info_args"])
         conn = DeviceConnection(info)
         if conn.connect():
-            output = conn.send_config_set(config_text.splitlines())
-            conn.disconnect()
+            with conn:
+                output = conn.send_config_set(config_text.splitlines())
             return {"device_id": dev_id, "status": "success", "output": output}
         return {"device_id": dev_id, "status": "failed", "error": f"Connection Failed: {conn.last_error}"}
     except Exception as e:
@@ -336,8 +336,8 @@ def acl_enforce(
             )
             conn = DeviceConnection(info)
             if conn.connect():
-                output = conn.driver.push_config(commands)
-                conn.disconnect()
+                with conn:
+                    output = conn.driver.push_config(commands)
                 results.append(
                     {
                         "device_id": dev.id,
@@ -6,7 +6,7 @@ from app.db.session import get_db
 from app.api import deps
 from app.models.user import User
 from app.models.compliance import ComplianceStandard, ComplianceRule
-from app.models.device import Device, ComplianceReport, ConfigBackup
+from app.models.device import Device, ComplianceReport, ConfigBackup, ConfigBlob
 from app.services.compliance_service import ComplianceEngine
 from pydantic import BaseModel, ConfigDict
 
@@ -199,13 +199,17 @@ def get_device_backups(device_id: int, db: Session = Depends(get_db)):
     """
     backups = db.query(ConfigBackup).filter(ConfigBackup.device_id == device_id)\
         .order_by(ConfigBackup.created_at.desc()).limit(20).all()
+
+    # 크기는 blob 메타데이터에서 (본문 복원 없이)
+    hashes = {b.config_hash for b in backups if b.config_hash}
+    sizes = dict(db.query(ConfigBlob.hash, ConfigBlob.size).filter(ConfigBlob.hash.in_(hashes)).all()) if hashes else {}
         
     return [
         {
             "id": b.id,
             "created_at": b.created_at,
             "is_golden": b.is_golden,
-            "size": len(b.raw_config) if b.raw_config else 0
+            "size": sizes.get(b.config_hash, 0) if b.config_hash else (len(b.legacy_raw_config) if b.legacy_raw_config else 0)
         }
         for b in backups
     ]
@@ -76,103 +76,104 @@ def _deploy_worker(target: Dict[str, Any], template_content: str, opts: Dict[str
         # 3. Connect & Push
         conn = DeviceConnection(info)
         if conn.connect():
-            backup_id = None
-            backup_error = None
-            rollback_prepared = False
-            rollback_ref = None
-            post_check = None
-
-            if opts.get("save_pre_backup", True):
-                db_local = SessionLocal()
-                try:
-                    running = conn.get_running_config()
-                    b = ConfigBackup(device_id=dev_id, raw_config=running, is_golden=False)
-                    db_local.add(b)
-                    db_local.commit()
-                    db_local.refresh(b)
-                    backup_id = int(b.id)
-                except Exception as e:
+            with conn:
+                backup_id = None
+                backup_error = None
+                rollback_prepared = False
+                rollback_ref = None
+                post_check = None
+
+                if opts.get("save_pre_backup", True):
+                    db_local = SessionLocal()
+                    try:
+                        running = conn.get_running_config()
+                        b = ConfigBackup(device_id=dev_id, raw_config=running, is_golden=False)
+                        db_local.add(b)
+                        db_local.commit()
+                        db_local.refresh(b)
+                        backup_id = int(b.id)
+                    except Exception as e:
+                        try:
+                            db_local.rollback()
+                        except Exception:
+                            pass
+                        backup_error = f"{type(e).__name__}: {e}"
+                    finally:
+                        db_local.close()
+
+                if opts.get("prepare_device_snapshot", True):
+                    snap_name = f"rollback_{dev_id}_{uuid.uuid4().hex[:10]}"
                     try:
-                        db_local.rollback()
+                        if hasattr(conn.driver, "prepare_rollback"):
+                            ok = bool(conn.driver.prepare_rollback(snap_name))
+                            rollback_prepared = ok
+                            rollback_ref = getattr(conn.driver, "_rollback_ref", None) or snap_name
                     except Exception:
-                        pass
-                    backup_error = f"{type(e).__name__}: {e}"
-                finally:
-                    db_local.close()
+                        rollback_prepared = False
+                        rollback_ref = None
 
-            if opts.get("prepare_device_snapshot", True):
-                snap_name = f"rollback_{dev_id}_{uuid.uuid4().hex[:10]}"
                 try:
-                    if hasattr(conn.driver, "prepare_rollback"):
-                        ok = bool(conn.driver.prepare_rollback(snap_name))
-                        rollback_prepared = ok
-                        rollback_ref = getattr(conn.driver, "_rollback_ref", None) or snap_name
-                except Exception:
-                    rollback_prepared = False
-                    rollback_ref = None
-
-            try:
-                output = conn.send_config_set(config_text.splitlines())
-                if opts.get("post_check_enabled", True):
-                    commands = opts.get("post_check_commands") or []
-                    if not commands:
-                        db_local = SessionLocal()
+                    output = conn.send_config_set(config_text.splitlines())
+                    if opts.get("post_check_enabled", True):
+                        commands = opts.get("post_check_commands") or []
+                        if not commands:
+                            db_local = SessionLocal()
+                            try:
+                                dev = db_local.query(Device).filter(Device.id == dev_id).first()
+                                if dev:
+                                    commands = resolve_post_check_commands(db_local, dev) or []
+                            finally:
+                                db_local.close()
+                        if not commands:
+                            commands = _default_post_check_commands(info.device_type)
+                        post_check = _run_post_check(conn, info.device_type, list(commands))
+                        if not post_check.get("ok"):
+                            raise Exception("Post-check failed")
+                    return {
+                        "id": dev_id,
+                        "status": "success",
+                        "output": output,
+                        "backup_id": backup_id,
+                        "backup_error": backup_error,
+                        "rollback_prepared": rollback_prepared,
+                        "rollback_ref": rollback_ref,
+                        "post_check": post_check,
+                    }
+                except Exception as e:
+                    # push/rollback 도중 실패한 세션은 풀로 돌려보내지 않음
+                    conn.discard()
+                    deploy_error = str(e)
+                    rollback_attempted = False
+                    rollback_success = False
+                    rollback_output = None
+                    rollback_error = None
+
+                    if opts.get("rollback_on_failure", True):
+                        rollback_attempted = True
                         try:
-                            dev = db_local.query(Device).filter(Device.id == dev_id).first()
-                            if dev:
-                                commands = resolve_post_check_commands(db_local, dev) or []
-                        finally:
-                            db_local.close()
-                    if not commands:
-                        commands = _default_post_check_commands(info.device_type)
-                    post_check = _run_post_check(conn, info.device_type, list(commands))
-                    if not post_check.get("ok"):
-                        raise Exception("Post-check failed")
-                conn.disconnect()
-                return {
-                    "id": dev_id,
-                    "status": "success",
-                    "output": output,
-                    "backup_id": backup_id,
-                    "backup_error": backup_error,
-                    "rollback_prepared": rollback_prepared,
-                    "rollback_ref": rollback_ref,
-                    "post_check": post_check,
-                }
-            except Exception as e:
-                deploy_error = str(e)
-                rollback_attempted = False
-                rollback_success = False
-                rollback_output = None
-                rollback_error = None
-
-                if opts.get("rollback_on_failure", True):
-                    rollback_attempted = True
-                    try:
-                        if hasattr(conn.driver, "rollback"):
-                            rollback_success = bool(conn.driver.rollback())
-                        else:
+                            if hasattr(conn.driver, "rollback"):
+                                rollback_success = bool(conn.driver.rollback())
+                            else:
+                                rollback_success = False
+                            rollback_output = "rollback executed" if rollback_success else "rollback not executed"
+                        except Exception as re:
+                            rollback_error = f"{type(re).__name__}: {re}"
                             rollback_success = False
-                        rollback_output = "rollback executed" if rollback_success else "rollback not executed"
-                    except Exception as re:
-                        rollback_error = f"{type(re).__name__}: {re}"
-                        rollback_success = False
-
-                conn.disconnect()
-                return {
-                    "id": dev_id,
-                    "status": "failed",
-                    "error": deploy_error,
-                    "backup_id": backup_id,
-                    "backup_error": backup_error,
-                    "rollback_attempted": rollback_attempted,
-                    "rollback_success": rollback_success,
-                    "rollback_output": rollback_output,
-                    "rollback_error": rollback_error,
-                    "rollback_prepared": rollback_prepared,
-                    "rollback_ref": rollback_ref,
-                    "post_check": post_check,
-                }
+
+                    return {
+                        "id": dev_id,
+                        "status": "failed",
+                        "error": deploy_error,
+                        "backup_id": backup_id,
+                        "backup_error": backup_error,
+                        "rollback_attempted": rollback_attempted,
+                        "rollback_success": rollback_success,
+                        "rollback_output": rollback_output,
+                        "rollback_error": rollback_error,
+                        "rollback_prepared": rollback_prepared,
+                        "rollback_ref": rollback_ref,
+                        "post_check": post_check,
+                    }
         else:
             return {"id": dev_id, "status": "failed", "error": f"Connection Failed: {conn.last_error}"}
 
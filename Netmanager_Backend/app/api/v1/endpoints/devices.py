@@ -18,6 +18,7 @@ from app.models.device_inventory import DeviceInventoryItem
 from app.services.template_service import TemplateRenderer
 from app.db.session import SessionLocal
 from app.services.audit_service import AuditService
+from app.services.topology_graph import topology_graph_store
 from app.models.settings import SystemSetting
 
 router = APIRouter()
@@ -272,15 +273,31 @@ def get_analytics_data(time_range: str = Query("24h", alias="range"), db: Sessio
     delta = timedelta(hours=1) if time_range == "1h" else timedelta(days=7) if time_range == "7d" else timedelta(
         hours=24)
     start_time = now - delta
-    metrics = db.query(SystemMetric).filter(SystemMetric.timestamp >= start_time).order_by(
-        SystemMetric.timestamp.asc()).all()
+    fmt = "%H:%M" if time_range in ["1h", "24h"] else "%m/%d"
+
+    # 긴 구간은 롤업 tier 에서 읽음 (raw 전체를 메모리로 올리지 않음)
+    from app.services import metric_rollup
 
     resource_data = []
+    tier = metric_rollup.pick_tier(delta.total_seconds())
+    if tier != "raw":
+        for b in metric_rollup.fleet_series(db, start_time, tier):
+            resource_data.append({
+                "time": b["bucket"].strftime(fmt),
+                "cpu": b["cpu_usage_avg"],
+                "memory": b["memory_usage_avg"],
+                "cpu_max": b["cpu_usage_max"],
+                "memory_max": b["memory_usage_max"],
+            })
+
+    metrics = []
+    if not resource_data:
+        metrics = db.query(SystemMetric).filter(SystemMetric.timestamp >= start_time).order_by(
+            SystemMetric.timestamp.asc()).all()
     if metrics:
         step = max(1, len(metrics) // 50)
         for i in range(0, len(metrics), step):
             m = metrics[i]
-            fmt = "%H:%M" if time_range in ["1h", "24h"] else "%m/%d"
             resource_data.append({"time": m.timestamp.strftime(fmt), "cpu": m.cpu_usage, "memory": m.memory_usage})
 
     top_devices_query = db.query(Device).filter(Device.status == 'online').all()
@@ -326,6 +343,7 @@ def get_topology_links(
     from datetime import datetime, timedelta
     from app.models.endpoint import Endpoint, EndpointAttachment
     from app.services.snmp_service import SnmpManager
+    from app.services.counter_state_store import CounterStateStore
     from sqlalchemy.orm import load_only
     now = datetime.now()
 
@@ -349,7 +367,6 @@ def get_topology_links(
     )
     sites = db.query(Site.id, Site.name).all()
     site_map = {sid: name for sid, name in sites}
-    meta_by_id = {d.id: (d.latest_parsed_data or {}) for d in devices}
 
     metric_by_device_id = {}
     if devices:
@@ -491,21 +508,14 @@ def get_topology_links(
             }
         })
 
-    links = (
-        db.query(Link)
-        .options(
-            load_only(
-                Link.source_device_id,
-                Link.target_device_id,
-                Link.source_interface_name,
-                Link.target_interface_name,
-                Link.status,
-                Link.protocol,
-            )
-        )
-        .filter(Link.target_device_id.isnot(None))
-        .all()
-    )
+    # 링크는 DB 대신 프로세스 공용 topology graph 에서 읽음
+    links = sorted(topology_graph_store.get(db).links(), key=lambda l: l.id)
+    # 링크 포트별 rate 는 interface_counter_states 에서 읽음 (latest_parsed_data JSON 파싱 없이)
+    link_port_names = set()
+    for l in links:
+        link_port_names.add(SnmpManager.normalize_interface_name(str(l.source_interface_name or "")))
+        link_port_names.add(SnmpManager.normalize_interface_name(str(l.target_interface_name or "")))
+    if_rates_by_id = CounterStateStore.link_rates(db, if_names=link_port_names) if links else {}
     edges = []
     for l in links:
         src_port_raw = str(l.source_interface_name or "")
@@ -513,10 +523,8 @@ def get_topology_links(
         src_port = SnmpManager.normalize_interface_name(src_port_raw)
         dst_port = SnmpManager.normalize_interface_name(dst_port_raw)
 
-        src_meta = meta_by_id.get(l.source_device_id, {}) if l.source_device_id else {}
-        dst_meta = meta_by_id.get(l.target_device_id, {}) if l.target_device_id else {}
-        src_if_state = src_meta.get("if_traffic_state", {}) if isinstance(src_meta, dict) else {}
-        dst_if_state = dst_meta.get("if_traffic_state", {}) if isinstance(dst_meta, dict) else {}
+        src_if_state = if_rates_by_id.get(l.source_device_id, {}) if l.source_device_id else {}
+        dst_if_state = if_rates_by_id.get(l.target_device_id, {}) if l.target_device_id else {}
 
         src_entry = src_if_state.get(src_port, {}) if isinstance(src_if_state, dict) and src_port else {}
         dst_entry = dst_if_state.get(dst_port, {}) if isinstance(dst_if_state, dict) and dst_port else {}
@@ -767,24 +775,9 @@ def get_endpoint_group_details(
 
 @router.get("/topology/trace")
 def trace_path(source_id: int, target_id: int, db: Session = Depends(get_db), current_user: User = Depends(deps.require_viewer)):
-    links = db.query(Link).all()
-    graph = {}
-    for l in links:
-        if not l.source_device_id or not l.target_device_id: continue
-        graph.setdefault(l.source_device_id, []).append(l.target_device_id)
-        graph.setdefault(l.target_device_id, []).append(l.source_device_id)
-
-    queue = [[source_id]];
-    visited = {source_id};
-    found_path = []
-    while queue:
-        path = queue.pop(0);
-        node = path[-1]
-        if node == target_id: found_path = path; break
-        if node in graph:
-            for neighbor in graph[node]:
-                if neighbor not in visited: visited.add(neighbor); new_path = list(path); new_path.append(
-                    neighbor); queue.append(new_path)
+    graph = topology_graph_store.get(db)
+    # 상태와 관계없이 알려진 모든 링크로 경로 탐색 (기존 동작 유지)
+    found_path = graph.shortest_path(source_id, target_id, active_only=False)
 
     if not found_path: return {"status": "failed", "message": "No path found", "path_nodes": [], "path_links": []}
 
@@ -792,8 +785,7 @@ def trace_path(source_id: int, target_id: int, db: Session = Depends(get_db), cu
     for i in range(len(found_path) - 1):
         src = found_path[i];
         dst = found_path[i + 1]
-        link_obj = db.query(Link).filter(((Link.source_device_id == src) & (Link.target_device_id == dst)) | (
-                (Link.source_device_id == dst) & (Link.target_device_id == src))).first()
+        link_obj = graph.find_link(src, dst)
         if link_obj: highlight_links.append(
             {"source": str(src), "target": str(dst), "status": link_obj.status, "speed": link_obj.link_speed})
 
@@ -851,9 +843,9 @@ def deploy_vlan_bulk(req: VlanDeployRequest, db: Session = Depends(get_db),
                 )
             )
             if conn.connect():
-                res = conn.deploy_config_template(vlan_template, req.dict())
+                with conn:
+                    res = conn.deploy_config_template(vlan_template, req.dict())
                 summary.append({"id": d_id, "name": dev.name, "status": "success" if res.get("success") else "failed"})
-                conn.disconnect()
             else:
                 summary.append({"id": d_id, "name": dev.name, "status": "failed"})
         return {"job_id": None, "status": "executed", "result": {"summary": summary}}
@@ -1,8 +1,10 @@
 import asyncio
 import json
+import queue
 
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Query
 from fastapi.responses import StreamingResponse
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 from typing import Any, Dict, List, Optional
 from pydantic import BaseModel
@@ -10,7 +12,7 @@ from app.db.session import get_db
 from app.db.session import get_db
 from app.services.discovery_service import DiscoveryService
 from app.db.session import SessionLocal
-from app.models.discovery import DiscoveryJob, DiscoveredDevice
+from app.models.discovery import DiscoveryJob, DiscoveredDevice, DiscoveryJobLog
 from app.tasks.discovery import run_discovery_job
 from app.tasks.topology_refresh import refresh_device_topology
 from app.tasks.device_sync import enqueue_ssh_sync_batch
@@ -189,6 +191,53 @@ def get_job_status(id: int, db: Session = Depends(get_db)):
         "created_at": str(job.created_at)
     }
 
+def _log_entry(row: DiscoveryJobLog) -> Dict[str, Any]:
+    return {
+        "id": row.id,
+        "ts": row.created_at.isoformat() if row.created_at else None,
+        "message": row.message,
+    }
+
+
+@router.get("/jobs/{id}/logs")
+def get_job_logs(
+    id: int,
+    after: Optional[int] = Query(None, ge=0, description="cursor: return entries with id > after (oldest first)"),
+    before: Optional[int] = Query(None, ge=1, description="cursor: return entries with id < before (newest first)"),
+    limit: int = Query(200, ge=1, le=1000),
+    db: Session = Depends(get_db),
+):
+    """
+    Cursor paging over the append-only job log.
+    - 기본(after/before 없음): 가장 최근 ``limit`` 건 (tail)
+    - ``after``: 이후 로그를 오래된 순으로 (live tail 보충용)
+    - ``before``: 이전 로그를 최신 순으로 (위로 스크롤)
+    """
+    if not db.query(DiscoveryJob.id).filter(DiscoveryJob.id == id).first():
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    q = db.query(DiscoveryJobLog).filter(DiscoveryJobLog.job_id == id)
+    if after is not None:
+        rows = q.filter(DiscoveryJobLog.id > after).order_by(DiscoveryJobLog.id.asc()).limit(limit + 1).all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+    else:
+        if before is not None:
+            q = q.filter(DiscoveryJobLog.id < before)
+        rows = q.order_by(DiscoveryJobLog.id.desc()).limit(limit + 1).all()
+        has_more = len(rows) > limit
+        rows = list(reversed(rows[:limit]))
+
+    items = [_log_entry(r) for r in rows]
+    return {
+        "job_id": id,
+        "items": items,
+        "first_cursor": items[0]["id"] if items else before,
+        "next_cursor": items[-1]["id"] if items else after,
+        "has_more": has_more,
+    }
+
+
 @router.get("/jobs/{id}/results", response_model=List[DeviceResponse])
 def get_job_results(id: int, db: Session = Depends(get_db)):
     results = db.query(DiscoveredDevice).filter(DiscoveredDevice.job_id == id).all()
@@ -214,59 +263,102 @@ def get_job_results(id: int, db: Session = Depends(get_db)):
 
 
 @router.get("/jobs/{id}/stream")
-async def stream_job_results(id: int):
-    async def event_generator():
-        last_id = 0
+async def stream_job_results(id: int, log_after: Optional[int] = Query(None, ge=0)):
+    """
+    SSE: ``device`` / ``progress`` / ``log`` / ``done``.
+    ``log`` 는 discovery_job_logs 를 cursor(``log_after``) 이후로 읽어 보낸다. realtime event bus 의
+    ``discovery_log`` 이벤트가 오면 폴링 간격을 기다리지 않고 바로 다시 읽는다.
+    """
+    from app.services.realtime_event_bus import realtime_event_bus
+
+    bus = realtime_event_bus.subscribe()
+
+    async def wait_for_log_event(timeout: float) -> None:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
         while True:
-            db = SessionLocal()
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return
             try:
-                job = db.query(DiscoveryJob).filter(DiscoveryJob.id == id).first()
-                if not job:
-                    payload = json.dumps({"error": "Job not found"}, ensure_ascii=False)
-                    yield f"event: error\ndata: {payload}\n\n"
-                    return
-
-                rows = (
-                    db.query(DiscoveredDevice)
-                    .filter(DiscoveredDevice.job_id == id, DiscoveredDevice.id > last_id)
-                    .order_by(DiscoveredDevice.id.asc())
-                    .limit(200)
-                    .all()
-                )
-
-                for r in rows:
-                    data = {
-                        "id": r.id,
-                        "ip_address": r.ip_address,
-                        "hostname": r.hostname,
-                        "vendor": r.vendor,
-                        "model": r.model,
-                        "os_version": r.os_version,
-                        "device_type": r.device_type,
-                        "status": r.status,
-                        "snmp_status": r.snmp_status,
-                        "vendor_confidence": getattr(r, "vendor_confidence", 0.0),
-                        "chassis_candidate": getattr(r, "chassis_candidate", False),
-                        "matched_device_id": getattr(r, "matched_device_id", None),
-                        "issues": getattr(r, "issues", None),
-                        "evidence": getattr(r, "evidence", None),
-                    }
-                    last_id = r.id
-                    yield f"event: device\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
-
-                total = int(getattr(job, "total_ips", 0) or 0)
-                scanned = int(getattr(job, "scanned_ips", 0) or 0)
-                pct = int((scanned / total) * 100) if total > 0 else (100 if job.status == "completed" else 0)
-                progress_data = {"status": job.status, "scanned_ips": scanned, "total_ips": total, "progress": pct}
-                yield f"event: progress\ndata: {json.dumps(progress_data, ensure_ascii=False)}\n\n"
-
-                if job.status in ("completed", "failed") and not rows:
-                    yield f"event: done\ndata: {json.dumps({'status': job.status}, ensure_ascii=False)}\n\n"
-                    return
-            finally:
-                db.close()
+                msg = await asyncio.to_thread(bus.get, True, remaining)
+            except queue.Empty:
+                return
+            if msg.event == "discovery_log" and (msg.data or {}).get("job_id") == id:
+                return
 
-            await asyncio.sleep(0.8)
+    async def event_generator():
+        last_id = 0
+        last_log_id = log_after
+        try:
+            while True:
+                db = SessionLocal()
+                try:
+                    job = db.query(DiscoveryJob).filter(DiscoveryJob.id == id).first()
+                    if not job:
+                        payload = json.dumps({"error": "Job not found"}, ensure_ascii=False)
+                        yield f"event: error\ndata: {payload}\n\n"
+                        return
+
+                    if last_log_id is None:
+                        # cursor 없이 연결하면 지금까지의 로그는 /logs 로 받고 이후만 tail
+                        last_log_id = int(
+                            db.query(func.max(DiscoveryJobLog.id)).filter(DiscoveryJobLog.job_id == id).scalar() or 0
+                        )
+                    log_rows = (
+                        db.query(DiscoveryJobLog)
+                        .filter(DiscoveryJobLog.job_id == id, DiscoveryJobLog.id > last_log_id)
+                        .order_by(DiscoveryJobLog.id.asc())
+                        .limit(500)
+                        .all()
+                    )
+                    for r in log_rows:
+                        last_log_id = r.id
+                        yield f"event: log\ndata: {json.dumps(_log_entry(r), ensure_ascii=False)}\n\n"
+
+                    rows = (
+                        db.query(DiscoveredDevice)
+                        .filter(DiscoveredDevice.job_id == id, DiscoveredDevice.id > last_id)
+                        .order_by(DiscoveredDevice.id.asc())
+                        .limit(200)
+                        .all()
+                    )
+
+                    for r in rows:
+                        data = {
+                            "id": r.id,
+                            "ip_address": r.ip_address,
+                            "hostname": r.hostname,
+                            "vendor": r.vendor,
+                            "model": r.model,
+                            "os_version": r.os_version,
+                            "device_type": r.device_type,
+                            "status": r.status,
+                            "snmp_status": r.snmp_status,
+                            "vendor_confidence": getattr(r, "vendor_confidence", 0.0),
+                            "chassis_candidate": getattr(r, "chassis_candidate", False),
+                            "matched_device_id": getattr(r, "matched_device_id", None),
+                            "issues": getattr(r, "issues", None),
+                            "evidence": getattr(r, "evidence", None),
+                        }
+                        last_id = r.id
+                        yield f"event: device\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+                    total = int(getattr(job, "total_ips", 0) or 0)
+                    scanned = int(getattr(job, "scanned_ips", 0) or 0)
+                    pct = int((scanned / total) * 100) if total > 0 else (100 if job.status == "completed" else 0)
+                    progress_data = {"status": job.status, "scanned_ips": scanned, "total_ips": total, "progress": pct}
+                    yield f"event: progress\ndata: {json.dumps(progress_data, ensure_ascii=False)}\n\n"
+
+                    if job.status in ("completed", "failed") and not rows and not log_rows:
+                        yield f"event: done\ndata: {json.dumps({'status': job.status}, ensure_ascii=False)}\n\n"
+                        return
+                finally:
+                    db.close()
+
+                await wait_for_log_event(0.8)
+        finally:
+            realtime_event_bus.unsubscribe(bus)
 
     return StreamingResponse(
         event_generator(),
@@ -8,9 +8,12 @@ from sqlalchemy.orm import Session
 from app.api import deps
 from app.db.session import get_db
 from app.models.device import Device, InterfaceMetric, SystemMetric
+from app.services import metric_rollup
 
 router = APIRouter()
 
+_TIER_PATTERN = "^(auto|raw|1m|5m|1h)$"
+
 
 def _utc_now() -> datetime:
     return datetime.now(timezone.utc)
@@ -53,6 +56,7 @@ def get_observability_summary(db: Session = Depends(get_db)):
                 "memory": float(getattr(m, "memory_usage", 0.0) or 0.0) if m else 0.0,
                 "traffic_in_bps": float(getattr(m, "traffic_in", 0.0) or 0.0) if m else 0.0,
                 "traffic_out_bps": float(getattr(m, "traffic_out", 0.0) or 0.0) if m else 0.0,
+                "rtt_ms": getattr(m, "rtt_ms", None) if m else None,
             }
         )
 
@@ -111,6 +115,7 @@ def list_observability_devices(db: Session = Depends(get_db)):
                 "memory": float(getattr(m, "memory_usage", 0.0) or 0.0) if m else 0.0,
                 "traffic_in_bps": float(getattr(m, "traffic_in", 0.0) or 0.0) if m else 0.0,
                 "traffic_out_bps": float(getattr(m, "traffic_out", 0.0) or 0.0) if m else 0.0,
+                "rtt_ms": getattr(m, "rtt_ms", None) if m else None,
                 "latest_ts": m.timestamp.isoformat() if m and m.timestamp else None,
             }
         )
@@ -120,22 +125,52 @@ def list_observability_devices(db: Session = Depends(get_db)):
 @router.get("/devices/{device_id}/timeseries", dependencies=[Depends(deps.get_current_user)])
 def get_device_timeseries(
     device_id: int,
-    minutes: int = Query(360, ge=5, le=4320),
+    minutes: int = Query(360, ge=5, le=43200),
     limit: int = Query(720, ge=60, le=5000),
+    tier: str = Query("auto", pattern=_TIER_PATTERN),
     db: Session = Depends(get_db),
 ):
     since = _utc_now() - timedelta(minutes=int(minutes))
-
-    rows = (
-        db.query(SystemMetric)
-        .filter(SystemMetric.device_id == device_id, SystemMetric.timestamp >= since)
-        .order_by(SystemMetric.timestamp.desc())
-        .limit(int(limit))
-        .all()
-    )
-    rows = list(reversed(rows))
+    if tier == "auto":
+        tier = metric_rollup.pick_tier(int(minutes) * 60)
 
     points = []
+    if tier != "raw":
+        for b in metric_rollup.system_series(db, device_id, since, tier)[-int(limit):]:
+            points.append(
+                {
+                    "ts": b["bucket"].isoformat() if b["bucket"] else None,
+                    "cpu": float(b["cpu_usage_avg"] or 0.0),
+                    "memory": float(b["memory_usage_avg"] or 0.0),
+                    "traffic_in_bps": float(b["traffic_in_avg"] or 0.0),
+                    "traffic_out_bps": float(b["traffic_out_avg"] or 0.0),
+                    "rtt_ms": b["rtt_ms_avg"],
+                    "cpu_max": b["cpu_usage_max"],
+                    "cpu_p95": b["cpu_usage_p95"],
+                    "memory_max": b["memory_usage_max"],
+                    "traffic_in_max": b["traffic_in_max"],
+                    "traffic_in_p95": b["traffic_in_p95"],
+                    "traffic_out_max": b["traffic_out_max"],
+                    "traffic_out_p95": b["traffic_out_p95"],
+                    "rtt_ms_max": b["rtt_ms_max"],
+                    "rtt_ms_p95": b["rtt_ms_p95"],
+                }
+            )
+        if not points:
+            # 롤업이 아직 없으면 raw 로 대체
+            tier = "raw"
+
+    rows = []
+    if tier == "raw":
+        rows = (
+            db.query(SystemMetric)
+            .filter(SystemMetric.device_id == device_id, SystemMetric.timestamp >= since)
+            .order_by(SystemMetric.timestamp.desc())
+            .limit(int(limit))
+            .all()
+        )
+        rows = list(reversed(rows))
+
     for r in rows:
         ts = r.timestamp
         points.append(
@@ -145,6 +180,7 @@ def get_device_timeseries(
                 "memory": float(r.memory_usage or 0.0),
                 "traffic_in_bps": float(r.traffic_in or 0.0),
                 "traffic_out_bps": float(r.traffic_out or 0.0),
+                "rtt_ms": r.rtt_ms,
             }
         )
 
@@ -159,7 +195,7 @@ def get_device_timeseries(
         }
         if device
         else None,
-        "range": {"minutes": int(minutes)},
+        "range": {"minutes": int(minutes), "tier": tier},
         "points": points,
     }
 
@@ -203,24 +239,50 @@ def list_device_interfaces(device_id: int, db: Session = Depends(get_db)):
 def get_interface_timeseries(
     device_id: int,
     name: str = Query(..., min_length=1),
-    minutes: int = Query(360, ge=5, le=4320),
+    minutes: int = Query(360, ge=5, le=43200),
     limit: int = Query(720, ge=60, le=5000),
+    tier: str = Query("auto", pattern=_TIER_PATTERN),
     db: Session = Depends(get_db),
 ):
     since = _utc_now() - timedelta(minutes=int(minutes))
-    rows = (
-        db.query(InterfaceMetric)
-        .filter(
-            InterfaceMetric.device_id == device_id,
-            InterfaceMetric.interface_name == name,
-            InterfaceMetric.timestamp >= since,
-        )
-        .order_by(InterfaceMetric.timestamp.desc())
-        .limit(int(limit))
-        .all()
-    )
-    rows = list(reversed(rows))
+    if tier == "auto":
+        tier = metric_rollup.pick_tier(int(minutes) * 60)
+
     points = []
+    if tier != "raw":
+        for b in metric_rollup.interface_series(db, device_id, name, since, tier)[-int(limit):]:
+            points.append(
+                {
+                    "ts": b["bucket"].isoformat() if b["bucket"] else None,
+                    "traffic_in_bps": float(b["in_bps_avg"] or 0.0),
+                    "traffic_out_bps": float(b["out_bps_avg"] or 0.0),
+                    "in_errors_per_sec": float(b["in_err_avg"] or 0.0),
+                    "out_errors_per_sec": float(b["out_err_avg"] or 0.0),
+                    "in_discards_per_sec": float(b["in_discards_avg"] or 0.0),
+                    "out_discards_per_sec": float(b["out_discards_avg"] or 0.0),
+                    "traffic_in_max": b["in_bps_max"],
+                    "traffic_in_p95": b["in_bps_p95"],
+                    "traffic_out_max": b["out_bps_max"],
+                    "traffic_out_p95": b["out_bps_p95"],
+                }
+            )
+        if not points:
+            tier = "raw"
+
+    rows = []
+    if tier == "raw":
+        rows = (
+            db.query(InterfaceMetric)
+            .filter(
+                InterfaceMetric.device_id == device_id,
+                InterfaceMetric.interface_name == name,
+                InterfaceMetric.timestamp >= since,
+            )
+            .order_by(InterfaceMetric.timestamp.desc())
+            .limit(int(limit))
+            .all()
+        )
+        rows = list(reversed(rows))
     for r in rows:
         points.append(
             {
@@ -233,4 +295,24 @@ def get_interface_timeseries(
                 "out_discards_per_sec": float(r.out_discards_per_sec or 0.0),
             }
         )
-    return {"device_id": device_id, "interface": name, "range": {"minutes": int(minutes)}, "points": points}
+    return {"device_id": device_id, "interface": name, "range": {"minutes": int(minutes), "tier": tier}, "points": points}
+
+
+@router.get("/monitor-shards", dependencies=[Depends(deps.require_admin)])
+def list_monitor_shards(db: Session = Depends(get_db)):
+    from app.services.monitor_shards import SHARD_COUNT, SHARD_KEY, ShardLeaseManager
+
+    shards = ShardLeaseManager.status(db)
+    owners = {}
+    for s in shards:
+        if s["state"] == "running" and s["owner"]:
+            owners[s["owner"]] = owners.get(s["owner"], 0) + 1
+    cycle_ms = [s["last_cycle_ms"] for s in shards if s["last_cycle_ms"] is not None]
+    return {
+        "shard_count": SHARD_COUNT,
+        "shard_key": SHARD_KEY,
+        "running": sum(1 for s in shards if s["state"] == "running"),
+        "owners": [{"owner": k, "shards": v} for k, v in sorted(owners.items())],
+        "max_cycle_ms": max(cycle_ms) if cycle_ms else None,
+        "shards": shards,
+    }
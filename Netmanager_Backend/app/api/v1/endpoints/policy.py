@@ -171,9 +171,9 @@ def deploy_policy(policy_id: int, req: PolicyDeployRequest, db: Session = Depend
             )
             conn = DeviceConnection(info)
             if conn.connect():
-                # Direct driver access for list of commands
-                output = conn.driver.push_config(commands)
-                conn.disconnect()
+                with conn:
+                    # Direct driver access for list of commands
+                    output = conn.driver.push_config(commands)
                 
                 results.append({
                     "device_id": dev.id,
@@ -13,6 +13,7 @@ from app.api import deps
 from app.models.user import User
 from app.models.topology import TopologyLayout
 from app.schemas.topology import TopologyLayoutCreate, TopologyLayoutResponse
+from app.services.path_trace_batch import PATH_TRACE_BATCH_MAX_FLOWS, iter_path_trace_batch
 from app.services.path_trace_service import PathTraceService
 from app.models.discovery import DiscoveryJob, DiscoveredDevice
 from app.models.topology_candidate import TopologyNeighborCandidate
@@ -117,6 +118,52 @@ def path_trace(
     return result
 
 
+class PathTraceFlow(BaseModel):
+    src_ip: str
+    dst_ip: str
+    id: Optional[str] = None
+
+
+class PathTraceBatchRequest(BaseModel):
+    flows: List[PathTraceFlow]
+    concurrency: Optional[int] = None
+
+
+@router.post("/path-trace/batch")
+def path_trace_batch(
+    req: PathTraceBatchRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(deps.require_viewer)
+):
+    """
+    Trace many flows at once. Streams NDJSON: one ``{"type": "result", "index": ...}`` line
+    per flow as it completes (not in request order), then a ``{"type": "summary"}`` line.
+    """
+    if not req.flows:
+        raise HTTPException(status_code=422, detail={"message": "flows is empty", "field": "flows"})
+    if len(req.flows) > PATH_TRACE_BATCH_MAX_FLOWS:
+        raise HTTPException(
+            status_code=422,
+            detail={"message": f"Too many flows (max {PATH_TRACE_BATCH_MAX_FLOWS})", "field": "flows"},
+        )
+    for i, flow in enumerate(req.flows):
+        for field in ("src_ip", "dst_ip"):
+            try:
+                ipaddress.ip_address(getattr(flow, field))
+            except ValueError:
+                raise HTTPException(status_code=422, detail={"message": f"Invalid {field}", "field": f"flows[{i}].{field}"})
+
+    flows = [flow.model_dump() for flow in req.flows]
+    # 요청 session 은 응답 스트리밍 전에 닫힐 수 있으므로 bind 만 넘김 (flow 마다 별도 session)
+    bind = db.get_bind()
+
+    def _lines():
+        for item in iter_path_trace_batch(bind, flows, concurrency=req.concurrency):
+            yield json.dumps(item, ensure_ascii=False, default=str) + "\n"
+
+    return StreamingResponse(_lines(), media_type="application/x-ndjson")
+
+
 @router.get("/stream")
 async def stream_topology_events(
     request: Request,
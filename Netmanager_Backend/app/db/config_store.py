@@ -0,0 +1,320 @@
+"""
+Content-addressed storage for ConfigBackup text.
+
+A backup row only keeps ``config_hash`` (SHA-256 of the config text); the text
+itself lives once in ``config_blobs`` no matter how many pulls returned it.
+Blobs are compressed with zstd (zlib when ``zstandard`` is not installed) and,
+when it is clearly smaller, stored as a line-level delta against the device's
+previous backup (``base_hash``). Chains are capped at ``CONFIG_DELTA_MAX_CHAIN``
+so a read never has to replay more than a few deltas.
+
+``ConfigBackup.raw_config`` stays the public attribute: assigning text queues
+the blob for the next flush, reading reconstructs (and caches by hash, blobs are
+immutable). Rows written before this change keep their text in the legacy
+``raw_config`` column and are read as-is until ``compact_legacy_backups``
+moves them over.
+
+Reading ``raw_config`` on a detached backup opens a short session on the engine
+the row came from. Blobs no backup (or delta) points at any more, e.g. after a
+device was deleted, are removed by ``prune_orphan_blobs``.
+"""
+from __future__ import annotations
+
+import difflib
+import hashlib
+import json
+import logging
+import os
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Iterable, List, Optional
+
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.exc import DetachedInstanceError
+
+try:
+    import zstandard
+except Exception:  # pragma: no cover - optional dependency
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+CONFIG_DELTA_ENABLED = os.getenv("CONFIG_DELTA_ENABLED", "true").strip().lower() in ("1", "true", "yes", "on")
+CONFIG_DELTA_MAX_CHAIN = int(os.getenv("CONFIG_DELTA_MAX_CHAIN", "8"))
+# delta 가 전체 압축본의 이 비율보다 작을 때만 delta 로 저장
+CONFIG_DELTA_MAX_RATIO = float(os.getenv("CONFIG_DELTA_MAX_RATIO", "0.5"))
+CONFIG_TEXT_CACHE_SIZE = int(os.getenv("CONFIG_TEXT_CACHE_SIZE", "128"))
+ZSTD_LEVEL = int(os.getenv("CONFIG_ZSTD_LEVEL", "9"))
+
+
+def config_hash(text: str) -> str:
+    return hashlib.sha256((text or "").encode("utf-8")).hexdigest()
+
+
+def _compress(payload: bytes) -> tuple[str, bytes]:
+    if zstandard is not None:
+        return "zstd", zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(payload)
+    return "zlib", zlib.compress(payload, 9)
+
+
+def _decompress(codec: str, data: bytes) -> bytes:
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("config blob is zstd-compressed but zstandard is not installed")
+        return zstandard.ZstdDecompressor().decompress(data)
+    if codec == "zlib":
+        return zlib.decompress(data)
+    return bytes(data)
+
+
+def make_delta(base: str, text: str) -> list:
+    """Line ops that turn ``base`` into ``text``: ["c", i1, i2] copies base lines, ["i", [lines]] inserts."""
+    a = base.splitlines(keepends=True)
+    b = text.splitlines(keepends=True)
+    ops: list = []
+    for tag, i1, i2, j1, j2 in difflib.SequenceMatcher(None, a, b, autojunk=False).get_opcodes():
+        if tag == "equal":
+            ops.append(["c", i1, i2])
+        elif j2 > j1:
+            ops.append(["i", b[j1:j2]])
+    return ops
+
+
+def apply_delta(base: str, ops: Iterable) -> str:
+    a = base.splitlines(keepends=True)
+    out: List[str] = []
+    for op in ops:
+        if op[0] == "c":
+            out.extend(a[op[1]:op[2]])
+        else:
+            out.extend(op[1])
+    return "".join(out)
+
+
+class _TextCache:
+    def __init__(self, max_entries: int):
+        self.max_entries = max(0, int(max_entries))
+        self._lock = threading.Lock()
+        self._data: "OrderedDict[str, str]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+
+    def put(self, key: str, value: str) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+text_cache = _TextCache(CONFIG_TEXT_CACHE_SIZE)
+
+
+def _blob_model():
+    from app.models.device import ConfigBlob
+
+    return ConfigBlob
+
+
+def _pending_blob(session: Session, digest: str):
+    ConfigBlob = _blob_model()
+    for obj in session.new:
+        if isinstance(obj, ConfigBlob) and obj.hash == digest:
+            return obj
+    return None
+
+
+def load_text(session: Session, digest: str) -> Optional[str]:
+    cached = text_cache.get(digest)
+    if cached is not None:
+        return cached
+    ConfigBlob = _blob_model()
+    blob = _pending_blob(session, digest) or session.get(ConfigBlob, digest)
+    if blob is None:
+        logger.warning("Config blob missing", extra={"config_hash": digest})
+        return None
+    payload = _decompress(blob.codec, blob.data)
+    if blob.base_hash:
+        base = load_text(session, blob.base_hash)
+        if base is None:
+            return None
+        text = apply_delta(base, json.loads(payload.decode("utf-8")))
+    else:
+        text = payload.decode("utf-8")
+    text_cache.put(digest, text)
+    return text
+
+
+def load_text_detached(obj, digest: str) -> Optional[str]:
+    """``load_text`` for a backup no longer attached to a session, via the engine it was loaded from."""
+    cached = text_cache.get(digest)
+    if cached is not None:
+        return cached
+    bind = getattr(obj, "_blob_bind", None)
+    if bind is None:
+        raise DetachedInstanceError(
+            f"ConfigBackup.raw_config of a detached instance needs a session (blob {digest[:12]} is not cached)"
+        )
+    with Session(bind=bind) as session:
+        return load_text(session, digest)
+
+
+def _previous_hash(session: Session, device_id: Optional[int], digest: str) -> Optional[str]:
+    if device_id is None:
+        return None
+    from app.models.device import ConfigBackup
+
+    with session.no_autoflush:
+        row = (
+            session.query(ConfigBackup.config_hash)
+            .filter(ConfigBackup.device_id == device_id, ConfigBackup.config_hash.isnot(None), ConfigBackup.config_hash != digest)
+            .order_by(ConfigBackup.id.desc())
+            .first()
+        )
+    return row[0] if row else None
+
+
+def store_text(session: Session, text: str, device_id: Optional[int] = None) -> str:
+    """Make sure a blob for ``text`` exists (dedup by hash); returns the hash."""
+    digest = config_hash(text)
+    ConfigBlob = _blob_model()
+    with session.no_autoflush:
+        if _pending_blob(session, digest) is not None or session.get(ConfigBlob, digest) is not None:
+            return digest
+
+    raw = text.encode("utf-8")
+    codec, data = _compress(raw)
+    base_hash = None
+    depth = 0
+
+    base_digest = _previous_hash(session, device_id, digest) if CONFIG_DELTA_ENABLED else None
+    if base_digest:
+        with session.no_autoflush:
+            base_blob = session.get(ConfigBlob, base_digest)
+        base_text = load_text(session, base_digest) if base_blob is not None else None
+        if base_text is not None and int(base_blob.depth or 0) < CONFIG_DELTA_MAX_CHAIN:
+            ops = make_delta(base_text, text)
+            if apply_delta(base_text, ops) == text:
+                d_codec, d_data = _compress(json.dumps(ops, separators=(",", ":")).encode("utf-8"))
+                if len(d_data) < len(data) * CONFIG_DELTA_MAX_RATIO:
+                    codec, data = d_codec, d_data
+                    base_hash = base_digest
+                    depth = int(base_blob.depth or 0) + 1
+
+    _insert_blob(
+        session,
+        dict(
+            hash=digest,
+            codec=codec,
+            base_hash=base_hash,
+            depth=depth,
+            size=len(raw),
+            stored_size=len(data),
+            data=data,
+        ),
+    )
+    text_cache.put(digest, text)
+    return digest
+
+
+def _insert_blob(session: Session, values: dict) -> None:
+    """
+    Blobs are immutable and keyed by content, so a concurrent writer (another device
+    with the same config in a parallel sync) may insert the same hash first: ignore it.
+    """
+    ConfigBlob = _blob_model()
+    bind = session.get_bind()
+    dialect = bind.dialect.name if bind is not None else ""
+    if dialect in ("postgresql", "sqlite"):
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        table = ConfigBlob.__table__
+        session.execute(
+            dialect_insert(table).values(**values).on_conflict_do_nothing(index_elements=[table.c.hash])
+        )
+    else:
+        session.add(ConfigBlob(**values))
+
+
+@event.listens_for(Session, "before_flush")
+def _store_pending_config_text(session: Session, flush_context, instances) -> None:
+    from app.models.device import ConfigBackup
+
+    for obj in list(session.new) + list(session.dirty):
+        if isinstance(obj, ConfigBackup) and obj._pending_text is not None:
+            text = obj._pending_text
+            obj._pending_text = None
+            obj.config_hash = store_text(session, text, obj.device_id)
+            obj.legacy_raw_config = None
+
+
+def _remember_bind(session: Session, obj) -> None:
+    from app.models.device import ConfigBackup
+
+    if isinstance(obj, ConfigBackup):
+        obj._blob_bind = session.get_bind()
+
+
+event.listen(Session, "loaded_as_persistent", _remember_bind)
+event.listen(Session, "pending_to_persistent", _remember_bind)
+
+
+def compact_legacy_backups(session: Session, batch_size: int = 200) -> int:
+    """Move up to ``batch_size`` legacy ``raw_config`` texts into blobs (oldest first, caller commits)."""
+    from app.models.device import ConfigBackup
+
+    rows = (
+        session.query(ConfigBackup)
+        .filter(ConfigBackup.config_hash.is_(None), ConfigBackup.legacy_raw_config.isnot(None))
+        .order_by(ConfigBackup.id.asc())
+        .limit(int(batch_size))
+        .all()
+    )
+    for row in rows:
+        text = row.legacy_raw_config
+        row.config_hash = store_text(session, text, row.device_id)
+        row.legacy_raw_config = None
+        session.flush()
+    return len(rows)
+
+
+def prune_orphan_blobs(session: Session, batch_size: int = 500) -> int:
+    """
+    Delete blobs that no backup references and no other blob uses as a delta base
+    (caller commits). Removing a delta can orphan its base, so this repeats until
+    nothing is left.
+    """
+    from app.models.device import ConfigBackup
+
+    ConfigBlob = _blob_model()
+    referenced = select(ConfigBackup.config_hash).where(ConfigBackup.config_hash.isnot(None))
+    bases = select(ConfigBlob.base_hash).where(ConfigBlob.base_hash.isnot(None)).scalar_subquery()
+    deleted = 0
+    while True:
+        hashes = [
+            row[0]
+            for row in session.query(ConfigBlob.hash)
+            .filter(ConfigBlob.hash.notin_(referenced), ConfigBlob.hash.notin_(bases))
+            .limit(int(batch_size))
+            .all()
+        ]
+        if not hashes:
+            return deleted
+        session.query(ConfigBlob).filter(ConfigBlob.hash.in_(hashes)).delete(synchronize_session=False)
+        session.flush()
+        deleted += len(hashes)
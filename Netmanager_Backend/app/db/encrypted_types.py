@@ -1,9 +1,91 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
 from sqlalchemy import String
+from sqlalchemy.orm import defer
 from sqlalchemy.types import TypeDecorator
 
 from app.core.field_encryption import get_fernet
 
 
+class DecryptedValueCache:
+    """
+    Bounded, TTL-evicted cache of decrypted column values, keyed by the SHA-256 of
+    the stored ciphertext. Fernet tokens carry a random IV, so a changed or
+    re-encrypted credential always gets a new key and old entries simply age out.
+    """
+
+    def __init__(self, max_entries: int = 20000, ttl_sec: float = 300.0):
+        self.max_entries = max(int(max_entries), 0)
+        self.ttl_sec = float(ttl_sec)
+        self._lock = threading.Lock()
+        self._data: "OrderedDict[bytes, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: bytes):
+        now = time.monotonic()
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            value, expires_at = item
+            if expires_at <= now:
+                del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: bytes, value: str) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl_sec)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+decrypted_cache = DecryptedValueCache(
+    max_entries=int(os.getenv("CREDENTIAL_CACHE_SIZE", "20000")),
+    ttl_sec=float(os.getenv("CREDENTIAL_CACHE_TTL_SEC", "300")),
+)
+
+
+def without_credentials(model, keep=()):
+    """Query options that skip loading (and decrypting) every EncryptedString column of ``model`` not in ``keep``."""
+    return [
+        defer(getattr(model, col.key))
+        for col in model.__table__.columns
+        if isinstance(col.type, EncryptedString) and col.key not in keep
+    ]
+
+
+def ssh_login_only(model):
+    """``without_credentials`` that still loads the SSH login password (gNMI/SSH pollers need nothing else)."""
+    return without_credentials(model, keep=("ssh_password",))
+
+
+def snmp_only(model):
+    """``without_credentials`` that still loads the SNMP community and v3 keys (SNMP pollers need nothing else)."""
+    return without_credentials(model, keep=("snmp_community", "snmp_v3_auth_key", "snmp_v3_priv_key"))
+
+
 class EncryptedString(TypeDecorator):
     impl = String
     cache_ok = True
@@ -25,9 +107,14 @@ class EncryptedString(TypeDecorator):
         s = str(value)
         if not s.startswith("enc:"):
             return s
+        key = hashlib.sha256(s.encode("utf-8")).digest()
+        cached = decrypted_cache.get(key)
+        if cached is not None:
+            return cached
         token = s[4:]
         try:
-            return get_fernet().decrypt(token.encode("utf-8")).decode("utf-8")
+            plain = get_fernet().decrypt(token.encode("utf-8")).decode("utf-8")
         except Exception:
             return None
-
+        decrypted_cache.put(key, plain)
+        return plain
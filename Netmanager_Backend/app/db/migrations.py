@@ -1,11 +1,15 @@
 from __future__ import annotations
 
+import logging
+import os
 from typing import Iterable
 
 from sqlalchemy import Engine, text
 
 from app.core.field_encryption import get_fernet
 
+logger = logging.getLogger(__name__)
+
 
 def _has_column(conn, dialect: str, table: str, column: str) -> bool:
     if dialect == "sqlite":
@@ -99,8 +103,12 @@ def _encrypt_table_columns(conn, dialect: str, table: str, id_col: str, columns:
 
 
 def _safe_execute(conn, sql: str, params: dict | None = None) -> None:
+    # PostgreSQL: 실패한 문장이 트랜잭션 전체를 망가뜨리지 않도록 savepoint 안에서 실행
     try:
-        if params:
+        if conn.dialect.name == "postgresql":
+            with conn.begin_nested():
+                conn.execute(text(sql), params or {})
+        elif params:
             conn.execute(text(sql), params)
         else:
             conn.execute(text(sql))
@@ -108,6 +116,27 @@ def _safe_execute(conn, sql: str, params: dict | None = None) -> None:
         pass
 
 
+def _partition_time_series(engine: Engine) -> None:
+    """
+    이미 파티션 테이블로 전환된 metric/event 테이블의 미래 파티션만 생성.
+    전환 자체는 기동 시 하지 않음: python -m app.scripts.partition_metric_tables
+    """
+    mode = os.getenv("METRIC_PARTITIONING", "auto").strip().lower()
+    if mode in {"off", "false", "0", "no"}:
+        return
+    from app.services import metric_partitions
+
+    for table in metric_partitions.PARTITIONED_TABLES:
+        try:
+            with engine.begin() as conn:
+                if conn.dialect.name != "postgresql":
+                    return
+                if metric_partitions.is_partitioned(conn, table):
+                    metric_partitions.ensure_partitions(conn, table)
+        except Exception:
+            logger.exception("Partitioning failed", extra={"table": table})
+
+
 def _dedupe_links(conn) -> None:
     rows = conn.execute(
         text(
@@ -218,6 +247,7 @@ def run_migrations(engine: Engine) -> None:
         has_devices = _table_exists(conn, dialect, "devices")
         has_system_settings = _table_exists(conn, dialect, "system_settings")
         has_system_metrics = _table_exists(conn, dialect, "system_metrics")
+        has_interface_counter_states = _table_exists(conn, dialect, "interface_counter_states")
         has_interface_metrics = _table_exists(conn, dialect, "interface_metrics")
         has_event_logs = _table_exists(conn, dialect, "event_logs")
         has_interfaces = _table_exists(conn, dialect, "interfaces")
@@ -450,6 +480,18 @@ def run_migrations(engine: Engine) -> None:
                 conn.execute(text("CREATE INDEX IF NOT EXISTS ix_devices_site_id ON devices (site_id)"))
             if _has_column(conn, dialect, "devices", "owner_id") and not _index_exists(conn, dialect, "ix_devices_owner_id"):
                 conn.execute(text("CREATE INDEX IF NOT EXISTS ix_devices_owner_id ON devices (owner_id)"))
+            if not _index_exists(conn, dialect, "ix_devices_ip_address"):
+                conn.execute(text("CREATE INDEX IF NOT EXISTS ix_devices_ip_address ON devices (ip_address)"))
+
+        if _table_exists(conn, dialect, "device_poll_states"):
+            if _has_column(conn, dialect, "device_poll_states", "shard_id") is False:
+                conn.execute(text("ALTER TABLE device_poll_states ADD COLUMN shard_id INTEGER"))
+            if _has_column(conn, dialect, "device_poll_states", "shard_basis") is False:
+                conn.execute(text("ALTER TABLE device_poll_states ADD COLUMN shard_basis VARCHAR"))
+            if _has_column(conn, dialect, "device_poll_states", "shard_site_id") is False:
+                conn.execute(text("ALTER TABLE device_poll_states ADD COLUMN shard_site_id INTEGER"))
+            if not _index_exists(conn, dialect, "ix_device_poll_states_shard_id"):
+                conn.execute(text("CREATE INDEX IF NOT EXISTS ix_device_poll_states_shard_id ON device_poll_states (shard_id)"))
 
         if has_interfaces:
             if _has_column(conn, dialect, "interfaces", "device_id") and not _index_exists(conn, dialect, "ix_interfaces_device_id"):
@@ -468,6 +510,8 @@ def run_migrations(engine: Engine) -> None:
                 conn.execute(text("CREATE INDEX IF NOT EXISTS ix_links_source_target ON links (source_device_id, target_device_id)"))
 
         if has_system_metrics:
+            if _has_column(conn, dialect, "system_metrics", "rtt_ms") is False:
+                conn.execute(text("ALTER TABLE system_metrics ADD COLUMN rtt_ms FLOAT"))
             if _has_column(conn, dialect, "system_metrics", "device_id") and not _index_exists(conn, dialect, "ix_system_metrics_device_id"):
                 conn.execute(text("CREATE INDEX IF NOT EXISTS ix_system_metrics_device_id ON system_metrics (device_id)"))
             if _has_column(conn, dialect, "system_metrics", "timestamp") and not _index_exists(conn, dialect, "ix_system_metrics_timestamp"):
@@ -479,6 +523,10 @@ def run_migrations(engine: Engine) -> None:
             ):
                 conn.execute(text("CREATE INDEX IF NOT EXISTS ix_system_metrics_device_ts ON system_metrics (device_id, timestamp)"))
 
+        if has_interface_counter_states:
+            if _has_column(conn, dialect, "interface_counter_states", "sys_uptime") is False:
+                conn.execute(text("ALTER TABLE interface_counter_states ADD COLUMN sys_uptime BIGINT"))
+
         if dialect == "postgresql":
             _safe_execute(conn, "CREATE EXTENSION IF NOT EXISTS timescaledb")
             if has_system_metrics:
@@ -494,9 +542,20 @@ def run_migrations(engine: Engine) -> None:
                     SELECT time_bucket('1 minute', timestamp) AS bucket,
                            device_id,
                            avg(cpu_usage) AS cpu_usage_avg,
+                           min(cpu_usage) AS cpu_usage_min,
+                           max(cpu_usage) AS cpu_usage_max,
                            avg(memory_usage) AS memory_usage_avg,
+                           min(memory_usage) AS memory_usage_min,
+                           max(memory_usage) AS memory_usage_max,
                            avg(traffic_in) AS traffic_in_avg,
-                           avg(traffic_out) AS traffic_out_avg
+                           min(traffic_in) AS traffic_in_min,
+                           max(traffic_in) AS traffic_in_max,
+                           avg(traffic_out) AS traffic_out_avg,
+                           min(traffic_out) AS traffic_out_min,
+                           max(traffic_out) AS traffic_out_max,
+                           avg(rtt_ms) AS rtt_ms_avg,
+                           min(rtt_ms) AS rtt_ms_min,
+                           max(rtt_ms) AS rtt_ms_max
                     FROM system_metrics
                     GROUP BY bucket, device_id
                     WITH NO DATA
@@ -510,9 +569,20 @@ def run_migrations(engine: Engine) -> None:
                     SELECT time_bucket('5 minutes', timestamp) AS bucket,
                            device_id,
                            avg(cpu_usage) AS cpu_usage_avg,
+                           min(cpu_usage) AS cpu_usage_min,
+                           max(cpu_usage) AS cpu_usage_max,
                            avg(memory_usage) AS memory_usage_avg,
+                           min(memory_usage) AS memory_usage_min,
+                           max(memory_usage) AS memory_usage_max,
                            avg(traffic_in) AS traffic_in_avg,
-                           avg(traffic_out) AS traffic_out_avg
+                           min(traffic_in) AS traffic_in_min,
+                           max(traffic_in) AS traffic_in_max,
+                           avg(traffic_out) AS traffic_out_avg,
+                           min(traffic_out) AS traffic_out_min,
+                           max(traffic_out) AS traffic_out_max,
+                           avg(rtt_ms) AS rtt_ms_avg,
+                           min(rtt_ms) AS rtt_ms_min,
+                           max(rtt_ms) AS rtt_ms_max
                     FROM system_metrics
                     GROUP BY bucket, device_id
                     WITH NO DATA
@@ -526,9 +596,20 @@ def run_migrations(engine: Engine) -> None:
                     SELECT time_bucket('1 hour', timestamp) AS bucket,
                            device_id,
                            avg(cpu_usage) AS cpu_usage_avg,
+                           min(cpu_usage) AS cpu_usage_min,
+                           max(cpu_usage) AS cpu_usage_max,
                            avg(memory_usage) AS memory_usage_avg,
+                           min(memory_usage) AS memory_usage_min,
+                           max(memory_usage) AS memory_usage_max,
                            avg(traffic_in) AS traffic_in_avg,
-                           avg(traffic_out) AS traffic_out_avg
+                           min(traffic_in) AS traffic_in_min,
+                           max(traffic_in) AS traffic_in_max,
+                           avg(traffic_out) AS traffic_out_avg,
+                           min(traffic_out) AS traffic_out_min,
+                           max(traffic_out) AS traffic_out_max,
+                           avg(rtt_ms) AS rtt_ms_avg,
+                           min(rtt_ms) AS rtt_ms_min,
+                           max(rtt_ms) AS rtt_ms_max
                     FROM system_metrics
                     GROUP BY bucket, device_id
                     WITH NO DATA
@@ -611,11 +692,19 @@ def run_migrations(engine: Engine) -> None:
                            device_id,
                            interface_name,
                            avg(traffic_in_bps) AS in_bps_avg,
+                           min(traffic_in_bps) AS in_bps_min,
+                           max(traffic_in_bps) AS in_bps_max,
                            avg(traffic_out_bps) AS out_bps_avg,
+                           min(traffic_out_bps) AS out_bps_min,
+                           max(traffic_out_bps) AS out_bps_max,
                            avg(in_errors_per_sec) AS in_err_avg,
+                           max(in_errors_per_sec) AS in_err_max,
                            avg(out_errors_per_sec) AS out_err_avg,
+                           max(out_errors_per_sec) AS out_err_max,
                            avg(in_discards_per_sec) AS in_discards_avg,
-                           avg(out_discards_per_sec) AS out_discards_avg
+                           max(in_discards_per_sec) AS in_discards_max,
+                           avg(out_discards_per_sec) AS out_discards_avg,
+                           max(out_discards_per_sec) AS out_discards_max
                     FROM interface_metrics
                     GROUP BY bucket, device_id, interface_name
                     WITH NO DATA
@@ -630,11 +719,19 @@ def run_migrations(engine: Engine) -> None:
                            device_id,
                            interface_name,
                            avg(traffic_in_bps) AS in_bps_avg,
+                           min(traffic_in_bps) AS in_bps_min,
+                           max(traffic_in_bps) AS in_bps_max,
                            avg(traffic_out_bps) AS out_bps_avg,
+                           min(traffic_out_bps) AS out_bps_min,
+                           max(traffic_out_bps) AS out_bps_max,
                            avg(in_errors_per_sec) AS in_err_avg,
+                           max(in_errors_per_sec) AS in_err_max,
                            avg(out_errors_per_sec) AS out_err_avg,
+                           max(out_errors_per_sec) AS out_err_max,
                            avg(in_discards_per_sec) AS in_discards_avg,
-                           avg(out_discards_per_sec) AS out_discards_avg
+                           max(in_discards_per_sec) AS in_discards_max,
+                           avg(out_discards_per_sec) AS out_discards_avg,
+                           max(out_discards_per_sec) AS out_discards_max
                     FROM interface_metrics
                     GROUP BY bucket, device_id, interface_name
                     WITH NO DATA
@@ -649,11 +746,19 @@ def run_migrations(engine: Engine) -> None:
                            device_id,
                            interface_name,
                            avg(traffic_in_bps) AS in_bps_avg,
+                           min(traffic_in_bps) AS in_bps_min,
+                           max(traffic_in_bps) AS in_bps_max,
                            avg(traffic_out_bps) AS out_bps_avg,
+                           min(traffic_out_bps) AS out_bps_min,
+                           max(traffic_out_bps) AS out_bps_max,
                            avg(in_errors_per_sec) AS in_err_avg,
+                           max(in_errors_per_sec) AS in_err_max,
                            avg(out_errors_per_sec) AS out_err_avg,
+                           max(out_errors_per_sec) AS out_err_max,
                            avg(in_discards_per_sec) AS in_discards_avg,
-                           avg(out_discards_per_sec) AS out_discards_avg
+                           max(in_discards_per_sec) AS in_discards_max,
+                           avg(out_discards_per_sec) AS out_discards_avg,
+                           max(out_discards_per_sec) AS out_discards_max
                     FROM interface_metrics
                     GROUP BY bucket, device_id, interface_name
                     WITH NO DATA
@@ -752,6 +857,10 @@ def run_migrations(engine: Engine) -> None:
                     conn.execute(text("ALTER TABLE config_backups ADD COLUMN created_at TIMESTAMP"))
             if _has_column(conn, dialect, "config_backups", "device_id") and not _index_exists(conn, dialect, "ix_config_backups_device_id"):
                 conn.execute(text("CREATE INDEX IF NOT EXISTS ix_config_backups_device_id ON config_backups (device_id)"))
+            if _has_column(conn, dialect, "config_backups", "config_hash") is False:
+                conn.execute(text("ALTER TABLE config_backups ADD COLUMN config_hash VARCHAR(64)"))
+            if not _index_exists(conn, dialect, "ix_config_backups_config_hash"):
+                conn.execute(text("CREATE INDEX IF NOT EXISTS ix_config_backups_config_hash ON config_backups (config_hash)"))
 
         if has_compliance_rules:
             if _has_column(conn, dialect, "compliance_rules", "standard_id") and not _index_exists(conn, dialect, "ix_compliance_rules_standard_id"):
@@ -879,3 +988,6 @@ def run_migrations(engine: Engine) -> None:
             )
         if has_system_settings:
             _encrypt_table_columns(conn, dialect, "system_settings", "id", ["value"])
+
+    if dialect == "postgresql":
+        _partition_time_series(engine)
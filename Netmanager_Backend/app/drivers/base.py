@@ -77,6 +77,12 @@ class NetworkDriver(ABC):
     def rollback(self) -> bool:
         return False
 
+    def reset_session_state(self) -> None:
+        """Forget per-job state (rollback snapshot, replace profile, last error) before a pooled session is reused."""
+        self._rollback_ref = None
+        self._config_replace_profile = None
+        self.last_error = None
+
     # ================================================================
     # SWIM (Software Image Management) Methods
     # ================================================================
@@ -286,17 +292,7 @@ class NetworkDriver(ABC):
         max_updates: int = 2000,
     ) -> Dict[str, Any]:
         target = (self.hostname, int(port or 57400))
-        sample_interval_ns = int(max(sample_interval_sec, 0.1) * 1_000_000_000)
-        subscribe = {
-            "mode": "stream",
-            "encoding": "json_ietf",
-            "subscription": [
-                {"path": "/system/processes/process/state/cpu-utilization", "mode": "sample", "sample_interval": sample_interval_ns},
-                {"path": "/system/state/memory/utilization", "mode": "sample", "sample_interval": sample_interval_ns},
-                {"path": "/interfaces/interface/state/counters", "mode": "sample", "sample_interval": sample_interval_ns},
-                {"path": "/interfaces/interface/state/oper-status", "mode": "on_change"},
-            ],
-        }
+        subscribe = self._gnmi_subscribe_request(sample_interval_sec)
 
         cpu_vals: List[float] = []
         mem_vals: List[float] = []
@@ -318,27 +314,7 @@ class NetworkDriver(ABC):
                     continue
                 if len(raw_msgs) < max_updates:
                     raw_msgs.append(msg)
-                upd = msg.get("update") or {}
-                prefix = upd.get("prefix")
-                updates = upd.get("update") or []
-                if not isinstance(updates, list):
-                    continue
-                for u in updates:
-                    if not isinstance(u, dict):
-                        continue
-                    path = u.get("path")
-                    val = u.get("val")
-                    if path is None or val is None:
-                        continue
-                    full_path = self._join_gnmi_prefix(prefix, path)
-                    self._ingest_gnmi_path_value(
-                        path_str=full_path,
-                        path_elems=None,
-                        val=val,
-                        cpu_vals=cpu_vals,
-                        mem_vals=mem_vals,
-                        if_counters=if_counters,
-                    )
+                self._ingest_gnmi_stream_msg(msg, cpu_vals, mem_vals, if_counters)
 
         total_in, total_out = self._sum_octets(if_counters)
         cpu = sum(cpu_vals) / len(cpu_vals) if cpu_vals else 0.0
@@ -353,6 +329,100 @@ class NetworkDriver(ABC):
             "raw_gnmi": raw_msgs,
         }
 
+    def _gnmi_subscribe_request(self, sample_interval_sec: float = 1.0) -> Dict[str, Any]:
+        sample_interval_ns = int(max(sample_interval_sec, 0.1) * 1_000_000_000)
+        return {
+            "mode": "stream",
+            "encoding": "json_ietf",
+            "subscription": [
+                {"path": "/system/processes/process/state/cpu-utilization", "mode": "sample", "sample_interval": sample_interval_ns},
+                {"path": "/system/state/memory/utilization", "mode": "sample", "sample_interval": sample_interval_ns},
+                {"path": "/interfaces/interface/state/counters", "mode": "sample", "sample_interval": sample_interval_ns},
+                {"path": "/interfaces/interface/state/oper-status", "mode": "on_change"},
+            ],
+        }
+
+    def _ingest_gnmi_stream_msg(
+        self,
+        msg: dict,
+        cpu_vals: List[float],
+        mem_vals: List[float],
+        if_counters: Dict[str, Dict[str, Any]],
+    ) -> None:
+        upd = msg.get("update") or {}
+        prefix = upd.get("prefix")
+        updates = upd.get("update") or []
+        if not isinstance(updates, list):
+            return
+        for u in updates:
+            if not isinstance(u, dict):
+                continue
+            path = u.get("path")
+            val = u.get("val")
+            if path is None or val is None:
+                continue
+            full_path = self._join_gnmi_prefix(prefix, path)
+            self._ingest_gnmi_path_value(
+                path_str=full_path,
+                path_elems=None,
+                val=val,
+                cpu_vals=cpu_vals,
+                mem_vals=mem_vals,
+                if_counters=if_counters,
+            )
+
+    def iter_gnmi_updates(self, port: int = 57400, sample_interval_sec: float = 1.0, poll_timeout_sec: float = 1.0):
+        """
+        Long-lived SAMPLE + ON_CHANGE subscription on one channel.
+        Yields one parsed batch per notification:
+          {"cpu": [..], "memory": [..], "if_counters": {if_name: {...}}}
+        and None whenever ``poll_timeout_sec`` passes without data, so the caller can
+        check for shutdown. Closing the generator closes the stream and the channel.
+        Raises on connection errors, including a stream that died after it was opened
+        (the caller reconnects).
+        """
+        try:
+            from pygnmi.client import gNMIclient
+        except ImportError:
+            raise NotImplementedError("gNMI library 'pygnmi' not installed.")
+
+        target = (self.hostname, int(port or 57400))
+        subscribe = self._gnmi_subscribe_request(sample_interval_sec)
+        with gNMIclient(target=target, username=self.username, password=self.password, insecure=True) as gc:
+            sub = gc.subscribe_stream(subscribe=subscribe)
+            try:
+                while True:
+                    try:
+                        msg = sub.get_update(timeout=poll_timeout_sec)
+                    except TimeoutError:
+                        self._raise_if_gnmi_stream_dead(sub)
+                        yield None
+                        continue
+                    if not isinstance(msg, dict):
+                        continue
+                    cpu_vals: List[float] = []
+                    mem_vals: List[float] = []
+                    if_counters: Dict[str, Dict[str, Any]] = {}
+                    self._ingest_gnmi_stream_msg(msg, cpu_vals, mem_vals, if_counters)
+                    if cpu_vals or mem_vals or if_counters:
+                        yield {"cpu": cpu_vals, "memory": mem_vals, "if_counters": if_counters}
+            finally:
+                try:
+                    sub.close()
+                except Exception:
+                    pass
+
+    @staticmethod
+    def _raise_if_gnmi_stream_dead(sub: Any) -> None:
+        # pygnmi 의 구독 스레드는 gRPC 스트림이 끊기면 sub.error 를 남기고 종료하며,
+        # 이후 get_update 는 TimeoutError 만 반복하므로 여기서 끊김을 드러냄
+        error = getattr(sub, "error", None)
+        if error is not None:
+            raise ConnectionError(f"gNMI stream failed: {error}")
+        thread = getattr(sub, "_subscribe_thread", None)
+        if thread is not None and not thread.is_alive():
+            raise ConnectionError("gNMI stream closed by target")
+
     def _join_gnmi_prefix(self, prefix: Any, path: Any) -> str:
         prefix_str = "" if prefix is None else str(prefix)
         path_str = "" if path is None else str(path)
@@ -150,6 +150,12 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.exception("Auto Discovery Scheduler failed to start")
 
+    try:
+        from app.services.topology_graph import topology_graph_store
+        topology_graph_store.start_event_listener()
+    except Exception:
+        logger.exception("Topology graph event listener failed to start")
+
     yield
 
     try:
@@ -159,6 +165,12 @@ async def lifespan(app: FastAPI):
     except Exception:
         pass
 
+    try:
+        from app.services.ssh_session_pool import ssh_session_pool
+        ssh_session_pool.close_all()
+    except Exception:
+        pass
+
     logger.info("NetManager API Server Stopping...")
 
 
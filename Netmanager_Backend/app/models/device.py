@@ -1,8 +1,9 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Float, Text, Boolean, JSON, Index
-from sqlalchemy.orm import relationship, backref
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, ForeignKey, Float, Text, Boolean, JSON, Index, LargeBinary
+from sqlalchemy.orm import relationship, backref, object_session
 from sqlalchemy.sql import func
 from app.db.session import Base
 from app.db.encrypted_types import EncryptedString
+from app.db import config_store
 
 
 # 1. 사이트 (Site)
@@ -75,7 +76,7 @@ class Device(Base):
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, unique=True, index=True, nullable=False)
     hostname = Column(String, index=True, nullable=True) # Actual hostname from device
-    ip_address = Column(String, nullable=False)
+    ip_address = Column(String, index=True, nullable=False)
     mac_address = Column(String, nullable=True)
     snmp_community = Column(EncryptedString, default="public", nullable=False)
     snmp_version = Column(String, default="v2c", nullable=False)
@@ -133,6 +134,12 @@ class Device(Base):
     issues = relationship("Issue", back_populates="device", cascade="all, delete-orphan")
     compliance_report = relationship("ComplianceReport", uselist=False, back_populates="device",
                                      cascade="all, delete-orphan")
+    poll_state = relationship("DevicePollState", uselist=False, back_populates="device",
+                              cascade="all, delete-orphan")
+    sync_state = relationship("DeviceSyncState", uselist=False, back_populates="device",
+                              cascade="all, delete-orphan")
+    counter_states = relationship("InterfaceCounterState", back_populates="device",
+                                  cascade="all, delete-orphan")
 
 
 # --- 하위 모델들 ---
@@ -188,10 +195,160 @@ class SystemMetric(Base):
     memory_usage = Column(Float, default=0.0)
     traffic_in = Column(Float, default=0.0)
     traffic_out = Column(Float, default=0.0)
+    rtt_ms = Column(Float, nullable=True)  # ICMP echo RTT (None: no reply / not measured)
     timestamp = Column(DateTime(timezone=True), server_default=func.now(), index=True)
     device = relationship("Device", back_populates="metrics")
 
 
+class DevicePollState(Base):
+    """모니터링 스케줄러 상태 (장비별 next-due, 연속 실패 횟수)"""
+    __tablename__ = "device_poll_states"
+    device_id = Column(Integer, ForeignKey("devices.id", ondelete="CASCADE"), primary_key=True)
+    next_poll_at = Column(DateTime, nullable=True, index=True)
+    next_status_at = Column(DateTime, nullable=True, index=True)
+    last_poll_at = Column(DateTime, nullable=True)
+    last_status_at = Column(DateTime, nullable=True)
+    consecutive_failures = Column(Integer, default=0, nullable=False)
+    effective_interval = Column(Integer, nullable=True)
+    last_error = Column(String, nullable=True)
+    # 모니터링 샤드 (PollScheduler.assign_shards): 샤드별 claim 이 전체 장비를 읽지 않도록 저장
+    shard_id = Column(Integer, nullable=True, index=True)
+    shard_basis = Column(String, nullable=True)  # "<shard key>:<shard count>"; 바뀌면 재배정
+    shard_site_id = Column(Integer, nullable=True)  # site 키일 때 배정 당시의 site
+    device = relationship("Device", back_populates="poll_state")
+
+
+class DeviceSyncState(Base):
+    """SSH 동기화 상태 (마지막 config 변경 marker, 전체/경량 동기화 시각, 마지막에 건너뛴 collector)"""
+    __tablename__ = "device_sync_states"
+    device_id = Column(Integer, ForeignKey("devices.id", ondelete="CASCADE"), primary_key=True)
+    change_marker = Column(String, nullable=True)
+    last_full_sync_at = Column(DateTime, nullable=True)
+    last_sync_at = Column(DateTime, nullable=True)
+    last_mode = Column(String, nullable=True)  # full, light
+    last_reason = Column(String, nullable=True)  # first_sync, syslog, config_counter, marker, max_age, unchanged ...
+    skipped_collectors = Column(JSON, nullable=True)
+    full_syncs = Column(Integer, default=0, nullable=False)
+    light_syncs = Column(Integer, default=0, nullable=False)
+    device = relationship("Device", back_populates="sync_state")
+
+
+class DeviceL3Table(Base):
+    """경로 추적용 L3 테이블 스냅샷 (FIB, ARP, VRF). 백그라운드 수집기가 주기적으로 갱신"""
+    __tablename__ = "device_l3_tables"
+    device_id = Column(Integer, ForeignKey("devices.id", ondelete="CASCADE"), primary_key=True)
+    source = Column(String, nullable=True)  # snmp, ssh
+    routes = Column(JSON, nullable=True)  # [{prefix, vrf, next_hop_ip, outgoing_interface, protocol}], None = 수집 안 됨/너무 큼
+    arp = Column(JSON, nullable=True)  # [{ip, mac, interface, vrf}]
+    vrfs = Column(JSON, nullable=True)
+    interface_vrfs = Column(JSON, nullable=True)  # {interface: vrf}
+    route_count = Column(Integer, default=0, nullable=False)
+    collected_at = Column(DateTime, nullable=True)
+    error = Column(Text, nullable=True)
+
+
+class InterfaceCounterState(Base):
+    """인터페이스 카운터 상태 (직전 카운터 + 계산된 rate). 장비 합계는 if_name='__total__' 행"""
+    __tablename__ = "interface_counter_states"
+    device_id = Column(Integer, ForeignKey("devices.id", ondelete="CASCADE"), primary_key=True)
+    if_name = Column(String, primary_key=True)
+    in_octets = Column(BigInteger, default=0, nullable=False)
+    out_octets = Column(BigInteger, default=0, nullable=False)
+    in_errors = Column(BigInteger, default=0, nullable=False)
+    out_errors = Column(BigInteger, default=0, nullable=False)
+    in_discards = Column(BigInteger, default=0, nullable=False)
+    out_discards = Column(BigInteger, default=0, nullable=False)
+    ts = Column(Float, nullable=True)  # epoch seconds of the sample
+    sys_uptime = Column(BigInteger, nullable=True)  # sysUpTime ticks at the sample (reboot detection)
+    in_bps = Column(Float, default=0.0, nullable=False)
+    out_bps = Column(Float, default=0.0, nullable=False)
+    in_errors_per_sec = Column(Float, default=0.0, nullable=False)
+    out_errors_per_sec = Column(Float, default=0.0, nullable=False)
+    in_discards_per_sec = Column(Float, default=0.0, nullable=False)
+    out_discards_per_sec = Column(Float, default=0.0, nullable=False)
+    oper_status = Column(String, nullable=True)
+    is_up = Column(Boolean, nullable=True)
+    health = Column(String, nullable=True)
+    device = relationship("Device", back_populates="counter_states")
+
+
+class MonitorShardLease(Base):
+    """모니터링 샤드 임대(lease) - 샤드별 담당 워커와 마지막 사이클 통계"""
+    __tablename__ = "monitor_shard_leases"
+    shard_id = Column(Integer, primary_key=True)
+    owner = Column(String, nullable=True)
+    lease_until = Column(DateTime, nullable=True)
+    last_cycle_started_at = Column(DateTime, nullable=True)
+    last_cycle_finished_at = Column(DateTime, nullable=True)
+    last_cycle_ms = Column(Float, nullable=True)
+    last_device_count = Column(Integer, default=0, nullable=False)
+    last_polled_count = Column(Integer, default=0, nullable=False)
+    last_error = Column(String, nullable=True)
+
+
+class SystemMetricRollup(Base):
+    """SystemMetric 다운샘플 (tier: 1m/5m/1h, 값별 min/avg/max/p95)"""
+    __tablename__ = "system_metric_rollups"
+    tier = Column(String(4), primary_key=True)
+    device_id = Column(Integer, ForeignKey("devices.id", ondelete="CASCADE"), primary_key=True)
+    bucket = Column(DateTime(timezone=True), primary_key=True)
+    samples = Column(Integer, default=0, nullable=False)
+    cpu_usage_min = Column(Float, nullable=True)
+    cpu_usage_avg = Column(Float, nullable=True)
+    cpu_usage_max = Column(Float, nullable=True)
+    cpu_usage_p95 = Column(Float, nullable=True)
+    memory_usage_min = Column(Float, nullable=True)
+    memory_usage_avg = Column(Float, nullable=True)
+    memory_usage_max = Column(Float, nullable=True)
+    memory_usage_p95 = Column(Float, nullable=True)
+    traffic_in_min = Column(Float, nullable=True)
+    traffic_in_avg = Column(Float, nullable=True)
+    traffic_in_max = Column(Float, nullable=True)
+    traffic_in_p95 = Column(Float, nullable=True)
+    traffic_out_min = Column(Float, nullable=True)
+    traffic_out_avg = Column(Float, nullable=True)
+    traffic_out_max = Column(Float, nullable=True)
+    traffic_out_p95 = Column(Float, nullable=True)
+    rtt_ms_min = Column(Float, nullable=True)
+    rtt_ms_avg = Column(Float, nullable=True)
+    rtt_ms_max = Column(Float, nullable=True)
+    rtt_ms_p95 = Column(Float, nullable=True)
+
+
+class InterfaceMetricRollup(Base):
+    """InterfaceMetric 다운샘플 (tier: 1m/5m/1h)"""
+    __tablename__ = "interface_metric_rollups"
+    tier = Column(String(4), primary_key=True)
+    device_id = Column(Integer, ForeignKey("devices.id", ondelete="CASCADE"), primary_key=True)
+    interface_name = Column(String, primary_key=True)
+    bucket = Column(DateTime(timezone=True), primary_key=True)
+    samples = Column(Integer, default=0, nullable=False)
+    in_bps_min = Column(Float, nullable=True)
+    in_bps_avg = Column(Float, nullable=True)
+    in_bps_max = Column(Float, nullable=True)
+    in_bps_p95 = Column(Float, nullable=True)
+    out_bps_min = Column(Float, nullable=True)
+    out_bps_avg = Column(Float, nullable=True)
+    out_bps_max = Column(Float, nullable=True)
+    out_bps_p95 = Column(Float, nullable=True)
+    in_err_avg = Column(Float, nullable=True)
+    in_err_max = Column(Float, nullable=True)
+    out_err_avg = Column(Float, nullable=True)
+    out_err_max = Column(Float, nullable=True)
+    in_discards_avg = Column(Float, nullable=True)
+    in_discards_max = Column(Float, nullable=True)
+    out_discards_avg = Column(Float, nullable=True)
+    out_discards_max = Column(Float, nullable=True)
+
+
+class MetricRollupWatermark(Base):
+    """롤업 진행 위치 (name: "<source>:<tier>", watermark 이전 버킷은 완료)"""
+    __tablename__ = "metric_rollup_watermarks"
+    name = Column(String, primary_key=True)
+    watermark = Column(DateTime(timezone=True), nullable=True)
+    updated_at = Column(DateTime(timezone=True), nullable=True)
+
+
 class InterfaceMetric(Base):
     __tablename__ = "interface_metrics"
     __table_args__ = (
@@ -266,15 +423,55 @@ class ConfigTemplate(Base):
     tags = Column(String, nullable=True)
 
 
+class ConfigBlob(Base):
+    """Config 본문 (content-addressed, 압축). base_hash 가 있으면 해당 blob 대비 line delta"""
+    __tablename__ = "config_blobs"
+    hash = Column(String(64), primary_key=True)  # sha256(config text)
+    codec = Column(String, nullable=False)  # zstd, zlib
+    base_hash = Column(String(64), ForeignKey("config_blobs.hash"), nullable=True)
+    depth = Column(Integer, default=0, nullable=False)  # delta chain 길이 (0 = 전체 본문)
+    size = Column(Integer, nullable=False)  # 원본 bytes
+    stored_size = Column(Integer, nullable=False)
+    data = Column(LargeBinary, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
 class ConfigBackup(Base):
     __tablename__ = "config_backups"
     id = Column(Integer, primary_key=True, index=True)
     device_id = Column(Integer, ForeignKey("devices.id"), index=True)
-    raw_config = Column(Text, nullable=True)
+    config_hash = Column(String(64), ForeignKey("config_blobs.hash"), nullable=True, index=True)
+    # 이전 버전에서 저장된 본문 (compact_legacy_backups 가 blob 으로 옮김)
+    legacy_raw_config = Column("raw_config", Text, nullable=True)
     is_golden = Column(Boolean, default=False)  # [NEW] Golden Config Flag
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     device = relationship("Device", back_populates="config_backups")
 
+    _pending_text = None
+    _blob_bind = None  # 마지막으로 로드/저장된 engine (detached 상태에서 blob 조회용)
+
+    @property
+    def raw_config(self):
+        if self._pending_text is not None:
+            return self._pending_text
+        if self.config_hash:
+            session = object_session(self)
+            if session is None:
+                return config_store.load_text_detached(self, self.config_hash)
+            return config_store.load_text(session, self.config_hash)
+        return self.legacy_raw_config
+
+    @raw_config.setter
+    def raw_config(self, value):
+        # 본문은 flush 시점에 config_blobs 로 저장 (동일 본문은 한 번만)
+        if value is None:
+            self._pending_text = None
+            self.config_hash = None
+            self.legacy_raw_config = None
+            return
+        self._pending_text = str(value)
+        self.config_hash = config_store.config_hash(self._pending_text)
+
 
 class ComplianceReport(Base):
     __tablename__ = "compliance_reports"
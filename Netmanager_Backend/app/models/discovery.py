@@ -31,9 +31,22 @@ class DiscoveryJob(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     completed_at = Column(DateTime(timezone=True), nullable=True)
     
-    logs = Column(Text, default="")  # 실시간 로그 저장 (매우 간단한 형태) or JSON
+    logs = Column(Text, default="")  # 최근 로그 요약 (전체 로그는 discovery_job_logs)
     
     results = relationship("DiscoveredDevice", back_populates="job", cascade="all, delete-orphan")
+    log_entries = relationship("DiscoveryJobLog", cascade="all, delete-orphan", passive_deletes=True)
+
+
+class DiscoveryJobLog(Base):
+    """
+    Discovery Job 로그 (append-only). id 가 페이징 cursor 로 쓰인다.
+    """
+    __tablename__ = "discovery_job_logs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    job_id = Column(Integer, ForeignKey("discovery_jobs.id", ondelete="CASCADE"), nullable=False, index=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+    message = Column(Text, nullable=False)
 
 
 class DiscoveredDevice(Base):
@@ -66,3 +79,16 @@ class DiscoveredDevice(Base):
     status = Column(String, default="new") # new, existing, approved, ignored
 
     job = relationship("DiscoveryJob", back_populates="results")
+
+
+class DiscoverySubnetCredential(Base):
+    """
+    /24(IPv6 는 /64) 별로 마지막에 SNMP 응답을 받은 자격증명 프로파일.
+    다음 스캔에서 같은 대역의 호스트에 먼저 시도한다.
+    """
+    __tablename__ = "discovery_subnet_credentials"
+
+    subnet = Column(String, primary_key=True)  # Example: "10.1.2.0/24"
+    snmp_profile_id = Column(Integer, ForeignKey("snmp_credential_profiles.id", ondelete="CASCADE"), nullable=False)
+    hits = Column(Integer, default=0, nullable=False)
+    last_success_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -4,6 +4,7 @@ from prometheus_client import REGISTRY
 from prometheus_client.core import GaugeMetricFamily
 from sqlalchemy import func
 
+from app.db.encrypted_types import without_credentials
 from app.db.session import SessionLocal
 from app.models.device import Device, SystemMetric
 
@@ -25,7 +26,7 @@ class DeviceMetricsCollector:
     def _build_families(self):
         db = SessionLocal()
         try:
-            devices = db.query(Device).all()
+            devices = db.query(Device).options(*without_credentials(Device)).all()
 
             latest_ts = (
                 db.query(SystemMetric.device_id, func.max(SystemMetric.timestamp).label("ts"))
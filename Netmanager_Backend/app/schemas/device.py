@@ -322,6 +322,7 @@ class MetricResponse(BaseModel):
     temperature: Optional[float] = 0.0  # 수정: 값이 없으면 0.0 처리
     traffic_in: Optional[float] = 0.0   # 수정: 값이 없으면 0.0 처리
     traffic_out: Optional[float] = 0.0  # 수정: 값이 없으면 0.0 처리
+    rtt_ms: Optional[float] = None
     timestamp: datetime
 
     class Config: from_attributes = True
@@ -0,0 +1,71 @@
+"""
+Opt-in conversion of system_metrics / interface_metrics / event_logs into daily
+range-partitioned tables (see app.services.metric_partitions).
+
+Each table goes through separate transactions so no step scans the table while
+holding ACCESS EXCLUSIVE:
+  1. move rows without a timestamp to <table>_null_ts
+  2. ADD CONSTRAINT ... CHECK (...) NOT VALID       (brief lock)
+  3. VALIDATE CONSTRAINT                            (scan, writes keep running)
+  4. rename + attach as <table>_legacy              (brief lock, no scan)
+
+Usage: DATABASE_URL=... DRY_RUN=0 python -m app.scripts.partition_metric_tables [table ...]
+TimescaleDB hypertables and already partitioned tables are skipped.
+"""
+import logging
+import os
+import sys
+
+from sqlalchemy import create_engine
+
+from app.services import metric_partitions
+
+logger = logging.getLogger(__name__)
+
+
+def convert_table(engine, table: str, dry_run: bool) -> bool:
+    with engine.connect() as conn:
+        mode = metric_partitions.storage_mode(conn, table)
+    if mode != "delete":
+        logger.info("partition_metric_tables table=%s skipped storage_mode=%s", table, mode)
+        return False
+    if dry_run:
+        logger.info("partition_metric_tables table=%s would be converted (DRY_RUN)", table)
+        return False
+
+    with engine.begin() as conn:
+        moved = metric_partitions.quarantine_null_timestamps(conn, table)
+    with engine.connect() as conn:
+        upper = metric_partitions.validated_check_upper(conn, table)
+    if upper is None:
+        with engine.begin() as conn:
+            metric_partitions.add_partition_bound_check(conn, table)
+        with engine.begin() as conn:
+            metric_partitions.validate_partition_bound_check(conn, table)
+    with engine.begin() as conn:
+        converted = metric_partitions.convert_to_partitioned(conn, table)
+    logger.info("partition_metric_tables table=%s converted=%s null_timestamp_rows_moved=%s", table, converted, moved)
+    return converted
+
+
+def main() -> None:
+    database_url = os.getenv("DATABASE_URL")
+    if not database_url:
+        raise RuntimeError("DATABASE_URL is required")
+
+    dry_run = os.getenv("DRY_RUN", "1") not in {"0", "false", "False", "no", "NO"}
+    tables = sys.argv[1:] or list(metric_partitions.PARTITIONED_TABLES)
+    unknown = [t for t in tables if t not in metric_partitions.PARTITIONED_TABLES]
+    if unknown:
+        raise RuntimeError(f"not a partitionable table: {', '.join(unknown)}")
+
+    engine = create_engine(database_url)
+    if engine.dialect.name != "postgresql":
+        raise RuntimeError("partitioning requires PostgreSQL")
+    for table in tables:
+        convert_table(engine, table, dry_run)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -273,7 +273,17 @@ class ComplianceEngine:
         if not latest:
             return {"status": "error", "message": "No config backup available"}
 
-        # 3. 비교 (Diff)
+        # 3. 비교 (Diff) - 같은 content hash 면 본문을 읽지 않음
+        if golden.config_hash and golden.config_hash == latest.config_hash:
+            return {
+                "device_id": device_id,
+                "status": "compliant",
+                "golden_id": golden.id,
+                "latest_id": latest.id,
+                "diff_lines": [],
+                "message": "Configuration matches Golden Config"
+            }
+
         golden_lines = (golden.raw_config or "").splitlines()
         latest_lines = (latest.raw_config or "").splitlines()
         
@@ -504,6 +514,8 @@ class ComplianceEngine:
                 "drift_after": drift,
             }
         except Exception as e:
+            # push/rollback 도중 실패한 세션은 풀로 돌려보내지 않음
+            conn.discard()
             rollback_attempted = False
             rollback_success = False
             rollback_error = None
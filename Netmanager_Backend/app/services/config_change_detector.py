@@ -0,0 +1,212 @@
+"""
+Cheap "did the config change?" check that runs before the expensive SSH collection.
+
+``ConfigChangeDetector.decide`` answers with a ``SyncDecision``:
+
+- full: first sync, forced (manual sync), older than ``INCREMENTAL_SYNC_MAX_AGE_SEC``,
+  a config-change syslog (``%SYS-5-CONFIG_I``, Junos ``UI_COMMIT``) arrived since the
+  last full sync, the change marker moved, or no marker could be read
+- light: marker unchanged -> the running config is not pulled again; facts, neighbors and
+  the WLC AP/client summary (operational state) are still refreshed every run
+
+The change marker is, in order of cost:
+1. SNMP ``ccmHistoryRunningLastChanged`` (CISCO-CONFIG-MAN-MIB) for Cisco devices
+2. one short vendor command over the (pooled) SSH session, e.g. the
+   ``! Last configuration change at ...`` line or the last commit entry
+
+``record`` stores the outcome in ``device_sync_states`` including the collectors
+that were skipped, so the cost of a sync run can be traced per device.
+"""
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import List, Optional, Sequence, Tuple
+
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+
+from app.models.device import Device, DeviceSyncState, EventLog
+
+logger = logging.getLogger(__name__)
+
+INCREMENTAL_SYNC_MAX_AGE_SEC = int(os.getenv("INCREMENTAL_SYNC_MAX_AGE_SEC", "86400"))
+
+LIGHT_COLLECTORS = ("facts", "neighbors", "wireless")
+
+CONFIG_SYSLOG_PATTERNS = ("CONFIG_I", "UI_COMMIT")
+
+# CISCO-CONFIG-MAN-MIB::ccmHistoryRunningLastChanged.0 (sysUpTime at last running-config change)
+CCM_RUNNING_LAST_CHANGED_OID = "1.3.6.1.4.1.9.9.43.1.1.1.0"
+
+# device_type prefix -> 출력이 config 변경 시에만 바뀌는 짧은 명령
+MARKER_COMMANDS = (
+    ("cisco_xr", "show configuration commit list 1"),
+    ("cisco_nxos", "show running-config | include \"last done at\""),
+    ("cisco_wlc", "show running-config | include Last configuration change"),
+    ("cisco", "show running-config | include Last configuration change"),
+    ("juniper", "show system commit | match \"^0 \""),
+    ("huawei", "display configuration commit list 1"),
+)
+
+_ERROR_HINTS = ("invalid input", "unknown command", "syntax error", "unrecognized command", "error:")
+
+
+@dataclass
+class SyncDecision:
+    full: bool
+    reason: str
+    marker: Optional[str] = None
+    skipped: List[str] = field(default_factory=list)
+
+    @property
+    def mode(self) -> str:
+        return "full" if self.full else "light"
+
+    def collectors(self, requested: Sequence[str]) -> List[str]:
+        """Filter ``requested`` collectors for this run and remember the ones skipped."""
+        if self.full:
+            return list(requested)
+        run = [c for c in requested if c in LIGHT_COLLECTORS]
+        self.skipped = [c for c in requested if c not in LIGHT_COLLECTORS]
+        return run
+
+
+def _marker_command(device_type: str) -> Optional[str]:
+    dt = str(device_type or "").strip().lower()
+    for prefix, cmd in MARKER_COMMANDS:
+        if dt.startswith(prefix):
+            return cmd
+    return None
+
+
+def _normalize_marker(source: str, value) -> Optional[str]:
+    text = str(value if value is not None else "").strip()
+    if not text:
+        return None
+    if any(h in text.lower() for h in _ERROR_HINTS):
+        return None
+    digest = hashlib.sha1(text.encode("utf-8", errors="ignore")).hexdigest()[:16]
+    return f"{source}:{digest}"
+
+
+def snmp_marker(device: Device) -> Optional[str]:
+    if not str(device.device_type or "").lower().startswith("cisco"):
+        return None
+    if not device.ip_address or not (device.snmp_community or device.snmp_v3_username):
+        return None
+    try:
+        from app.services.snmp_service import SnmpManager
+
+        snmp = SnmpManager(
+            device.ip_address,
+            device.snmp_community,
+            port=int(getattr(device, "snmp_port", None) or 161),
+            version=str(getattr(device, "snmp_version", None) or "v2c"),
+            v3_username=getattr(device, "snmp_v3_username", None),
+            v3_security_level=getattr(device, "snmp_v3_security_level", None),
+            v3_auth_proto=getattr(device, "snmp_v3_auth_proto", None),
+            v3_auth_key=getattr(device, "snmp_v3_auth_key", None),
+            v3_priv_proto=getattr(device, "snmp_v3_priv_proto", None),
+            v3_priv_key=getattr(device, "snmp_v3_priv_key", None),
+        )
+        res = snmp.get_oids([CCM_RUNNING_LAST_CHANGED_OID]) or {}
+    except Exception:
+        logger.debug("Config change counter read failed", extra={"device_id": device.id}, exc_info=True)
+        return None
+    value = res.get(CCM_RUNNING_LAST_CHANGED_OID)
+    if value is None or "nosuch" in str(value).lower():
+        return None
+    return f"ccm:{str(value).strip()}"
+
+
+def ssh_marker(device_type: str, conn) -> Optional[str]:
+    cmd = _marker_command(device_type)
+    if not cmd or conn is None:
+        return None
+    try:
+        out = conn.send_command(cmd)
+    except Exception:
+        logger.debug("Config change marker command failed", extra={"command": cmd}, exc_info=True)
+        return None
+    return _normalize_marker("cli", out)
+
+
+class ConfigChangeDetector:
+    @staticmethod
+    def config_syslog_since(db: Session, device_id: int, since: datetime) -> bool:
+        conds = []
+        for p in CONFIG_SYSLOG_PATTERNS:
+            conds.append(EventLog.event_id.like(f"%{p}%"))
+            conds.append(EventLog.message.like(f"%{p}%"))
+        row = (
+            db.query(EventLog.id)
+            .filter(EventLog.device_id == device_id, EventLog.timestamp > since, or_(*conds))
+            .first()
+        )
+        return row is not None
+
+    @staticmethod
+    def read_marker(device: Device, conn=None) -> Optional[str]:
+        return snmp_marker(device) or ssh_marker(device.device_type, conn)
+
+    @staticmethod
+    def precheck(db: Session, device: Device, force: bool = False, now: Optional[datetime] = None) -> Tuple[Optional[str], Optional[str]]:
+        """
+        DB-only half of ``decide``: ``(full_reason, stored_marker)``. ``full_reason`` is set
+        when a full sync is needed regardless of the marker (forced, first sync, max age, syslog).
+        """
+        now = now or datetime.now()
+        state = db.get(DeviceSyncState, device.id)
+        if force:
+            return "forced", None
+        if state is None or state.last_full_sync_at is None:
+            return "first_sync", None
+        if INCREMENTAL_SYNC_MAX_AGE_SEC > 0 and now - state.last_full_sync_at > timedelta(seconds=INCREMENTAL_SYNC_MAX_AGE_SEC):
+            return "max_age", state.change_marker
+        try:
+            if ConfigChangeDetector.config_syslog_since(db, device.id, state.last_full_sync_at):
+                return "syslog", state.change_marker
+        except Exception:
+            logger.debug("Config syslog lookup failed", extra={"device_id": device.id}, exc_info=True)
+        return None, state.change_marker
+
+    @staticmethod
+    def conclude(full_reason: Optional[str], stored_marker: Optional[str], marker: Optional[str]) -> SyncDecision:
+        if full_reason:
+            return SyncDecision(True, full_reason, marker)
+        if marker is None:
+            return SyncDecision(True, "no_detector", marker)
+        if marker != stored_marker:
+            return SyncDecision(True, "marker_changed", marker)
+        return SyncDecision(False, "unchanged", marker)
+
+    @staticmethod
+    def decide(db: Session, device: Device, conn=None, force: bool = False, now: Optional[datetime] = None) -> SyncDecision:
+        full_reason, stored_marker = ConfigChangeDetector.precheck(db, device, force=force, now=now)
+        # 전체 동기화여도 marker 는 읽어 둠 (다음 실행의 비교 기준)
+        marker = ConfigChangeDetector.read_marker(device, conn)
+        return ConfigChangeDetector.conclude(full_reason, stored_marker, marker)
+
+    @staticmethod
+    def record(db: Session, device_id: int, decision: SyncDecision, now: Optional[datetime] = None) -> DeviceSyncState:
+        """Store the run outcome (caller commits)."""
+        now = now or datetime.now()
+        state = db.get(DeviceSyncState, device_id)
+        if state is None:
+            state = DeviceSyncState(device_id=device_id, full_syncs=0, light_syncs=0)
+            db.add(state)
+        state.last_sync_at = now
+        state.last_mode = decision.mode
+        state.last_reason = decision.reason
+        state.skipped_collectors = list(decision.skipped)
+        if decision.full:
+            state.last_full_sync_at = now
+            state.change_marker = decision.marker
+            state.full_syncs = int(state.full_syncs or 0) + 1
+        else:
+            state.light_syncs = int(state.light_syncs or 0) + 1
+        return state
@@ -0,0 +1,221 @@
+"""
+Counter delta / rate engine shared by the monitoring tasks.
+
+One call takes every (device, port) sample of a polling cycle together with the
+previous state from ``CounterStateStore`` and returns, per sample, the new state
+entry: raw counters, ``ts``, ``sys_uptime`` and the six rates
+(``in_bps``/``out_bps``, errors/s and discards/s).
+
+Counter handling:
+- each field has a width: ``COUNTER_BITS`` by default (HC octets are 64-bit,
+  IF-MIB errors/discards are Counter32), overridden per sample with
+  ``counter_bits`` (an int for every field, or ``{field: bits}``), e.g. when an
+  agent without ifXTable only returned the 32-bit octet columns;
+- a decrease of a 32-bit counter that is explained by one wrap (the wrapped
+  delta is under half of the 2^32 space) is counted as a wrap;
+- any other decrease, including every decrease of a 64-bit counter
+  (``clear counters``, agent restart), is a discontinuity;
+- a sysUpTime that went backwards (and could not have wrapped in the elapsed
+  time) marks every port of the device as a discontinuity;
+- on a discontinuity, or when the previous sample is missing or less than
+  ``MIN_INTERVAL_SEC`` old, the rates are 0 and the sample becomes the new baseline.
+
+NumPy is used when installed (one vectorised pass over the whole cycle); the
+pure-Python path gives the same results.
+"""
+from __future__ import annotations
+
+from typing import Dict, List, Optional
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+from app.services.counter_state_store import COUNTER_FIELDS
+
+MIN_INTERVAL_SEC = 1.0
+
+_WRAP32 = 1 << 32
+_HALF32 = 1 << 31
+_WRAP64 = 1 << 64
+# sysUpTime is TimeTicks (1/100 s), a 32-bit value
+_TICKS_PER_SEC = 100
+
+# counter field -> width in bits, unless the sample says otherwise
+COUNTER_BITS = {
+    "in_octets": 64,
+    "out_octets": 64,
+    "in_errors": 32,
+    "out_errors": 32,
+    "in_discards": 32,
+    "out_discards": 32,
+}
+
+# counter field -> (rate field, multiplier)
+_RATE_OF = {
+    "in_octets": ("in_bps", 8.0),
+    "out_octets": ("out_bps", 8.0),
+    "in_errors": ("in_errors_per_sec", 1.0),
+    "out_errors": ("out_errors_per_sec", 1.0),
+    "in_discards": ("in_discards_per_sec", 1.0),
+    "out_discards": ("out_discards_per_sec", 1.0),
+}
+
+
+def _as_int(value) -> int:
+    try:
+        v = int(value or 0)
+    except (TypeError, ValueError):
+        try:
+            v = int(float(value))
+        except (TypeError, ValueError):
+            return 0
+    return min(max(v, 0), _WRAP64 - 1)
+
+
+def _as_ticks(value) -> Optional[int]:
+    if value is None:
+        return None
+    try:
+        return int(str(value).strip())
+    except (TypeError, ValueError):
+        return None
+
+
+def counter_delta(prev: int, cur: int, bits: int = 64) -> Optional[int]:
+    """Delta of one counter; a 32-bit counter may wrap once. None for a reset/discontinuity."""
+    if cur >= prev:
+        return cur - prev
+    if bits == 32 and prev < _WRAP32:
+        wrapped = cur + _WRAP32 - prev
+        return wrapped if wrapped < _HALF32 else None
+    return None
+
+
+def _field_bits(sample: dict) -> List[int]:
+    override = sample.get("counter_bits")
+    if isinstance(override, int):
+        return [int(override)] * len(COUNTER_FIELDS)
+    override = override if isinstance(override, dict) else {}
+    return [int(override.get(f) or COUNTER_BITS.get(f, 64)) for f in COUNTER_FIELDS]
+
+
+def _rebooted(prev_uptime: Optional[int], cur_uptime: Optional[int], dt: float) -> bool:
+    if prev_uptime is None or cur_uptime is None:
+        return False
+    if cur_uptime >= prev_uptime:
+        return False
+    # uptime itself wraps after ~497 days; only a wrap that fits in dt is not a reboot
+    return prev_uptime + dt * _TICKS_PER_SEC * 2 < _WRAP32
+
+
+class CounterRateEngine:
+    @staticmethod
+    def compute(samples: List[dict], prev_states: Dict[int, Dict[str, dict]]) -> List[dict]:
+        """
+        ``samples``: [{"device_id", "if_name", "counters": {in_octets, ...}, "ts", "sys_uptime"}]
+        ``prev_states``: ``CounterStateStore.load`` output.
+        Returns one state entry per sample (same order) with counters, ts, sys_uptime,
+        the rate fields and ``discontinuity``.
+        """
+        if not samples:
+            return []
+        if np is not None:
+            return CounterRateEngine._compute_numpy(samples, prev_states)
+        return CounterRateEngine._compute_python(samples, prev_states)
+
+    # ------------------------------------------------------------------ helpers
+    @staticmethod
+    def _prepare(samples: List[dict], prev_states: Dict[int, Dict[str, dict]]):
+        rows = []
+        for s in samples:
+            counters = s.get("counters") or {}
+            prev = (prev_states.get(s["device_id"]) or {}).get(s["if_name"]) or {}
+            rows.append(
+                (
+                    [_as_int(counters.get(f, 0)) for f in COUNTER_FIELDS],
+                    [_as_int(prev.get(f, 0)) for f in COUNTER_FIELDS],
+                    float(s.get("ts") or 0.0),
+                    float(prev.get("ts") or 0.0),
+                    _as_ticks(s.get("sys_uptime")),
+                    _as_ticks(prev.get("sys_uptime")),
+                    bool(prev),
+                    _field_bits(s),
+                )
+            )
+        return rows
+
+    @staticmethod
+    def _entry(sample: dict, cur: List[int], rates: List[float], discontinuity: bool) -> dict:
+        entry = {f: cur[i] for i, f in enumerate(COUNTER_FIELDS)}
+        entry["ts"] = float(sample.get("ts") or 0.0)
+        entry["sys_uptime"] = _as_ticks(sample.get("sys_uptime"))
+        for i, f in enumerate(COUNTER_FIELDS):
+            entry[_RATE_OF[f][0]] = float(rates[i])
+        entry["discontinuity"] = bool(discontinuity)
+        return entry
+
+    @staticmethod
+    def _compute_python(samples: List[dict], prev_states: Dict[int, Dict[str, dict]]) -> List[dict]:
+        out = []
+        for sample, (cur, prev, ts, prev_ts, up, prev_up, has_prev, bits) in zip(
+            samples, CounterRateEngine._prepare(samples, prev_states)
+        ):
+            dt = ts - prev_ts
+            rates = [0.0] * len(COUNTER_FIELDS)
+            discontinuity = False
+            if has_prev and prev_ts > 0 and dt >= MIN_INTERVAL_SEC:
+                if _rebooted(prev_up, up, dt):
+                    discontinuity = True
+                else:
+                    for i, f in enumerate(COUNTER_FIELDS):
+                        d = counter_delta(prev[i], cur[i], bits[i])
+                        if d is None:
+                            discontinuity = True
+                            continue
+                        rates[i] = d * _RATE_OF[f][1] / dt
+            out.append(CounterRateEngine._entry(sample, cur, rates, discontinuity))
+        return out
+
+    @staticmethod
+    def _compute_numpy(samples: List[dict], prev_states: Dict[int, Dict[str, dict]]) -> List[dict]:
+        rows = CounterRateEngine._prepare(samples, prev_states)
+        n = len(rows)
+        cur = np.array([r[0] for r in rows], dtype=np.uint64).reshape(n, len(COUNTER_FIELDS))
+        prev = np.array([r[1] for r in rows], dtype=np.uint64).reshape(n, len(COUNTER_FIELDS))
+        ts = np.array([r[2] for r in rows], dtype=np.float64)
+        prev_ts = np.array([r[3] for r in rows], dtype=np.float64)
+        up = np.array([-1 if r[4] is None else r[4] for r in rows], dtype=np.int64)
+        prev_up = np.array([-1 if r[5] is None else r[5] for r in rows], dtype=np.int64)
+        has_prev = np.array([r[6] for r in rows], dtype=bool)
+        is32 = np.array([r[7] for r in rows], dtype=np.int64).reshape(n, len(COUNTER_FIELDS)) == 32
+
+        dt = ts - prev_ts
+        comparable = has_prev & (prev_ts > 0) & (dt >= MIN_INTERVAL_SEC)
+        rebooted = comparable & (
+            (up >= 0) & (prev_up >= 0) & (up < prev_up)
+            & (prev_up + dt * _TICKS_PER_SEC * 2 < float(_WRAP32))
+        )
+        usable = comparable & ~rebooted
+
+        # uint64 subtraction is already modulo 2^64
+        raw = cur - prev
+        went_down = cur < prev
+        wrapped32 = raw & np.uint64(_WRAP32 - 1)
+        wraps32 = is32 & (prev < np.uint64(_WRAP32)) & (wrapped32 < np.uint64(_HALF32))
+        delta = np.where(went_down, wrapped32, raw)
+        valid = (~went_down) | wraps32
+
+        mult = np.array([_RATE_OF[f][1] for f in COUNTER_FIELDS], dtype=np.float64)
+        safe_dt = np.where(usable, dt, 1.0)[:, None]
+        rates = delta.astype(np.float64) * mult / safe_dt
+        good = valid & usable[:, None]
+        rates = np.where(good, rates, 0.0)
+        discontinuity = rebooted | (usable & ~valid.all(axis=1))
+
+        rates_list = rates.tolist()
+        return [
+            CounterRateEngine._entry(sample, row[0], rates_list[i], bool(discontinuity[i]))
+            for i, (sample, row) in enumerate(zip(samples, rows))
+        ]
@@ -0,0 +1,181 @@
+"""
+Interface counter-state store.
+
+The previous counters and the last computed rates of every port live in
+``interface_counter_states``, one fixed-width row per ``(device_id, if_name)``,
+instead of an ``if_traffic_state`` map inside ``Device.latest_parsed_data``.
+A poll now upserts only the rows of the ports it sampled; the JSON blob (AP
+lists, mac aliases, interfaces, ...) is no longer copied and rewritten on
+every cycle, and readers such as the topology health map fetch just the
+columns they need.
+
+The device-wide octet totals (former ``traffic_state``) are stored as the
+``TOTAL_IFNAME`` row.
+
+Entries are exchanged as plain dicts with the same keys the monitoring loops
+already used (``in_octets``, ``ts``, ``in_bps``, ``health`` ...).
+"""
+from __future__ import annotations
+
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy.orm import Session
+
+from app.models.device import InterfaceCounterState
+
+TOTAL_IFNAME = "__total__"
+
+COUNTER_FIELDS = ("in_octets", "out_octets", "in_errors", "out_errors", "in_discards", "out_discards")
+RATE_FIELDS = (
+    "in_bps",
+    "out_bps",
+    "in_errors_per_sec",
+    "out_errors_per_sec",
+    "in_discards_per_sec",
+    "out_discards_per_sec",
+)
+_STATUS_FIELDS = ("oper_status", "is_up", "health")
+_ALL_FIELDS = COUNTER_FIELDS + ("ts", "sys_uptime") + RATE_FIELDS + _STATUS_FIELDS
+
+_CHUNK = 500
+_BIGINT_MAX = (1 << 63) - 1
+
+
+def _to_row(device_id: int, if_name: str, entry: dict) -> dict:
+    row = {"device_id": int(device_id), "if_name": str(if_name)}
+    for f in COUNTER_FIELDS:
+        try:
+            row[f] = min(_BIGINT_MAX, max(0, int(entry.get(f, 0) or 0)))
+        except (TypeError, ValueError):
+            row[f] = 0
+    for f in RATE_FIELDS:
+        try:
+            row[f] = float(entry.get(f, 0.0) or 0.0)
+        except (TypeError, ValueError):
+            row[f] = 0.0
+    try:
+        row["ts"] = float(entry["ts"]) if entry.get("ts") is not None else None
+    except (TypeError, ValueError):
+        row["ts"] = None
+    try:
+        row["sys_uptime"] = int(entry["sys_uptime"]) if entry.get("sys_uptime") is not None else None
+    except (TypeError, ValueError):
+        row["sys_uptime"] = None
+    oper = entry.get("oper_status")
+    row["oper_status"] = str(oper) if oper is not None else None
+    is_up = entry.get("is_up")
+    row["is_up"] = bool(is_up) if is_up is not None else None
+    health = entry.get("health")
+    row["health"] = str(health) if health is not None else None
+    return row
+
+
+
+
+def legacy_if_state(meta) -> Dict[str, dict]:
+    """Pre-store ``if_traffic_state`` (+ ``traffic_state`` as TOTAL_IFNAME) from a latest_parsed_data blob."""
+    if not isinstance(meta, dict):
+        return {}
+    out: Dict[str, dict] = {}
+    if_state = meta.get("if_traffic_state")
+    if isinstance(if_state, dict):
+        for name, entry in if_state.items():
+            if isinstance(entry, dict):
+                e = dict(entry)
+                e.setdefault("in_octets", e.get("in", 0))
+                e.setdefault("out_octets", e.get("out", 0))
+                out[str(name)] = e
+    t_state = meta.get("traffic_state")
+    if isinstance(t_state, dict):
+        out[TOTAL_IFNAME] = {"in_octets": t_state.get("in", 0), "out_octets": t_state.get("out", 0), "ts": t_state.get("ts")}
+    return out
+
+
+class CounterStateStore:
+    @staticmethod
+    def load(db: Session, device_ids: Iterable[int], if_names: Optional[Iterable[str]] = None) -> Dict[int, Dict[str, dict]]:
+        """{device_id: {if_name: entry}} for the given devices (optionally only some ports)."""
+        ids = sorted({int(x) for x in device_ids if x is not None})
+        names = sorted({str(n) for n in if_names}) if if_names is not None else None
+        cols = [InterfaceCounterState.device_id, InterfaceCounterState.if_name] + [
+            getattr(InterfaceCounterState, f) for f in _ALL_FIELDS
+        ]
+        out: Dict[int, Dict[str, dict]] = {}
+        for i in range(0, len(ids), _CHUNK):
+            q = db.query(*cols).filter(InterfaceCounterState.device_id.in_(ids[i:i + _CHUNK]))
+            if names is not None:
+                q = q.filter(InterfaceCounterState.if_name.in_(names))
+            for row in q.all():
+                out.setdefault(row[0], {})[row[1]] = dict(zip(_ALL_FIELDS, row[2:]))
+        return out
+
+    @staticmethod
+    def save(db: Session, states: Dict[int, Dict[str, dict]]) -> int:
+        """Upsert the given ports' entries. Untouched ports keep their rows. The caller commits."""
+        rows: List[dict] = [
+            _to_row(device_id, if_name, entry)
+            for device_id, ports in (states or {}).items()
+            for if_name, entry in (ports or {}).items()
+            if isinstance(entry, dict)
+        ]
+        if not rows:
+            return 0
+        bind = db.get_bind()
+        dialect = bind.dialect.name if bind is not None else ""
+        if dialect in ("postgresql", "sqlite"):
+            if dialect == "postgresql":
+                from sqlalchemy.dialects.postgresql import insert as dialect_insert
+            else:
+                from sqlalchemy.dialects.sqlite import insert as dialect_insert
+            table = InterfaceCounterState.__table__
+            for i in range(0, len(rows), _CHUNK):
+                stmt = dialect_insert(table).values(rows[i:i + _CHUNK])
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=[table.c.device_id, table.c.if_name],
+                    set_={f: stmt.excluded[f] for f in _ALL_FIELDS},
+                )
+                db.execute(stmt)
+        else:
+            for row in rows:
+                db.merge(InterfaceCounterState(**row))
+        return len(rows)
+
+    @staticmethod
+    def link_rates(
+        db: Session,
+        device_ids: Optional[Iterable[int]] = None,
+        if_names: Optional[Iterable[str]] = None,
+    ) -> Dict[int, Dict[str, dict]]:
+        """Light read for topology: {device_id: {if_name: {in_bps, out_bps, ts, health, is_up}}}."""
+        q = db.query(
+            InterfaceCounterState.device_id,
+            InterfaceCounterState.if_name,
+            InterfaceCounterState.in_bps,
+            InterfaceCounterState.out_bps,
+            InterfaceCounterState.ts,
+            InterfaceCounterState.health,
+            InterfaceCounterState.is_up,
+        ).filter(InterfaceCounterState.if_name != TOTAL_IFNAME)
+        if device_ids is not None:
+            ids = sorted({int(x) for x in device_ids if x is not None})
+            if not ids:
+                return {}
+            if len(ids) <= _CHUNK:
+                q = q.filter(InterfaceCounterState.device_id.in_(ids))
+        if if_names is not None:
+            names = sorted({str(n) for n in if_names if n})
+            if not names:
+                return {}
+            # a long IN list costs more than reading the narrow rows
+            if len(names) <= _CHUNK:
+                q = q.filter(InterfaceCounterState.if_name.in_(names))
+        out: Dict[int, Dict[str, dict]] = {}
+        for device_id, if_name, in_bps, out_bps, ts, health, is_up in q.all():
+            out.setdefault(device_id, {})[if_name] = {
+                "in_bps": in_bps,
+                "out_bps": out_bps,
+                "ts": ts,
+                "health": health,
+                "is_up": is_up,
+            }
+        return out
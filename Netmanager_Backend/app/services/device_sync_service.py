@@ -12,7 +12,9 @@ from app.services.oui_service import OUIService
 from app.services.ssh_service import DeviceConnection, DeviceInfo
 from app.services.topology_link_service import TopologyLinkService
 from app.services.entity_mib_service import EntityMibService
+from app.services.config_change_detector import ConfigChangeDetector
 from app.services.inventory_ssh_service import InventorySshService
+from app.services.ip_index import note_device_interfaces_changed
 from app.services.snmp_l2_service import SnmpL2Service
 from app.services.snmp_service import SnmpManager
 
@@ -78,228 +80,10 @@ class DeviceSyncService:
             device.last_seen = datetime.now()
 
             try:
-                facts = conn.get_facts()
-                raw_config = conn.get_running_config()
-                neighbors = conn.get_neighbors()
-                interfaces = conn.get_detailed_interfaces()
-                parsed_data = {"interfaces": interfaces}
-
-                is_wlc_model = "9800" in str(facts.get("model", "")) or "Wireless" in str(facts.get("os_version", ""))
-                if is_wlc_model and not hasattr(conn.driver, "get_wireless_summary"):
-                    try:
-                        ap_parsed = conn.driver.connection.send_command("show ap summary", use_textfsm=True)
-                        if isinstance(ap_parsed, list):
-                            total_clients = 0
-                            client_out = conn.driver.connection.send_command("show wireless client summary")
-                            client_match = re.search(r"Number of Clients\s*:\s*(\d+)", client_out, re.IGNORECASE)
-                            if client_match:
-                                total_clients = int(client_match.group(1))
-
-                            up_aps = 0
-                            normalized_aps = []
-                            for ap in ap_parsed:
-                                ap["name"] = ap.get("name") or ap.get("ap_name") or "Unknown"
-                                ap["model"] = ap.get("model") or ap.get("ap_model") or "N/A"
-                                ap["status"] = ap.get("status") or ap.get("state") or "Unknown"
-                                ap["uptime"] = ap.get("uptime") or ap.get("up_time") or "N/A"
-                                ap["serial_number"] = ap.get("serial_number") or ap.get("serial") or "N/A"
-                                ap["ip_address"] = ap.get("ip_address") or "N/A"
-
-                                status_lower = str(ap["status"]).lower()
-                                if "up" in status_lower or "reg" in status_lower:
-                                    up_aps += 1
-                                    ap["status"] = "online"
-                                else:
-                                    ap["status"] = "offline"
-
-                                normalized_aps.append(ap)
-
-                            wlan_out = conn.driver.connection.send_command("show wlan summary")
-                            wlans = []
-                            for wl in wlan_out.splitlines():
-                                m = re.match(r"^\s*(\d+)\s+(\S+)\s+(\S+)\s+(UP|DISABLED|DOWN|ENABLED)", wl, re.IGNORECASE)
-                                if m:
-                                    wlans.append(
-                                        {
-                                            "id": m.group(1),
-                                            "profile": m.group(2),
-                                            "ssid": m.group(3),
-                                            "status": "UP"
-                                            if "UP" in m.group(4).upper() or "ENABLED" in m.group(4).upper()
-                                            else "DOWN",
-                                        }
-                                    )
-
-                            parsed_data["wireless"] = {
-                                "total_aps": len(normalized_aps),
-                                "up_aps": up_aps,
-                                "down_aps": len(normalized_aps) - up_aps,
-                                "total_clients": total_clients,
-                                "ap_list": normalized_aps,
-                                "wlan_summary": wlans,
-                            }
-                    except Exception:
-                        pass
-                elif hasattr(conn.driver, "get_wireless_summary"):
-                    parsed_data["wireless"] = conn.driver.get_wireless_summary()
-
-                device.model = facts.get("model", "Unknown")
-                device.os_version = facts.get("os_version", "Unknown")
-                device.serial_number = facts.get("serial_number", None)
-                device.hostname = facts.get("hostname", device.name)
-                device.uptime = parse_uptime_seconds(facts.get("uptime", 0))
-                device.latest_parsed_data = parsed_data
-                try:
-                    def _norm_mac(v):
-                        if v is None:
-                            return None
-                        if isinstance(v, (bytes, bytearray)):
-                            b = bytes(v)
-                            if len(b) < 6:
-                                return None
-                            s = b[:6].hex()
-                            return f"{s[0:4]}.{s[4:8]}.{s[8:12]}".lower()
-                        s0 = str(v).strip()
-                        if not s0:
-                            return None
-                        s = s0.lower().replace("0x", "")
-                        s = re.sub(r"[^0-9a-f]", "", s)
-                        if len(s) < 12:
-                            return None
-                        s = s[:12]
-                        return f"{s[0:4]}.{s[4:8]}.{s[8:12]}".lower()
-
-                    if device.ip_address and device.snmp_community:
-                        snmp = SnmpManager(
-                            device.ip_address,
-                            device.snmp_community,
-                            port=int(getattr(device, "snmp_port", None) or 161),
-                            version=str(getattr(device, "snmp_version", None) or "v2c"),
-                            v3_username=getattr(device, "snmp_v3_username", None),
-                            v3_security_level=getattr(device, "snmp_v3_security_level", None),
-                            v3_auth_proto=getattr(device, "snmp_v3_auth_proto", None),
-                            v3_auth_key=getattr(device, "snmp_v3_auth_key", None),
-                            v3_priv_proto=getattr(device, "snmp_v3_priv_proto", None),
-                            v3_priv_key=getattr(device, "snmp_v3_priv_key", None),
-                        )
-                        mac_probe = snmp.get_oids(["1.3.6.1.2.1.17.1.1.0"]) or {}
-                        mac = _norm_mac(mac_probe.get("1.3.6.1.2.1.17.1.1.0"))
-                        if mac:
-                            device.mac_address = mac
-                except Exception:
-                    pass
-                try:
-                    mac_aliases = set()
-                    if getattr(device, "mac_address", None):
-                        mac_aliases.add(str(device.mac_address).strip().lower())
-                    for iface in parsed_data.get("interfaces", []) or []:
-                        if not isinstance(iface, dict):
-                            continue
-                        m = _norm_mac(iface.get("mac_address") or iface.get("hardware_address"))
-                        if m:
-                            mac_aliases.add(m)
-                    if device.ip_address and device.snmp_community:
-                        snmp2 = SnmpManager(
-                            device.ip_address,
-                            device.snmp_community,
-                            port=int(getattr(device, "snmp_port", None) or 161),
-                            version=str(getattr(device, "snmp_version", None) or "v2c"),
-                            v3_username=getattr(device, "snmp_v3_username", None),
-                            v3_security_level=getattr(device, "snmp_v3_security_level", None),
-                            v3_auth_proto=getattr(device, "snmp_v3_auth_proto", None),
-                            v3_auth_key=getattr(device, "snmp_v3_auth_key", None),
-                            v3_priv_proto=getattr(device, "snmp_v3_priv_proto", None),
-                            v3_priv_key=getattr(device, "snmp_v3_priv_key", None),
-                        )
-                        for m in snmp2.get_mac_aliases() or []:
-                            mm = _norm_mac(m)
-                            if mm:
-                                mac_aliases.add(mm)
-                    if mac_aliases:
-                        parsed_data["mac_aliases"] = sorted(m for m in mac_aliases if m)
-                        device.latest_parsed_data = parsed_data
-                except Exception:
-                    pass
-
-                db.query(Interface).filter(Interface.device_id == device.id).delete()
-                for iface in parsed_data.get("interfaces", []):
-                    link_status = iface.get("link_status", "")
-                    is_up = iface.get("is_up", False)
-                    is_enabled = iface.get("is_enabled", True)
-
-                    if not is_enabled:
-                        status = "admin_down"
-                    elif is_up:
-                        status = "up"
-                    else:
-                        status = "down"
-
-                    db.add(
-                        Interface(
-                            device_id=device.id,
-                            name=iface["name"],
-                            description=iface.get("description"),
-                            status=status,
-                            admin_status="up" if is_enabled else "down",
-                            mode=iface.get("mode", "access"),
-                            vlan=int(iface["vlan"]) if str(iface.get("vlan")).isdigit() else 1,
-                            ip_address=iface.get("ip_address"),
-                        )
-                    )
-
-                if "neighbors" not in parsed_data:
-                    parsed_data["neighbors"] = neighbors
-                device.latest_parsed_data = parsed_data
-
-                db.add(ConfigBackup(device_id=device.id, raw_config=raw_config))
-                TopologyLinkService.refresh_links_for_device(db, device, neighbors)
-
-                try:
-                    DeviceSyncService._refresh_endpoints_from_mac_table(db, device, conn)
-                except Exception:
-                    pass
-
-                try:
-                    inv_count = EntityMibService.refresh_device_inventory(db, device)
-                except Exception:
-                    inv_count = 0
-
-                if inv_count == 0 or (not device.serial_number) or (not device.model or device.model == "Unknown"):
-                    try:
-                        InventorySshService.refresh_device_inventory_from_ssh(db, device, conn)
-                    except Exception:
-                        pass
-
-                # --- L3 Topology: OSPF / BGP neighbor collection ---
-                ospf_neighbors = []
-                bgp_neighbors = []
-                try:
-                    if hasattr(conn.driver, 'get_ospf_neighbors'):
-                        ospf_neighbors = conn.driver.get_ospf_neighbors()
-                except Exception:
-                    pass
-                try:
-                    if hasattr(conn.driver, 'get_bgp_neighbors'):
-                        bgp_neighbors = conn.driver.get_bgp_neighbors()
-                except Exception:
-                    pass
-
-                if ospf_neighbors or bgp_neighbors:
-                    try:
-                        TopologyLinkService.refresh_l3_links_for_device(
-                            db, device, ospf_neighbors, bgp_neighbors
-                        )
-                    except Exception:
-                        pass
-
-                    if "l3_routing" not in parsed_data:
-                        parsed_data["l3_routing"] = {}
-                    parsed_data["l3_routing"]["ospf_neighbors"] = ospf_neighbors
-                    parsed_data["l3_routing"]["bgp_neighbors"] = bgp_neighbors
-                    device.latest_parsed_data = parsed_data
-
-                l3_count = len(ospf_neighbors) + len(bgp_neighbors)
-                sync_msg = f"Synced. Interfaces: {len(parsed_data.get('interfaces', []))}, L2 Neighbors: {len(neighbors)}, L3 Peers: {l3_count}"
+                # 수동/신규 장비 동기화는 항상 전체 수집; marker 는 주기 동기화(full_ssh_sync_all)의 비교 기준으로 남김
+                decision = ConfigChangeDetector.decide(db, device, conn, force=True)
+                sync_msg = DeviceSyncService._collect_full(db, device, conn)
+                ConfigChangeDetector.record(db, device.id, decision)
             except Exception as e:
                 device.status = "online"
                 sync_msg = f"Synced but parsing error: {str(e)}"
@@ -576,6 +360,234 @@ class DeviceSyncService:
         except Exception:
             pass
 
+    @staticmethod
+    def _collect_full(db: Session, device: Device, conn: DeviceConnection) -> str:
+        """config 변경(또는 첫/수동 동기화) 시 전체 수집: facts, running config, interfaces, neighbors, wireless, MAC/inventory, L3 peers"""
+        facts = conn.get_facts()
+        raw_config = conn.get_running_config()
+        neighbors = conn.get_neighbors()
+        interfaces = conn.get_detailed_interfaces()
+        parsed_data = {"interfaces": interfaces}
+
+        is_wlc_model = "9800" in str(facts.get("model", "")) or "Wireless" in str(facts.get("os_version", ""))
+        if is_wlc_model and not hasattr(conn.driver, "get_wireless_summary"):
+            try:
+                ap_parsed = conn.driver.connection.send_command("show ap summary", use_textfsm=True)
+                if isinstance(ap_parsed, list):
+                    total_clients = 0
+                    client_out = conn.driver.connection.send_command("show wireless client summary")
+                    client_match = re.search(r"Number of Clients\s*:\s*(\d+)", client_out, re.IGNORECASE)
+                    if client_match:
+                        total_clients = int(client_match.group(1))
+
+                    up_aps = 0
+                    normalized_aps = []
+                    for ap in ap_parsed:
+                        ap["name"] = ap.get("name") or ap.get("ap_name") or "Unknown"
+                        ap["model"] = ap.get("model") or ap.get("ap_model") or "N/A"
+                        ap["status"] = ap.get("status") or ap.get("state") or "Unknown"
+                        ap["uptime"] = ap.get("uptime") or ap.get("up_time") or "N/A"
+                        ap["serial_number"] = ap.get("serial_number") or ap.get("serial") or "N/A"
+                        ap["ip_address"] = ap.get("ip_address") or "N/A"
+
+                        status_lower = str(ap["status"]).lower()
+                        if "up" in status_lower or "reg" in status_lower:
+                            up_aps += 1
+                            ap["status"] = "online"
+                        else:
+                            ap["status"] = "offline"
+
+                        normalized_aps.append(ap)
+
+                    wlan_out = conn.driver.connection.send_command("show wlan summary")
+                    wlans = []
+                    for wl in wlan_out.splitlines():
+                        m = re.match(r"^\s*(\d+)\s+(\S+)\s+(\S+)\s+(UP|DISABLED|DOWN|ENABLED)", wl, re.IGNORECASE)
+                        if m:
+                            wlans.append(
+                                {
+                                    "id": m.group(1),
+                                    "profile": m.group(2),
+                                    "ssid": m.group(3),
+                                    "status": "UP"
+                                    if "UP" in m.group(4).upper() or "ENABLED" in m.group(4).upper()
+                                    else "DOWN",
+                                }
+                            )
+
+                    parsed_data["wireless"] = {
+                        "total_aps": len(normalized_aps),
+                        "up_aps": up_aps,
+                        "down_aps": len(normalized_aps) - up_aps,
+                        "total_clients": total_clients,
+                        "ap_list": normalized_aps,
+                        "wlan_summary": wlans,
+                    }
+            except Exception:
+                pass
+        elif hasattr(conn.driver, "get_wireless_summary"):
+            parsed_data["wireless"] = conn.driver.get_wireless_summary()
+
+        device.model = facts.get("model", "Unknown")
+        device.os_version = facts.get("os_version", "Unknown")
+        device.serial_number = facts.get("serial_number", None)
+        device.hostname = facts.get("hostname", device.name)
+        device.uptime = parse_uptime_seconds(facts.get("uptime", 0))
+        device.latest_parsed_data = parsed_data
+        try:
+            def _norm_mac(v):
+                if v is None:
+                    return None
+                if isinstance(v, (bytes, bytearray)):
+                    b = bytes(v)
+                    if len(b) < 6:
+                        return None
+                    s = b[:6].hex()
+                    return f"{s[0:4]}.{s[4:8]}.{s[8:12]}".lower()
+                s0 = str(v).strip()
+                if not s0:
+                    return None
+                s = s0.lower().replace("0x", "")
+                s = re.sub(r"[^0-9a-f]", "", s)
+                if len(s) < 12:
+                    return None
+                s = s[:12]
+                return f"{s[0:4]}.{s[4:8]}.{s[8:12]}".lower()
+
+            if device.ip_address and device.snmp_community:
+                snmp = SnmpManager(
+                    device.ip_address,
+                    device.snmp_community,
+                    port=int(getattr(device, "snmp_port", None) or 161),
+                    version=str(getattr(device, "snmp_version", None) or "v2c"),
+                    v3_username=getattr(device, "snmp_v3_username", None),
+                    v3_security_level=getattr(device, "snmp_v3_security_level", None),
+                    v3_auth_proto=getattr(device, "snmp_v3_auth_proto", None),
+                    v3_auth_key=getattr(device, "snmp_v3_auth_key", None),
+                    v3_priv_proto=getattr(device, "snmp_v3_priv_proto", None),
+                    v3_priv_key=getattr(device, "snmp_v3_priv_key", None),
+                )
+                mac_probe = snmp.get_oids(["1.3.6.1.2.1.17.1.1.0"]) or {}
+                mac = _norm_mac(mac_probe.get("1.3.6.1.2.1.17.1.1.0"))
+                if mac:
+                    device.mac_address = mac
+        except Exception:
+            pass
+        try:
+            mac_aliases = set()
+            if getattr(device, "mac_address", None):
+                mac_aliases.add(str(device.mac_address).strip().lower())
+            for iface in parsed_data.get("interfaces", []) or []:
+                if not isinstance(iface, dict):
+                    continue
+                m = _norm_mac(iface.get("mac_address") or iface.get("hardware_address"))
+                if m:
+                    mac_aliases.add(m)
+            if device.ip_address and device.snmp_community:
+                snmp2 = SnmpManager(
+                    device.ip_address,
+                    device.snmp_community,
+                    port=int(getattr(device, "snmp_port", None) or 161),
+                    version=str(getattr(device, "snmp_version", None) or "v2c"),
+                    v3_username=getattr(device, "snmp_v3_username", None),
+                    v3_security_level=getattr(device, "snmp_v3_security_level", None),
+                    v3_auth_proto=getattr(device, "snmp_v3_auth_proto", None),
+                    v3_auth_key=getattr(device, "snmp_v3_auth_key", None),
+                    v3_priv_proto=getattr(device, "snmp_v3_priv_proto", None),
+                    v3_priv_key=getattr(device, "snmp_v3_priv_key", None),
+                )
+                for m in snmp2.get_mac_aliases() or []:
+                    mm = _norm_mac(m)
+                    if mm:
+                        mac_aliases.add(mm)
+            if mac_aliases:
+                parsed_data["mac_aliases"] = sorted(m for m in mac_aliases if m)
+                device.latest_parsed_data = parsed_data
+        except Exception:
+            pass
+
+        db.query(Interface).filter(Interface.device_id == device.id).delete()
+        note_device_interfaces_changed(db, device.id)
+        for iface in parsed_data.get("interfaces", []):
+            link_status = iface.get("link_status", "")
+            is_up = iface.get("is_up", False)
+            is_enabled = iface.get("is_enabled", True)
+
+            if not is_enabled:
+                status = "admin_down"
+            elif is_up:
+                status = "up"
+            else:
+                status = "down"
+
+            db.add(
+                Interface(
+                    device_id=device.id,
+                    name=iface["name"],
+                    description=iface.get("description"),
+                    status=status,
+                    admin_status="up" if is_enabled else "down",
+                    mode=iface.get("mode", "access"),
+                    vlan=int(iface["vlan"]) if str(iface.get("vlan")).isdigit() else 1,
+                    ip_address=iface.get("ip_address"),
+                )
+            )
+
+        if "neighbors" not in parsed_data:
+            parsed_data["neighbors"] = neighbors
+        device.latest_parsed_data = parsed_data
+
+        db.add(ConfigBackup(device_id=device.id, raw_config=raw_config))
+        TopologyLinkService.refresh_links_for_device(db, device, neighbors)
+
+        try:
+            DeviceSyncService._refresh_endpoints_from_mac_table(db, device, conn)
+        except Exception:
+            pass
+
+        try:
+            inv_count = EntityMibService.refresh_device_inventory(db, device)
+        except Exception:
+            inv_count = 0
+
+        if inv_count == 0 or (not device.serial_number) or (not device.model or device.model == "Unknown"):
+            try:
+                InventorySshService.refresh_device_inventory_from_ssh(db, device, conn)
+            except Exception:
+                pass
+
+        # --- L3 Topology: OSPF / BGP neighbor collection ---
+        ospf_neighbors = []
+        bgp_neighbors = []
+        try:
+            if hasattr(conn.driver, 'get_ospf_neighbors'):
+                ospf_neighbors = conn.driver.get_ospf_neighbors()
+        except Exception:
+            pass
+        try:
+            if hasattr(conn.driver, 'get_bgp_neighbors'):
+                bgp_neighbors = conn.driver.get_bgp_neighbors()
+        except Exception:
+            pass
+
+        if ospf_neighbors or bgp_neighbors:
+            try:
+                TopologyLinkService.refresh_l3_links_for_device(
+                    db, device, ospf_neighbors, bgp_neighbors
+                )
+            except Exception:
+                pass
+
+            if "l3_routing" not in parsed_data:
+                parsed_data["l3_routing"] = {}
+            parsed_data["l3_routing"]["ospf_neighbors"] = ospf_neighbors
+            parsed_data["l3_routing"]["bgp_neighbors"] = bgp_neighbors
+            device.latest_parsed_data = parsed_data
+
+        l3_count = len(ospf_neighbors) + len(bgp_neighbors)
+        sync_msg = f"Synced. Interfaces: {len(parsed_data.get('interfaces', []))}, L2 Neighbors: {len(neighbors)}, L3 Peers: {l3_count}"
+        return sync_msg
+
     @staticmethod
     def sync_device_job(device_id: int) -> Dict[str, Any]:
         db = SessionLocal()
@@ -1,7 +1,5 @@
 from __future__ import annotations
 
-import platform
-import subprocess
 import time
 from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
@@ -10,6 +8,7 @@ from typing import Any, Dict, List, Optional, Tuple
 from sqlalchemy.orm import Session
 
 from app.models.device import Device, Issue, Link
+from app.services.icmp_sweeper import icmp_sweeper
 from app.services.path_trace_service import PathTraceService
 
 
@@ -32,15 +31,12 @@ def _now_utc(now: Optional[datetime]) -> datetime:
 def _ping_once(ip_address: str, timeout_ms: int = 1000) -> bool:
     if not ip_address:
         return False
-    is_windows = platform.system().lower() == "windows"
-    count_flag = "-n" if is_windows else "-c"
-    timeout_flag = "-w" if is_windows else "-W"
-    timeout_val = str(int(timeout_ms)) if is_windows else str(max(1, int(timeout_ms / 1000)))
-    cmd = ["ping", count_flag, "1", timeout_flag, timeout_val, str(ip_address)]
-    try:
-        return subprocess.call(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL) == 0
-    except Exception:
-        return False
+    return icmp_sweeper.ping(ip_address, timeout=timeout_ms / 1000.0) is not None
+
+
+def _ping_many(ip_addresses: List[str], timeout_ms: int = 1000) -> Dict[str, bool]:
+    rtts = icmp_sweeper.sweep([ip for ip in ip_addresses if ip], timeout=timeout_ms / 1000.0)
+    return {ip: rtt is not None for ip, rtt in rtts.items()}
 
 
 def _norm_if_name(s: str) -> str:
@@ -207,10 +203,12 @@ class OneClickDiagnosisService:
             c[s] += 1
 
         device_health: Dict[int, Dict[str, Any]] = {}
+        node_ips = [dev_by_id[did].ip_address for did in node_ids if dev_by_id.get(did) and dev_by_id[did].ip_address]
+        ping_by_ip = _ping_many(node_ips)
         for did in node_ids:
             dev = dev_by_id.get(did)
             ip = dev.ip_address if dev else None
-            ping_ok = _ping_once(ip) if ip else False
+            ping_ok = ping_by_ip.get(str(ip).strip(), False) if ip else False
             ic = issue_counts.get(did) or {"critical": 0, "warning": 0, "info": 0}
             device_health[did] = {
                 "device_id": did,
@@ -0,0 +1,205 @@
+"""
+Phase 1 -> Phase 2 streaming for discovery.
+
+``AliveHostStream`` is the producer side of the pipeline: a background thread
+finds alive hosts and puts them on a queue, and ``run_scan_worker`` pulls from
+it (``get`` / ``finished``) to keep its in-flight window of ``_scan_single_host``
+workers full while the sweep is still running.
+
+``NmapPingStream`` runs the nmap ping sweep per /24 chunk instead of one
+``nm.scan(hosts=cidr)`` over the whole range, so the first hosts reach SNMP
+inspection after the first chunk rather than after the entire sweep. A chunk
+whose nmap ping run fails is retried with the TCP ping sweep (Phase 1b); a chunk
+that is merely empty is not, so sparse ranges are not swept twice. Only when the
+whole range answers nothing (ICMP filtered everywhere) does Phase 1b sweep it all
+again. Its queue is bounded; when Phase 2 falls behind, the producer simply waits.
+"""
+from __future__ import annotations
+
+import ipaddress
+import logging
+import os
+import queue
+import threading
+from abc import ABC, abstractmethod
+from typing import Callable, Iterator, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+PIPELINE_QUEUE_SIZE = int(os.getenv("DISCOVERY_PIPELINE_QUEUE_SIZE", "1024"))
+NMAP_CHUNK_PREFIX = int(os.getenv("DISCOVERY_NMAP_CHUNK_PREFIX", "24"))
+
+NMAP_PING_ARGS = "-sn -PE -PP"
+NMAP_TCP_PING_ARGS = "-sn -PS22,23,80,443,161,830 -PA80,443"
+
+
+class AliveHostStream(ABC):
+    """Base class: subclasses implement ``_produce`` and call ``_emit`` for each alive host."""
+
+    thread_name = "alive-host-stream"
+
+    def __init__(self, queue_size: int = 0):
+        self._queue: "queue.Queue[str]" = queue.Queue(maxsize=max(0, int(queue_size)))
+        self._thread: Optional[threading.Thread] = None
+        self._finished = threading.Event()
+        self._stopped = threading.Event()
+        self.probed = 0
+        self.alive = 0
+        self.timed_out = False
+
+    def start(self) -> "AliveHostStream":
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name=self.thread_name, daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stopped.set()
+
+    def _run(self) -> None:
+        try:
+            self._produce()
+        except Exception:
+            logger.exception("Alive host sweep failed", extra={"stream": self.thread_name})
+        finally:
+            self._finished.set()
+
+    @abstractmethod
+    def _produce(self) -> None:
+        """Find alive hosts (runs on the stream thread) and ``_emit`` each one."""
+
+    def _emit(self, ip: str) -> bool:
+        """Queue one alive host, waiting while the queue is full. False once the stream is stopped."""
+        self.alive += 1
+        while not self._stopped.is_set():
+            try:
+                self._queue.put(ip, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    @property
+    def finished(self) -> bool:
+        """Sweep done and every alive host handed out."""
+        return self._finished.is_set() and self._queue.empty()
+
+    def get(self, timeout: Optional[float] = None) -> Optional[str]:
+        """Next alive host; None when nothing arrived within ``timeout``."""
+        try:
+            return self._queue.get(timeout=timeout) if timeout else self._queue.get_nowait()
+        except queue.Empty:
+            return None
+
+    def __iter__(self) -> Iterator[str]:
+        self.start()
+        while not self.finished:
+            ip = self.get(timeout=0.2)
+            if ip is not None:
+                yield ip
+
+
+def scope_filter(
+    include_cidrs: Optional[Sequence[str]] = None,
+    exclude_cidrs: Optional[Sequence[str]] = None,
+) -> Callable[[str], bool]:
+    """Predicate for the discovery scope settings (include/exclude CIDRs, no loopback/multicast/link-local)."""
+    include_nets = []
+    exclude_nets = []
+    for c in include_cidrs or []:
+        try:
+            include_nets.append(ipaddress.ip_network(str(c).strip(), strict=False))
+        except Exception:
+            continue
+    for c in exclude_cidrs or []:
+        try:
+            exclude_nets.append(ipaddress.ip_network(str(c).strip(), strict=False))
+        except Exception:
+            continue
+
+    def in_scope(ip) -> bool:
+        try:
+            ip_obj = ipaddress.ip_address(str(ip).strip())
+        except Exception:
+            return False
+        if ip_obj.is_loopback or ip_obj.is_multicast or ip_obj.is_unspecified or ip_obj.is_link_local:
+            return False
+        if any(ip_obj in n for n in exclude_nets):
+            return False
+        if include_nets and not any(ip_obj in n for n in include_nets):
+            return False
+        return True
+
+    return in_scope
+
+
+def cidr_chunks(cidr: str, prefix: int = NMAP_CHUNK_PREFIX, prefer_private: bool = False) -> List[str]:
+    network = ipaddress.ip_network(cidr, strict=False)
+    if network.version != 4 or network.prefixlen >= prefix:
+        return [str(network)]
+    chunks = list(network.subnets(new_prefix=prefix))
+    if prefer_private:
+        chunks.sort(key=lambda n: 0 if n.is_private else 1)
+    return [str(n) for n in chunks]
+
+
+class NmapPingStream(AliveHostStream):
+    thread_name = "nmap-ping-stream"
+
+    def __init__(
+        self,
+        scanner_factory: Callable[[], object],
+        cidr: str,
+        extract_up_hosts: Callable[[object], List[str]],
+        in_scope: Optional[Callable[[str], bool]] = None,
+        chunk_prefix: int = NMAP_CHUNK_PREFIX,
+        prefer_private: bool = False,
+        queue_size: int = PIPELINE_QUEUE_SIZE,
+    ):
+        super().__init__(queue_size=queue_size)
+        self.scanner_factory = scanner_factory
+        self.chunks = cidr_chunks(cidr, chunk_prefix, prefer_private=prefer_private)
+        self.extract_up_hosts = extract_up_hosts
+        self.in_scope = in_scope or (lambda ip: True)
+        self.tcp_fallback_chunks = 0
+
+    def _scan(self, nm, hosts: str, arguments: str) -> Optional[List[str]]:
+        """Up hosts for one nmap run; None when nmap itself failed (raised or reported errors)."""
+        try:
+            result = nm.scan(hosts=hosts, arguments=arguments)
+        except Exception:
+            logger.warning("nmap ping sweep failed", extra={"hosts": hosts, "arguments": arguments}, exc_info=True)
+            return None
+        nmap_info = result.get("nmap") if isinstance(result, dict) else None
+        scaninfo = (nmap_info or {}).get("scaninfo") or {}
+        if scaninfo.get("error"):
+            logger.warning("nmap ping sweep reported errors", extra={"hosts": hosts, "errors": scaninfo.get("error")})
+            return None
+        return self.extract_up_hosts(nm)
+
+    def _emit_all(self, hosts: Sequence[str]) -> bool:
+        for ip in hosts:
+            if self.in_scope(ip) and not self._emit(ip):
+                return False
+        return True
+
+    def _produce(self) -> None:
+        nm = self.scanner_factory()
+        for chunk in self.chunks:
+            if self._stopped.is_set():
+                return
+            net = ipaddress.ip_network(chunk, strict=False)
+            self.probed += max(0, int(net.num_addresses) - 2) if net.num_addresses >= 4 else int(net.num_addresses)
+            hosts = self._scan(nm, chunk, NMAP_PING_ARGS)
+            if hosts is None:
+                # nmap 실행 자체가 실패한 chunk 만 TCP ping 으로 다시 확인 (응답 없는 chunk 는 그대로 넘어감)
+                self.tcp_fallback_chunks += 1
+                hosts = self._scan(nm, chunk, NMAP_TCP_PING_ARGS) or []
+            if not self._emit_all(hosts):
+                return
+        if self.alive == 0 and not self._stopped.is_set():
+            # 전체 대역이 ICMP 에 응답하지 않음 (필터링): 기존 Phase 1b 처럼 TCP ping 으로 한 번 더
+            self.tcp_fallback_chunks += len(self.chunks)
+            for chunk in self.chunks:
+                if self._stopped.is_set() or not self._emit_all(self._scan(nm, chunk, NMAP_TCP_PING_ARGS) or []):
+                    return
@@ -3,22 +3,27 @@ import subprocess
 import ipaddress
 import logging
 import os
+import time
 try:
     import nmap
 except ImportError:  # pragma: no cover
     nmap = None
-from concurrent.futures import ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from datetime import datetime
-from sqlalchemy import or_
-from sqlalchemy.orm import Session
+from sqlalchemy import event, or_
+from sqlalchemy.orm import Session, object_session
 from sqlalchemy.exc import IntegrityError
-from app.models.discovery import DiscoveryJob, DiscoveredDevice
+from app.models.discovery import DiscoveryJob, DiscoveredDevice, DiscoveryJobLog
 from app.models.credentials import SnmpCredentialProfile
 from app.models.device import Device
 from app.models.device import Site
 from app.models.settings import SystemSetting
 from app.db.session import SessionLocal
 from app.services.snmp_service import SnmpManager
+from app.services.snmp_async_engine import snmp_async_engine
+from app.services.snmp_credential_race import SubnetCredentialMemory, candidate_key, race_system_info
+from app.services.discovery_pipeline import NMAP_PING_ARGS, NMAP_TCP_PING_ARGS, NmapPingStream, scope_filter
+from app.services.tcp_alive_sweeper import TCP_SWEEP_MAX_HOSTS, TcpAliveSweep, scoped_hosts
 from app.core.device_fingerprints import (
     identify_vendor_by_oid,
     extract_model_from_descr,
@@ -27,21 +32,64 @@ from app.core.device_fingerprints import (
 
 logger = logging.getLogger(__name__)
 
+PROGRESS_FLUSH_SEC = float(os.getenv("DISCOVERY_PROGRESS_FLUSH_SEC", "2"))
+JOB_LOG_SUMMARY_CHARS = int(os.getenv("DISCOVERY_JOB_LOG_SUMMARY_CHARS", "2000"))
+_PENDING_LOG_EVENTS_KEY = "discovery_log_events"
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_job_log_events(session: Session) -> None:
+    # 행이 commit 된 뒤에 발행해야 SSE 루프가 깨어났을 때 바로 읽을 수 있음
+    pending = session.info.pop(_PENDING_LOG_EVENTS_KEY, None)
+    if not pending:
+        return
+    try:
+        from app.services.realtime_event_bus import realtime_event_bus
+
+        for payload in pending:
+            realtime_event_bus.publish("discovery_log", payload)
+    except Exception:
+        pass
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_job_log_events(session: Session, previous_transaction) -> None:
+    if not session.in_transaction():
+        session.info.pop(_PENDING_LOG_EVENTS_KEY, None)
+
+
 class DiscoveryService:
     def __init__(self, db: Session):
         self.db = db
+        self.subnet_credentials = SubnetCredentialMemory()
 
-    def _append_job_log(self, job: DiscoveryJob, message: str, max_chars: int = 20000) -> None:
-        msg = str(message or "")
+    def _append_job_log(self, job: DiscoveryJob, message: str, max_chars: int = JOB_LOG_SUMMARY_CHARS) -> None:
+        """
+        로그는 discovery_job_logs 에 한 줄(묶음)씩 INSERT 하고, 호출자가 commit 하면 realtime event bus 로 발행한다.
+        DiscoveryJob.logs 에는 최근 로그 요약(max_chars)만 남긴다.
+        """
+        msg = str(message or "").strip("\n")
         if not msg:
             return
-        if job.logs is None:
-            job.logs = ""
-        if not msg.startswith("\n"):
-            msg = "\n" + msg
-        job.logs = (job.logs or "") + msg
-        if len(job.logs) > max_chars:
-            job.logs = job.logs[-max_chars:]
+        summary = f"{job.logs}\n{msg}" if job.logs else msg
+        if len(summary) > max_chars:
+            summary = summary[-max_chars:]
+            summary = summary[summary.find("\n") + 1:]
+        job.logs = summary
+
+        session = object_session(job)
+        if session is None or job.id is None:
+            return
+        entry = DiscoveryJobLog(job_id=job.id, message=msg)
+        session.add(entry)
+        try:
+            session.flush()
+        except Exception:
+            logger.debug("Discovery job log flush failed", exc_info=True)
+            return
+        session.info.setdefault(_PENDING_LOG_EVENTS_KEY, []).append(
+            {"job_id": int(job.id), "id": int(entry.id), "ts": datetime.now().isoformat(), "message": msg}
+        )
 
     def _extract_up_hosts(self, nm) -> list:
         hosts = []
@@ -53,79 +101,21 @@ class DiscoveryService:
                 continue
         return hosts
 
-    def _tcp_alive_sweep(self, cidr: str, ports=None, max_hosts: int = 1024, timeout: float = 0.25, include_cidrs: list[str] | None = None, exclude_cidrs: list[str] | None = None) -> list:
+    def _tcp_alive_stream(self, cidr: str, ports=None, max_hosts: int | None = None, timeout: float | None = None, include_cidrs: list[str] | None = None, exclude_cidrs: list[str] | None = None) -> TcpAliveSweep | None:
+        """nmap 이 없을 때의 asyncio TCP 생존 확인. 발견되는 대로 꺼내 쓸 수 있도록 시작된 sweep 을 돌려준다."""
         network = ipaddress.ip_network(cidr, strict=False)
         total = int(network.num_addresses) - 2 if int(network.num_addresses) >= 2 else 0
-        if total > max_hosts:
-            return []
-
-        ports = ports or [22, 23, 80, 443, 161, 830]
-
-        import socket
-
-        def check(ip: str) -> bool:
-            for p in ports:
-                s = None
-                try:
-                    s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                    s.settimeout(timeout)
-                    r = s.connect_ex((ip, int(p)))
-                    if r in (0, 111, 10061):
-                        return True
-                except Exception:
-                    continue
-                finally:
-                    try:
-                        if s is not None:
-                            s.close()
-                    except Exception:
-                        pass
-            return False
-
-        alive = []
-        include_nets = []
-        exclude_nets = []
-        for c in include_cidrs or []:
-            try:
-                include_nets.append(ipaddress.ip_network(str(c).strip(), strict=False))
-            except Exception:
-                continue
-        for c in exclude_cidrs or []:
-            try:
-                exclude_nets.append(ipaddress.ip_network(str(c).strip(), strict=False))
-            except Exception:
-                continue
+        limit = int(max_hosts if max_hosts is not None else TCP_SWEEP_MAX_HOSTS)
+        if total > limit:
+            return None
+        hosts = scoped_hosts(cidr, include_cidrs=include_cidrs, exclude_cidrs=exclude_cidrs)
+        return TcpAliveSweep(hosts, ports=ports, timeout=timeout).start()
 
-        ips = []
-        for ip in network.hosts():
-            try:
-                ip_obj = ipaddress.ip_address(str(ip))
-            except Exception:
-                continue
-            if ip_obj.is_loopback or ip_obj.is_multicast or ip_obj.is_unspecified or ip_obj.is_link_local:
-                continue
-            if any(ip_obj in n for n in exclude_nets):
-                continue
-            if include_nets and not any(ip_obj in n for n in include_nets):
-                continue
-            ips.append(str(ip_obj))
-
-        base_workers = int(os.getenv("DISCOVERY_PING_MAX_WORKERS", "0") or 0)
-        if base_workers <= 0:
-            cpu = os.cpu_count() or 4
-            base_workers = cpu * 10
-        max_workers = max(10, min(200, base_workers, len(ips) or 1))
-
-        with ThreadPoolExecutor(max_workers=max_workers) as ex:
-            futs = {ex.submit(check, ip): ip for ip in ips}
-            for fut in as_completed(futs):
-                ip = futs[fut]
-                try:
-                    if fut.result():
-                        alive.append(ip)
-                except Exception:
-                    continue
-        return alive
+    def _tcp_alive_sweep(self, cidr: str, ports=None, max_hosts: int | None = None, timeout: float | None = None, include_cidrs: list[str] | None = None, exclude_cidrs: list[str] | None = None) -> list:
+        stream = self._tcp_alive_stream(cidr, ports=ports, max_hosts=max_hosts, timeout=timeout, include_cidrs=include_cidrs, exclude_cidrs=exclude_cidrs)
+        if stream is None:
+            return []
+        return sorted(stream, key=lambda s: ipaddress.ip_address(s))
 
     def create_scan_job(
         self,
@@ -188,9 +178,11 @@ class DiscoveryService:
             snmp_v3_priv_proto=effective_v3_priv_proto,
             snmp_v3_priv_key=effective_v3_priv_key,
             status="pending",
-            logs="Job Created. Waiting for worker...",
+            logs="",
         )
         self.db.add(job)
+        self.db.flush()
+        self._append_job_log(job, "Job Created. Waiting for worker...")
         self.db.commit()
         self.db.refresh(job)
         return job
@@ -206,6 +198,7 @@ class DiscoveryService:
             db.close()
             return
 
+        alive_stream = None
         try:
             job.status = "running"
             self._append_job_log(job, "Worker Started. Initializing Scanner...")
@@ -266,6 +259,10 @@ class DiscoveryService:
                     snmp_profile["credential_pool"] = pool
             except Exception:
                 pass
+            try:
+                self.subnet_credentials.load(db)
+            except Exception:
+                db.rollback()
 
             network = ipaddress.ip_network(cidr, strict=False)
             host_count = int(network.num_addresses) - 2 if int(network.num_addresses) >= 2 else 0
@@ -279,61 +276,33 @@ class DiscoveryService:
             
             # --- Phase 1: Fast Ping Scan (Nmap) ---
             # Nmap is much faster than running ping subprocess for each IP
-            active_hosts = []
             include_cidrs = _parse_cidr_list(_get_setting_value("discovery_scope_include_cidrs"))
             exclude_cidrs = _parse_cidr_list(_get_setting_value("discovery_scope_exclude_cidrs"))
             prefer_private = (_get_setting_value("discovery_prefer_private") or "true").strip().lower() in ("true", "1", "yes", "y", "on")
+            in_scope = scope_filter(include_cidrs, exclude_cidrs)
             if nm is not None:
-                scan_args = "-sn -PE -PP"
-                self._append_job_log(job, f"[Phase 1] Ping Sweeping with Nmap ({scan_args})...")
+                # /24 단위로 ping sweep 하고 찾은 호스트를 바로 Phase 2 로 넘김 (nmap 이 실패한 chunk 만 TCP ping 재시도)
+                self._append_job_log(
+                    job,
+                    f"[Phase 1] Ping Sweeping with Nmap ({NMAP_PING_ARGS}), streaming hosts into Phase 2; "
+                    f"TCP ping ({NMAP_TCP_PING_ARGS}) for failed chunks or a fully silent range...",
+                )
                 db.commit()
-                nm.scan(hosts=cidr, arguments=scan_args)
-                active_hosts = self._extract_up_hosts(nm)
-
-                if len(active_hosts) == 0:
-                    scan_args2 = "-sn -PS22,23,80,443,161,830 -PA80,443"
-                    self._append_job_log(job, f"[Phase 1b] TCP Ping Sweeping with Nmap ({scan_args2})...")
-                    db.commit()
-                    nm.scan(hosts=cidr, arguments=scan_args2)
-                    active_hosts = self._extract_up_hosts(nm)
+                alive_stream = NmapPingStream(
+                    lambda: nm,
+                    cidr,
+                    self._extract_up_hosts,
+                    in_scope=in_scope,
+                    prefer_private=prefer_private,
+                ).start()
             else:
-                self._append_job_log(job, "[Phase 1] python-nmap missing; using TCP connect probe fallback...")
+                self._append_job_log(job, "[Phase 1] python-nmap missing; streaming asyncio TCP sweep into Phase 2...")
                 db.commit()
-                active_hosts = self._tcp_alive_sweep(cidr, include_cidrs=include_cidrs, exclude_cidrs=exclude_cidrs)
-
-            try:
-                include_nets = []
-                exclude_nets = []
-                for c in include_cidrs:
-                    try:
-                        include_nets.append(ipaddress.ip_network(str(c).strip(), strict=False))
-                    except Exception:
-                        continue
-                for c in exclude_cidrs:
-                    try:
-                        exclude_nets.append(ipaddress.ip_network(str(c).strip(), strict=False))
-                    except Exception:
-                        continue
-                filtered = []
-                for ip in active_hosts:
-                    try:
-                        ip_obj = ipaddress.ip_address(str(ip).strip())
-                    except Exception:
-                        continue
-                    if ip_obj.is_loopback or ip_obj.is_multicast or ip_obj.is_unspecified or ip_obj.is_link_local:
-                        continue
-                    if any(ip_obj in n for n in exclude_nets):
-                        continue
-                    if include_nets and not any(ip_obj in n for n in include_nets):
-                        continue
-                    filtered.append(str(ip_obj))
-                if prefer_private:
-                    filtered.sort(key=lambda s: (0 if ipaddress.ip_address(s).is_private else 1, s))
-                active_hosts = filtered
-            except Exception:
-                pass
+                alive_stream = self._tcp_alive_stream(cidr, include_cidrs=include_cidrs, exclude_cidrs=exclude_cidrs)
+                if alive_stream is None:
+                    self._append_job_log(job, f"[Phase 1] {cidr} is larger than {TCP_SWEEP_MAX_HOSTS} hosts; TCP sweep skipped (install nmap or split the range).")
+                    db.commit()
 
-            self._append_job_log(job, f"[Phase 1] Found {len(active_hosts)} active hosts.")
             self._append_job_log(job, "[Phase 2] Deep Inspection (SNMP & Ports)...")
             db.commit()
             
@@ -361,14 +330,29 @@ class DiscoveryService:
 
             completed_count = 0
             job.scanned_ips = 0
-            job.total_ips = len(active_hosts)
+            job.total_ips = 0
             db.commit()
 
+            def next_host(wait_sec: float = 0.0):
+                if alive_stream is None:
+                    return None
+                return alive_stream.get(timeout=wait_sec)
+
+            # 진행률 분모는 Phase 1 이 지금까지 찾은 호스트 수 (Phase 2 in-flight 창에 들어간 수가 아님)
+            def sync_total():
+                if alive_stream is not None:
+                    job.total_ips = max(int(job.total_ips or 0), int(alive_stream.alive))
+
+            def sweep_running() -> bool:
+                return alive_stream is not None and not alive_stream.finished
+
             pending_rows = []
             pending_logs = []
+            last_flush = time.monotonic()
 
             def flush_pending():
-                nonlocal pending_rows, pending_logs
+                nonlocal pending_rows, pending_logs, last_flush
+                last_flush = time.monotonic()
                 if pending_rows:
                     try:
                         db.add_all(pending_rows)
@@ -422,18 +406,29 @@ class DiscoveryService:
                 )
 
             inflight = max_workers * inflight_mult
-            active_iter = iter([str(ip) for ip in active_hosts])
 
             with ThreadPoolExecutor(max_workers=max_workers) as executor:
                 future_map = {}
-                for _ in range(inflight):
-                    ip = next(active_iter, None)
-                    if not ip:
-                        break
-                    future_map[executor.submit(self._scan_single_host, ip, snmp_profile)] = ip
 
-                while future_map:
-                    done, _ = wait(list(future_map.keys()), return_when=FIRST_COMPLETED)
+                def top_up(wait_sec: float = 0.0):
+                    sync_total()
+                    while len(future_map) < inflight:
+                        ip = next_host(wait_sec)
+                        if not ip:
+                            break
+                        wait_sec = 0.0
+                        future_map[executor.submit(self._scan_single_host, ip, snmp_profile)] = ip
+
+                top_up()
+                while future_map or sweep_running():
+                    if not future_map:
+                        top_up(0.5)
+                        continue
+                    done, _ = wait(list(future_map.keys()), timeout=(0.5 if sweep_running() else None), return_when=FIRST_COMPLETED)
+                    top_up()
+                    if time.monotonic() - last_flush >= PROGRESS_FLUSH_SEC:
+                        # 배치가 덜 찼어도 scanned_ips/total_ips 진행률은 주기적으로 커밋
+                        flush_pending()
                     for fut in done:
                         ip = future_map.pop(fut, None)
                         if not ip:
@@ -451,11 +446,23 @@ class DiscoveryService:
                         except Exception as e:
                             pending_logs.append(f"  [!] {ip}: inspect error {str(e)}")
                         finally:
-                            nxt = next(active_iter, None)
-                            if nxt:
-                                future_map[executor.submit(self._scan_single_host, nxt, snmp_profile)] = nxt
+                            top_up()
 
+                sync_total()
                 flush_pending()
+                if alive_stream is not None:
+                    self._append_job_log(
+                        job,
+                        f"[Phase 1] Swept {alive_stream.probed} addresses, found {alive_stream.alive} active hosts"
+                        + (" (deadline reached)" if alive_stream.timed_out else "")
+                        + ".",
+                    )
+
+            try:
+                if self.subnet_credentials.save(db):
+                    db.commit()
+            except Exception:
+                db.rollback()
 
             try:
                 DiscoveryService(db).auto_approve_job(job.id)
@@ -469,7 +476,6 @@ class DiscoveryService:
 
             try:
                 from app.services.topology_snapshot_policy_service import TopologySnapshotPolicyService
-                from app.models.settings import SystemSetting
 
                 row = db.query(SystemSetting).filter(SystemSetting.key == "topology_snapshot_auto_on_discovery_job_complete").first()
                 enabled = True
@@ -490,6 +496,8 @@ class DiscoveryService:
             self._append_job_log(job, f"[Error] Scan Failed: {str(e)}")
             db.commit()
         finally:
+            if alive_stream is not None:
+                alive_stream.stop()
             db.close()
 
     def _scan_single_host(self, ip: str, snmp_profile: dict):
@@ -545,15 +553,12 @@ class DiscoveryService:
         if not isinstance(credential_pool, list):
             credential_pool = []
 
-        def _try_snmp(p: dict):
-            comm = (p.get("community") or "public").strip() or "public"
-            ver = (p.get("version") or "v2c").strip().lower() or "v2c"
-            prt = int(p.get("port") or 161)
-            snmp = SnmpManager(
+        def _snmp_for(p: dict):
+            return SnmpManager(
                 ip,
-                community=comm,
-                port=prt,
-                version=ver,
+                community=(p.get("community") or "public").strip() or "public",
+                port=int(p.get("port") or 161),
+                version=(p.get("version") or "v2c").strip().lower() or "v2c",
                 v3_username=p.get("v3_username"),
                 v3_security_level=p.get("v3_security_level"),
                 v3_auth_proto=p.get("v3_auth_proto"),
@@ -561,17 +566,18 @@ class DiscoveryService:
                 v3_priv_proto=p.get("v3_priv_proto"),
                 v3_priv_key=p.get("v3_priv_key"),
             )
-            return snmp, snmp.get_system_info(), comm, ver, prt, p.get("profile_id")
 
-        snmp, sysinfo, community, version, port, matched_profile_id = _try_snmp(profile)
-        if not sysinfo:
-            for p in credential_pool:
-                if not isinstance(p, dict):
-                    continue
-                snmp, sysinfo, community, version, port, matched_profile_id = _try_snmp(p)
-                if sysinfo:
-                    break
+        # job 프로파일 + credential pool 을 동시에 시도하고 먼저 응답한 자격증명을 사용
+        candidates = [profile] + [p for p in credential_pool if isinstance(p, dict)]
+        preferred = self.subnet_credentials.preferred_index(ip, candidates)
+        winner, snmp, sysinfo = snmp_async_engine.run_sync(
+            race_system_info(candidates, _snmp_for, preferred_index=preferred)
+        )
         if sysinfo:
+            matched = candidates[winner]
+            version = (matched.get("version") or "v2c").strip().lower() or "v2c"
+            matched_profile_id = matched.get("profile_id")
+            self.subnet_credentials.remember(ip, candidate_key(matched))
             info["snmp_status"] = "reachable"
             sys_descr = str(sysinfo.get("sysDescr") or "")
             sys_oid = str(sysinfo.get("sysObjectID") or "")
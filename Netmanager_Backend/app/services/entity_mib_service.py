@@ -53,7 +53,8 @@ class EntityMibService:
             "is_fru": f"{EntityMibService._ENT_PHYSICAL_BASE}.16",
         }
 
-        data_by_col: Dict[str, Dict[int, str]] = {k: mgr.walk_table_column(oid) for k, oid in cols.items()}
+        walked = mgr.walk_table_columns(list(cols.values()))
+        data_by_col: Dict[str, Dict[int, str]] = {k: walked.get(oid) or {} for k, oid in cols.items()}
         idxs = set()
         for m in data_by_col.values():
             idxs.update(m.keys())
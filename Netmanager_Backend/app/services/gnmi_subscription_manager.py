@@ -0,0 +1,394 @@
+"""
+Persistent gNMI subscription manager (runs as its own process).
+
+    python -m app.services.gnmi_subscription_manager
+
+One long-lived SAMPLE + ON_CHANGE subscription per gNMI/hybrid device, instead
+of ``collect_gnmi_metrics`` opening a channel and a 3-second stream window
+every 5 seconds:
+
+- every device stream runs in its own thread and merges updates into an
+  in-memory per-device state; on a connection error it reconnects with
+  exponential backoff and jitter (``GNMI_RECONNECT_MIN_SEC`` .. ``GNMI_RECONNECT_MAX_SEC``);
+- on-change ``oper-status`` transitions are published to the realtime event bus
+  as soon as they arrive, so none are lost between windows;
+- every ``GNMI_FLUSH_INTERVAL_SEC`` the devices that sent data are handed to
+  ``monitoring._save_gnmi_results`` (counter store, rates, metrics, issues);
+- the device list is re-read every ``GNMI_TARGET_REFRESH_SEC``; streams of removed
+  or changed devices are stopped;
+- while running, ``HEARTBEAT_KEY`` is kept in Redis together with
+  ``LIVE_DEVICES_KEY``, the devices whose stream delivered data within
+  ``LIVE_MAX_AGE_SEC``; the periodic ``collect_gnmi_metrics`` task skips only
+  those and keeps polling devices whose stream is down.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import random
+import signal
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+try:
+    import redis
+except Exception:  # pragma: no cover
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+HEARTBEAT_KEY = "gnmi:subscriber:heartbeat"
+LIVE_DEVICES_KEY = "gnmi:subscriber:live_devices"
+
+FLUSH_INTERVAL_SEC = float(os.getenv("GNMI_FLUSH_INTERVAL_SEC", "5"))
+TARGET_REFRESH_SEC = float(os.getenv("GNMI_TARGET_REFRESH_SEC", "60"))
+RECONNECT_MIN_SEC = float(os.getenv("GNMI_RECONNECT_MIN_SEC", "2"))
+RECONNECT_MAX_SEC = float(os.getenv("GNMI_RECONNECT_MAX_SEC", "120"))
+SAMPLE_INTERVAL_SEC = float(os.getenv("GNMI_SAMPLE_INTERVAL_SEC", "1"))
+MAX_STREAMS = int(os.getenv("GNMI_MAX_STREAMS", "1000"))
+LIVE_MAX_AGE_SEC = float(os.getenv("GNMI_LIVE_MAX_AGE_SEC", str(max(30.0, SAMPLE_INTERVAL_SEC * 10))))
+
+_UP_VALUES = {"up", "active", "true", "1"}
+
+
+def reconnect_delay(failures: int, rnd: Callable[[], float] = random.random) -> float:
+    """Exponential backoff with +-20% jitter; failures starts at 1."""
+    base = min(RECONNECT_MAX_SEC, RECONNECT_MIN_SEC * (2 ** max(0, int(failures) - 1)))
+    return base * (0.8 + 0.4 * rnd())
+
+
+class _DeviceState:
+    __slots__ = ("cpu", "memory", "if_counters", "dirty", "last_update", "connected", "failures", "last_error")
+
+    def __init__(self):
+        self.cpu: Optional[float] = None
+        self.memory: Optional[float] = None
+        self.if_counters: Dict[str, Dict[str, Any]] = {}
+        self.dirty = False
+        self.last_update: Optional[float] = None
+        self.connected = False
+        self.failures = 0
+        self.last_error: Optional[str] = None
+
+
+class GnmiSubscriptionManager:
+    def __init__(
+        self,
+        driver_factory: Optional[Callable[[dict], Any]] = None,
+        save_results: Optional[Callable[..., None]] = None,
+        publish: Optional[Callable[[str, dict], None]] = None,
+    ):
+        self._driver_factory = driver_factory or self._default_driver
+        self._save_results = save_results
+        self._publish = publish
+        self._lock = threading.Lock()
+        self._states: Dict[int, _DeviceState] = {}
+        self._threads: Dict[int, threading.Thread] = {}
+        self._stops: Dict[int, threading.Event] = {}
+        self._targets: Dict[int, dict] = {}
+        self._stop = threading.Event()
+
+    # ------------------------------------------------------------ targets
+    @staticmethod
+    def _default_driver(target: dict):
+        from app.drivers.manager import DriverManager
+
+        return DriverManager.get_driver(
+            str(target.get("type") or "cisco_ios"),
+            target["ip"],
+            target.get("user"),
+            target.get("pw"),
+            22,
+            target.get("pw"),
+        )
+
+    @staticmethod
+    def load_targets() -> List[dict]:
+        from sqlalchemy import func
+
+        from app.db.encrypted_types import ssh_login_only
+        from app.db.session import SessionLocal
+        from app.models.device import Device
+
+        db = SessionLocal()
+        try:
+            # SSH 계정만 필요하므로 SNMP/enable 비밀값은 로드(복호화)하지 않음
+            devices = (
+                db.query(Device)
+                .options(*ssh_login_only(Device))
+                .filter(Device.ip_address != None, func.lower(Device.telemetry_mode).in_(("gnmi", "hybrid")))  # noqa: E711
+                .all()
+            )
+            return [
+                {
+                    "id": d.id,
+                    "ip": d.ip_address,
+                    "type": d.device_type,
+                    "user": d.ssh_username,
+                    "pw": d.ssh_password,
+                    "gnmi_port": d.gnmi_port or 57400,
+                }
+                for d in devices
+                if str(d.telemetry_mode or "").lower() in ("gnmi", "hybrid")
+            ][:MAX_STREAMS]
+        finally:
+            db.close()
+
+    def sync_targets(self, targets: Iterable[dict]) -> None:
+        """Start streams for new devices, restart changed ones, stop removed ones."""
+        wanted = {int(t["id"]): t for t in targets if t.get("ip")}
+        for did in list(self._targets):
+            if did not in wanted or wanted[did] != self._targets[did]:
+                self._stop_stream(did)
+        for did, t in wanted.items():
+            if did not in self._targets:
+                self._start_stream(t)
+
+    def _start_stream(self, target: dict) -> None:
+        did = int(target["id"])
+        stop = threading.Event()
+        with self._lock:
+            self._states[did] = _DeviceState()
+        th = threading.Thread(target=self._run_stream, args=(target, stop), name=f"gnmi-{did}", daemon=True)
+        self._targets[did] = target
+        self._stops[did] = stop
+        self._threads[did] = th
+        th.start()
+
+    def _stop_stream(self, did: int) -> None:
+        stop = self._stops.pop(did, None)
+        if stop is not None:
+            stop.set()
+        self._threads.pop(did, None)
+        self._targets.pop(did, None)
+        with self._lock:
+            self._states.pop(did, None)
+
+    # ------------------------------------------------------------ streams
+    def _run_stream(self, target: dict, stop: threading.Event) -> None:
+        did = int(target["id"])
+        while not stop.is_set() and not self._stop.is_set():
+            try:
+                driver = self._driver_factory(target)
+                updates = driver.iter_gnmi_updates(
+                    port=int(target.get("gnmi_port") or 57400),
+                    sample_interval_sec=SAMPLE_INTERVAL_SEC,
+                )
+                try:
+                    self.consume(did, updates, stop)
+                finally:
+                    close = getattr(updates, "close", None)
+                    if close:
+                        close()
+                if stop.is_set() or self._stop.is_set():
+                    break
+                raise ConnectionError("gNMI stream ended")
+            except NotImplementedError as e:
+                # pygnmi 미설치 / gNMI 미지원 드라이버: 재시도해도 의미 없음
+                self._mark_failure(did, str(e))
+                logger.warning("gNMI subscription unavailable", extra={"device_id": did, "error": str(e)})
+                return
+            except Exception as e:
+                failures = self._mark_failure(did, str(e))
+                delay = reconnect_delay(failures)
+                logger.info(
+                    "gNMI stream lost, reconnecting",
+                    extra={"device_id": did, "error": str(e), "retry_in_sec": round(delay, 1)},
+                )
+                if stop.wait(delay):
+                    break
+
+    def _mark_failure(self, did: int, error: str) -> int:
+        with self._lock:
+            st = self._states.get(did)
+            if st is None:
+                return 1
+            st.connected = False
+            st.failures += 1
+            st.last_error = error[:500]
+            return st.failures
+
+    def consume(self, device_id: int, updates: Iterable[Optional[dict]], stop: Optional[threading.Event] = None) -> None:
+        """Merge parsed batches from ``iter_gnmi_updates`` into the device state until stopped."""
+        for batch in updates:
+            if (stop is not None and stop.is_set()) or self._stop.is_set():
+                return
+            if batch is None:
+                continue
+            transitions = []
+            with self._lock:
+                st = self._states.get(device_id)
+                if st is None:
+                    return
+                st.connected = True
+                st.failures = 0
+                st.last_error = None
+                if batch.get("cpu"):
+                    st.cpu = sum(batch["cpu"]) / len(batch["cpu"])
+                if batch.get("memory"):
+                    st.memory = sum(batch["memory"]) / len(batch["memory"])
+                for if_name, values in (batch.get("if_counters") or {}).items():
+                    entry = st.if_counters.setdefault(str(if_name), {})
+                    if "is_up" in values or "oper_status" in values:
+                        prev_up = entry.get("is_up")
+                        is_up = values.get("is_up")
+                        if is_up is None and values.get("oper_status") is not None:
+                            is_up = str(values["oper_status"]).strip().lower() in _UP_VALUES
+                        if prev_up is not None and is_up is not None and bool(prev_up) != bool(is_up):
+                            transitions.append((str(if_name), bool(is_up)))
+                    entry.update(values)
+                st.dirty = True
+                st.last_update = time.time()
+            for if_name, is_up in transitions:
+                self._publish_oper_change(device_id, if_name, is_up)
+
+    def _publish_oper_change(self, device_id: int, if_name: str, is_up: bool) -> None:
+        import datetime
+
+        target = self._targets.get(device_id) or {}
+        payload = {
+            "device_id": int(device_id),
+            "device_ip": target.get("ip"),
+            "interface": if_name,
+            "state": "up" if is_up else "down",
+            "protocol": "LLDP",
+            "ts": datetime.datetime.now().isoformat(),
+            "source": "gnmi_oper_status",
+        }
+        try:
+            publish = self._publish
+            if publish is None:
+                from app.services.realtime_event_bus import realtime_event_bus
+
+                publish = realtime_event_bus.publish
+            publish("link_update", payload)
+        except Exception:
+            logger.exception("Failed to publish gNMI oper-status change")
+
+    # ------------------------------------------------------------ flush
+    def drain(self) -> List[dict]:
+        """Snapshot every device that sent data since the last drain, in ``_save_gnmi_results`` shape."""
+        results = []
+        with self._lock:
+            for did, st in self._states.items():
+                if not st.dirty:
+                    continue
+                st.dirty = False
+                if_counters = {k: dict(v) for k, v in st.if_counters.items()}
+                total_in = sum(int(v.get("in_octets", 0) or 0) for v in if_counters.values())
+                total_out = sum(int(v.get("out_octets", 0) or 0) for v in if_counters.values())
+                results.append(
+                    {
+                        "id": did,
+                        "ok": True,
+                        "data": {
+                            "cpu_usage": float(st.cpu or 0.0),
+                            "memory_usage": float(st.memory or 0.0),
+                            "raw_octets_in": total_in,
+                            "raw_octets_out": total_out,
+                            "if_counters": if_counters,
+                        },
+                    }
+                )
+        return results
+
+    def flush(self) -> int:
+        results = self.drain()
+        if not results:
+            return 0
+        save = self._save_results
+        if save is None:
+            from app.tasks.monitoring import _save_gnmi_results
+
+            save = _save_gnmi_results
+        save(results, oper_events_published=True)
+        return len(results)
+
+    def status(self) -> List[dict]:
+        with self._lock:
+            return [
+                {
+                    "device_id": did,
+                    "connected": st.connected,
+                    "failures": st.failures,
+                    "last_update": st.last_update,
+                    "last_error": st.last_error,
+                }
+                for did, st in sorted(self._states.items())
+            ]
+
+    def live_device_ids(self, now: Optional[float] = None) -> List[int]:
+        """Devices whose stream is connected and delivered data within ``LIVE_MAX_AGE_SEC``."""
+        now = time.time() if now is None else now
+        with self._lock:
+            return sorted(
+                did
+                for did, st in self._states.items()
+                if st.connected and st.last_update is not None and now - st.last_update <= LIVE_MAX_AGE_SEC
+            )
+
+    # ------------------------------------------------------------ main loop
+    def _heartbeat(self) -> None:
+        if redis is None:
+            return
+        try:
+            ttl = int(max(FLUSH_INTERVAL_SEC * 6, 30))
+            live = self.live_device_ids()
+            r = redis.Redis.from_url(os.getenv("REDIS_URL", "redis://localhost:6379/0"))
+            pipe = r.pipeline()
+            pipe.set(HEARTBEAT_KEY, str(os.getpid()), ex=ttl)
+            pipe.delete(LIVE_DEVICES_KEY)
+            if live:
+                pipe.sadd(LIVE_DEVICES_KEY, *live)
+                pipe.expire(LIVE_DEVICES_KEY, ttl)
+            pipe.execute()
+        except Exception as e:
+            logger.warning(f"gNMI subscriber heartbeat failed: {e}")
+
+    def stop(self) -> None:
+        self._stop.set()
+        for did in list(self._stops):
+            self._stop_stream(did)
+        if redis is not None:
+            try:
+                redis.Redis.from_url(os.getenv("REDIS_URL", "redis://localhost:6379/0")).delete(HEARTBEAT_KEY, LIVE_DEVICES_KEY)
+            except Exception:
+                pass
+
+    def run_forever(self) -> None:
+        next_refresh = 0.0
+        while not self._stop.is_set():
+            now = time.monotonic()
+            if now >= next_refresh:
+                try:
+                    self.sync_targets(self.load_targets())
+                except Exception:
+                    logger.exception("gNMI target refresh failed")
+                next_refresh = now + TARGET_REFRESH_SEC
+            self._heartbeat()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("gNMI flush failed")
+            self._stop.wait(FLUSH_INTERVAL_SEC)
+
+
+def main() -> None:
+    from app.core.logging_config import configure_logging
+
+    configure_logging()
+    manager = GnmiSubscriptionManager()
+
+    def _shutdown(signum, frame):
+        manager.stop()
+
+    signal.signal(signal.SIGTERM, _shutdown)
+    signal.signal(signal.SIGINT, _shutdown)
+    logger.info("gNMI subscription manager started")
+    manager.run_forever()
+    manager.stop()
+
+
+if __name__ == "__main__":
+    main()
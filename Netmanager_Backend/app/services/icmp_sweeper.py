@@ -0,0 +1,282 @@
+"""
+In-process ICMP echo sweeper.
+
+One sweep sends an echo request to every target over a single ICMP socket and
+collects the replies inside one timeout window, matching them by
+(source address, sequence) and, on raw sockets, by identifier and payload token.
+That replaces one ``ping`` fork/exec (and one worker thread) per device.
+
+Socket preference: unprivileged ``SOCK_DGRAM``/``IPPROTO_ICMP`` (Linux
+``net.ipv4.ping_group_range``), then ``SOCK_RAW`` (root / CAP_NET_RAW). When
+neither can be opened, and for IPv6 targets, it falls back to the ``ping``
+subprocess in a small thread pool.
+
+Results are ``{host: rtt_ms}``; ``None`` means no reply.
+"""
+from __future__ import annotations
+
+import ipaddress
+import logging
+import os
+import platform
+import re
+import selectors
+import socket
+import struct
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+ICMP_ECHO_REQUEST = 8
+ICMP_ECHO_REPLY = 0
+
+ICMP_MODE = os.getenv("ICMP_MODE", "auto").strip().lower()  # auto | socket | subprocess
+ICMP_TIMEOUT_SEC = float(os.getenv("ICMP_TIMEOUT_SEC", "1.0"))
+ICMP_RETRIES = int(os.getenv("ICMP_RETRIES", "0"))
+ICMP_FALLBACK_WORKERS = int(os.getenv("ICMP_FALLBACK_WORKERS", "30"))
+
+_PAYLOAD_PAD = b"netmanager-icmp-sweep".ljust(40, b".")
+_RTT_RE = re.compile(r"time[=<]\s*([\d.]+)\s*ms", re.IGNORECASE)
+
+
+def _checksum(data: bytes) -> int:
+    if len(data) % 2:
+        data += b"\x00"
+    total = sum(struct.unpack("!%dH" % (len(data) // 2), data))
+    total = (total >> 16) + (total & 0xFFFF)
+    total += total >> 16
+    return (~total) & 0xFFFF
+
+
+def _echo_request(ident: int, seq: int, payload: bytes) -> bytes:
+    header = struct.pack("!BBHHH", ICMP_ECHO_REQUEST, 0, 0, ident, seq)
+    csum = _checksum(header + payload)
+    return struct.pack("!BBHHH", ICMP_ECHO_REQUEST, 0, csum, ident, seq) + payload
+
+
+def _ping_subprocess(host: str, timeout: float) -> Optional[float]:
+    """Fallback: one ``ping`` process; returns RTT in ms (0.0 if alive but unparsed) or None."""
+    is_windows = platform.system().lower() == "windows"
+    count_flag = "-n" if is_windows else "-c"
+    timeout_flag = "-w" if is_windows else "-W"
+    timeout_val = str(int(timeout * 1000)) if is_windows else str(max(1, int(round(timeout))))
+    cmd = ["ping", count_flag, "1", timeout_flag, timeout_val, str(host)]
+    startupinfo = None
+    if is_windows:
+        startupinfo = subprocess.STARTUPINFO()
+        startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
+    try:
+        ret = subprocess.run(
+            cmd,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            startupinfo=startupinfo,
+            timeout=timeout + 1.0,
+        )
+    except Exception:
+        return None
+    if ret.returncode != 0:
+        return None
+    m = _RTT_RE.search(ret.stdout.decode(errors="ignore"))
+    return float(m.group(1)) if m else 0.0
+
+
+class IcmpSweeper:
+    def __init__(self, mode: str | None = None):
+        self.mode = (mode or ICMP_MODE or "auto").lower()
+        self._lock = threading.Lock()
+        self._socket_kind: Optional[str] = None  # "dgram" | "raw" | "" (unavailable), probed once
+        self._ident = os.getpid() & 0xFFFF
+        self._sweeps = 0
+
+    # ------------------------------------------------------------- sockets
+    def _open_socket(self) -> Tuple[Optional[socket.socket], Optional[str]]:
+        if self.mode == "subprocess":
+            return None, None
+        kinds = [self._socket_kind] if self._socket_kind else ["dgram", "raw"]
+        for kind in kinds:
+            if not kind:
+                break
+            try:
+                sock_type = socket.SOCK_DGRAM if kind == "dgram" else socket.SOCK_RAW
+                sock = socket.socket(socket.AF_INET, sock_type, socket.IPPROTO_ICMP)
+            except (OSError, AttributeError):
+                continue
+            try:
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1 << 20)
+            except OSError:
+                pass
+            sock.setblocking(False)
+            if self._socket_kind is None:
+                logger.info("ICMP sweeper using %s socket", kind)
+            self._socket_kind = kind
+            return sock, kind
+        if self._socket_kind is None:
+            logger.warning("ICMP socket unavailable (no CAP_NET_RAW / ping_group_range); using ping subprocess")
+        self._socket_kind = ""
+        return None, None
+
+    @property
+    def socket_kind(self) -> str:
+        """'dgram', 'raw' or 'subprocess' (after the first sweep)."""
+        return self._socket_kind or "subprocess"
+
+    # --------------------------------------------------------------- sweep
+    def sweep(
+        self,
+        hosts: Iterable[str],
+        timeout: float | None = None,
+        retries: int | None = None,
+    ) -> Dict[str, Optional[float]]:
+        timeout = float(timeout if timeout is not None else ICMP_TIMEOUT_SEC)
+        retries = max(0, int(retries if retries is not None else ICMP_RETRIES))
+        hosts = [str(h).strip() for h in hosts if str(h or "").strip()]
+        results: Dict[str, Optional[float]] = {h: None for h in hosts}
+        if not hosts:
+            return results
+
+        v4: Dict[str, List[str]] = {}
+        other: List[str] = []
+        for h in dict.fromkeys(hosts):
+            addr = self._resolve_v4(h)
+            if addr:
+                v4.setdefault(addr, []).append(h)
+            else:
+                other.append(h)
+
+        sock, kind = self._open_socket() if v4 else (None, None)
+        if sock is None:
+            other.extend(h for names in v4.values() for h in names)
+            v4 = {}
+        else:
+            try:
+                addrs = list(v4.keys())
+                pending = addrs
+                for _ in range(retries + 1):
+                    if not pending:
+                        break
+                    # sequence numbers are 16 bit: sweep in chunks
+                    for i in range(0, len(pending), 0xFFFF):
+                        rtts = self._sweep_socket(sock, kind, pending[i:i + 0xFFFF], timeout)
+                        for addr, rtt in rtts.items():
+                            for h in v4[addr]:
+                                results[h] = rtt
+                    pending = [a for a in pending if results[v4[a][0]] is None]
+            except Exception:
+                # a broken socket sweep must not read as "every device down": re-check
+                # whatever did not answer with the subprocess fallback
+                logger.exception("ICMP socket sweep failed; falling back to ping subprocess")
+                other.extend(h for names in v4.values() for h in names if results[h] is None)
+            finally:
+                sock.close()
+
+        if other:
+            workers = max(1, min(ICMP_FALLBACK_WORKERS, len(other)))
+            with ThreadPoolExecutor(max_workers=workers) as ex:
+                for h, rtt in zip(other, ex.map(lambda host: _ping_subprocess(host, timeout), other)):
+                    results[h] = rtt
+        return results
+
+    def ping(self, host: str, timeout: float | None = None) -> Optional[float]:
+        if not host:
+            return None
+        return self.sweep([host], timeout=timeout).get(str(host).strip())
+
+    @staticmethod
+    def _resolve_v4(host: str) -> Optional[str]:
+        try:
+            ip = ipaddress.ip_address(host)
+            return str(ip) if ip.version == 4 else None
+        except ValueError:
+            pass
+        try:
+            return socket.gethostbyname(host)
+        except OSError:
+            return None
+
+    def _sweep_socket(self, sock: socket.socket, kind: str, addrs: List[str], timeout: float) -> Dict[str, float]:
+        with self._lock:
+            self._sweeps += 1
+            token = struct.pack("!HI", os.getpid() & 0xFFFF, self._sweeps & 0xFFFFFFFF)
+        ident = self._ident
+        seq_to_addr: Dict[int, str] = {}
+        sent_at: Dict[int, float] = {}
+        rtts: Dict[str, float] = {}
+        # selectors (epoll/poll) rather than select.select: workers holding pooled SSH
+        # and SNMP sockets routinely hand out fds >= FD_SETSIZE (1024)
+        sel = selectors.DefaultSelector()
+        sel.register(sock, selectors.EVENT_READ)
+
+        def _drain(wait: float) -> None:
+            if not sel.select(max(0.0, wait)):
+                return
+            while True:
+                try:
+                    data, addr = sock.recvfrom(2048)
+                except (BlockingIOError, InterruptedError):
+                    return
+                except OSError:
+                    return
+                now = time.monotonic()
+                if kind == "raw":
+                    if len(data) < 20:
+                        continue
+                    data = data[(data[0] & 0x0F) * 4:]
+                if len(data) < 8:
+                    continue
+                icmp_type, _, _, r_ident, r_seq = struct.unpack("!BBHHH", data[:8])
+                if icmp_type != ICMP_ECHO_REPLY:
+                    continue
+                # DGRAM sockets: the kernel rewrites the identifier and demuxes replies for us
+                if kind == "raw" and r_ident != ident:
+                    continue
+                if data[8:8 + len(token)] != token:
+                    continue
+                expected = seq_to_addr.get(r_seq)
+                if expected is None or expected != addr[0] or expected in rtts:
+                    continue
+                rtts[expected] = round((now - sent_at[r_seq]) * 1000.0, 3)
+
+        try:
+            for seq, addr in enumerate(addrs, start=1):
+                seq &= 0xFFFF
+                packet = _echo_request(ident, seq, token + _PAYLOAD_PAD)
+                seq_to_addr[seq] = addr
+                while True:
+                    try:
+                        sent_at[seq] = time.monotonic()
+                        sock.sendto(packet, (addr, 0))
+                        break
+                    except (BlockingIOError, InterruptedError):
+                        time.sleep(0.005)
+                    except OSError:
+                        # e.g. ENETUNREACH: counts as no reply
+                        break
+                if seq % 64 == 0:
+                    _drain(0.0)
+
+            deadline = time.monotonic() + timeout
+            while len(rtts) < len(addrs):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                _drain(remaining)
+        finally:
+            sel.close()
+        return rtts
+
+
+icmp_sweeper = IcmpSweeper()
+
+
+def ping_many(hosts: Iterable[str], timeout: float | None = None) -> Dict[str, Optional[float]]:
+    """{host: rtt_ms or None} for all hosts, in one sweep."""
+    return icmp_sweeper.sweep(hosts, timeout=timeout)
+
+
+def ping_rtt(host: str, timeout: float | None = None) -> Optional[float]:
+    return icmp_sweeper.ping(host, timeout=timeout)
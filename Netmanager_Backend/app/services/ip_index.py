@@ -0,0 +1,392 @@
+"""
+Process-wide IP ownership index: which device / interface owns an address or subnet.
+
+Path trace used to scan every addressed ``Interface`` row and parse it with
+``ipaddress`` for each lookup (twice per trace plus once per hop), and the syslog /
+trap receivers only matched the management IP. ``ip_index_store.get(db)`` returns an
+``IpIndex`` holding, per database engine:
+
+- interface subnets (``10.0.0.1/24``) in a ``PrefixTable`` for longest-prefix match,
+  globally and per device
+- interface addresses (with or without mask) and management IPs for exact matches
+
+The index is loaded once and then refreshed per device instead of rebuilt:
+
+- ORM writes in this process that change an interface address / name or a device
+  management IP mark the device dirty on commit (bulk deletes call
+  ``note_device_interfaces_changed``)
+- every ``IP_INDEX_POLL_SEC`` a primary-key range query picks up interface / device
+  rows inserted by other processes (device sync rewrites a device's interfaces, so
+  the new ids name the devices to refresh)
+- dirty devices are reloaded on the next ``get``; a full reload happens after
+  ``IP_INDEX_MAX_AGE_SEC`` (covers in-place edits made elsewhere)
+"""
+from __future__ import annotations
+
+import ipaddress
+import logging
+import os
+import threading
+import time
+import weakref
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from sqlalchemy import event, func, inspect
+from sqlalchemy.orm import Session
+
+from app.models.device import Device, Interface
+from app.services.route_lookup_cache import PrefixTable
+
+logger = logging.getLogger(__name__)
+
+IP_INDEX_ENABLED = os.getenv("IP_INDEX_ENABLED", "true").strip().lower() in ("1", "true", "yes", "on")
+IP_INDEX_MAX_AGE_SEC = float(os.getenv("IP_INDEX_MAX_AGE_SEC", "300"))
+IP_INDEX_POLL_SEC = float(os.getenv("IP_INDEX_POLL_SEC", "5"))
+
+_CHANGES_KEY = "_ip_index_changes"
+
+AddrKey = Tuple[int, int]
+
+
+class IpOwner(NamedTuple):
+    device_id: int
+    interface_id: Optional[int]  # None: management IP
+    interface_name: Optional[str]
+    prefixlen: Optional[int]  # None: address without mask
+
+
+def _order(owner: IpOwner) -> Tuple[int, int]:
+    # 같은 prefix 를 여러 인터페이스가 가지면 먼저 등록된(id 가 작은) 쪽을 사용
+    return owner.interface_id if owner.interface_id is not None else -1, owner.device_id
+
+
+def _addr_key(ip) -> Optional[AddrKey]:
+    try:
+        addr = ip if isinstance(ip, (ipaddress.IPv4Address, ipaddress.IPv6Address)) else ipaddress.ip_address(str(ip).strip())
+    except ValueError:
+        return None
+    return addr.version, int(addr)
+
+
+def _parse_interface_ip(value: str):
+    """(address key, network or None) for "10.0.0.1/24" / "10.0.0.1"; None when unparsable."""
+    raw = str(value or "").strip()
+    if not raw:
+        return None
+    try:
+        if "/" in raw:
+            iface = ipaddress.ip_interface(raw)
+            return (iface.version, int(iface.ip)), iface.network
+        key = _addr_key(raw)
+        return (key, None) if key is not None else None
+    except ValueError:
+        return None
+
+
+def _insert(lst: List[IpOwner], owner: IpOwner) -> None:
+    lst.append(owner)
+    lst.sort(key=_order)
+
+
+class IpIndex:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.loaded_at = 0.0
+        self.checked_at = 0.0
+        self.stale = False
+        self.version = 0
+        # 다른 프로세스가 추가한 행을 찾기 위한 마지막으로 본 PK
+        self.max_interface_id = 0
+        self.max_device_id = 0
+        self._dirty: Set[int] = set()
+        self._subnets: PrefixTable[List[IpOwner]] = PrefixTable()
+        self._device_subnets: Dict[int, PrefixTable[List[IpOwner]]] = {}
+        self._hosts: Dict[AddrKey, List[IpOwner]] = {}  # 마스크 없이 저장된 인터페이스 주소
+        self._addresses: Dict[AddrKey, List[IpOwner]] = {}  # 모든 인터페이스 주소
+        self._mgmt: Dict[AddrKey, List[IpOwner]] = {}
+        # device_id -> 등록한 항목 (장비 단위 교체용)
+        self._by_device: Dict[int, List[Tuple[str, object, IpOwner]]] = {}
+
+    # -- build --------------------------------------------------------------------
+
+    def load(self, interfaces: Iterable[Tuple], devices: Iterable[Tuple]) -> "IpIndex":
+        with self._lock:
+            self._subnets = PrefixTable()
+            self._device_subnets = {}
+            self._hosts = {}
+            self._addresses = {}
+            self._mgmt = {}
+            self._by_device = {}
+            self._fill(interfaces, devices)
+            self._dirty.clear()
+            self.loaded_at = time.monotonic()
+            self.stale = False
+            self.version += 1
+        return self
+
+    def replace_devices(self, device_ids: Iterable[int], interfaces: Iterable[Tuple], devices: Iterable[Tuple]) -> None:
+        """Drop everything the given devices owned and add their current rows."""
+        with self._lock:
+            for device_id in device_ids:
+                self._drop_device(int(device_id))
+            self._fill(interfaces, devices)
+            self.version += 1
+
+    def _fill(self, interfaces: Iterable[Tuple], devices: Iterable[Tuple]) -> None:
+        for intf_id, device_id, name, ip_value in interfaces:
+            if device_id is None:
+                continue
+            parsed = _parse_interface_ip(ip_value)
+            if parsed is None:
+                continue
+            key, net = parsed
+            owner = IpOwner(int(device_id), intf_id, name, net.prefixlen if net is not None else None)
+            entries = self._by_device.setdefault(owner.device_id, [])
+            _insert(self._addresses.setdefault(key, []), owner)
+            entries.append(("addr", key, owner))
+            if net is None:
+                _insert(self._hosts.setdefault(key, []), owner)
+                entries.append(("host", key, owner))
+                continue
+            for table in (self._subnets, self._device_subnets.setdefault(owner.device_id, PrefixTable())):
+                owners = table.get(net)
+                if owners is None:
+                    owners = []
+                    table.add(net, owners)
+                _insert(owners, owner)
+            entries.append(("net", net, owner))
+        for device_id, ip_value in devices:
+            key = _addr_key(ip_value) if ip_value else None
+            if key is None:
+                continue
+            owner = IpOwner(int(device_id), None, "Mgmt", None)
+            _insert(self._mgmt.setdefault(key, []), owner)
+            self._by_device.setdefault(owner.device_id, []).append(("mgmt", key, owner))
+
+    def _drop_device(self, device_id: int) -> None:
+        for kind, key, owner in self._by_device.pop(device_id, []):
+            if kind == "net":
+                owners = self._subnets.get(key)
+                if owners is not None and owner in owners:
+                    owners.remove(owner)
+                    if not owners:
+                        self._subnets.discard(key)
+                continue
+            bucket = {"addr": self._addresses, "host": self._hosts, "mgmt": self._mgmt}[kind]
+            owners = bucket.get(key)
+            if owners is not None and owner in owners:
+                owners.remove(owner)
+                if not owners:
+                    del bucket[key]
+        self._device_subnets.pop(device_id, None)
+
+    def mark_dirty(self, device_ids: Iterable[int]) -> None:
+        with self._lock:
+            self._dirty.update(int(d) for d in device_ids)
+
+    def take_dirty(self) -> Set[int]:
+        with self._lock:
+            dirty, self._dirty = self._dirty, set()
+            return dirty
+
+    def mark_stale(self) -> None:
+        self.stale = True
+
+    # -- lookups -------------------------------------------------------------------
+
+    def lookup(self, ip) -> Optional[IpOwner]:
+        """
+        Interface owning ``ip``: an exact unmasked interface address first, then the
+        longest interface subnet containing it.
+        """
+        try:
+            addr = ipaddress.ip_address(str(ip).strip())
+        except ValueError:
+            return None
+        with self._lock:
+            hosts = self._hosts.get((addr.version, int(addr)))
+            if hosts:
+                return hosts[0]
+            hit = self._subnets.lookup(addr)
+            return hit[1][0] if hit is not None else None
+
+    def best_interface(self, device_id: int, ip) -> Optional[IpOwner]:
+        """Longest-prefix interface subnet on ``device_id`` containing ``ip``."""
+        with self._lock:
+            table = self._device_subnets.get(int(device_id))
+            hit = table.lookup(ip) if table is not None else None
+            return hit[1][0] if hit is not None else None
+
+    def management_owner(self, ip) -> Optional[IpOwner]:
+        key = _addr_key(ip)
+        if key is None:
+            return None
+        with self._lock:
+            owners = self._mgmt.get(key)
+            return owners[0] if owners else None
+
+    def device_for_address(self, ip) -> Optional[int]:
+        """Device that *has* address ``ip`` (management IP first, then any interface address)."""
+        key = _addr_key(ip)
+        if key is None:
+            return None
+        with self._lock:
+            owners = self._mgmt.get(key) or self._addresses.get(key)
+            return owners[0].device_id if owners else None
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "devices": len(self._by_device),
+                "subnets": len(self._subnets),
+                "addresses": len(self._addresses),
+                "management_ips": len(self._mgmt),
+            }
+
+
+def _interface_rows(db: Session, device_ids: Optional[List[int]] = None) -> List[Tuple]:
+    q = db.query(Interface.id, Interface.device_id, Interface.name, Interface.ip_address).filter(Interface.ip_address.isnot(None))
+    if device_ids is not None:
+        q = q.filter(Interface.device_id.in_(device_ids))
+    return q.order_by(Interface.id.asc()).all()
+
+
+def _device_rows(db: Session, device_ids: Optional[List[int]] = None) -> List[Tuple]:
+    q = db.query(Device.id, Device.ip_address).filter(Device.ip_address.isnot(None))
+    if device_ids is not None:
+        q = q.filter(Device.id.in_(device_ids))
+    return q.all()
+
+
+def _ip_fields_changed(obj) -> bool:
+    attrs = ("ip_address", "device_id", "name") if isinstance(obj, Interface) else ("ip_address",)
+    state = inspect(obj)
+    return any(state.attrs[a].history.has_changes() for a in attrs)
+
+
+def _owner_device_id(obj) -> Optional[int]:
+    return obj.device_id if isinstance(obj, Interface) else obj.id
+
+
+def _has_uncommitted_ip_changes(db: Session) -> bool:
+    if db.info.get(_CHANGES_KEY):
+        return True
+    for obj in list(db.new) + list(db.deleted):
+        if isinstance(obj, (Interface, Device)):
+            return True
+    return any(isinstance(o, (Interface, Device)) and _ip_fields_changed(o) for o in db.dirty)
+
+
+def _max_ids(db: Session) -> Tuple[int, int]:
+    return int(db.query(func.max(Interface.id)).scalar() or 0), int(db.query(func.max(Device.id)).scalar() or 0)
+
+
+class IpIndexStore:
+    def __init__(self, max_age: float = IP_INDEX_MAX_AGE_SEC, poll_sec: float = IP_INDEX_POLL_SEC, enabled: bool = IP_INDEX_ENABLED):
+        self.max_age = float(max_age)
+        self.poll_sec = float(poll_sec)
+        self.enabled = bool(enabled)
+        self._lock = threading.Lock()
+        self._indexes: "weakref.WeakKeyDictionary[object, IpIndex]" = weakref.WeakKeyDictionary()
+
+    def get(self, db: Session) -> IpIndex:
+        """
+        Index for ``db``'s database. A session with uncommitted interface / management IP
+        changes gets a private index built from its own view.
+        """
+        if not self.enabled or _has_uncommitted_ip_changes(db):
+            return IpIndex().load(_interface_rows(db), _device_rows(db))
+        bind = db.get_bind()
+        with self._lock:
+            index = self._indexes.get(bind)
+            if index is None:
+                index = IpIndex()
+                self._indexes[bind] = index
+        now = time.monotonic()
+        with index._lock:
+            if not index.loaded_at or index.stale or (self.max_age > 0 and now - index.loaded_at >= self.max_age):
+                max_ids = _max_ids(db)
+                index.load(_interface_rows(db), _device_rows(db))
+                index.max_interface_id, index.max_device_id = max_ids
+                index.checked_at = now
+                return index
+            if self.poll_sec <= 0 or now - index.checked_at >= self.poll_sec:
+                self._poll_new_rows(db, index)
+                index.checked_at = now
+            if index._dirty:
+                ids = sorted(index.take_dirty())
+                index.replace_devices(ids, _interface_rows(db, ids), _device_rows(db, ids))
+        return index
+
+    @staticmethod
+    def _poll_new_rows(db: Session, index: IpIndex) -> None:
+        new_intfs = db.query(Interface.id, Interface.device_id).filter(Interface.id > index.max_interface_id).all()
+        new_devices = db.query(Device.id).filter(Device.id > index.max_device_id).all()
+        if new_intfs:
+            index.max_interface_id = max(int(r[0]) for r in new_intfs)
+            index.mark_dirty(int(r[1]) for r in new_intfs if r[1] is not None)
+        if new_devices:
+            index.max_device_id = max(int(r[0]) for r in new_devices)
+            index.mark_dirty(int(r[0]) for r in new_devices)
+
+    def loaded(self, bind=None) -> List[IpIndex]:
+        with self._lock:
+            if bind is not None:
+                index = self._indexes.get(bind)
+                return [index] if index is not None else []
+            return list(self._indexes.values())
+
+    def mark_dirty(self, device_ids: Iterable[int], bind=None) -> None:
+        ids = [int(d) for d in device_ids]
+        for index in self.loaded(bind):
+            index.mark_dirty(ids)
+
+    def invalidate(self, bind=None) -> None:
+        for index in self.loaded(bind):
+            index.mark_stale()
+
+
+ip_index_store = IpIndexStore()
+
+
+def note_device_interfaces_changed(db: Session, device_id: int) -> None:
+    """For bulk ``Interface`` writes that bypass the ORM flush hooks."""
+    db.info.setdefault(_CHANGES_KEY, set()).add(int(device_id))
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_ip_changes(session: Session, flush_context) -> None:
+    changed = None
+    for obj in list(session.new) + list(session.deleted):
+        if isinstance(obj, (Interface, Device)):
+            if changed is None:
+                changed = session.info.setdefault(_CHANGES_KEY, set())
+            changed.add(_owner_device_id(obj))
+    for obj in session.dirty:
+        if isinstance(obj, (Interface, Device)) and _ip_fields_changed(obj):
+            if changed is None:
+                changed = session.info.setdefault(_CHANGES_KEY, set())
+            changed.add(_owner_device_id(obj))
+            if isinstance(obj, Interface):
+                # 다른 장비로 옮겨진 인터페이스: 이전 장비도 갱신
+                old = inspect(obj).attrs.device_id.history.deleted
+                changed.update(d for d in old or () if d is not None)
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_ip_changes(session: Session) -> None:
+    changed = session.info.pop(_CHANGES_KEY, None)
+    ids = sorted(d for d in (changed or ()) if d is not None)
+    if not ids:
+        return
+    try:
+        ip_index_store.mark_dirty(ids, session.get_bind())
+    except Exception:
+        ip_index_store.mark_dirty(ids)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_ip_changes(session: Session, previous_transaction) -> None:
+    # savepoint rollback 은 그대로 둠: commit 시 장비를 한 번 더 다시 읽을 뿐
+    if not session.in_transaction():
+        session.info.pop(_CHANGES_KEY, None)
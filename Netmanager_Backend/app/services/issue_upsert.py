@@ -0,0 +1,126 @@
+"""
+Batched issue creation for the monitoring save loops.
+
+``IssueUpserter`` loads the active ``(device_id, title)`` pairs of the devices in
+the cycle with one query, deduplicates new issues in memory, inserts them with
+one ``add_all`` at ``flush()``, and only after the caller has committed,
+``publish()`` sends the ``issue_update`` events and critical alert emails.
+Nothing is published or mailed for a cycle whose transaction rolled back.
+
+    issues = IssueUpserter(db, device_ids)
+    issues.add(device.id, "High CPU", "CPU: 91%", "warning", device.name)
+    ...
+    issues.flush()
+    db.commit()
+    issues.publish()
+"""
+from __future__ import annotations
+
+import datetime
+import logging
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.models.device import Issue
+
+logger = logging.getLogger(__name__)
+
+_PRELOAD_CHUNK = 500
+
+
+class IssueUpserter:
+    def __init__(self, db: Session, device_ids: Optional[Iterable[int]] = None, source: str = "monitoring"):
+        self.db = db
+        self.source = source
+        self._known: Set[Tuple[int, str]] = set()
+        self._pending: List[Issue] = []
+        self._names: Dict[int, Optional[str]] = {}
+        # plain dicts: ORM rows expire on commit and would be re-SELECTed one by one in publish()
+        self._flushed: List[dict] = []
+        self._preload(device_ids)
+
+    def _preload(self, device_ids: Optional[Iterable[int]]) -> None:
+        q = self.db.query(Issue.device_id, Issue.title).filter(Issue.status == "active", Issue.device_id != None)
+        if device_ids is None:
+            rows = q.all()
+        else:
+            ids = sorted({int(x) for x in device_ids if x is not None})
+            rows = []
+            for i in range(0, len(ids), _PRELOAD_CHUNK):
+                rows.extend(q.filter(Issue.device_id.in_(ids[i:i + _PRELOAD_CHUNK])).all())
+        self._known = {(int(device_id), str(title)) for device_id, title in rows}
+
+    def add(self, device_id: int, title: str, desc: str, severity: str, device_name: str = None) -> bool:
+        """Queue an issue unless an active one with the same (device, title) exists. True if queued."""
+        key = (int(device_id), str(title))
+        if key in self._known:
+            return False
+        self._known.add(key)
+        self._pending.append(
+            Issue(
+                device_id=int(device_id),
+                title=str(title),
+                description=desc,
+                severity=severity,
+                status="active",
+            )
+        )
+        self._names[int(device_id)] = device_name
+        return True
+
+    def flush(self) -> int:
+        """Insert queued issues into the session (one batch). The caller commits."""
+        if not self._pending:
+            return 0
+        self.db.add_all(self._pending)
+        self._flushed.extend(
+            {
+                "device_id": int(i.device_id),
+                "title": str(i.title),
+                "severity": str(i.severity),
+                "description": str(i.description),
+            }
+            for i in self._pending
+        )
+        count = len(self._pending)
+        self._pending = []
+        return count
+
+    def discard(self) -> None:
+        """Forget queued/flushed issues after a rollback so nothing is published."""
+        self._pending = []
+        self._flushed = []
+
+    def publish(self) -> None:
+        """After commit: issue_update events, then critical alert emails."""
+        created, self._flushed = self._flushed, []
+        if not created:
+            return
+        now = datetime.datetime.now().isoformat()
+        try:
+            from app.services.realtime_event_bus import realtime_event_bus
+
+            for issue in created:
+                realtime_event_bus.publish(
+                    "issue_update",
+                    dict(issue, status="active", ts=now, source=self.source),
+                )
+        except Exception:
+            pass
+
+        for issue in created:
+            if issue["severity"] != "critical":
+                continue
+            device_label = self._names.get(issue["device_id"]) or f"Device ID {issue['device_id']}"
+            try:
+                from app.services.email_service import EmailService
+
+                EmailService.send_email(
+                    self.db,
+                    to_email=None,  # None이면 기본 관리자 이메일 사용
+                    subject=f"[CRITICAL] {issue['title']} - {device_label}",
+                    content=f"장비: {device_label}\n이슈: {issue['title']}\n상세: {issue['description']}\n\n즉시 확인이 필요합니다.",
+                )
+            except Exception:
+                logger.exception("Alert email failed", extra={"device_id": issue["device_id"], "device_name": device_label})
@@ -0,0 +1,376 @@
+"""
+Daily range partitioning for the high-volume time-series tables on PostgreSQL.
+
+``system_metrics``, ``interface_metrics`` and ``event_logs`` are converted once,
+by the opt-in maintenance command ``python -m app.scripts.partition_metric_tables``
+(never at startup), into tables ``PARTITION BY RANGE (timestamp)``:
+
+- rows without a timestamp are moved to ``<table>_null_ts``;
+- a ``CHECK`` on the timestamp range is added ``NOT VALID`` and validated
+  without blocking writes, so the swap below needs no table scan;
+- the existing table is renamed to ``<table>_legacy`` and attached as the
+  partition ``FROM (MINVALUE) TO (<bound>)``, so no rows are copied; foreign
+  keys and indexes are recreated on the new parent;
+- one partition per UTC day ``<table>_pYYYYMMDD`` is created ahead of time
+  (``ensure_partitions``, also run daily by the maintenance task);
+- ``<table>_default`` catches rows outside every range (clock skew).
+
+Retention then detaches and drops whole partitions whose upper bound is at or
+before the cutoff instead of running a large ``DELETE``.
+
+``storage_mode`` tells the retention task which path applies:
+``partitioned`` | ``timescale`` (hypertable, TimescaleDB policies) | ``delete``
+(SQLite and plain tables).
+
+Both a ``Connection`` and a ``Session`` can be passed as ``conn``.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import re
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+PARTITIONED_TABLES = ("system_metrics", "interface_metrics", "event_logs")
+DAYS_AHEAD = int(os.getenv("METRIC_PARTITION_DAYS_AHEAD", "7"))
+
+# 부모 테이블에 다시 만들 인덱스 (모델 정의와 동일한 이름)
+_INDEXES: Dict[str, List[Tuple[str, str]]] = {
+    "system_metrics": [
+        ("ix_system_metrics_device_ts", "device_id, timestamp"),
+        ("ix_system_metrics_device_id", "device_id"),
+        ("ix_system_metrics_timestamp", "timestamp"),
+    ],
+    "interface_metrics": [
+        ("ix_interface_metrics_device_ts", "device_id, timestamp"),
+        ("ix_interface_metrics_device_if_ts", "device_id, interface_name, timestamp"),
+        ("ix_interface_metrics_device_id", "device_id"),
+        ("ix_interface_metrics_interface_name", "interface_name"),
+        ("ix_interface_metrics_timestamp", "timestamp"),
+    ],
+    "event_logs": [
+        ("ix_event_logs_device_ts", "device_id, timestamp"),
+        ("ix_event_logs_device_id", "device_id"),
+        ("ix_event_logs_timestamp", "timestamp"),
+    ],
+}
+
+_TO_BOUND = re.compile(r"TO \('([^']+)'\)")
+_FROM_BOUND = re.compile(r"FROM \('([^']+)'\)")
+
+
+def partition_name(table: str, day: date) -> str:
+    return f"{table}_p{day:%Y%m%d}"
+
+
+def _bound_day(pattern, bound_expr: str) -> Optional[date]:
+    m = pattern.search(bound_expr or "")
+    if not m:
+        return None
+    # pg_get_expr 는 세션 TimeZone 으로 출력하므로 UTC 로 되돌림
+    try:
+        value = datetime.fromisoformat(m.group(1))
+    except ValueError:
+        return None
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc)
+    return value.date()
+
+
+def bound_upper_day(bound_expr: str) -> Optional[date]:
+    """Upper bound day of a ``pg_get_expr(relpartbound)`` string; None for DEFAULT/MAXVALUE."""
+    return _bound_day(_TO_BOUND, bound_expr)
+
+
+def bound_lower_day(bound_expr: str) -> Optional[date]:
+    """Lower bound day of a ``pg_get_expr(relpartbound)`` string; None for DEFAULT/MINVALUE."""
+    return _bound_day(_FROM_BOUND, bound_expr)
+
+
+def covered_days(bounds: List[Tuple[str, str]]) -> List[Tuple[date, date]]:
+    """[lower, upper) day ranges already taken by range partitions; MINVALUE (legacy) starts at ``date.min``."""
+    out = []
+    for _, expr in bounds:
+        upper = bound_upper_day(expr)
+        if upper is None:
+            continue
+        out.append((bound_lower_day(expr) or date.min, upper))
+    return out
+
+
+def partitions_to_drop(bounds: List[Tuple[str, str]], cutoff: datetime) -> List[str]:
+    """Partitions (name, bound expr) that only hold rows older than ``cutoff``."""
+    cutoff_day = cutoff.astimezone(timezone.utc).date()
+    out = []
+    for name, expr in bounds:
+        upper = bound_upper_day(expr)
+        if upper is not None and upper <= cutoff_day:
+            out.append(name)
+    return out
+
+
+def _dialect(conn) -> str:
+    bind = conn.get_bind() if hasattr(conn, "get_bind") else conn
+    return bind.dialect.name
+
+
+def _scalar(conn, sql: str, params: Optional[dict] = None):
+    return conn.execute(text(sql), params or {}).scalar()
+
+
+def is_partitioned(conn, table: str) -> bool:
+    return bool(
+        _scalar(
+            conn,
+            "SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid "
+            "WHERE c.relname = :table AND pg_table_is_visible(c.oid)",
+            {"table": table},
+        )
+    )
+
+
+def timescale_installed(conn) -> bool:
+    return bool(_scalar(conn, "SELECT 1 FROM pg_extension WHERE extname = 'timescaledb'"))
+
+
+def _is_hypertable(conn, table: str) -> bool:
+    if not timescale_installed(conn):
+        return False
+    return bool(
+        _scalar(
+            conn,
+            "SELECT 1 FROM timescaledb_information.hypertables WHERE hypertable_name = :table",
+            {"table": table},
+        )
+    )
+
+
+def storage_mode(conn, table: str) -> str:
+    if _dialect(conn) != "postgresql":
+        return "delete"
+    if is_partitioned(conn, table):
+        return "partitioned"
+    if _is_hypertable(conn, table):
+        return "timescale"
+    return "delete"
+
+
+def list_partitions(conn, table: str) -> List[Tuple[str, str]]:
+    rows = conn.execute(
+        text(
+            "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid) "
+            "FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "JOIN pg_class p ON p.oid = i.inhparent "
+            "WHERE p.relname = :table ORDER BY c.relname"
+        ),
+        {"table": table},
+    ).all()
+    return [(r[0], r[1] or "") for r in rows]
+
+
+def _day_literal(day: date) -> str:
+    return f"{day:%Y-%m-%d} 00:00:00+00"
+
+
+def ensure_partitions(conn, table: str, start: Optional[date] = None, days_ahead: int = DAYS_AHEAD) -> int:
+    """
+    Create the missing daily partitions from ``start`` (default today, UTC) through
+    today + ``days_ahead``. The horizon is fixed, so repeated calls are no-ops.
+    """
+    today = datetime.now(timezone.utc).date()
+    start = start or today
+    end = today + timedelta(days=int(days_ahead))
+    partitions = list_partitions(conn, table)
+    existing = {name for name, _ in partitions}
+    # legacy 파티션 등 이미 덮인 날짜는 건너뜀
+    covered = covered_days(partitions)
+    created = 0
+    day = start
+    while day <= end:
+        name = partition_name(table, day)
+        if name in existing or any(lo <= day < hi for lo, hi in covered):
+            day += timedelta(days=1)
+            continue
+        try:
+            with conn.begin_nested():
+                conn.execute(
+                    text(
+                        f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {table} "
+                        f"FOR VALUES FROM ('{_day_literal(day)}') TO ('{_day_literal(day + timedelta(days=1))}')"
+                    )
+                )
+            created += 1
+        except Exception:
+            # 범위가 legacy/default 파티션과 겹치면(행이 이미 들어가 있으면) 건너뜀
+            logger.warning("Could not create partition", extra={"table": table, "partition": name})
+        day += timedelta(days=1)
+    if f"{table}_default" not in existing:
+        conn.execute(text(f"CREATE TABLE IF NOT EXISTS {table}_default PARTITION OF {table} DEFAULT"))
+    return created
+
+
+def drop_partitions_before(conn, table: str, cutoff: datetime) -> List[str]:
+    """Detach and drop every partition whose range ends at or before ``cutoff``'s day."""
+    dropped = []
+    for name in partitions_to_drop(list_partitions(conn, table), cutoff):
+        conn.execute(text(f"ALTER TABLE {table} DETACH PARTITION {name}"))
+        if name == f"{table}_legacy":
+            # legacy 테이블이 id 시퀀스를 소유하고 있으면 함께 삭제되지 않도록 (변환 시 옮겼지만 방어적으로)
+            seq = _scalar(conn, "SELECT pg_get_serial_sequence(:t, 'id')", {"t": name})
+            if seq:
+                conn.execute(text(f"ALTER SEQUENCE {seq} OWNED BY {table}.id"))
+        conn.execute(text(f"DROP TABLE IF EXISTS {name}"))
+        dropped.append(name)
+    return dropped
+
+
+def _check_name(table: str) -> str:
+    return f"{table[:40]}_partition_bound_chk"
+
+
+def _legacy_upper(days: int = 2) -> date:
+    # 준비 단계와 전환 사이에 날짜가 바뀌어도 새 행이 CHECK 에 걸리지 않도록 여유를 둠
+    return datetime.now(timezone.utc).date() + timedelta(days=int(days))
+
+
+def quarantine_null_timestamps(conn, table: str) -> int:
+    """
+    Move rows without a ``timestamp`` (they fit no range partition) into
+    ``<table>_null_ts`` and return how many were moved. Nothing is dropped.
+    """
+    quarantine = f"{table}_null_ts"
+    count = int(_scalar(conn, f"SELECT count(*) FROM {table} WHERE timestamp IS NULL") or 0)
+    if not count:
+        return 0
+    conn.execute(text(f"CREATE TABLE IF NOT EXISTS {quarantine} (LIKE {table})"))
+    conn.execute(
+        text(
+            f"WITH moved AS (DELETE FROM {table} WHERE timestamp IS NULL RETURNING *) "
+            f"INSERT INTO {quarantine} SELECT * FROM moved"
+        )
+    )
+    logger.warning(
+        "Moved rows without timestamp to quarantine table",
+        extra={"table": table, "quarantine": quarantine, "rows": count},
+    )
+    return count
+
+
+def add_partition_bound_check(conn, table: str, upper: Optional[date] = None) -> date:
+    """
+    ``CHECK (timestamp IS NOT NULL AND timestamp < upper) NOT VALID``: only a brief
+    lock, and new rows are checked from here on. Replaces a leftover check from an
+    interrupted run. Run ``validate_partition_bound_check`` in a later transaction.
+    """
+    upper = upper or _legacy_upper()
+    conn.execute(text(f"ALTER TABLE {table} DROP CONSTRAINT IF EXISTS {_check_name(table)}"))
+    conn.execute(
+        text(
+            f"ALTER TABLE {table} ADD CONSTRAINT {_check_name(table)} "
+            f"CHECK (timestamp IS NOT NULL AND timestamp < '{_day_literal(upper)}') NOT VALID"
+        )
+    )
+    return upper
+
+
+def validate_partition_bound_check(conn, table: str) -> None:
+    """Full scan under SHARE UPDATE EXCLUSIVE: reads and writes keep running."""
+    conn.execute(text(f"ALTER TABLE {table} VALIDATE CONSTRAINT {_check_name(table)}"))
+
+
+_CHECK_UPPER = re.compile(r"<\s*'([^']+)'")
+
+
+def validated_check_upper(conn, table: str) -> Optional[date]:
+    """Upper bound of the table's validated partition-bound CHECK, None if there is none."""
+    row = conn.execute(
+        text(
+            "SELECT convalidated, pg_get_constraintdef(oid) FROM pg_constraint "
+            "WHERE conname = :name AND conrelid = to_regclass(:t)"
+        ),
+        {"name": _check_name(table), "t": table},
+    ).first()
+    if not row or not row[0]:
+        return None
+    return _bound_day(_CHECK_UPPER, row[1])
+
+
+def convert_to_partitioned(conn, table: str) -> bool:
+    """
+    Swap a plain table for a daily-partitioned parent with the old table attached as
+    ``<table>_legacy``. Returns True when converted; skipped for hypertables and
+    tables that are already partitioned.
+
+    Expects ``quarantine_null_timestamps``, ``add_partition_bound_check`` and
+    ``validate_partition_bound_check`` to have run, each in its own transaction
+    (see ``app.scripts.partition_metric_tables``); the legacy range ends at the
+    CHECK's bound. The validated CHECK lets ``SET NOT NULL`` and ``ATTACH
+    PARTITION`` skip their table scans, so the swap only holds ACCESS EXCLUSIVE
+    briefly. Without it those steps run here, inside the swap transaction.
+    """
+    if _dialect(conn) != "postgresql":
+        return False
+    if is_partitioned(conn, table) or _is_hypertable(conn, table):
+        return False
+    if not _scalar(conn, "SELECT to_regclass(:t) IS NOT NULL", {"t": table}):
+        return False
+
+    upper = validated_check_upper(conn, table)
+    if upper is None:
+        logger.warning("No validated bound CHECK; scanning inside the swap transaction", extra={"table": table})
+        quarantine_null_timestamps(conn, table)
+        upper = add_partition_bound_check(conn, table)
+        validate_partition_bound_check(conn, table)
+
+    legacy = f"{table}_legacy"
+    seq = _scalar(conn, "SELECT pg_get_serial_sequence(:t, 'id')", {"t": table})
+    indexes = conn.execute(
+        text("SELECT indexname, indexdef FROM pg_indexes WHERE tablename = :t AND indexname <> :pk"),
+        {"t": table, "pk": f"{table}_pkey"},
+    ).all()
+    foreign_keys = conn.execute(
+        text(
+            "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+            "WHERE conrelid = to_regclass(:t) AND contype = 'f'"
+        ),
+        {"t": table},
+    ).all()
+
+    conn.execute(text(f"ALTER TABLE {table} RENAME TO {legacy}"))
+    conn.execute(text(f"ALTER TABLE {legacy} RENAME CONSTRAINT {table}_pkey TO {legacy}_pkey"))
+    for name, _ in indexes:
+        conn.execute(text(f"ALTER INDEX {name} RENAME TO {name[:55]}_legacy"))
+    # the validated CHECK proves it: no scan
+    conn.execute(text(f"ALTER TABLE {legacy} ALTER COLUMN timestamp SET NOT NULL"))
+
+    conn.execute(text(f"CREATE TABLE {table} (LIKE {legacy} INCLUDING DEFAULTS) PARTITION BY RANGE (timestamp)"))
+    conn.execute(text(f"ALTER TABLE {table} ADD CONSTRAINT {table}_pkey PRIMARY KEY (id, timestamp)"))
+    if seq:
+        conn.execute(text(f"ALTER SEQUENCE {seq} OWNED BY {table}.id"))
+    # LIKE 는 FK 를 복사하지 않음: 부모에 다시 걸면 legacy 의 같은 FK 가 그대로 재사용됨
+    for name, definition in foreign_keys:
+        conn.execute(text(f"ALTER TABLE {table} ADD CONSTRAINT {name} {definition}"))
+    for name, definition in indexes:
+        try:
+            with conn.begin_nested():
+                # indexdef still names the original table, which is now the parent
+                conn.execute(text(definition))
+        except Exception:
+            # e.g. a UNIQUE index without the partition key cannot exist on the parent
+            logger.warning("Could not recreate index on partitioned table", extra={"table": table, "index": name})
+    for name, cols in _INDEXES.get(table, []):
+        conn.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({cols})"))
+
+    # matching indexes on legacy are attached, not rebuilt; the CHECK skips the range scan
+    conn.execute(
+        text(f"ALTER TABLE {table} ATTACH PARTITION {legacy} FOR VALUES FROM (MINVALUE) TO ('{_day_literal(upper)}')")
+    )
+    conn.execute(text(f"ALTER TABLE {legacy} DROP CONSTRAINT IF EXISTS {_check_name(table)}"))
+    ensure_partitions(conn, table, start=upper)
+    logger.info("Converted table to daily partitions", extra={"table": table})
+    return True
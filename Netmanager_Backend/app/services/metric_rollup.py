@@ -0,0 +1,356 @@
+"""
+Time-series rollup tiers (1m / 5m / 1h) for SystemMetric and InterfaceMetric.
+
+Each tier bucket keeps min/avg/max/p95 of the raw samples, so long-range charts
+read a few hundred pre-aggregated rows instead of every raw sample.
+
+Two backends:
+- ``timescale``: the continuous aggregates created by ``run_migrations``
+  (``system_metrics_1m`` ...) are read directly. They carry min/avg/max;
+  ``p95`` is not available there (ordered-set aggregates are not allowed in
+  continuous aggregates) and is returned as ``None``.
+- ``table``: everywhere else (plain PostgreSQL, SQLite) ``run_rollups`` fills
+  ``system_metric_rollups`` / ``interface_metric_rollups`` incrementally. A
+  per-(source, tier) watermark marks the end of the last finished bucket; every
+  run aggregates the raw rows between the watermark and the bucket holding the
+  newest raw sample, at most ``_MAX_SPAN_SEC`` per tier per run. The watermark
+  never passes ``now - METRIC_ROLLUP_GRACE_SEC``: ``timestamp`` is the inserting
+  transaction's start time, so a slow poll transaction can commit rows dated
+  before samples that are already visible. The grouping
+  runs in the database (``percentile_disc`` for p95 on PostgreSQL, a window
+  function elsewhere); only one row per bucket comes back to Python.
+
+Readers call ``pick_tier(range)`` and then ``system_series`` / ``fleet_series``
+/ ``interface_series``; an empty result means "use the raw table".
+"""
+from __future__ import annotations
+
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+from sqlalchemy import Integer, cast, func, insert, literal_column, select, text
+from sqlalchemy.orm import Session
+
+from app.models.device import (
+    InterfaceMetric,
+    InterfaceMetricRollup,
+    MetricRollupWatermark,
+    SystemMetric,
+    SystemMetricRollup,
+)
+
+TIERS = {"1m": 60, "5m": 300, "1h": 3600}
+# 한 번의 실행에서 처리할 최대 구간 (백필 시 쿼리/트랜잭션 크기 상한)
+_MAX_SPAN_SEC = {"1m": 6 * 3600, "5m": 6 * 3600, "1h": 24 * 3600}
+_INSERT_CHUNK = 500
+_BACKEND_TTL_SEC = 300.0
+# 가장 긴 폴링 트랜잭션보다 길게: 그보다 늦게 커밋되는 행은 이미 닫힌 버킷에 들어갈 수 있음
+ROLLUP_GRACE_SEC = int(os.getenv("METRIC_ROLLUP_GRACE_SEC", "300"))
+
+# range 별 tier 선택 기준 (해당 range 이하이면 그 tier)
+_TIER_BY_RANGE = (
+    (2 * 3600, "raw"),
+    (12 * 3600, "1m"),
+    (3 * 24 * 3600, "5m"),
+)
+
+_SOURCES = {
+    "system_metrics": {
+        "raw": SystemMetric,
+        "rollup": SystemMetricRollup,
+        "view": "system_metrics",
+        "keys": ("device_id",),
+        # rollup prefix -> (raw column, stats)
+        "values": {
+            "cpu_usage": ("cpu_usage", ("min", "avg", "max", "p95")),
+            "memory_usage": ("memory_usage", ("min", "avg", "max", "p95")),
+            "traffic_in": ("traffic_in", ("min", "avg", "max", "p95")),
+            "traffic_out": ("traffic_out", ("min", "avg", "max", "p95")),
+            "rtt_ms": ("rtt_ms", ("min", "avg", "max", "p95")),
+        },
+        "probe_column": "cpu_usage_max",
+    },
+    "interface_metrics": {
+        "raw": InterfaceMetric,
+        "rollup": InterfaceMetricRollup,
+        "view": "interface_metrics",
+        "keys": ("device_id", "interface_name"),
+        "values": {
+            "in_bps": ("traffic_in_bps", ("min", "avg", "max", "p95")),
+            "out_bps": ("traffic_out_bps", ("min", "avg", "max", "p95")),
+            "in_err": ("in_errors_per_sec", ("avg", "max")),
+            "out_err": ("out_errors_per_sec", ("avg", "max")),
+            "in_discards": ("in_discards_per_sec", ("avg", "max")),
+            "out_discards": ("out_discards_per_sec", ("avg", "max")),
+        },
+        "probe_column": "in_bps_max",
+    },
+}
+
+_backend_cache: Dict[str, object] = {"value": None, "at": 0.0}
+
+
+def pick_tier(range_seconds: float) -> str:
+    """Coarsest tier still giving a useful resolution for the range ("raw" for short ranges)."""
+    for limit, tier in _TIER_BY_RANGE:
+        if range_seconds <= limit:
+            return tier
+    return "1h"
+
+
+def floor_bucket(ts: datetime, tier_sec: int) -> datetime:
+    # aware values are aligned on the UTC epoch, like the SQL bucket index
+    epoch = datetime(1970, 1, 1, tzinfo=timezone.utc if ts.tzinfo else None)
+    offset = int((ts - epoch).total_seconds() // tier_sec) * tier_sec
+    bucket = epoch + timedelta(seconds=offset)
+    return bucket.astimezone(ts.tzinfo) if ts.tzinfo else bucket
+
+
+def rollup_backend(db: Session) -> str:
+    """"timescale" when the continuous aggregates with min/max columns exist, else "table"."""
+    now = time.monotonic()
+    cached = _backend_cache.get("value")
+    if cached and now - float(_backend_cache.get("at") or 0.0) < _BACKEND_TTL_SEC:
+        return str(cached)
+    backend = "table"
+    bind = db.get_bind()
+    if bind is not None and bind.dialect.name == "postgresql" and os.getenv("METRIC_ROLLUP_BACKEND", "").strip().lower() != "table":
+        try:
+            row = db.execute(
+                text(
+                    "SELECT 1 FROM information_schema.columns "
+                    "WHERE table_name = 'system_metrics_1m' AND column_name = :column"
+                ),
+                {"column": _SOURCES["system_metrics"]["probe_column"]},
+            ).first()
+            if row is not None:
+                backend = "timescale"
+        except Exception:
+            db.rollback()
+    _backend_cache["value"] = backend
+    _backend_cache["at"] = now
+    return backend
+
+
+def _get_watermark(db: Session, name: str) -> Optional[datetime]:
+    row = db.query(MetricRollupWatermark).filter(MetricRollupWatermark.name == name).first()
+    return row.watermark if row else None
+
+
+def _set_watermark(db: Session, name: str, value: datetime) -> None:
+    row = db.query(MetricRollupWatermark).filter(MetricRollupWatermark.name == name).first()
+    if row is None:
+        row = MetricRollupWatermark(name=name)
+        db.add(row)
+    row.watermark = value
+    row.updated_at = datetime.now(timezone.utc)
+
+
+def _bucket_index(db: Session, ts_col, tier_sec: int):
+    """SQL expression: bucket number (UTC epoch seconds // tier_sec) of ``ts_col``."""
+    # inlined, not bound: the same expression appears in SELECT and GROUP BY
+    size = literal_column(str(int(tier_sec)), Integer)
+    if db.get_bind().dialect.name == "postgresql":
+        return func.floor(func.extract("epoch", ts_col) / size)
+    return cast(func.strftime("%s", ts_col), Integer) // size
+
+
+def _bucket_start(index, tier_sec: int, tzinfo) -> datetime:
+    if tzinfo is None:
+        return datetime(1970, 1, 1) + timedelta(seconds=int(index) * tier_sec)
+    return datetime.fromtimestamp(int(index) * tier_sec, timezone.utc).astimezone(tzinfo)
+
+
+def _p95_by_group(db: Session, raw, key_cols, bucket, col, window) -> Dict[tuple, float]:
+    """Nearest-rank p95 per (keys, bucket) for databases without ordered-set aggregates (window functions)."""
+    parts = key_cols + [bucket]
+    ranked = (
+        select(
+            *[c.label(f"k{i}") for i, c in enumerate(parts)],
+            col.label("v"),
+            func.row_number().over(partition_by=parts, order_by=col).label("rn"),
+            func.count(col).over(partition_by=parts).label("n"),
+        )
+        .where(*window, col != None)
+        .subquery()
+    )
+    rank = ranked.c.n * 0.95
+    rows = db.execute(
+        select(*[ranked.c[f"k{i}"] for i in range(len(parts))], ranked.c.v).where(
+            ranked.c.rn >= rank, ranked.c.rn - 1 < rank
+        )
+    ).all()
+    return {tuple(r[:-1]): r[-1] for r in rows}
+
+
+def _roll_tier(db: Session, source: str, tier: str) -> int:
+    spec = _SOURCES[source]
+    raw = spec["raw"]
+    rollup = spec["rollup"]
+    tier_sec = TIERS[tier]
+    name = f"{source}:{tier}"
+
+    latest = db.query(func.max(raw.timestamp)).scalar()
+    if latest is None:
+        return 0
+    # 가장 최근 샘플이 속한 버킷은 아직 진행 중이고, grace 이내의 버킷은 늦게 커밋되는 행이 더 올 수 있음
+    settled = datetime.now(timezone.utc) - timedelta(seconds=ROLLUP_GRACE_SEC)
+    if latest.tzinfo is None:
+        settled = settled.replace(tzinfo=None)
+    end = floor_bucket(min(latest, settled), tier_sec)
+    start = _get_watermark(db, name)
+    if start is None:
+        first = db.query(func.min(raw.timestamp)).scalar()
+        if first is None:
+            return 0
+        start = floor_bucket(first, tier_sec)
+    elif (start.tzinfo is None) != (end.tzinfo is None):
+        start = start.replace(tzinfo=end.tzinfo) if end.tzinfo else start.astimezone(timezone.utc).replace(tzinfo=None)
+    if start >= end:
+        return 0
+    end = min(end, start + timedelta(seconds=_MAX_SPAN_SEC[tier]))
+
+    # 집계는 DB 에서 수행 (raw 행을 메모리로 올리지 않음); 결과는 (키, 버킷) 당 1행
+    postgres = db.get_bind().dialect.name == "postgresql"
+    key_cols = [getattr(raw, k) for k in spec["keys"]]
+    bucket = _bucket_index(db, raw.timestamp, tier_sec)
+    window = [raw.timestamp >= start, raw.timestamp < end] + [c != None for c in key_cols]
+    aggs = []
+    p95_cols = []
+    for prefix, (col_name, stats) in spec["values"].items():
+        col = getattr(raw, col_name)
+        for stat in stats:
+            label = f"{prefix}_{stat}"
+            if stat == "p95":
+                if postgres:
+                    aggs.append(func.percentile_disc(0.95).within_group(col.asc()).label(label))
+                else:
+                    p95_cols.append((label, col))
+            else:
+                aggs.append(getattr(func, stat)(col).label(label))
+    stmt = (
+        select(*key_cols, bucket.label("bucket_index"), func.count().label("samples"), *aggs)
+        .where(*window)
+        .group_by(*key_cols, bucket)
+    )
+    p95 = {label: _p95_by_group(db, raw, key_cols, bucket, col, window) for label, col in p95_cols}
+
+    out_rows = []
+    for row in db.execute(stmt).mappings().all():
+        rec = {k: row[k] for k in spec["keys"]}
+        gkey = tuple(rec[k] for k in spec["keys"]) + (row["bucket_index"],)
+        rec["tier"] = tier
+        rec["bucket"] = _bucket_start(row["bucket_index"], tier_sec, end.tzinfo)
+        rec["samples"] = int(row["samples"] or 0)
+        for prefix, (_, stats) in spec["values"].items():
+            for stat in stats:
+                label = f"{prefix}_{stat}"
+                value = p95[label].get(gkey) if label in p95 else row[label]
+                rec[label] = float(value) if value is not None else None
+        out_rows.append(rec)
+
+    # 같은 구간을 다시 돌려도 결과가 같도록 (재시도/워터마크 롤백 대비)
+    db.query(rollup).filter(rollup.tier == tier, rollup.bucket >= start, rollup.bucket < end).delete(
+        synchronize_session=False
+    )
+    for i in range(0, len(out_rows), _INSERT_CHUNK):
+        db.execute(insert(rollup), out_rows[i:i + _INSERT_CHUNK])
+    _set_watermark(db, name, end)
+    db.commit()
+    return len(out_rows)
+
+
+def run_rollups(db: Session) -> Dict[str, int]:
+    """Advance every (source, tier) watermark once. No-op on the timescale backend."""
+    if rollup_backend(db) == "timescale":
+        return {}
+    written: Dict[str, int] = {}
+    for source in _SOURCES:
+        for tier in TIERS:
+            written[f"{source}:{tier}"] = _roll_tier(db, source, tier)
+    return written
+
+
+# ---------------------------------------------------------------------- readers
+def _read(db: Session, source: str, tier: str, since: datetime, filters: Dict[str, object]) -> List[dict]:
+    spec = _SOURCES[source]
+    prefixes = spec["values"]
+    if rollup_backend(db) == "timescale":
+        cols = ["bucket"] + list(spec["keys"])
+        for prefix, (_, stats) in prefixes.items():
+            cols += [f"{prefix}_{s}" for s in stats if s != "p95"]
+        where = ["bucket >= :since"] + [f"{k} = :{k}" for k in filters]
+        sql = f"SELECT {', '.join(cols)} FROM {spec['view']}_{tier} WHERE {' AND '.join(where)} ORDER BY bucket ASC"
+        params = dict(filters)
+        params["since"] = since
+        out = []
+        for row in db.execute(text(sql), params).mappings().all():
+            rec = dict(row)
+            rec["samples"] = None
+            for prefix, (_, stats) in prefixes.items():
+                if "p95" in stats:
+                    rec[f"{prefix}_p95"] = None
+            out.append(rec)
+        return out
+
+    rollup = spec["rollup"]
+    q = db.query(rollup).filter(rollup.tier == tier, rollup.bucket >= since)
+    for k, v in filters.items():
+        q = q.filter(getattr(rollup, k) == v)
+    out = []
+    for r in q.order_by(rollup.bucket.asc()).all():
+        rec = {"bucket": r.bucket, "samples": r.samples}
+        for k in spec["keys"]:
+            rec[k] = getattr(r, k)
+        for prefix, (_, stats) in prefixes.items():
+            for s in stats:
+                rec[f"{prefix}_{s}"] = getattr(r, f"{prefix}_{s}")
+        out.append(rec)
+    return out
+
+
+def system_series(db: Session, device_id: int, since: datetime, tier: str) -> List[dict]:
+    return _read(db, "system_metrics", tier, since, {"device_id": int(device_id)})
+
+
+def interface_series(db: Session, device_id: int, interface_name: str, since: datetime, tier: str) -> List[dict]:
+    return _read(db, "interface_metrics", tier, since, {"device_id": int(device_id), "interface_name": str(interface_name)})
+
+
+def fleet_series(db: Session, since: datetime, tier: str) -> List[dict]:
+    """All devices combined per bucket: mean of the device averages, max of the maxima (grouped in SQL)."""
+    cols = ("cpu_usage_avg", "cpu_usage_max", "memory_usage_avg", "memory_usage_max")
+    if rollup_backend(db) == "timescale":
+        sql = (
+            "SELECT bucket, avg(cpu_usage_avg) AS cpu_usage_avg, max(cpu_usage_max) AS cpu_usage_max, "
+            "avg(memory_usage_avg) AS memory_usage_avg, max(memory_usage_max) AS memory_usage_max "
+            f"FROM {_SOURCES['system_metrics']['view']}_{tier} WHERE bucket >= :since GROUP BY bucket ORDER BY bucket ASC"
+        )
+        rows = db.execute(text(sql), {"since": since}).mappings().all()
+    else:
+        r = SystemMetricRollup
+        rows = (
+            db.execute(
+                select(
+                    r.bucket.label("bucket"),
+                    func.avg(r.cpu_usage_avg).label("cpu_usage_avg"),
+                    func.max(r.cpu_usage_max).label("cpu_usage_max"),
+                    func.avg(r.memory_usage_avg).label("memory_usage_avg"),
+                    func.max(r.memory_usage_max).label("memory_usage_max"),
+                )
+                .where(r.tier == tier, r.bucket >= since)
+                .group_by(r.bucket)
+                .order_by(r.bucket.asc())
+            )
+            .mappings()
+            .all()
+        )
+    out = []
+    for row in rows:
+        point = {"bucket": row["bucket"]}
+        for c in cols:
+            point[c] = float(row[c]) if row[c] is not None else 0.0
+        out.append(point)
+    return out
@@ -0,0 +1,183 @@
+"""
+Monitoring shards.
+
+The fleet is split into ``MONITOR_SHARD_COUNT`` shards with a jump consistent
+hash of the device id (or of the site id with ``MONITOR_SHARD_KEY=site``, so a
+site's devices are polled together). Each shard has one lease row
+(``MonitorShardLease``); a worker runs a shard's cycle only while it holds the
+lease, so any number of ``monitoring`` consumers can poll different shards at
+the same time without polling the same device twice.
+
+Rebalancing is lease based: the scheduler tick sends one ``monitor_shard`` task
+per free shard and Celery hands them to whichever workers are idle. A new worker
+starts taking shards on the next tick; shards held by a worker that died become
+free again when the lease expires (``MONITOR_SHARD_LEASE_SEC``).
+
+Lease changes are single conditional UPDATEs, so two workers can never both
+believe they own a shard.
+"""
+from __future__ import annotations
+
+import datetime
+import os
+import socket
+from typing import Dict, List, Optional
+
+from sqlalchemy import or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.models.device import MonitorShardLease
+
+SHARD_COUNT = max(1, int(os.getenv("MONITOR_SHARD_COUNT", "16")))
+SHARD_KEY = os.getenv("MONITOR_SHARD_KEY", "device").strip().lower()  # device | site
+SHARD_LEASE_SEC = int(os.getenv("MONITOR_SHARD_LEASE_SEC", "120"))
+
+
+def jump_hash(key: int, buckets: int) -> int:
+    """Lamping & Veach jump consistent hash: growing ``buckets`` moves only ~1/n of the keys."""
+    key = int(key) & 0xFFFFFFFFFFFFFFFF
+    b, j = -1, 0
+    while j < buckets:
+        b = j
+        key = (key * 2862933555777941757 + 1) & 0xFFFFFFFFFFFFFFFF
+        j = int(float(b + 1) * (float(1 << 31) / float((key >> 33) + 1)))
+    return b
+
+
+def shard_for(device_id: int, site_id: Optional[int] = None, shard_count: Optional[int] = None, key: Optional[str] = None) -> int:
+    shard_count = shard_count or SHARD_COUNT
+    key = key or SHARD_KEY
+    if key == "site" and site_id is not None:
+        # site ids and device ids must not collide in the hash space
+        return jump_hash((int(site_id) << 1) | 1, shard_count)
+    return jump_hash(int(device_id) << 1, shard_count)
+
+
+def worker_identity() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class ShardLeaseManager:
+    @staticmethod
+    def _ensure_row(db: Session, shard_id: int) -> None:
+        if db.get(MonitorShardLease, shard_id) is not None:
+            return
+        try:
+            db.add(MonitorShardLease(shard_id=shard_id, last_device_count=0, last_polled_count=0))
+            db.commit()
+        except IntegrityError:
+            # another worker created it first
+            db.rollback()
+
+    @staticmethod
+    def acquire(
+        db: Session,
+        shard_id: int,
+        owner: str,
+        lease_seconds: Optional[int] = None,
+        now: Optional[datetime.datetime] = None,
+    ) -> bool:
+        """Take (or extend) the shard lease if it is free, expired or already ours. Commits."""
+        now = now or datetime.datetime.utcnow()
+        lease_seconds = lease_seconds or SHARD_LEASE_SEC
+        ShardLeaseManager._ensure_row(db, shard_id)
+        updated = (
+            db.query(MonitorShardLease)
+            .filter(
+                MonitorShardLease.shard_id == shard_id,
+                or_(
+                    MonitorShardLease.lease_until == None,
+                    MonitorShardLease.lease_until <= now,
+                    MonitorShardLease.owner == owner,
+                ),
+            )
+            .update(
+                {
+                    MonitorShardLease.owner: owner,
+                    MonitorShardLease.lease_until: now + datetime.timedelta(seconds=lease_seconds),
+                },
+                synchronize_session=False,
+            )
+        )
+        db.commit()
+        return updated == 1
+
+    @staticmethod
+    def renew(db: Session, shard_id: int, owner: str, lease_seconds: Optional[int] = None) -> bool:
+        """Extend a lease we hold; False means it was lost (expired and taken over)."""
+        now = datetime.datetime.utcnow()
+        lease_seconds = lease_seconds or SHARD_LEASE_SEC
+        updated = (
+            db.query(MonitorShardLease)
+            .filter(MonitorShardLease.shard_id == shard_id, MonitorShardLease.owner == owner)
+            .update(
+                {MonitorShardLease.lease_until: now + datetime.timedelta(seconds=lease_seconds)},
+                synchronize_session=False,
+            )
+        )
+        db.commit()
+        return updated == 1
+
+    @staticmethod
+    def release(
+        db: Session,
+        shard_id: int,
+        owner: str,
+        started_at: datetime.datetime,
+        device_count: int,
+        polled_count: int,
+        error: Optional[str] = None,
+    ) -> None:
+        """Free the lease and record the cycle. The owner is kept as 'last owner' for the admin view. Commits."""
+        now = datetime.datetime.utcnow()
+        (
+            db.query(MonitorShardLease)
+            .filter(MonitorShardLease.shard_id == shard_id, MonitorShardLease.owner == owner)
+            .update(
+                {
+                    MonitorShardLease.lease_until: now,
+                    MonitorShardLease.last_cycle_started_at: started_at,
+                    MonitorShardLease.last_cycle_finished_at: now,
+                    MonitorShardLease.last_cycle_ms: round((now - started_at).total_seconds() * 1000.0, 1),
+                    MonitorShardLease.last_device_count: int(device_count),
+                    MonitorShardLease.last_polled_count: int(polled_count),
+                    MonitorShardLease.last_error: (str(error)[:255] if error else None),
+                },
+                synchronize_session=False,
+            )
+        )
+        db.commit()
+
+    @staticmethod
+    def busy_shards(db: Session, now: Optional[datetime.datetime] = None) -> set:
+        now = now or datetime.datetime.utcnow()
+        return {
+            row[0]
+            for row in db.query(MonitorShardLease.shard_id).filter(MonitorShardLease.lease_until > now).all()
+        }
+
+    @staticmethod
+    def status(db: Session, shard_count: Optional[int] = None, now: Optional[datetime.datetime] = None) -> List[Dict]:
+        shard_count = shard_count or SHARD_COUNT
+        now = now or datetime.datetime.utcnow()
+        rows = {r.shard_id: r for r in db.query(MonitorShardLease).all()}
+        out: List[Dict] = []
+        for shard_id in range(shard_count):
+            r = rows.get(shard_id)
+            running = bool(r and r.lease_until and r.lease_until > now)
+            out.append(
+                {
+                    "shard_id": shard_id,
+                    "state": "running" if running else "idle",
+                    "owner": r.owner if r else None,
+                    "lease_until": r.lease_until.isoformat() if r and r.lease_until else None,
+                    "last_cycle_started_at": r.last_cycle_started_at.isoformat() if r and r.last_cycle_started_at else None,
+                    "last_cycle_finished_at": r.last_cycle_finished_at.isoformat() if r and r.last_cycle_finished_at else None,
+                    "last_cycle_ms": r.last_cycle_ms if r else None,
+                    "last_device_count": int(r.last_device_count or 0) if r else 0,
+                    "last_polled_count": int(r.last_polled_count or 0) if r else 0,
+                    "last_error": r.last_error if r else None,
+                }
+            )
+        return out
@@ -0,0 +1,115 @@
+"""
+Batch path trace for application-dependency checks.
+
+Many (src_ip, dst_ip) flows are traced concurrently, each in its own session, against
+the same topology graph / IP index and one ``PathTraceHopCache``: a route / ARP / L2
+lookup on a device that several flows cross is done once and shared. Identical flows
+are traced once. Results are yielded as each flow finishes so the endpoint can stream
+them (NDJSON), followed by a summary record.
+"""
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.services.path_trace_service import PathTraceHopCache, PathTraceService
+
+PATH_TRACE_BATCH_MAX_FLOWS = int(os.getenv("PATH_TRACE_BATCH_MAX_FLOWS", "1000"))
+PATH_TRACE_BATCH_CONCURRENCY = int(os.getenv("PATH_TRACE_BATCH_CONCURRENCY", "8"))
+
+
+def _flow_status(result: Optional[Dict[str, Any]], error: Optional[str]) -> str:
+    if error:
+        return "error"
+    if not isinstance(result, dict):
+        return "error"
+    if result.get("error"):
+        return "not_found"
+    return str(result.get("status") or "success")
+
+
+def iter_path_trace_batch(bind, flows: List[Dict[str, Any]], concurrency: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+    """
+    flows: [{"src_ip", "dst_ip", "id"?}]. Yields {"type": "result", "index", ...} per flow in
+    completion order, then {"type": "summary", ...}.
+    """
+    started = time.monotonic()
+    groups: "OrderedDict[Tuple[str, str], List[int]]" = OrderedDict()
+    for i, flow in enumerate(flows):
+        groups.setdefault((str(flow["src_ip"]).strip(), str(flow["dst_ip"]).strip()), []).append(i)
+
+    limit = int(concurrency or PATH_TRACE_BATCH_CONCURRENCY)
+    limit = max(1, min(limit, PATH_TRACE_BATCH_CONCURRENCY, len(groups) or 1))
+    hop_cache = PathTraceHopCache()
+    make_session = sessionmaker(bind=bind, autocommit=False, autoflush=False)
+    local = threading.local()
+    sessions: List[Session] = []
+    sessions_lock = threading.Lock()
+
+    def _session() -> Session:
+        db = getattr(local, "db", None)
+        if db is None:
+            db = local.db = make_session()
+            with sessions_lock:
+                sessions.append(db)
+        return db
+
+    def _trace(pair: Tuple[str, str]) -> Dict[str, Any]:
+        db = _session()
+        try:
+            return PathTraceService(db, hop_cache=hop_cache).trace_path(pair[0], pair[1])
+        finally:
+            # 읽기 전용: 트랜잭션을 닫아 다음 flow 가 오래된 snapshot 을 보지 않도록
+            db.rollback()
+
+    counts: Dict[str, int] = {}
+    try:
+        with ThreadPoolExecutor(max_workers=limit, thread_name_prefix="path-trace") as ex:
+            futures = {ex.submit(_trace, pair): pair for pair in groups}
+            try:
+                for fut in as_completed(futures):
+                    pair = futures[fut]
+                    result, error = None, None
+                    try:
+                        result = fut.result()
+                    except Exception as e:
+                        error = f"{type(e).__name__}: {e}"
+                    status = _flow_status(result, error)
+                    for index in groups[pair]:
+                        counts[status] = counts.get(status, 0) + 1
+                        item: Dict[str, Any] = {
+                            "type": "result",
+                            "index": index,
+                            "id": flows[index].get("id"),
+                            "src_ip": pair[0],
+                            "dst_ip": pair[1],
+                            "status": status,
+                        }
+                        if error:
+                            item["error"] = error
+                        else:
+                            item["result"] = result
+                        yield item
+            finally:
+                # 클라이언트가 끊으면 아직 시작하지 않은 flow 는 취소
+                for fut in futures:
+                    fut.cancel()
+    finally:
+        for db in sessions:
+            db.close()
+
+    yield {
+        "type": "summary",
+        "flows": len(flows),
+        "unique_flows": len(groups),
+        "status_counts": counts,
+        "concurrency": limit,
+        "hops": hop_cache.stats(),
+        "elapsed_ms": int((time.monotonic() - started) * 1000),
+    }
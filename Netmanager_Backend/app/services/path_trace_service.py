@@ -1,20 +1,100 @@
-from sqlalchemy.orm import Session, selectinload
-from sqlalchemy import or_
-from typing import List, Dict, Optional, Any, Tuple
+from sqlalchemy.orm import Session
+from typing import Callable, List, Dict, Optional, Any, Tuple
+import copy
 import ipaddress
-from collections import deque
+import threading
+
+from app.models.device import Device, Interface
+from app.services.ip_index import IpIndex, ip_index_store
+from app.services.route_lookup_cache import DeviceL3View, route_lookup_cache
+from app.services.topology_graph import GraphLink, TopologyGraph, normalize_intf_key, topology_graph_store
+
+class PathTraceHopCache:
+    """
+    Lookups shared by the traces of one batch. Each key (e.g. route lookup on a device for
+    a destination) is computed once, by whichever trace gets there first; concurrent
+    traces needing the same hop wait for that result instead of opening another SSH session.
+    Values must be plain data (no ORM objects): traces run in different sessions.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._results: Dict[Tuple, Any] = {}
+        self._pending: Dict[Tuple, threading.Event] = {}
+        self.computed: Dict[str, int] = {}
+        self.shared: Dict[str, int] = {}
+
+    def get_or_compute(self, key: Tuple, fn: Callable[[], Any]) -> Any:
+        kind = str(key[0])
+        while True:
+            with self._lock:
+                if key in self._results:
+                    self.shared[kind] = self.shared.get(kind, 0) + 1
+                    return self._results[key]
+                ev = self._pending.get(key)
+                owner = ev is None
+                if owner:
+                    ev = self._pending[key] = threading.Event()
+            if not owner:
+                # 계산 중인 trace 를 기다림 (실패했으면 다시 시도)
+                ev.wait()
+                continue
+            try:
+                value = fn()
+            except BaseException:
+                with self._lock:
+                    self._pending.pop(key, None)
+                ev.set()
+                raise
+            with self._lock:
+                self._results[key] = value
+                self._pending.pop(key, None)
+                self.computed[kind] = self.computed.get(kind, 0) + 1
+            ev.set()
+            return value
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            return {"computed": dict(self.computed), "shared": dict(self.shared)}
 
-from app.models.device import Device, Link, Interface
 
 class PathTraceService:
-    def __init__(self, db: Session):
+    def __init__(self, db: Session, hop_cache: Optional[PathTraceHopCache] = None):
         self.db = db
+        self._hop_cache = hop_cache
+        # 단일 trace 용 캐시; 배치에서는 hop cache 의 single-flight 조회를 사용 (_cached)
         self._vrf_list_cache: Dict[int, List[str]] = {}
         self._intf_vrf_cache: Dict[Tuple[int, str], Optional[str]] = {}
         self._device_best_intf_cache: Dict[Tuple[int, str], Optional[str]] = {}
-        self._l3_interfaces_cache: Optional[List[Interface]] = None
-        self._links_by_device_cache: Dict[int, List[Link]] = {}
-        self._adjacency_cache: Optional[Dict[int, List[int]]] = None
+        self._graph: Optional[TopologyGraph] = None
+        self._ip_index: Optional[IpIndex] = None
+
+    def _cached(self, kind: str, local: Dict, key, fn: Callable[[], Any]) -> Any:
+        # 배치의 trace 스레드들이 같은 dict 를 동시에 고치지 않도록 hop cache (lock + single-flight) 경유
+        if self._hop_cache is not None:
+            return self._hop_cache.get_or_compute((kind,) + (key if isinstance(key, tuple) else (key,)), fn)
+        if key not in local:
+            local[key] = fn()
+        return local[key]
+
+    @property
+    def graph(self) -> TopologyGraph:
+        # trace 한 번 동안은 (배치에서는 배치 전체가) 같은 graph 를 사용
+        if self._graph is None:
+            if self._hop_cache is not None:
+                self._graph = self._hop_cache.get_or_compute(("graph",), lambda: topology_graph_store.get(self.db))
+            else:
+                self._graph = topology_graph_store.get(self.db)
+        return self._graph
+
+    @property
+    def ip_index(self) -> IpIndex:
+        if self._ip_index is None:
+            if self._hop_cache is not None:
+                self._ip_index = self._hop_cache.get_or_compute(("ip_index",), lambda: ip_index_store.get(self.db))
+            else:
+                self._ip_index = ip_index_store.get(self.db)
+        return self._ip_index
 
     def trace_path(self, src_ip: str, dst_ip: str) -> Dict[str, Any]:
         """
@@ -85,23 +165,11 @@ class PathTraceService:
         # 4. Format Result
         devs = self.db.query(Device).filter(Device.id.in_(path_nodes)).all()
         dev_by_id = {d.id: d for d in devs}
-        node_set = set(path_nodes)
-        links = (
-            self.db.query(Link)
-            .filter(
-                Link.status.in_(["active", "up"])
-                & (
-                    (Link.source_device_id.in_(node_set) & Link.target_device_id.in_(node_set))
-                    | (Link.target_device_id.in_(node_set) & Link.source_device_id.in_(node_set))
-                )
-            )
-            .all()
-        )
-        link_by_pair: Dict[frozenset[int], Link] = {}
-        for l in links:
-            k = frozenset([l.source_device_id, l.target_device_id])
-            if k not in link_by_pair:
-                link_by_pair[k] = l
+        link_by_pair: Dict[frozenset[int], GraphLink] = {}
+        for a, b in zip(path_nodes, path_nodes[1:]):
+            l = self.graph.find_link(a, b, active_only=True)
+            if l:
+                link_by_pair[frozenset([a, b])] = l
 
         formatted_path = []
         for i, node_id in enumerate(path_nodes):
@@ -240,6 +308,7 @@ class PathTraceService:
                 "next_hop_ip": route_hint.get("next_hop_ip"),
                 "outgoing_interface": route_hint.get("outgoing_interface"),
                 "vrf": vrf,
+                "lookup": route_hint.get("source") or "live",
                 "arp": arp_hint,
                 "mac": mac_hint,
             }
@@ -256,7 +325,50 @@ class PathTraceService:
             "path": path,
         }
 
+    def _l3_view(self, device: Optional[Device]) -> Optional[DeviceL3View]:
+        if not device:
+            return None
+        try:
+            return route_lookup_cache.get(self.db, device.id)
+        except Exception:
+            return None
+
+    def _route_hint_from_view(
+        self, view: DeviceL3View, device: Device, dst_ip: str, ingress_interface_name: Optional[str]
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Same VRF search order as the live lookup, against the collected tables.
+        None = the cache cannot answer (SNMP tables only cover the global VRF).
+        """
+        candidates: List[Optional[str]] = [None]
+        for v in (
+            view.interface_vrf(ingress_interface_name),
+            view.interface_vrf(self._find_best_interface_name_on_device(device.id, dst_ip)),
+            *view.vrfs,
+        ):
+            if v and v not in candidates:
+                candidates.append(v)
+        for v in candidates:
+            hint = view.route(dst_ip, vrf=v)
+            if hint and (hint.get("outgoing_interface") or hint.get("next_hop_ip")):
+                return hint
+        if view.source == "ssh":
+            return {"next_hop_ip": None, "outgoing_interface": None, "protocol": None, "vrf": None, "raw": None, "source": "cache"}
+        return None
+
     def _get_route_hint(self, device: Device, dst_ip: str, ingress_interface_name: Optional[str] = None) -> Dict[str, Any]:
+        if self._hop_cache is None or not device:
+            return self._lookup_route_hint(device, dst_ip, ingress_interface_name)
+        key = ("route", device.id, dst_ip, ingress_interface_name or "")
+        return dict(self._hop_cache.get_or_compute(key, lambda: self._lookup_route_hint(device, dst_ip, ingress_interface_name)))
+
+    def _lookup_route_hint(self, device: Device, dst_ip: str, ingress_interface_name: Optional[str] = None) -> Dict[str, Any]:
+        view = self._l3_view(device)
+        if view is not None and view.has_routes:
+            cached = self._route_hint_from_view(view, device, dst_ip, ingress_interface_name)
+            if cached is not None:
+                return cached
+
         if not device or not getattr(device, "ssh_password", None):
             return {"next_hop_ip": None, "outgoing_interface": None, "protocol": None, "raw": None}
 
@@ -280,23 +392,23 @@ class PathTraceService:
 
             candidates: List[str] = []
             if ingress_interface_name:
-                cache_key = (device.id, ingress_interface_name)
-                if cache_key in self._intf_vrf_cache:
-                    v = self._intf_vrf_cache[cache_key]
-                else:
-                    v = conn.get_interface_vrf(ingress_interface_name).get("vrf")
-                    self._intf_vrf_cache[cache_key] = v
+                v = self._cached(
+                    "intf_vrf",
+                    self._intf_vrf_cache,
+                    (device.id, ingress_interface_name),
+                    lambda: conn.get_interface_vrf(ingress_interface_name).get("vrf"),
+                )
                 if v:
                     candidates.append(v)
 
             inferred_intf = self._find_best_interface_name_on_device(device.id, dst_ip)
             if inferred_intf:
-                cache_key = (device.id, inferred_intf)
-                if cache_key in self._intf_vrf_cache:
-                    v = self._intf_vrf_cache[cache_key]
-                else:
-                    v = conn.get_interface_vrf(inferred_intf).get("vrf")
-                    self._intf_vrf_cache[cache_key] = v
+                v = self._cached(
+                    "intf_vrf",
+                    self._intf_vrf_cache,
+                    (device.id, inferred_intf),
+                    lambda: conn.get_interface_vrf(inferred_intf).get("vrf"),
+                )
                 if v and v not in candidates:
                     candidates.append(v)
 
@@ -305,10 +417,7 @@ class PathTraceService:
                 if h2.get("outgoing_interface") or h2.get("next_hop_ip"):
                     return h2
 
-            vrfs = self._vrf_list_cache.get(device.id)
-            if vrfs is None:
-                vrfs = conn.get_vrfs()
-                self._vrf_list_cache[device.id] = vrfs
+            vrfs = self._cached("vrf_list", self._vrf_list_cache, device.id, conn.get_vrfs)
 
             for v in vrfs:
                 if v in candidates:
@@ -322,42 +431,11 @@ class PathTraceService:
             conn.disconnect()
 
     def _find_best_interface_name_on_device(self, device_id: int, target_ip: str) -> Optional[str]:
-        cache_key = (device_id, target_ip)
-        if cache_key in self._device_best_intf_cache:
-            return self._device_best_intf_cache[cache_key]
-
-        try:
-            target = ipaddress.ip_address(target_ip)
-        except ValueError:
-            self._device_best_intf_cache[cache_key] = None
-            return None
+        def lookup() -> Optional[str]:
+            owner = self.ip_index.best_interface(device_id, target_ip)
+            return owner.interface_name if owner is not None else None
 
-        interfaces = (
-            self.db.query(Interface)
-            .filter(Interface.device_id == device_id)
-            .filter(Interface.ip_address.isnot(None))
-            .all()
-        )
-
-        best_name = None
-        best_prefix_len = -1
-        for intf in interfaces:
-            ip_addr = intf.ip_address
-            if not ip_addr:
-                continue
-            try:
-                if "/" in ip_addr:
-                    net = ipaddress.ip_network(ip_addr, strict=False)
-                else:
-                    continue
-                if target in net and net.prefixlen > best_prefix_len:
-                    best_prefix_len = net.prefixlen
-                    best_name = intf.name
-            except ValueError:
-                continue
-
-        self._device_best_intf_cache[cache_key] = best_name
-        return best_name
+        return self._cached("best_intf", self._device_best_intf_cache, (device_id, target_ip), lookup)
 
     def _try_extend_l2(
         self,
@@ -397,6 +475,19 @@ class PathTraceService:
         host_ip: str,
         vrf: Optional[str],
         max_hops: int = 10,
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        if self._hop_cache is None or not start_device:
+            return self._lookup_l2_chain_to_host(start_device, host_ip, vrf, max_hops)
+        key = ("l2_chain", start_device.id, host_ip, vrf or "", max_hops)
+        nodes, port0 = self._hop_cache.get_or_compute(key, lambda: self._lookup_l2_chain_to_host(start_device, host_ip, vrf, max_hops))
+        return copy.deepcopy(nodes), port0
+
+    def _lookup_l2_chain_to_host(
+        self,
+        start_device: Device,
+        host_ip: str,
+        vrf: Optional[str],
+        max_hops: int = 10,
     ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
         if not start_device or not getattr(start_device, "ssh_password", None):
             return [], None
@@ -418,7 +509,8 @@ class PathTraceService:
         if not conn.connect():
             return [], None
         try:
-            arp = conn.get_arp_entry(host_ip, vrf=vrf)
+            view = self._l3_view(start_device)
+            arp = (view.arp(host_ip, vrf) if view is not None else None) or conn.get_arp_entry(host_ip, vrf=vrf)
             mac = (arp.get("mac") or "").strip()
             if not mac:
                 return [], None
@@ -491,7 +583,26 @@ class PathTraceService:
         next_hop_ip: str,
         vrf: Optional[str],
     ) -> Tuple[Optional[str], Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+        if self._hop_cache is None or not device:
+            return self._lookup_outgoing_interface_via_arp_mac(device, dst_ip, next_hop_ip, vrf)
+        key = ("arp_mac", device.id, next_hop_ip or dst_ip, vrf or "")
+        return copy.deepcopy(
+            self._hop_cache.get_or_compute(key, lambda: self._lookup_outgoing_interface_via_arp_mac(device, dst_ip, next_hop_ip, vrf))
+        )
+
+    def _lookup_outgoing_interface_via_arp_mac(
+        self,
+        device: Device,
+        dst_ip: str,
+        next_hop_ip: str,
+        vrf: Optional[str],
+    ) -> Tuple[Optional[str], Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+        arp_target = next_hop_ip or dst_ip
+        view = self._l3_view(device)
+        cached_arp = view.arp(arp_target, vrf) if view is not None else None
         if not device or not getattr(device, "ssh_password", None):
+            if cached_arp:
+                return (cached_arp.get("interface") or None), cached_arp, None
             return None, None, None
 
         from app.services.ssh_service import DeviceConnection, DeviceInfo
@@ -508,8 +619,7 @@ class PathTraceService:
         if not conn.connect():
             return None, None, None
         try:
-            arp_target = next_hop_ip or dst_ip
-            arp = conn.get_arp_entry(arp_target, vrf=vrf)
+            arp = cached_arp or conn.get_arp_entry(arp_target, vrf=vrf)
             mac = (arp.get("mac") or "").strip()
             if not mac:
                 return (arp.get("interface") or None), arp, None
@@ -523,25 +633,7 @@ class PathTraceService:
             conn.disconnect()
 
     def _normalize_intf_key(self, name: str) -> str:
-        if not name:
-            return ""
-        s = name.strip().lower().replace(" ", "")
-        mapping = {
-            "gi": "gigabitethernet",
-            "fa": "fastethernet",
-            "te": "tengigabitethernet",
-            "fo": "fortygigabitethernet",
-            "hu": "hundredgigabitethernet",
-            "po": "port-channel",
-            "vl": "vlan",
-            "eth": "ethernet",
-        }
-        for short, full in mapping.items():
-            if s.startswith(short) and not s.startswith(full):
-                rest = s[len(short):]
-                if rest and (rest[0].isdigit() or rest[0] == "/"):
-                    return full + rest
-        return s
+        return normalize_intf_key(name)
 
     def _resolve_next_hop_by_topology(
         self, current_device_id: int, outgoing_interface: str, next_hop_ip: str
@@ -549,16 +641,9 @@ class PathTraceService:
         """
         Returns (next_device_id, ingress_interface_name_on_next_device)
         """
-        out_key = self._normalize_intf_key(outgoing_interface)
-        links = self._get_links_for_device(current_device_id)
-
-        for l in links:
-            if l.source_device_id == current_device_id:
-                if self._normalize_intf_key(l.source_interface_name) == out_key:
-                    return l.target_device_id, l.target_interface_name
-            if l.target_device_id == current_device_id:
-                if self._normalize_intf_key(l.target_interface_name) == out_key:
-                    return l.source_device_id, l.source_interface_name
+        peer_id, peer_intf = self.graph.peer_on_interface(current_device_id, outgoing_interface)
+        if peer_id:
+            return peer_id, peer_intf
 
         if next_hop_ip:
             dev = self.db.query(Device).filter(Device.ip_address == next_hop_ip).first()
@@ -575,48 +660,21 @@ class PathTraceService:
         Find the device that owns the subnet of the target IP.
         """
         try:
-            target = ipaddress.ip_address(target_ip)
+            ipaddress.ip_address(target_ip)
         except ValueError:
             return None, None
 
-        if self._l3_interfaces_cache is None:
-            self._l3_interfaces_cache = (
-                self.db.query(Interface)
-                .options(selectinload(Interface.device))
-                .filter(Interface.ip_address.isnot(None))
-                .all()
-            )
-        interfaces = self._l3_interfaces_cache
-        
-        best_match = None
-        best_device = None
-        best_prefix_len = -1
-
-        for intf in interfaces:
-            if not intf.ip_address: continue
-            try:
-                # Assume format "1.1.1.1/24" or just "1.1.1.1" (implies /32)
-                if "/" in intf.ip_address:
-                    net = ipaddress.ip_network(intf.ip_address, strict=False)
-                else:
-                     # Skip if no subnet mask info (or treat as host /32)
-                     # For exact match:
-                     if intf.ip_address == target_ip:
-                         return intf.device, intf
-                     continue
-
-                if target in net:
-                    if net.prefixlen > best_prefix_len:
-                        best_prefix_len = net.prefixlen
-                        best_match = intf
-                        best_device = intf.device
-            except ValueError:
-                continue
-        
-        if best_device:
-            return best_device, best_match
-
-        dev = self.db.query(Device).filter(Device.ip_address == target_ip).first()
+        owner = self.ip_index.lookup(target_ip)
+        if owner is not None:
+            intf = self.db.get(Interface, owner.interface_id)
+            dev = self.db.get(Device, owner.device_id)
+            if intf is not None and dev is not None:
+                return dev, intf
+            # 인덱스 적재 이후 삭제됨 -> 다음 조회 때 재적재
+            self.ip_index.mark_stale()
+
+        owner = self.ip_index.management_owner(target_ip)
+        dev = self.db.get(Device, owner.device_id) if owner is not None else None
         if dev:
             return dev, Interface(name="Mgmt", ip_address=target_ip, device_id=dev.id)
 
@@ -626,61 +684,13 @@ class PathTraceService:
         """
         BFS to find shortest list of device IDs.
         """
-        queue = deque([[start_id]])
-        visited = {start_id}
-        graph = self._build_adjacency_list()
+        return self.graph.shortest_path(start_id, end_id)
 
-        while queue:
-            path = queue.popleft()
-            node = path[-1]
-            
-            if node == end_id:
-                return path
-            
-            for neighbor in graph.get(node, []):
-                if neighbor not in visited:
-                    visited.add(neighbor)
-                    new_path = list(path)
-                    new_path.append(neighbor)
-                    queue.append(new_path)
-        return []
-
-    def _build_adjacency_list(self) -> Dict[int, List[int]]:
-        if self._adjacency_cache is not None:
-            return self._adjacency_cache
-        links = self.db.query(Link).filter(Link.status.in_(["active", "up"])).all()
-        adj: Dict[int, List[int]] = {}
-        for link in links:
-            if link.source_device_id not in adj: adj[link.source_device_id] = []
-            if link.target_device_id not in adj: adj[link.target_device_id] = []
-            
-            adj[link.source_device_id].append(link.target_device_id)
-            adj[link.target_device_id].append(link.source_device_id)
-        self._adjacency_cache = adj
-        return adj
-
-    def _get_links_for_device(self, device_id: int) -> List[Link]:
-        cached = self._links_by_device_cache.get(device_id)
-        if cached is not None:
-            return cached
-        links = (
-            self.db.query(Link)
-            .filter(
-                (Link.status.in_(["active", "up"]))
-                & ((Link.source_device_id == device_id) | (Link.target_device_id == device_id))
-            )
-            .all()
-        )
-        self._links_by_device_cache[device_id] = links
-        return links
-
-    def _find_link(self, node_a: int, node_b: int) -> Optional[Link]:
-        return self.db.query(Link).filter(
-            or_(
-                (Link.source_device_id == node_a) & (Link.target_device_id == node_b),
-                (Link.source_device_id == node_b) & (Link.target_device_id == node_a)
-            )
-        ).first()
+    def _get_links_for_device(self, device_id: int) -> List[GraphLink]:
+        return self.graph.links_for_device(device_id)
+
+    def _find_link(self, node_a: int, node_b: int) -> Optional[GraphLink]:
+        return self.graph.find_link(node_a, node_b)
 
     def _format_node(self, device: Device, ingress: str = None, egress: str = None) -> Dict[str, Any]:
         if not device: return {"name": "Unknown"}
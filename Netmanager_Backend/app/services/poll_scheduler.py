@@ -0,0 +1,251 @@
+"""
+Per-device monitoring scheduler.
+
+Each device has its own next-due times (``DevicePollState``) derived from
+``Device.polling_interval`` (SNMP metrics) and ``Device.status_interval`` (ping).
+New devices get a stable phase offset inside their interval, so a fleet that
+shares one interval is spread evenly over it instead of being polled in one burst.
+
+The effective interval adapts:
+- devices that keep failing (ping or SNMP timeouts) back off exponentially,
+  up to ``MONITOR_MAX_BACKOFF_FACTOR`` times their interval;
+- reachable devices with open critical/warning issues are polled faster
+  (``MONITOR_ISSUE_SPEEDUP_FACTOR``).
+
+``schedule_monitoring`` (Celery beat, short tick) runs ``assign_shards`` once
+(new devices get their poll state, devices whose shard changed are moved) and
+sends one ``monitor_shard`` task per monitoring shard (see ``monitor_shards``);
+the shard owner calls ``claim_due`` for its shard, which reads only that shard's
+due rows through the stored ``DevicePollState.shard_id``, polls the returned
+batches and reports back through ``record_outcomes``.
+"""
+from __future__ import annotations
+
+import datetime
+import math
+import os
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+
+from app.models.device import Device, DevicePollState, Issue
+
+SCHEDULER_TICK_SEC = float(os.getenv("MONITOR_SCHEDULER_TICK_SEC", "5"))
+MIN_INTERVAL_SEC = int(os.getenv("MONITOR_MIN_INTERVAL_SEC", "10"))
+MAX_BACKOFF_FACTOR = float(os.getenv("MONITOR_MAX_BACKOFF_FACTOR", "8"))
+ISSUE_SPEEDUP_FACTOR = float(os.getenv("MONITOR_ISSUE_SPEEDUP_FACTOR", "0.5"))
+DISPATCH_BATCH_SIZE = int(os.getenv("MONITOR_DISPATCH_BATCH_SIZE", "100"))
+
+_SPEEDUP_SEVERITIES = ("critical", "warning")
+
+
+def _chunks(ids: List[int], size: int) -> Iterable[List[int]]:
+    size = max(1, int(size))
+    for i in range(0, len(ids), size):
+        yield ids[i:i + size]
+
+
+class PollScheduler:
+    @staticmethod
+    def effective_interval(base_interval: Optional[int], failures: int = 0, has_open_issue: bool = False) -> int:
+        interval = max(MIN_INTERVAL_SEC, int(base_interval or 60))
+        failures = int(failures or 0)
+        if failures > 1:
+            # one miss is noise; from the second consecutive failure on, double per failure
+            factor = min(MAX_BACKOFF_FACTOR, float(2 ** min(failures - 1, 16)))
+            return int(interval * factor)
+        if has_open_issue and failures == 0:
+            return max(MIN_INTERVAL_SEC, int(interval * ISSUE_SPEEDUP_FACTOR))
+        return interval
+
+    @staticmethod
+    def phase_offset(device_id: int, interval: int) -> float:
+        """Stable offset in [0, interval); Fibonacci hashing spreads consecutive ids evenly."""
+        frac = ((int(device_id) * 2654435761) & 0xFFFFFFFF) / float(1 << 32)
+        return frac * float(interval)
+
+    @staticmethod
+    def advance(prev_due: Optional[datetime.datetime], now: datetime.datetime, interval: int) -> datetime.datetime:
+        """Next due time after ``now`` that keeps the device's phase (missed slots are skipped, not replayed)."""
+        step = datetime.timedelta(seconds=int(interval))
+        if prev_due is None:
+            return now + step
+        behind = (now - prev_due).total_seconds()
+        slots = max(1, int(math.floor(behind / float(interval))) + 1)
+        return prev_due + step * slots
+
+    @staticmethod
+    def _new_state(device_id: int, polling_interval, status_interval, now: datetime.datetime) -> DevicePollState:
+        poll_every = PollScheduler.effective_interval(polling_interval)
+        status_every = PollScheduler.effective_interval(status_interval)
+        offset = PollScheduler.phase_offset(device_id, poll_every)
+        return DevicePollState(
+            device_id=device_id,
+            consecutive_failures=0,
+            effective_interval=poll_every,
+            next_poll_at=now + datetime.timedelta(seconds=offset),
+            next_status_at=now + datetime.timedelta(seconds=offset % status_every),
+        )
+
+    @staticmethod
+    def assign_shards(
+        db: Session,
+        now: Optional[datetime.datetime] = None,
+        shard_count: Optional[int] = None,
+        key: Optional[str] = None,
+    ) -> int:
+        """
+        Create the poll state of new devices and store the monitoring shard of every
+        device whose shard is missing or out of date (shard count, shard key or, with
+        the site key, the device's site changed). The query returns only those
+        devices. Returns how many were (re)assigned; the caller commits.
+        """
+        from app.services.monitor_shards import SHARD_COUNT, SHARD_KEY, shard_for
+
+        now = now or datetime.datetime.utcnow()
+        shard_count = shard_count or SHARD_COUNT
+        key = key or SHARD_KEY
+        basis = f"{key}:{shard_count}"
+        stale = [
+            DevicePollState.device_id == None,
+            DevicePollState.shard_id == None,
+            DevicePollState.shard_basis == None,
+            DevicePollState.shard_basis != basis,
+        ]
+        if key == "site":
+            stale.append(DevicePollState.shard_site_id.is_distinct_from(Device.site_id))
+        rows = (
+            db.query(Device.id, Device.polling_interval, Device.status_interval, Device.site_id, DevicePollState)
+            .outerjoin(DevicePollState, DevicePollState.device_id == Device.id)
+            .filter(Device.ip_address != None, or_(*stale))
+            .all()
+        )
+        for device_id, polling_interval, status_interval, site_id, state in rows:
+            if state is None:
+                state = PollScheduler._new_state(device_id, polling_interval, status_interval, now)
+            state.shard_id = shard_for(device_id, site_id, shard_count, key)
+            state.shard_basis = basis
+            state.shard_site_id = site_id if key == "site" else None
+            db.add(state)
+        return len(rows)
+
+    @staticmethod
+    def claim_due(
+        db: Session,
+        now: Optional[datetime.datetime] = None,
+        batch_size: Optional[int] = None,
+        shard_id: Optional[int] = None,
+        shard_count: Optional[int] = None,
+    ) -> List[Tuple[List[int], List[int]]]:
+        """
+        Pick devices whose poll/status time has come, move their next-due forward and
+        return dispatch batches ``[(device_ids, snmp_device_ids), ...]``.
+        With ``shard_id`` only that monitoring shard's due devices are read (by the
+        shard stored by ``assign_shards``; unassigned devices wait for it).
+        The caller commits.
+        """
+        now = now or datetime.datetime.utcnow()
+        batch_size = batch_size or DISPATCH_BATCH_SIZE
+
+        active_issue = db.query(Issue.device_id).filter(
+            Issue.device_id != None,
+            Issue.status == "active",
+            Issue.severity.in_(_SPEEDUP_SEVERITIES),
+        )
+        if shard_id is None:
+            rows = (
+                db.query(Device.id, Device.polling_interval, Device.status_interval)
+                .filter(Device.ip_address != None)
+                .all()
+            )
+            devices = [(r[0], r[1], r[2]) for r in rows]
+            states: Dict[int, DevicePollState] = {s.device_id: s for s in db.query(DevicePollState).all()}
+            issue_device_ids = {row[0] for row in active_issue.distinct().all()}
+        else:
+            from app.services.monitor_shards import SHARD_COUNT, SHARD_KEY
+
+            basis = f"{SHARD_KEY}:{shard_count or SHARD_COUNT}"
+            rows = (
+                db.query(DevicePollState, Device.polling_interval, Device.status_interval)
+                .join(Device, Device.id == DevicePollState.device_id)
+                .filter(
+                    DevicePollState.shard_id == int(shard_id),
+                    DevicePollState.shard_basis == basis,
+                    Device.ip_address != None,
+                    or_(
+                        DevicePollState.next_poll_at == None,
+                        DevicePollState.next_poll_at <= now,
+                        DevicePollState.next_status_at == None,
+                        DevicePollState.next_status_at <= now,
+                    ),
+                )
+                .all()
+            )
+            devices = [(state.device_id, polling_interval, status_interval) for state, polling_interval, status_interval in rows]
+            states = {state.device_id: state for state, _, _ in rows}
+            issue_device_ids = set()
+            for chunk in _chunks(list(states), 500):
+                issue_device_ids.update(row[0] for row in active_issue.filter(Issue.device_id.in_(chunk)).distinct().all())
+
+        poll_ids: List[int] = []
+        status_ids: List[int] = []
+        for device_id, polling_interval, status_interval in devices:
+            state = states.get(device_id)
+            if state is None:
+                db.add(PollScheduler._new_state(device_id, polling_interval, status_interval, now))
+                continue
+
+            failures = int(state.consecutive_failures or 0)
+            has_issue = device_id in issue_device_ids
+            poll_every = PollScheduler.effective_interval(polling_interval, failures, has_issue)
+            status_every = PollScheduler.effective_interval(status_interval, failures, has_issue)
+            state.effective_interval = poll_every
+
+            poll_due = state.next_poll_at is None or state.next_poll_at <= now
+            status_due = state.next_status_at is None or state.next_status_at <= now
+            if poll_due:
+                poll_ids.append(device_id)
+                state.next_poll_at = PollScheduler.advance(state.next_poll_at, now, poll_every)
+                # a metrics poll includes the ping
+                if status_due:
+                    state.next_status_at = PollScheduler.advance(state.next_status_at, now, status_every)
+            elif status_due:
+                status_ids.append(device_id)
+                state.next_status_at = PollScheduler.advance(state.next_status_at, now, status_every)
+            db.add(state)
+
+        batches: List[Tuple[List[int], List[int]]] = []
+        for ids in _chunks(poll_ids, batch_size):
+            batches.append((ids, list(ids)))
+        for ids in _chunks(status_ids, batch_size):
+            batches.append((ids, []))
+        return batches
+
+    @staticmethod
+    def record_outcomes(db: Session, outcomes: List[dict], now: Optional[datetime.datetime] = None) -> None:
+        """Update failure streaks from ``_run_monitor_cycle`` results. The caller commits."""
+        if not outcomes:
+            return
+        now = now or datetime.datetime.utcnow()
+        ids = [int(o["id"]) for o in outcomes if o.get("id") is not None]
+        states = {
+            s.device_id: s for s in db.query(DevicePollState).filter(DevicePollState.device_id.in_(ids)).all()
+        }
+        for o in outcomes:
+            device_id = int(o["id"])
+            state = states.get(device_id)
+            if state is None:
+                state = DevicePollState(device_id=device_id, consecutive_failures=0)
+                states[device_id] = state
+            ok = bool(o.get("alive")) and (not o.get("snmp_attempted") or bool(o.get("snmp_ok")))
+            if ok:
+                state.consecutive_failures = 0
+                state.last_error = None
+            else:
+                state.consecutive_failures = int(state.consecutive_failures or 0) + 1
+                state.last_error = str(o.get("error") or "snmp timeout")[:255]
+            state.last_status_at = now
+            if o.get("snmp_attempted"):
+                state.last_poll_at = now
+            db.add(state)
@@ -0,0 +1,425 @@
+"""
+Shared route / ARP / VRF lookup plane for L3 path trace.
+
+``PathTraceService`` used to open an SSH session per hop and run ``show ip route``
+(plus ``get_interface_vrf`` and one ``get_route_to`` per VRF) on every trace.
+Instead, a background collector (``app.tasks.monitoring.collect_l3_tables``)
+stores each L3 device's FIB, ARP and VRF tables in ``device_l3_tables``:
+
+- SNMP ``inetCidrRouteTable`` / ``ipCidrRouteTable`` + ``ipNetToMediaTable`` when the
+  agent answers (global table only)
+- SSH ``show ip route [vrf X]``, ``show ip arp [vrf X]``, VRF/interface mapping otherwise
+
+``route_lookup_cache.get(db, device_id)`` returns a ``DeviceL3View`` answering
+longest-prefix-match queries. Views are kept per process for
+``ROUTE_CACHE_TTL_SEC`` and only built from rows younger than
+``ROUTE_TABLE_MAX_AGE_SEC``; anything older (or missing) makes the caller fall
+back to the live SSH lookup.
+"""
+from __future__ import annotations
+
+import ipaddress
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Generic, Iterable, List, Optional, Tuple, TypeVar
+
+from sqlalchemy.orm import Session
+
+from app.models.device import Device, DeviceL3Table
+
+logger = logging.getLogger(__name__)
+
+ROUTE_CACHE_TTL_SEC = float(os.getenv("ROUTE_CACHE_TTL_SEC", "60"))
+ROUTE_CACHE_MAX_DEVICES = int(os.getenv("ROUTE_CACHE_MAX_DEVICES", "512"))
+ROUTE_TABLE_MAX_AGE_SEC = int(os.getenv("ROUTE_TABLE_MAX_AGE_SEC", "900"))
+# 인터넷 full table 같은 대형 RIB 는 저장하지 않음 (일부만 저장하면 LPM 결과가 틀려짐)
+ROUTE_TABLE_MAX_ROUTES = int(os.getenv("ROUTE_TABLE_MAX_ROUTES", "50000"))
+
+INET_CIDR_ROUTE_IFINDEX = "1.3.6.1.2.1.4.24.7.1.7"
+INET_CIDR_ROUTE_TYPE = "1.3.6.1.2.1.4.24.7.1.8"
+INET_CIDR_ROUTE_PROTO = "1.3.6.1.2.1.4.24.7.1.9"
+IP_CIDR_ROUTE_IFINDEX = "1.3.6.1.2.1.4.24.4.1.5"
+IP_CIDR_ROUTE_TYPE = "1.3.6.1.2.1.4.24.4.1.6"
+IP_CIDR_ROUTE_PROTO = "1.3.6.1.2.1.4.24.4.1.7"
+IP_NET_TO_MEDIA_PHYS = "1.3.6.1.2.1.4.22.1.2"
+
+# IANA IP-MIB route protocol -> show ip route 표기
+_SNMP_ROUTE_PROTO = {2: "connected", 3: "static", 8: "rip", 9: "isis", 13: "ospf", 14: "bgp", 16: "eigrp"}
+_ROUTE_TYPE_REJECT = 2
+_ROUTE_TYPE_LOCAL = 3
+
+T = TypeVar("T")
+
+
+class PrefixTable(Generic[T]):
+    """Longest-prefix match over IPv4/IPv6 prefixes: one hash map per prefix length."""
+
+    def __init__(self):
+        self._by_len: Dict[Tuple[int, int], Dict[int, T]] = {}
+        self._lens: Dict[int, List[int]] = {4: [], 6: []}
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    @staticmethod
+    def _network(prefix):
+        if isinstance(prefix, (ipaddress.IPv4Network, ipaddress.IPv6Network)):
+            return prefix
+        return ipaddress.ip_network(str(prefix), strict=False)
+
+    def add(self, prefix, value: T) -> None:
+        net = self._network(prefix)
+        key = (net.version, net.prefixlen)
+        bucket = self._by_len.get(key)
+        if bucket is None:
+            bucket = self._by_len[key] = {}
+            lens = self._lens[net.version]
+            lens.append(net.prefixlen)
+            lens.sort(reverse=True)
+        net_int = int(net.network_address)
+        if net_int not in bucket:
+            self._count += 1
+        bucket[net_int] = value
+
+    def get(self, prefix) -> Optional[T]:
+        """Exact-prefix get (no LPM)."""
+        net = self._network(prefix)
+        bucket = self._by_len.get((net.version, net.prefixlen))
+        return bucket.get(int(net.network_address)) if bucket is not None else None
+
+    def discard(self, prefix) -> Optional[T]:
+        net = self._network(prefix)
+        key = (net.version, net.prefixlen)
+        bucket = self._by_len.get(key)
+        if bucket is None:
+            return None
+        value = bucket.pop(int(net.network_address), None)
+        if value is not None:
+            self._count -= 1
+        if not bucket:
+            del self._by_len[key]
+            self._lens[net.version].remove(net.prefixlen)
+        return value
+
+    def lookup(self, ip) -> Optional[Tuple[int, T]]:
+        """(prefix length, value) of the most specific prefix containing ``ip``."""
+        try:
+            addr = ip if isinstance(ip, (ipaddress.IPv4Address, ipaddress.IPv6Address)) else ipaddress.ip_address(str(ip).strip())
+        except ValueError:
+            return None
+        bits = addr.max_prefixlen
+        ip_int = int(addr)
+        for plen in self._lens[addr.version]:
+            mask = ((1 << plen) - 1) << (bits - plen) if plen else 0
+            hit = self._by_len[(addr.version, plen)].get(ip_int & mask)
+            if hit is not None:
+                return plen, hit
+        return None
+
+
+def _vrf_key(vrf: Optional[str]) -> str:
+    v = str(vrf or "").strip()
+    return "" if v.lower() in ("", "default", "global") else v
+
+
+class DeviceL3View:
+    def __init__(self, row: DeviceL3Table):
+        from app.services.topology_graph import normalize_intf_key
+
+        self._norm = normalize_intf_key
+        self.device_id = int(row.device_id)
+        self.source = row.source
+        self.collected_at = row.collected_at
+        self.has_routes = row.routes is not None
+        self.vrfs: List[str] = [v for v in (row.vrfs or []) if _vrf_key(v)]
+        self._routes: Dict[str, PrefixTable[Dict[str, Any]]] = {}
+        for r in row.routes or []:
+            try:
+                self._routes.setdefault(_vrf_key(r.get("vrf")), PrefixTable()).add(r["prefix"], r)
+            except (KeyError, ValueError):
+                continue
+        self._arp: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        for a in row.arp or []:
+            if a.get("ip"):
+                self._arp[(_vrf_key(a.get("vrf")), str(a["ip"]).strip())] = a
+        self._intf_vrf = {normalize_intf_key(k): v for k, v in (row.interface_vrfs or {}).items() if _vrf_key(v)}
+
+    def interface_vrf(self, interface_name: Optional[str]) -> Optional[str]:
+        if not interface_name:
+            return None
+        return self._intf_vrf.get(self._norm(interface_name))
+
+    def route(self, dst_ip: str, vrf: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """LPM in ``vrf``; recursive next hops (e.g. BGP) are resolved to an outgoing interface."""
+        table = self._routes.get(_vrf_key(vrf))
+        if table is None:
+            return None
+        hit = table.lookup(dst_ip)
+        if hit is None:
+            return None
+        entry = dict(hit[1])
+        nh = entry.get("next_hop_ip")
+        for _ in range(3):
+            if entry.get("outgoing_interface") or not nh:
+                break
+            nxt = table.lookup(nh)
+            if nxt is None:
+                break
+            entry["outgoing_interface"] = nxt[1].get("outgoing_interface")
+            nh = nxt[1].get("next_hop_ip")
+        return {
+            "next_hop_ip": entry.get("next_hop_ip"),
+            "outgoing_interface": entry.get("outgoing_interface"),
+            "protocol": entry.get("protocol"),
+            "vrf": _vrf_key(vrf) or None,
+            "prefix": entry.get("prefix"),
+            "raw": None,
+            "source": "cache",
+        }
+
+    def arp(self, ip: str, vrf: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        entry = self._arp.get((_vrf_key(vrf), str(ip or "").strip()))
+        if entry is None:
+            return None
+        return {"ip": entry.get("ip"), "mac": entry.get("mac"), "interface": entry.get("interface"), "raw": None}
+
+
+class RouteLookupCache:
+    def __init__(self, ttl: float = ROUTE_CACHE_TTL_SEC, max_devices: int = ROUTE_CACHE_MAX_DEVICES, max_age: int = ROUTE_TABLE_MAX_AGE_SEC):
+        self.ttl = float(ttl)
+        self.max_devices = max(0, int(max_devices))
+        self.max_age = int(max_age)
+        self._lock = threading.Lock()
+        # device_id -> (loaded_at, view or None)
+        self._data: "OrderedDict[int, Tuple[float, Optional[DeviceL3View]]]" = OrderedDict()
+
+    def get(self, db: Session, device_id: int) -> Optional[DeviceL3View]:
+        now = time.monotonic()
+        with self._lock:
+            hit = self._data.get(device_id)
+            if hit is not None and now - hit[0] < self.ttl:
+                self._data.move_to_end(device_id)
+                return hit[1]
+        view = None
+        row = db.get(DeviceL3Table, device_id)
+        if row is not None and row.collected_at is not None and row.collected_at >= datetime.now() - timedelta(seconds=self.max_age):
+            view = DeviceL3View(row)
+        if self.max_devices > 0:
+            with self._lock:
+                self._data[device_id] = (now, view)
+                self._data.move_to_end(device_id)
+                while len(self._data) > self.max_devices:
+                    self._data.popitem(last=False)
+        return view
+
+    def invalidate(self, device_id: Optional[int] = None) -> None:
+        with self._lock:
+            if device_id is None:
+                self._data.clear()
+            else:
+                self._data.pop(device_id, None)
+
+
+route_lookup_cache = RouteLookupCache()
+
+
+# -- collectors ------------------------------------------------------------------
+
+
+def _oid_suffix(oid: str, column: str) -> List[int]:
+    return [int(x) for x in oid[len(column) + 1:].split(".") if x != ""]
+
+
+def _inet_address(parts: List[int], pos: int) -> Tuple[Optional[str], int]:
+    """InetAddressType + length-prefixed InetAddress from an index, returns (address, next pos)."""
+    addr_type, length = parts[pos], parts[pos + 1]
+    raw = bytes(parts[pos + 2: pos + 2 + length])
+    pos = pos + 2 + length
+    if addr_type == 1 and length == 4:
+        return str(ipaddress.IPv4Address(raw)), pos
+    if addr_type == 2 and length == 16:
+        return str(ipaddress.IPv6Address(raw)), pos
+    return None, pos
+
+
+def _parse_inet_cidr_index(parts: List[int]) -> Optional[Tuple[str, Optional[str]]]:
+    dest, pos = _inet_address(parts, 0)
+    plen = parts[pos]
+    pos += 1
+    pos += 1 + parts[pos]  # inetCidrRoutePolicy (OID)
+    nh, _ = _inet_address(parts, pos)
+    if dest is None:
+        return None
+    return f"{dest}/{plen}", nh
+
+
+def _parse_ip_cidr_index(parts: List[int]) -> Optional[Tuple[str, Optional[str]]]:
+    if len(parts) != 13:
+        return None
+    dest = ".".join(str(x) for x in parts[0:4])
+    mask = ".".join(str(x) for x in parts[4:8])
+    nh = ".".join(str(x) for x in parts[9:13])
+    return str(ipaddress.ip_network(f"{dest}/{mask}", strict=False)), nh
+
+
+def _snmp_routes(snmp, names_by_idx: Dict[int, str]) -> Optional[List[Dict[str, Any]]]:
+    limit = ROUTE_TABLE_MAX_ROUTES + 1
+    for cols, parse in (
+        ((INET_CIDR_ROUTE_IFINDEX, INET_CIDR_ROUTE_TYPE, INET_CIDR_ROUTE_PROTO), _parse_inet_cidr_index),
+        ((IP_CIDR_ROUTE_IFINDEX, IP_CIDR_ROUTE_TYPE, IP_CIDR_ROUTE_PROTO), _parse_ip_cidr_index),
+    ):
+        data = snmp.walk_oids(list(cols), max_rows=limit) or {}
+        if_col, type_col, proto_col = (data.get(c) or {} for c in cols)
+        if not if_col:
+            continue
+        types = {oid[len(cols[1]):]: v for oid, v in type_col.items()}
+        protos = {oid[len(cols[2]):]: v for oid, v in proto_col.items()}
+        routes: List[Dict[str, Any]] = []
+        for oid, if_idx in if_col.items():
+            suffix = oid[len(cols[0]):]
+            try:
+                parsed = parse(_oid_suffix(oid, cols[0]))
+                rtype = int(types.get(suffix) or 0)
+                proto = int(protos.get(suffix) or 0)
+                if_name = names_by_idx.get(int(if_idx))
+            except (ValueError, IndexError):
+                continue
+            if parsed is None or rtype == _ROUTE_TYPE_REJECT:
+                continue
+            prefix, nh = parsed
+            if nh and ipaddress.ip_address(nh).is_unspecified:
+                nh = None
+            routes.append(
+                {
+                    "prefix": prefix,
+                    "vrf": None,
+                    "next_hop_ip": None if rtype == _ROUTE_TYPE_LOCAL else nh,
+                    "outgoing_interface": if_name,
+                    "protocol": _SNMP_ROUTE_PROTO.get(proto, "connected" if rtype == _ROUTE_TYPE_LOCAL else None),
+                }
+            )
+        return routes
+    return None
+
+
+def collect_snmp(device: Device) -> Optional[Dict[str, Any]]:
+    """Global route + ARP table over SNMP; None when the agent has no usable route MIB."""
+    if not device.ip_address or not (device.snmp_community or device.snmp_v3_username):
+        return None
+    from app.services.snmp_service import IF_DESCR, IF_NAME, SnmpManager
+
+    snmp = SnmpManager(
+        device.ip_address,
+        device.snmp_community,
+        port=int(getattr(device, "snmp_port", None) or 161),
+        version=str(getattr(device, "snmp_version", None) or "v2c"),
+        v3_username=getattr(device, "snmp_v3_username", None),
+        v3_security_level=getattr(device, "snmp_v3_security_level", None),
+        v3_auth_proto=getattr(device, "snmp_v3_auth_proto", None),
+        v3_auth_key=getattr(device, "snmp_v3_auth_key", None),
+        v3_priv_proto=getattr(device, "snmp_v3_priv_proto", None),
+        v3_priv_key=getattr(device, "snmp_v3_priv_key", None),
+    )
+    names_by_idx = snmp.walk_table_column(IF_NAME) or snmp.walk_table_column(IF_DESCR) or {}
+    routes = _snmp_routes(snmp, names_by_idx)
+    if not routes:
+        return None
+
+    arp: List[Dict[str, Any]] = []
+    for oid, value in (snmp.walk_oid(IP_NET_TO_MEDIA_PHYS, max_rows=ROUTE_TABLE_MAX_ROUTES) or {}).items():
+        parts = _oid_suffix(oid, IP_NET_TO_MEDIA_PHYS)
+        mac = SnmpManager.normalize_mac(value)
+        if len(parts) != 5 or not mac:
+            continue
+        arp.append({"ip": ".".join(str(x) for x in parts[1:]), "mac": mac, "interface": names_by_idx.get(parts[0]), "vrf": None})
+    return {"source": "snmp", "routes": routes, "arp": arp, "vrfs": [], "interface_vrfs": {}}
+
+
+def collect_ssh(device: Device) -> Optional[Dict[str, Any]]:
+    if not device.ip_address or not getattr(device, "ssh_password", None):
+        return None
+    from app.services.ssh_service import DeviceConnection, DeviceInfo
+
+    conn = DeviceConnection(
+        DeviceInfo(
+            host=device.ip_address,
+            username=device.ssh_username or "admin",
+            password=device.ssh_password,
+            secret=device.enable_password,
+            port=int(device.ssh_port or 22),
+            device_type=device.device_type or "cisco_ios",
+        )
+    )
+    if not conn.connect():
+        raise ConnectionError(conn.last_error or "SSH connect failed")
+    try:
+        vrfs = conn.get_vrfs()
+        routes: List[Dict[str, Any]] = []
+        arp: List[Dict[str, Any]] = []
+        complete = True
+        for vrf in [None] + list(vrfs):
+            table = conn.get_route_table(vrf=vrf)
+            if table is None:
+                complete = False
+                continue
+            routes.extend(dict(r, vrf=vrf) for r in table)
+            arp.extend(dict(a, vrf=vrf) for a in conn.get_arp_table(vrf=vrf))
+        interface_vrfs = conn.get_vrf_interfaces() if vrfs else {}
+    finally:
+        conn.disconnect()
+    if not routes and not complete:
+        return None
+    return {"source": "ssh", "routes": routes, "arp": arp, "vrfs": vrfs, "interface_vrfs": interface_vrfs}
+
+
+def collect_device_tables(db: Session, device: Device, now: Optional[datetime] = None) -> DeviceL3Table:
+    """Collect (SNMP first, SSH otherwise) and store the device's L3 tables; caller commits."""
+    now = now or datetime.now()
+    row = db.get(DeviceL3Table, device.id)
+    if row is None:
+        row = DeviceL3Table(device_id=device.id)
+        db.add(row)
+    data = None
+    error = None
+    for collector in (collect_snmp, collect_ssh):
+        try:
+            data = collector(device)
+        except Exception as e:
+            error = f"{collector.__name__}: {type(e).__name__}: {e}"
+            logger.debug("L3 table collection failed", extra={"device_id": device.id}, exc_info=True)
+            data = None
+        if data:
+            break
+    if not data:
+        row.error = error or "no route table available"
+        return row
+
+    routes = data.get("routes") or []
+    row.source = data.get("source")
+    row.route_count = len(routes)
+    row.routes = routes if len(routes) <= ROUTE_TABLE_MAX_ROUTES else None
+    row.arp = (data.get("arp") or [])[:ROUTE_TABLE_MAX_ROUTES]
+    row.vrfs = list(data.get("vrfs") or [])
+    row.interface_vrfs = dict(data.get("interface_vrfs") or {})
+    row.collected_at = now
+    row.error = None
+    route_lookup_cache.invalidate(device.id)
+    return row
+
+
+def l3_device_ids(db: Session) -> Iterable[int]:
+    """Devices with at least one addressed (L3) interface: the ones path trace routes through."""
+    from app.models.device import Interface
+
+    rows = (
+        db.query(Interface.device_id)
+        .filter(Interface.ip_address.isnot(None), Interface.ip_address.like("%/%"))
+        .distinct()
+        .all()
+    )
+    return [int(r[0]) for r in rows if r[0] is not None]
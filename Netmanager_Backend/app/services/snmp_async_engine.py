@@ -0,0 +1,303 @@
+"""
+Shared asyncio SNMP engine.
+
+Every SNMPv1/v2c request in the process goes out through one UDP socket per
+address family, driven by one event loop running in a daemon thread. Replies are
+matched back to their waiting coroutine by request-id, so thousands of requests
+can be in flight at once without a thread per device.
+
+Synchronous callers (``SnmpManager``'s public methods, discovery, neighbor crawl)
+submit coroutines with ``run_sync``; async callers simply ``await`` the engine.
+SNMPv3 is not handled here and stays on pysnmp's hlapi (see ``SnmpManager``).
+"""
+from __future__ import annotations
+
+import asyncio
+import ipaddress
+import itertools
+import logging
+import os
+import random
+import socket
+import threading
+from typing import Any, Awaitable, Dict, List, Optional, Tuple
+
+try:
+    from pyasn1.codec.ber import decoder as ber_decoder
+    from pyasn1.codec.ber import encoder as ber_encoder
+    from pysnmp.proto import api as snmp_api
+    from pysnmp.proto import rfc1905
+except Exception:  # pragma: no cover
+    ber_decoder = None
+    ber_encoder = None
+    snmp_api = None
+    rfc1905 = None
+
+logger = logging.getLogger(__name__)
+
+# (errorIndication, errorStatus, errorIndex, varBinds) - same shape as pysnmp hlapi
+SnmpResponse = Tuple[Optional[str], int, int, List[Tuple[Any, Any]]]
+
+
+def is_end_of_view(value) -> bool:
+    """True for the v2c exception values that terminate a walk."""
+    if rfc1905 is None:
+        return False
+    return isinstance(value, (rfc1905.EndOfMibView, rfc1905.NoSuchObject, rfc1905.NoSuchInstance))
+
+
+async def with_deadline(aw: Awaitable, deadline: float | None):
+    """Await ``aw`` but give up after ``deadline`` seconds (raises asyncio.TimeoutError)."""
+    if not deadline or deadline <= 0:
+        return await aw
+    return await asyncio.wait_for(aw, timeout=float(deadline))
+
+
+class _SnmpDatagramProtocol(asyncio.DatagramProtocol):
+    def __init__(self, engine: "AsyncSnmpEngine"):
+        self._engine = engine
+
+    def datagram_received(self, data, addr):
+        self._engine._on_datagram(data, addr)
+
+    def error_received(self, exc):
+        # ICMP port unreachable etc. - the request simply times out.
+        return
+
+
+class AsyncSnmpEngine:
+    def __init__(self, max_inflight: int | None = None):
+        self.max_inflight = int(max_inflight or os.getenv("SNMP_ASYNC_MAX_INFLIGHT", "2000"))
+        self._lock = threading.Lock()
+        self._pid = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._thread: threading.Thread | None = None
+        self._transports: Dict[int, asyncio.DatagramTransport] = {}
+        self._transport_lock: asyncio.Lock | None = None
+        self._semaphore: asyncio.Semaphore | None = None
+        self._pending: Dict[int, Tuple[asyncio.Future, Optional[str], int]] = {}
+        self._request_ids = itertools.count(random.randint(1, 1 << 24))
+        self.stats = {"sent": 0, "received": 0, "timeouts": 0}
+
+    @property
+    def available(self) -> bool:
+        return snmp_api is not None and ber_encoder is not None
+
+    # ------------------------------------------------------------------ loop
+    def loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is not None and self._pid == os.getpid() and self._thread and self._thread.is_alive():
+                return self._loop
+            # First use, or we are a forked child (Celery prefork): start a fresh loop.
+            self._pid = os.getpid()
+            self._transports = {}
+            self._pending = {}
+            self._transport_lock = None
+            self._semaphore = None
+            loop = asyncio.new_event_loop()
+            ready = threading.Event()
+
+            def _run():
+                asyncio.set_event_loop(loop)
+                loop.call_soon(ready.set)
+                loop.run_forever()
+
+            self._thread = threading.Thread(target=_run, name="snmp-async-engine", daemon=True)
+            self._thread.start()
+            ready.wait(5.0)
+            self._loop = loop
+            return loop
+
+    def _in_engine_loop(self) -> bool:
+        try:
+            return asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            return False
+
+    def run_sync(self, aw: Awaitable, timeout: float | None = None):
+        """Run a coroutine on the engine loop from synchronous code and wait for it."""
+        loop = self.loop()
+        if self._in_engine_loop():
+            raise RuntimeError("run_sync() called from the SNMP engine loop; await the coroutine instead")
+        fut = asyncio.run_coroutine_threadsafe(aw, loop)
+        try:
+            return fut.result(timeout)
+        except BaseException:
+            fut.cancel()
+            raise
+
+    async def _on_engine_loop(self, aw: Awaitable):
+        if self._in_engine_loop():
+            return await aw
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(aw, self.loop()))
+
+    # ------------------------------------------------------------- transport
+    async def _transport_for(self, host: str) -> asyncio.DatagramTransport:
+        family = socket.AF_INET6 if ":" in str(host) else socket.AF_INET
+        transport = self._transports.get(family)
+        if transport is not None and not transport.is_closing():
+            return transport
+        if self._transport_lock is None:
+            self._transport_lock = asyncio.Lock()
+        async with self._transport_lock:
+            transport = self._transports.get(family)
+            if transport is None or transport.is_closing():
+                local = ("::", 0) if family == socket.AF_INET6 else ("0.0.0.0", 0)
+                transport, _ = await asyncio.get_running_loop().create_datagram_endpoint(
+                    lambda: _SnmpDatagramProtocol(self),
+                    local_addr=local,
+                    family=family,
+                )
+                self._transports[family] = transport
+            return transport
+
+    def _on_datagram(self, data: bytes, addr) -> None:
+        try:
+            version = int(snmp_api.decodeMessageVersion(data))
+            proto = snmp_api.protoModules[version]
+            msg, _ = ber_decoder.decode(data, asn1Spec=proto.Message())
+            pdu = proto.apiMessage.getPDU(msg)
+            request_id = int(proto.apiPDU.getRequestID(pdu))
+        except Exception:
+            return
+        entry = self._pending.get(request_id)
+        if entry is None:
+            return
+        fut, expected_ip, expected_port = entry
+        try:
+            if expected_port and int(addr[1]) != expected_port:
+                return
+            if expected_ip and ipaddress.ip_address(addr[0]) != ipaddress.ip_address(expected_ip):
+                return
+        except Exception:
+            return
+        self.stats["received"] += 1
+        if not fut.done():
+            fut.set_result((proto, pdu))
+
+    def _next_request_id(self) -> int:
+        while True:
+            rid = next(self._request_ids) & 0x7FFFFFFF
+            if rid and rid not in self._pending:
+                return rid
+
+    # -------------------------------------------------------------- requests
+    async def _send(
+        self,
+        host: str,
+        port: int,
+        community: str,
+        mp_model: int,
+        build_pdu,
+        timeout: float,
+        retries: int,
+    ) -> SnmpResponse:
+        if not self.available:
+            return ("snmpUnavailable", 0, 0, [])
+        proto = snmp_api.protoModules[snmp_api.protoVersion1 if int(mp_model) == 0 else snmp_api.protoVersion2c]
+        pdu = build_pdu(proto)
+        request_id = self._next_request_id()
+        proto.apiPDU.setRequestID(pdu, request_id)
+        msg = proto.Message()
+        proto.apiMessage.setDefaults(msg)
+        proto.apiMessage.setCommunity(msg, community)
+        proto.apiMessage.setPDU(msg, pdu)
+        payload = ber_encoder.encode(msg)
+
+        try:
+            expected_ip = str(ipaddress.ip_address(host))
+        except ValueError:
+            expected_ip = None
+
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_inflight)
+        loop = asyncio.get_running_loop()
+        transport = await self._transport_for(host)
+        reply = None
+        async with self._semaphore:
+            for _ in range(max(0, int(retries)) + 1):
+                fut = loop.create_future()
+                self._pending[request_id] = (fut, expected_ip, int(port))
+                try:
+                    transport.sendto(payload, (host, int(port)))
+                    self.stats["sent"] += 1
+                    reply = await asyncio.wait_for(fut, timeout=float(timeout))
+                    break
+                except asyncio.TimeoutError:
+                    continue
+                except OSError as e:
+                    return (str(e), 0, 0, [])
+                finally:
+                    self._pending.pop(request_id, None)
+        if reply is None:
+            self.stats["timeouts"] += 1
+            return ("requestTimedOut", 0, 0, [])
+
+        rsp_proto, rsp_pdu = reply
+        error_status = int(rsp_proto.apiPDU.getErrorStatus(rsp_pdu))
+        error_index = int(rsp_proto.apiPDU.getErrorIndex(rsp_pdu))
+        return (None, error_status, error_index, list(rsp_proto.apiPDU.getVarBinds(rsp_pdu)))
+
+    async def get(
+        self,
+        host: str,
+        port: int,
+        community: str,
+        oids: List[str],
+        *,
+        mp_model: int = 1,
+        timeout: float = 2.0,
+        retries: int = 2,
+    ) -> SnmpResponse:
+        def _build(proto):
+            pdu = proto.GetRequestPDU()
+            proto.apiPDU.setDefaults(pdu)
+            proto.apiPDU.setVarBinds(pdu, [(oid, proto.Null("")) for oid in oids])
+            return pdu
+
+        return await self._on_engine_loop(self._send(host, port, community, mp_model, _build, timeout, retries))
+
+    async def get_next(
+        self,
+        host: str,
+        port: int,
+        community: str,
+        oids: List[str],
+        *,
+        mp_model: int = 1,
+        timeout: float = 2.0,
+        retries: int = 2,
+    ) -> SnmpResponse:
+        def _build(proto):
+            pdu = proto.GetNextRequestPDU()
+            proto.apiPDU.setDefaults(pdu)
+            proto.apiPDU.setVarBinds(pdu, [(oid, proto.Null("")) for oid in oids])
+            return pdu
+
+        return await self._on_engine_loop(self._send(host, port, community, mp_model, _build, timeout, retries))
+
+    async def get_bulk(
+        self,
+        host: str,
+        port: int,
+        community: str,
+        oids: List[str],
+        *,
+        non_repeaters: int = 0,
+        max_repetitions: int = 25,
+        timeout: float = 2.0,
+        retries: int = 2,
+    ) -> SnmpResponse:
+        """GETBULK (SNMPv2c only)."""
+        def _build(proto):
+            pdu = proto.GetBulkRequestPDU()
+            proto.apiBulkPDU.setDefaults(pdu)
+            proto.apiBulkPDU.setNonRepeaters(pdu, int(non_repeaters))
+            proto.apiBulkPDU.setMaxRepetitions(pdu, int(max_repetitions))
+            proto.apiBulkPDU.setVarBinds(pdu, [(oid, proto.Null("")) for oid in oids])
+            return pdu
+
+        return await self._on_engine_loop(self._send(host, port, community, 1, _build, timeout, retries))
+
+
+snmp_async_engine = AsyncSnmpEngine()
@@ -0,0 +1,174 @@
+"""
+Concurrent SNMP credential probing for discovery.
+
+Instead of trying the job profile and then every ``credential_pool`` entry one
+after another (each miss costs timeout x retries), ``race_system_info`` sends the
+sysDescr/sysObjectID/sysName GET for all candidates at once on the shared asyncio
+engine and returns the first one that answers. The rest are cancelled.
+
+``SubnetCredentialMemory`` remembers which candidate answered per /24 (/64 for
+IPv6). That candidate is launched first with a short head start, so sibling
+hosts usually succeed with a single request and the race only fans out when the
+remembered credential does not work. Pool profiles (``profile_id``) are persisted
+in ``discovery_subnet_credentials`` for later jobs; the job's own profile is only
+remembered for the running job.
+"""
+from __future__ import annotations
+
+import asyncio
+import ipaddress
+import logging
+import os
+import threading
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+RACE_WIDTH = max(1, int(os.getenv("DISCOVERY_SNMP_RACE_WIDTH", "16")))
+HEAD_START_SEC = max(0.0, float(os.getenv("DISCOVERY_SNMP_HEAD_START_SEC", "0.5")))
+
+JOB_PROFILE = "job"
+CandidateKey = Union[int, str]
+
+
+def subnet_key(ip: str) -> Optional[str]:
+    try:
+        addr = ipaddress.ip_address(str(ip).strip())
+    except ValueError:
+        return None
+    prefix = 24 if addr.version == 4 else 64
+    return str(ipaddress.ip_network(f"{addr}/{prefix}", strict=False))
+
+
+def candidate_key(profile: dict) -> CandidateKey:
+    pid = (profile or {}).get("profile_id")
+    try:
+        return int(pid)
+    except (TypeError, ValueError):
+        return JOB_PROFILE
+
+
+class SubnetCredentialMemory:
+    """Thread-safe subnet -> candidate key map shared by the discovery workers of one service."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._by_subnet: Dict[str, CandidateKey] = {}
+        self._learned: Dict[str, int] = {}
+
+    def preferred(self, ip: str) -> Optional[CandidateKey]:
+        key = subnet_key(ip)
+        if key is None:
+            return None
+        with self._lock:
+            return self._by_subnet.get(key)
+
+    def preferred_index(self, ip: str, candidates: List[dict]) -> Optional[int]:
+        want = self.preferred(ip)
+        if want is None:
+            return None
+        for i, p in enumerate(candidates):
+            if candidate_key(p) == want:
+                return i
+        return None
+
+    def remember(self, ip: str, key: CandidateKey) -> None:
+        subnet = subnet_key(ip)
+        if subnet is None:
+            return
+        with self._lock:
+            self._by_subnet[subnet] = key
+            if isinstance(key, int):
+                self._learned[subnet] = key
+
+    def load(self, db) -> int:
+        from app.models.discovery import DiscoverySubnetCredential
+
+        rows = db.query(DiscoverySubnetCredential.subnet, DiscoverySubnetCredential.snmp_profile_id).all()
+        with self._lock:
+            for subnet, profile_id in rows:
+                if subnet and profile_id is not None:
+                    self._by_subnet.setdefault(str(subnet), int(profile_id))
+        return len(rows)
+
+    def save(self, db) -> int:
+        """Upsert the pool profiles learned since the last save (caller commits)."""
+        from app.models.discovery import DiscoverySubnetCredential
+
+        with self._lock:
+            learned = dict(self._learned)
+            self._learned.clear()
+        for subnet, profile_id in learned.items():
+            row = db.get(DiscoverySubnetCredential, subnet)
+            if row is None:
+                db.add(DiscoverySubnetCredential(subnet=subnet, snmp_profile_id=profile_id, hits=1))
+            else:
+                row.hits = (1 if row.snmp_profile_id != profile_id else int(row.hits or 0) + 1)
+                row.snmp_profile_id = profile_id
+        return len(learned)
+
+
+async def _probe(snmp):
+    aget = getattr(snmp, "aget_system_info", None)
+    if aget is not None:
+        return await aget()
+    return await asyncio.to_thread(snmp.get_system_info)
+
+
+async def race_system_info(
+    candidates: List[dict],
+    make_manager: Callable[[dict], object],
+    preferred_index: Optional[int] = None,
+    head_start: float = HEAD_START_SEC,
+    width: int = RACE_WIDTH,
+) -> Tuple[Optional[int], object, Optional[dict]]:
+    """
+    Probe ``candidates`` concurrently (at most ``width`` in flight) and return
+    ``(index, manager, sysinfo)`` of the first valid reply, or ``(None, None, None)``.
+    ``preferred_index`` is launched alone first and the others join after
+    ``head_start`` seconds or as soon as it fails.
+    """
+    order = list(range(len(candidates)))
+    if preferred_index is not None and 0 <= preferred_index < len(order):
+        order.remove(preferred_index)
+        order.insert(0, preferred_index)
+    else:
+        preferred_index = None
+    queue = iter(order)
+    pending: Dict[asyncio.Future, Tuple[int, object]] = {}
+
+    def launch() -> bool:
+        idx = next(queue, None)
+        if idx is None:
+            return False
+        try:
+            snmp = make_manager(candidates[idx])
+        except Exception:
+            logger.debug("SNMP manager build failed", extra={"candidate": idx}, exc_info=True)
+            return True
+        pending[asyncio.ensure_future(_probe(snmp))] = (idx, snmp)
+        return True
+
+    loop = asyncio.get_running_loop()
+    limit = 1 if (preferred_index is not None and head_start > 0) else max(1, int(width))
+    head_start_until = loop.time() + head_start
+    try:
+        while True:
+            while len(pending) < limit and launch():
+                pass
+            if not pending:
+                return None, None, None
+            timeout = max(0.0, head_start_until - loop.time()) if limit == 1 and width > 1 else None
+            done, _ = await asyncio.wait(list(pending), timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            limit = max(1, int(width))
+            for task in done:
+                idx, snmp = pending.pop(task)
+                try:
+                    sysinfo = task.result()
+                except Exception:
+                    sysinfo = None
+                if sysinfo:
+                    return idx, snmp, sysinfo
+    finally:
+        for task in pending:
+            task.cancel()
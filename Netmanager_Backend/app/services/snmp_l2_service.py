@@ -31,6 +31,30 @@ class SnmpL2Service:
     IF_NAME = "1.3.6.1.2.1.31.1.1.1.1"
     IF_DESCR = "1.3.6.1.2.1.2.2.1.2"
 
+    @staticmethod
+    def _walk_oids(snmp: SnmpManager, oids: List[str], max_rows: int) -> Dict[str, Dict[str, str]]:
+        """Walk several subtrees in one bulk stream when the client supports it."""
+        walk_oids = getattr(snmp, "walk_oids", None)
+        if callable(walk_oids):
+            return walk_oids(oids, max_rows=max_rows) or {}
+        return {oid: snmp.walk_oid(oid, max_rows=max_rows) for oid in oids}
+
+    @staticmethod
+    def _walk_table_columns(snmp: SnmpManager, columns: List[str]) -> Dict[str, Dict[int, str]]:
+        walk_table_columns = getattr(snmp, "walk_table_columns", None)
+        if callable(walk_table_columns):
+            return walk_table_columns(columns) or {}
+        return {col: snmp.walk_table_column(col) for col in columns}
+
+    @staticmethod
+    def _bridge_port_and_if_names(snmp: SnmpManager) -> Tuple[Dict[int, str], Dict[int, str]]:
+        cols = SnmpL2Service._walk_table_columns(
+            snmp, [SnmpL2Service.DOT1D_BASE_PORT_IFINDEX, SnmpL2Service.IF_NAME]
+        )
+        bridge_port_to_ifindex = cols.get(SnmpL2Service.DOT1D_BASE_PORT_IFINDEX) or {}
+        if_names = cols.get(SnmpL2Service.IF_NAME) or snmp.walk_table_column(SnmpL2Service.IF_DESCR)
+        return bridge_port_to_ifindex, if_names
+
     @staticmethod
     def _oid_suffix(oid: str, base: str) -> List[str]:
         if not oid.startswith(base + "."):
@@ -85,14 +109,26 @@ class SnmpL2Service:
         if not snmp:
             return []
 
-        loc_port_id = snmp.walk_table_column(SnmpL2Service.LLDP_LOC_PORT_ID)
-        loc_port_desc = snmp.walk_table_column(SnmpL2Service.LLDP_LOC_PORT_DESC)
-
-        sys_names = snmp.walk_oid(SnmpL2Service.LLDP_REM_SYS_NAME, max_rows=max_rows)
-        port_ids = snmp.walk_oid(SnmpL2Service.LLDP_REM_PORT_ID, max_rows=max_rows)
-        chassis_subtypes = snmp.walk_oid(SnmpL2Service.LLDP_REM_CHASSIS_ID_SUBTYPE, max_rows=max_rows)
-        chassis_ids = snmp.walk_oid(SnmpL2Service.LLDP_REM_CHASSIS_ID, max_rows=max_rows)
-        man_addrs = snmp.walk_oid(SnmpL2Service.LLDP_REM_MAN_ADDR, max_rows=max_rows)
+        loc = SnmpL2Service._walk_table_columns(snmp, [SnmpL2Service.LLDP_LOC_PORT_ID, SnmpL2Service.LLDP_LOC_PORT_DESC])
+        loc_port_id = loc.get(SnmpL2Service.LLDP_LOC_PORT_ID) or {}
+        loc_port_desc = loc.get(SnmpL2Service.LLDP_LOC_PORT_DESC) or {}
+
+        rem = SnmpL2Service._walk_oids(
+            snmp,
+            [
+                SnmpL2Service.LLDP_REM_SYS_NAME,
+                SnmpL2Service.LLDP_REM_PORT_ID,
+                SnmpL2Service.LLDP_REM_CHASSIS_ID_SUBTYPE,
+                SnmpL2Service.LLDP_REM_CHASSIS_ID,
+                SnmpL2Service.LLDP_REM_MAN_ADDR,
+            ],
+            max_rows,
+        )
+        sys_names = rem.get(SnmpL2Service.LLDP_REM_SYS_NAME) or {}
+        port_ids = rem.get(SnmpL2Service.LLDP_REM_PORT_ID) or {}
+        chassis_subtypes = rem.get(SnmpL2Service.LLDP_REM_CHASSIS_ID_SUBTYPE)
+        chassis_ids = rem.get(SnmpL2Service.LLDP_REM_CHASSIS_ID)
+        man_addrs = rem.get(SnmpL2Service.LLDP_REM_MAN_ADDR)
 
         def local_name(local_port_num: int) -> str:
             return str(loc_port_id.get(local_port_num) or loc_port_desc.get(local_port_num) or "").strip()
@@ -216,10 +252,20 @@ class SnmpL2Service:
         if not snmp:
             return []
 
-        addrs = snmp.walk_oid(SnmpL2Service.CDP_CACHE_ADDRESS, max_rows=max_rows)
-        dev_ids = snmp.walk_oid(SnmpL2Service.CDP_CACHE_DEVICE_ID, max_rows=max_rows)
-        dev_ports = snmp.walk_oid(SnmpL2Service.CDP_CACHE_DEVICE_PORT, max_rows=max_rows)
-        sys_names = snmp.walk_oid(SnmpL2Service.CDP_CACHE_SYS_NAME, max_rows=max_rows)
+        cache = SnmpL2Service._walk_oids(
+            snmp,
+            [
+                SnmpL2Service.CDP_CACHE_ADDRESS,
+                SnmpL2Service.CDP_CACHE_DEVICE_ID,
+                SnmpL2Service.CDP_CACHE_DEVICE_PORT,
+                SnmpL2Service.CDP_CACHE_SYS_NAME,
+            ],
+            max_rows,
+        )
+        addrs = cache.get(SnmpL2Service.CDP_CACHE_ADDRESS)
+        dev_ids = cache.get(SnmpL2Service.CDP_CACHE_DEVICE_ID)
+        dev_ports = cache.get(SnmpL2Service.CDP_CACHE_DEVICE_PORT)
+        sys_names = cache.get(SnmpL2Service.CDP_CACHE_SYS_NAME)
 
         by_key: Dict[Tuple[int, int], Dict[str, Any]] = {}
 
@@ -298,8 +344,7 @@ class SnmpL2Service:
         if not snmp:
             return []
 
-        bridge_port_to_ifindex = snmp.walk_table_column(SnmpL2Service.DOT1D_BASE_PORT_IFINDEX)
-        if_names = snmp.walk_table_column(SnmpL2Service.IF_NAME) or snmp.walk_table_column(SnmpL2Service.IF_DESCR)
+        bridge_port_to_ifindex, if_names = SnmpL2Service._bridge_port_and_if_names(snmp)
 
         fdb_port = snmp.walk_oid(SnmpL2Service.DOT1D_TP_FDB_PORT, max_rows=max_rows)
         if not fdb_port:
@@ -333,8 +378,7 @@ class SnmpL2Service:
         if not snmp:
             return []
 
-        bridge_port_to_ifindex = snmp.walk_table_column(SnmpL2Service.DOT1D_BASE_PORT_IFINDEX)
-        if_names = snmp.walk_table_column(SnmpL2Service.IF_NAME) or snmp.walk_table_column(SnmpL2Service.IF_DESCR)
+        bridge_port_to_ifindex, if_names = SnmpL2Service._bridge_port_and_if_names(snmp)
 
         vlan_fdb = snmp.walk_oid(SnmpL2Service.DOT1Q_VLAN_FDB_ID, max_rows=max_rows)
         fdbid_to_vlan: Dict[int, int] = {}
@@ -350,10 +394,13 @@ class SnmpL2Service:
             if fdbid > 0 and vlan > 0:
                 fdbid_to_vlan[fdbid] = vlan
 
-        fdb_port = snmp.walk_oid(SnmpL2Service.DOT1Q_TP_FDB_PORT, max_rows=max_rows)
+        fdb = SnmpL2Service._walk_oids(
+            snmp, [SnmpL2Service.DOT1Q_TP_FDB_PORT, SnmpL2Service.DOT1Q_TP_FDB_STATUS], max_rows
+        )
+        fdb_port = fdb.get(SnmpL2Service.DOT1Q_TP_FDB_PORT)
         if not fdb_port:
             return []
-        fdb_status = snmp.walk_oid(SnmpL2Service.DOT1Q_TP_FDB_STATUS, max_rows=max_rows)
+        fdb_status = fdb.get(SnmpL2Service.DOT1Q_TP_FDB_STATUS) or {}
 
         results: List[Dict[str, Any]] = []
         for oid, port_val in fdb_port.items():
@@ -1,9 +1,12 @@
-from typing import Dict
+from typing import Dict, List, Tuple
+import asyncio
+import os
 import re
+import threading
 try:
     from pysnmp.hlapi import (
         SnmpEngine, CommunityData, UdpTransportTarget, ContextData,
-        ObjectType, ObjectIdentity, getCmd, nextCmd,
+        ObjectType, ObjectIdentity, getCmd, nextCmd, bulkCmd,
         UsmUserData,
         usmNoAuthProtocol, usmHMACMD5AuthProtocol, usmHMACSHAAuthProtocol,
         usmNoPrivProtocol, usmDESPrivProtocol, usmAesCfb128Protocol
@@ -17,6 +20,7 @@ except Exception:
     ObjectIdentity = None
     getCmd = None
     nextCmd = None
+    bulkCmd = None
     UsmUserData = None
     usmNoAuthProtocol = None
     usmHMACMD5AuthProtocol = None
@@ -25,7 +29,56 @@ except Exception:
     usmDESPrivProtocol = None
     usmAesCfb128Protocol = None
 
+from app.services.snmp_async_engine import snmp_async_engine, is_end_of_view
+
+SNMP_TIMEOUT_SEC = float(os.getenv("SNMP_TIMEOUT_SEC", "2.0"))
+SNMP_RETRIES = int(os.getenv("SNMP_RETRIES", "2"))
+SNMP_BULK_MAX_REPETITIONS = int(os.getenv("SNMP_BULK_MAX_REPETITIONS", "25"))
+
+IF_NAME = '1.3.6.1.2.1.31.1.1.1.1'
+IF_DESCR = '1.3.6.1.2.1.2.2.1.2'
+IF_PHYS_ADDRESS = '1.3.6.1.2.1.2.2.1.6'
+IF_OPER_STATUS = '1.3.6.1.2.1.2.2.1.8'
+IF_IN_OCTETS = '1.3.6.1.2.1.2.2.1.10'
+IF_IN_DISCARDS = '1.3.6.1.2.1.2.2.1.13'
+IF_IN_ERRORS = '1.3.6.1.2.1.2.2.1.14'
+IF_OUT_OCTETS = '1.3.6.1.2.1.2.2.1.16'
+IF_OUT_DISCARDS = '1.3.6.1.2.1.2.2.1.19'
+IF_OUT_ERRORS = '1.3.6.1.2.1.2.2.1.20'
+IF_HC_IN_OCTETS = '1.3.6.1.2.1.31.1.1.1.6'
+IF_HC_OUT_OCTETS = '1.3.6.1.2.1.31.1.1.1.10'
+
+# errorStatus values the column walker reacts to
+_ERR_TOO_BIG = 1
+_ERR_NO_SUCH_NAME = 2
+
+_thread_engines = threading.local()
+
+
+def _shared_hlapi_engine():
+    """
+    One pysnmp SnmpEngine per thread, shared by every SnmpManager in it.
+    Only the SNMPv3 (hlapi) path needs it; SnmpEngine is not thread-safe.
+    """
+    if not SnmpEngine:
+        return None
+    eng = getattr(_thread_engines, "engine", None)
+    if eng is None:
+        eng = SnmpEngine()
+        _thread_engines.engine = eng
+    return eng
+
+
 class SnmpManager:
+    """
+    SNMP client for one target.
+
+    Every public method is a thin synchronous wrapper around its ``a``-prefixed
+    coroutine, which runs on the shared asyncio engine (``snmp_async_engine``).
+    Async callers (monitoring) should await the coroutines directly so many
+    targets can be polled concurrently on one loop.
+    """
+
     def __init__(
         self,
         target_ip,
@@ -39,6 +92,9 @@ class SnmpManager:
         v3_priv_proto: str | None = None,
         v3_priv_key: str | None = None,
         mp_model: int | None = None,
+        timeout: float | None = None,
+        retries: int | None = None,
+        max_repetitions: int | None = None,
     ):
         self.target = target_ip
         self.community = community
@@ -51,9 +107,26 @@ class SnmpManager:
         self.v3_priv_proto = (v3_priv_proto or "").strip() or None
         self.v3_priv_key = v3_priv_key
         self.mp_model = mp_model
-        # Shared SNMP Engine is generally okay for sync, or new per request if very infrequent
-        # But creating new engine per request is safer for thread-safety in simple scripts
-        self.snmp_engine = SnmpEngine() if SnmpEngine else None
+        self.timeout = float(timeout) if timeout is not None else SNMP_TIMEOUT_SEC
+        self.retries = int(retries) if retries is not None else SNMP_RETRIES
+        self.max_repetitions = max(1, int(max_repetitions if max_repetitions is not None else SNMP_BULK_MAX_REPETITIONS))
+
+    def _is_v3(self) -> bool:
+        return self.version in ("v3", "3") or bool(self.v3_username)
+
+    def _is_v1(self) -> bool:
+        return self.version in ("v1", "1")
+
+    def _uses_async_transport(self) -> bool:
+        return (not self._is_v3()) and snmp_async_engine.available
+
+    def _resolve_mp_model(self) -> int:
+        if self.mp_model is not None:
+            return int(self.mp_model)
+        return 0 if self._is_v1() else 1
+
+    def _run(self, coro):
+        return snmp_async_engine.run_sync(coro)
 
     def _resolve_v3_protocols(self):
         auth_map = {
@@ -72,9 +145,9 @@ class SnmpManager:
         return auth_proto, priv_proto
 
     def _build_auth_data(self):
-        if not self.snmp_engine:
+        if not _shared_hlapi_engine():
             return None
-        if self.version in ("v3", "3") or self.v3_username:
+        if self._is_v3():
             if not UsmUserData or not self.v3_username:
                 return None
 
@@ -105,22 +178,23 @@ class SnmpManager:
 
         if not CommunityData:
             return None
-        if self.mp_model is not None:
-            return CommunityData(self.community, mpModel=int(self.mp_model))
-        return CommunityData(self.community, mpModel=1)
-
-    def _get_request(self, oids):
-        """SNMP GET (Synchronous)"""
-        if not self.snmp_engine or not getCmd:
+        return CommunityData(self.community, mpModel=self._resolve_mp_model())
+
+    # ------------------------------------------------------------------
+    # hlapi (synchronous) transport: SNMPv3, or when the async engine is unavailable
+    # ------------------------------------------------------------------
+    def _get_request_sync(self, oids):
+        engine = _shared_hlapi_engine()
+        if not engine or not getCmd:
             return None
         auth_data = self._build_auth_data()
         if not auth_data:
             return None
         try:
             iterator = getCmd(
-                self.snmp_engine,
+                engine,
                 auth_data,
-                UdpTransportTarget((self.target, self.port), timeout=2.0, retries=2),
+                UdpTransportTarget((self.target, self.port), timeout=self.timeout, retries=self.retries),
                 ContextData(),
                 *[ObjectType(ObjectIdentity(oid)) for oid in oids],
                 lookupMib=False
@@ -141,9 +215,178 @@ class SnmpManager:
         except Exception as e:
             return None
 
-    def check_status(self):
+    def _walk_columns_sync(self, columns: List[str], max_rows: int = 0) -> Dict[str, List[Tuple[str, str]]]:
+        rows: Dict[str, List[Tuple[str, str]]] = {c: [] for c in columns}
+        engine = _shared_hlapi_engine()
+        if not engine or not bulkCmd:
+            return rows
+        auth_data = self._build_auth_data()
+        if not auth_data:
+            return rows
+        prefixes = [c + "." for c in columns]
+        done = set()
+        try:
+            for (errorIndication, errorStatus, errorIndex, varBinds) in bulkCmd(
+                engine, auth_data,
+                UdpTransportTarget((self.target, self.port), timeout=self.timeout, retries=self.retries),
+                ContextData(),
+                0, self.max_repetitions,
+                *[ObjectType(ObjectIdentity(c)) for c in columns],
+                lexicographicMode=False, lookupMib=False
+            ):
+                if errorIndication or errorStatus:
+                    break
+                for i, varBind in enumerate(varBinds):
+                    col = columns[i % len(columns)]
+                    if col in done:
+                        continue
+                    oid = str(varBind[0])
+                    if not oid.startswith(prefixes[i % len(columns)]) or is_end_of_view(varBind[1]):
+                        done.add(col)
+                        continue
+                    rows[col].append((oid, str(varBind[1])))
+                    if max_rows and len(rows[col]) >= int(max_rows):
+                        done.add(col)
+                if len(done) == len(columns):
+                    break
+        except Exception:
+            return {c: [] for c in columns}
+        return rows
+
+    # ------------------------------------------------------------------
+    # Async primitives
+    # ------------------------------------------------------------------
+    async def _aget_request(self, oids):
+        """SNMP GET"""
+        if not self._uses_async_transport():
+            return await asyncio.to_thread(self._get_request_sync, oids)
+        try:
+            errorIndication, errorStatus, errorIndex, varBinds = await snmp_async_engine.get(
+                self.target,
+                int(self.port or 161),
+                self.community,
+                list(oids),
+                mp_model=self._resolve_mp_model(),
+                timeout=self.timeout,
+                retries=self.retries,
+            )
+        except Exception:
+            return None
+        if errorIndication or errorStatus:
+            return None
+        result = {}
+        for oid, val in varBinds:
+            result[str(oid)] = str(val)
+        return result
+
+    async def _awalk_columns(self, columns: List[str], max_rows: int = 0) -> Dict[str, List[Tuple[str, str]]]:
+        """
+        Walk several subtrees (typically columns of one table) in a single request stream.
+
+        v2c/v3 use GETBULK with ``max_repetitions`` rows per column per round trip; v1
+        agents get one multi-varbind GETNEXT per row. Each column stops on its own
+        (out of subtree, non-increasing OID, endOfMibView, ``max_rows``) and is dropped
+        from the following requests. Returns {column: [(oid, value), ...]}.
+        """
+        columns = list(dict.fromkeys(str(c).strip(".") for c in columns if str(c or "").strip(".")))
+        if not columns:
+            return {}
+        if not self._uses_async_transport():
+            return await asyncio.to_thread(self._walk_columns_sync, columns, max_rows)
+        try:
+            bases = {c: tuple(int(x) for x in c.split(".")) for c in columns}
+        except Exception:
+            return {c: [] for c in columns}
+
+        rows: Dict[str, List[Tuple[str, str]]] = {c: [] for c in columns}
+        cursor = {c: c for c in columns}
+        last = dict(bases)
+        active = list(columns)
+        mp_model = self._resolve_mp_model()
+        repetitions = self.max_repetitions
+        try:
+            while active:
+                if mp_model == 0:
+                    response = await snmp_async_engine.get_next(
+                        self.target,
+                        int(self.port or 161),
+                        self.community,
+                        [cursor[c] for c in active],
+                        mp_model=0,
+                        timeout=self.timeout,
+                        retries=self.retries,
+                    )
+                else:
+                    response = await snmp_async_engine.get_bulk(
+                        self.target,
+                        int(self.port or 161),
+                        self.community,
+                        [cursor[c] for c in active],
+                        max_repetitions=repetitions,
+                        timeout=self.timeout,
+                        retries=self.retries,
+                    )
+                errorIndication, errorStatus, errorIndex, varBinds = response
+                if errorIndication:
+                    break
+                if errorStatus:
+                    if mp_model == 0 and errorStatus == _ERR_NO_SUCH_NAME and 1 <= errorIndex <= len(active):
+                        # v1 reports the first column that ran off the end of the MIB
+                        active.pop(errorIndex - 1)
+                        continue
+                    if mp_model != 0 and errorStatus == _ERR_TOO_BIG and repetitions > 1:
+                        repetitions = max(1, repetitions // 2)
+                        continue
+                    break
+                if not varBinds:
+                    break
+
+                width = len(active)
+                finished = set()
+                progressed = False
+                for i, (oid, val) in enumerate(varBinds):
+                    col = active[i % width]
+                    if col in finished:
+                        continue
+                    oid_t = tuple(oid)
+                    if is_end_of_view(val) or oid_t[: len(bases[col])] != bases[col] or oid_t <= last[col]:
+                        finished.add(col)
+                        continue
+                    rows[col].append((str(oid), str(val)))
+                    last[col] = oid_t
+                    cursor[col] = str(oid)
+                    progressed = True
+                    if max_rows and len(rows[col]) >= int(max_rows):
+                        finished.add(col)
+                if not progressed and not finished:
+                    break
+                active = [c for c in active if c not in finished]
+        except Exception:
+            return {c: [] for c in columns}
+        return rows
+
+    async def _awalk(self, oid_str: str, max_rows: int = 0) -> List[Tuple[str, str]]:
+        """SNMP WALK of one subtree; returns [(oid, value), ...]."""
+        oid_str = str(oid_str).strip(".")
+        return (await self._awalk_columns([oid_str], max_rows=max_rows)).get(oid_str, [])
+
+    @staticmethod
+    def _rows_by_index(rows: List[Tuple[str, str]]) -> Dict[int, str]:
+        results: Dict[int, str] = {}
+        for oid, val in rows:
+            try:
+                idx = int(oid.split('.')[-1])
+                results[idx] = val
+            except Exception:
+                continue
+        return results
+
+    # ------------------------------------------------------------------
+    # Async API
+    # ------------------------------------------------------------------
+    async def acheck_status(self):
         oids = ['1.3.6.1.2.1.1.1.0', '1.3.6.1.2.1.1.3.0']
-        data = self._get_request(oids)
+        data = await self._aget_request(oids)
 
         if data:
             return {
@@ -154,16 +397,16 @@ class SnmpManager:
         else:
             return {"status": "offline"}
 
-    def get_oids(self, oids: list[str]) -> Dict[str, str] | None:
-        return self._get_request(oids)
+    async def aget_oids(self, oids: list[str]) -> Dict[str, str] | None:
+        return await self._aget_request(oids)
 
-    def get_system_info(self) -> Dict[str, str] | None:
+    async def aget_system_info(self) -> Dict[str, str] | None:
         oids = [
             '1.3.6.1.2.1.1.1.0',
             '1.3.6.1.2.1.1.2.0',
             '1.3.6.1.2.1.1.5.0',
         ]
-        data = self._get_request(oids)
+        data = await self._aget_request(oids)
         if not data:
             return None
         return {
@@ -172,107 +415,63 @@ class SnmpManager:
             "sysName": data.get('1.3.6.1.2.1.1.5.0', ''),
         }
 
-    def get_total_octets(self) -> Dict[str, int]:
+    async def aget_total_octets(self) -> Dict[str, int]:
         """
         Get sum of all interfaces octets (In/Out).
         Prioritizes HC (64-bit) counters.
-        Uses synchronous nextCmd walk.
         """
-        def _walk_sum(oid_str):
-            if not self.snmp_engine or not nextCmd:
-                return 0
-            auth_data = self._build_auth_data()
-            if not auth_data:
-                return 0
-            try:
-                total = 0
-                
-                # Synchronous Walk
-                for (errorIndication, errorStatus, errorIndex, varBinds) in nextCmd(
-                    self.snmp_engine,
-                    auth_data,
-                    UdpTransportTarget((self.target, self.port), timeout=2.0, retries=2),
-                    ContextData(),
-                    ObjectType(ObjectIdentity(oid_str)),
-                    lexicographicMode=False, lookupMib=False
-                ):
-                    if errorIndication or errorStatus:
-                        break
-                    
-                    for varBind in varBinds:
-                        # oid = varBind[0]
-                        value = varBind[1]
-                        try:
-                            total += int(value)
-                        except:
-                            pass
-                
-                return total
-            except Exception as e:
-                return 0
-
-        i64 = _walk_sum('1.3.6.1.2.1.31.1.1.1.6') # ifHCInOctets
-        o64 = _walk_sum('1.3.6.1.2.1.31.1.1.1.10') # ifHCOutOctets
-        
+        def _sum(values: Dict[int, str]) -> int:
+            total = 0
+            for value in values.values():
+                try:
+                    total += int(value)
+                except:
+                    pass
+            return total
+
+        cols = await self.awalk_table_columns([IF_HC_IN_OCTETS, IF_HC_OUT_OCTETS])
+        i64, o64 = _sum(cols[IF_HC_IN_OCTETS]), _sum(cols[IF_HC_OUT_OCTETS])
+
         if i64 == 0 and o64 == 0:
-            i32 = _walk_sum('1.3.6.1.2.1.2.2.1.10') # ifInOctets
-            o32 = _walk_sum('1.3.6.1.2.1.2.2.1.16') # ifOutOctets
-            return {"in": i32, "out": o32}
+            cols = await self.awalk_table_columns([IF_IN_OCTETS, IF_OUT_OCTETS])
+            return {"in": _sum(cols[IF_IN_OCTETS]), "out": _sum(cols[IF_OUT_OCTETS])}
         return {"in": i64, "out": o64}
 
-    @staticmethod
-    def normalize_interface_name(name: str) -> str:
-        s = str(name or "").strip()
-        if not s:
-            return ""
-        s = s.replace(" ", "")
-        low = s.lower()
-        mapping = {
-            "gi": "gigabitethernet",
-            "fa": "fastethernet",
-            "te": "tengigabitethernet",
-            "fo": "fortygigabitethernet",
-            "hu": "hundredgigabitethernet",
-            "et": "ethernet",
-            "po": "port-channel",
-            "portchannel": "port-channel",
-            "vl": "vlan",
-        }
-        for short, full in mapping.items():
-            if low.startswith(short) and not low.startswith(full):
-                import re
-                m = re.search(r"(\d.*)", s)
-                if m:
-                    return f"{full}{m.group(1)}"
-        return low
+    async def _aget_if_names(self) -> Dict[int, str]:
+        names_by_idx = await self.awalk_table_column(IF_NAME)
+        if not names_by_idx:
+            names_by_idx = await self.awalk_table_column(IF_DESCR)
+        return names_by_idx
 
-    @staticmethod
-    def normalize_mac(value) -> str:
-        if value is None:
-            return ""
-        if isinstance(value, (bytes, bytearray)):
-            b = bytes(value)
-            if len(b) < 6:
-                return ""
-            s = b[:6].hex()
-            return f"{s[0:4]}.{s[4:8]}.{s[8:12]}".lower()
-        s0 = str(value).strip()
-        if not s0:
-            return ""
-        s = s0.lower().replace("0x", "")
-        s = re.sub(r"[^0-9a-f]", "", s)
-        if len(s) < 12:
-            return ""
-        s = s[:12]
-        return f"{s[0:4]}.{s[4:8]}.{s[8:12]}".lower()
+    async def _aget_if_columns(self, columns: List[str]) -> Tuple[Dict[int, str], Dict[str, Dict[int, str]]]:
+        """
+        ifName plus ``columns`` in one bulk stream. Falls back to ifDescr for names and
+        to the 32-bit octet columns when the agent has no ifXTable HC counters.
+        Returns (names_by_idx, {column: {ifIndex: value}}).
+        """
+        cols = await self.awalk_table_columns([IF_NAME] + list(columns))
+        names_by_idx = cols.pop(IF_NAME, {})
 
-    def get_interface_phys_address_map(self) -> Dict[str, str]:
-        if not self.snmp_engine or not nextCmd:
-            return {}
-        names_by_idx = self.walk_table_column('1.3.6.1.2.1.31.1.1.1.1')  # ifName
+        retry: List[str] = []
         if not names_by_idx:
-            names_by_idx = self.walk_table_column('1.3.6.1.2.1.2.2.1.2')  # ifDescr
-        mac_by_idx = self.walk_table_column('1.3.6.1.2.1.2.2.1.6')  # ifPhysAddress
+            retry.append(IF_DESCR)
+        hc_pairs = [(IF_HC_IN_OCTETS, IF_IN_OCTETS), (IF_HC_OUT_OCTETS, IF_OUT_OCTETS)]
+        hc_wanted = [pair for pair in hc_pairs if pair[0] in cols]
+        if hc_wanted and not any(cols.get(hc) for hc, _ in hc_wanted):
+            retry.extend(legacy for _, legacy in hc_wanted)
+        if retry:
+            more = await self.awalk_table_columns(retry)
+            if not names_by_idx:
+                names_by_idx = more.pop(IF_DESCR, {})
+            for hc, legacy in hc_wanted:
+                if legacy in more:
+                    # the legacy column is kept too, so callers can tell the values are Counter32
+                    cols[hc] = cols[legacy] = more[legacy]
+        return names_by_idx, cols
+
+    async def aget_interface_phys_address_map(self) -> Dict[str, str]:
+        names_by_idx, cols = await self._aget_if_columns([IF_PHYS_ADDRESS])
+        mac_by_idx = cols[IF_PHYS_ADDRESS]
         if not names_by_idx or not mac_by_idx:
             return {}
         out: Dict[str, str] = {}
@@ -286,37 +485,27 @@ class SnmpManager:
                 out[norm] = mac
         return out
 
-    def get_mac_aliases(self) -> list[str]:
+    async def aget_mac_aliases(self) -> list[str]:
         macs = set()
         try:
-            bridge = (self.get_oids(["1.3.6.1.2.1.17.1.1.0"]) or {}).get("1.3.6.1.2.1.17.1.1.0")
+            bridge = ((await self.aget_oids(["1.3.6.1.2.1.17.1.1.0"])) or {}).get("1.3.6.1.2.1.17.1.1.0")
             m = self.normalize_mac(bridge)
             if m:
                 macs.add(m)
         except Exception:
             pass
         try:
-            for m in self.get_interface_phys_address_map().values():
+            for m in (await self.aget_interface_phys_address_map()).values():
                 if m:
                     macs.add(m)
         except Exception:
             pass
         return sorted(macs)
 
-    def get_interface_octets_map(self) -> Dict[str, Dict[str, int]]:
-        if not self.snmp_engine or not nextCmd:
-            return {}
-
-        names_by_idx = self.walk_table_column('1.3.6.1.2.1.31.1.1.1.1')  # ifName
-        if not names_by_idx:
-            names_by_idx = self.walk_table_column('1.3.6.1.2.1.2.2.1.2')  # ifDescr
-
-        in64_by_idx = self.walk_table_column('1.3.6.1.2.1.31.1.1.1.6')   # ifHCInOctets
-        out64_by_idx = self.walk_table_column('1.3.6.1.2.1.31.1.1.1.10') # ifHCOutOctets
-        use_32 = (not in64_by_idx) and (not out64_by_idx)
-        if use_32:
-            in64_by_idx = self.walk_table_column('1.3.6.1.2.1.2.2.1.10')  # ifInOctets
-            out64_by_idx = self.walk_table_column('1.3.6.1.2.1.2.2.1.16') # ifOutOctets
+    async def aget_interface_octets_map(self) -> Dict[str, Dict[str, int]]:
+        names_by_idx, cols = await self._aget_if_columns([IF_HC_IN_OCTETS, IF_HC_OUT_OCTETS])
+        in64_by_idx = cols[IF_HC_IN_OCTETS]
+        out64_by_idx = cols[IF_HC_OUT_OCTETS]
 
         result: Dict[str, Dict[str, int]] = {}
         for idx, name in names_by_idx.items():
@@ -334,25 +523,23 @@ class SnmpManager:
             result[n] = {"in": i, "out": o}
         return result
 
-    def get_interface_counters_map(self) -> Dict[str, Dict[str, int]]:
-        if not self.snmp_engine or not nextCmd:
-            return {}
-
-        names_by_idx = self.walk_table_column('1.3.6.1.2.1.31.1.1.1.1')  # ifName
-        if not names_by_idx:
-            names_by_idx = self.walk_table_column('1.3.6.1.2.1.2.2.1.2')  # ifDescr
-
-        in_octets_by_idx = self.walk_table_column('1.3.6.1.2.1.31.1.1.1.6')   # ifHCInOctets
-        out_octets_by_idx = self.walk_table_column('1.3.6.1.2.1.31.1.1.1.10') # ifHCOutOctets
-        use_32 = (not in_octets_by_idx) and (not out_octets_by_idx)
-        if use_32:
-            in_octets_by_idx = self.walk_table_column('1.3.6.1.2.1.2.2.1.10')  # ifInOctets
-            out_octets_by_idx = self.walk_table_column('1.3.6.1.2.1.2.2.1.16') # ifOutOctets
-
-        in_discards_by_idx = self.walk_table_column('1.3.6.1.2.1.2.2.1.13')  # ifInDiscards
-        in_errors_by_idx = self.walk_table_column('1.3.6.1.2.1.2.2.1.14')    # ifInErrors
-        out_discards_by_idx = self.walk_table_column('1.3.6.1.2.1.2.2.1.19') # ifOutDiscards
-        out_errors_by_idx = self.walk_table_column('1.3.6.1.2.1.2.2.1.20')   # ifOutErrors
+    async def aget_interface_counters_map(self) -> Dict[str, Dict[str, int]]:
+        names_by_idx, cols = await self._aget_if_columns([
+            IF_HC_IN_OCTETS,
+            IF_HC_OUT_OCTETS,
+            IF_IN_DISCARDS,
+            IF_IN_ERRORS,
+            IF_OUT_DISCARDS,
+            IF_OUT_ERRORS,
+        ])
+        in_octets_by_idx = cols[IF_HC_IN_OCTETS]
+        out_octets_by_idx = cols[IF_HC_OUT_OCTETS]
+        in_discards_by_idx = cols[IF_IN_DISCARDS]
+        in_errors_by_idx = cols[IF_IN_ERRORS]
+        out_discards_by_idx = cols[IF_OUT_DISCARDS]
+        out_errors_by_idx = cols[IF_OUT_ERRORS]
+        # no ifXTable: the octet values are the 32-bit ifTable counters
+        octet_bits = 32 if IF_IN_OCTETS in cols or IF_OUT_OCTETS in cols else 64
 
         result: Dict[str, Dict[str, int]] = {}
         for idx, name in names_by_idx.items():
@@ -392,9 +579,11 @@ class SnmpManager:
                 "in_discards": i_dis,
                 "out_discards": o_dis,
             }
+            if octet_bits == 32:
+                result[n]["counter_bits"] = {"in_octets": 32, "out_octets": 32}
         return result
 
-    def get_interface_counters_for_ports(self, ports: list[str]) -> Dict[str, Dict[str, int]]:
+    async def aget_interface_counters_for_ports(self, ports: list[str]) -> Dict[str, Dict[str, int]]:
         if not ports:
             return {}
         wanted = [self.normalize_interface_name(p) for p in ports if str(p or "").strip()]
@@ -402,7 +591,7 @@ class SnmpManager:
         if not wanted_set:
             return {}
 
-        counters = self.get_interface_counters_map()
+        counters = await self.aget_interface_counters_map()
         if not counters:
             return {}
 
@@ -418,6 +607,8 @@ class SnmpManager:
                     "in_discards": int(v.get("in_discards", 0) or 0),
                     "out_discards": int(v.get("out_discards", 0) or 0),
                 }
+                if v.get("counter_bits"):
+                    by_norm[norm]["counter_bits"] = v["counter_bits"]
 
         result: Dict[str, Dict[str, int]] = {}
         for p in wanted_set:
@@ -425,7 +616,7 @@ class SnmpManager:
                 result[p] = by_norm[p]
         return result
 
-    def get_interface_octets_for_ports(self, ports: list[str]) -> Dict[str, Dict[str, int]]:
+    async def aget_interface_octets_for_ports(self, ports: list[str]) -> Dict[str, Dict[str, int]]:
         if not ports:
             return {}
         wanted = [self.normalize_interface_name(p) for p in ports if str(p or "").strip()]
@@ -433,7 +624,7 @@ class SnmpManager:
         if not wanted_set:
             return {}
 
-        octets = self.get_interface_octets_map()
+        octets = await self.aget_interface_octets_map()
         if not octets:
             return {}
 
@@ -449,7 +640,7 @@ class SnmpManager:
                 result[p] = by_norm[p]
         return result
 
-    def get_resource_usage(self):
+    async def aget_resource_usage(self):
         """
         CPU, Memory, and Traffic Usage
         """
@@ -462,14 +653,15 @@ class SnmpManager:
         mem_free_oid = '1.3.6.1.4.1.9.9.48.1.1.1.6.1'
 
         target_oids = cpu_oids + [mem_used_oid, mem_free_oid]
-        data = self._get_request(target_oids)
-        
-        traffic = self.get_total_octets()
+        data, traffic = await asyncio.gather(
+            self._aget_request(target_oids),
+            self.aget_total_octets(),
+        )
 
         if not data:
             return {
                 "cpu_usage": 0, "memory_usage": 0, "temperature": 0.0,
-                "traffic_in": 0.0, "traffic_out": 0.0, 
+                "traffic_in": 0.0, "traffic_out": 0.0,
                 "raw_octets_in": traffic['in'], "raw_octets_out": traffic['out']
             }
 
@@ -496,81 +688,34 @@ class SnmpManager:
             "cpu_usage": cpu_val,
             "memory_usage": round(mem_percent, 2),
             "temperature": 0.0,
-            "traffic_in": 0.0, 
+            "traffic_in": 0.0,
             "traffic_out": 0.0,
-            "raw_octets_in": traffic['in'], 
+            "raw_octets_in": traffic['in'],
             "raw_octets_out": traffic['out']
         }
 
-    def get_interface_statuses(self) -> Dict[int, str]:
+    async def aget_interface_statuses(self) -> Dict[int, str]:
         """
-        SNMP WALK for ifOperStatus (Synchronous)
+        SNMP WALK for ifOperStatus
         """
-        if not self.snmp_engine or not nextCmd:
-            return {}
-        auth_data = self._build_auth_data()
-        if not auth_data:
-            return {}
-        try:
-            results = {}
-            for (errorIndication, errorStatus, errorIndex, varBinds) in nextCmd(
-                self.snmp_engine, auth_data,
-                UdpTransportTarget((self.target, self.port), timeout=2.0, retries=2),
-                ContextData(),
-                ObjectType(ObjectIdentity('1.3.6.1.2.1.2.2.1.8')),
-                lexicographicMode=False, lookupMib=False
-            ):
-                if errorIndication or errorStatus:
-                    break
-                for varBind in varBinds:
-                    oid = str(varBind[0])
-                    val = int(varBind[1])
-                    try:
-                        idx = int(oid.split('.')[-1])
-                        results[idx] = 'up' if val == 1 else 'down'
-                    except:
-                        continue
-            return results
-        except Exception:
-            return {}
+        return self._oper_status_by_index(await self.awalk_table_column(IF_OPER_STATUS))
 
-    def get_interface_name_status_map(self) -> Dict[str, str]:
+    @staticmethod
+    def _oper_status_by_index(values: Dict[int, str]) -> Dict[int, str]:
+        results = {}
+        for idx, val in values.items():
+            try:
+                results[idx] = 'up' if int(val) == 1 else 'down'
+            except:
+                continue
+        return results
+
+    async def aget_interface_name_status_map(self) -> Dict[str, str]:
         """
         Build mapping of interface name -> oper status ('up'/'down') using ifName (preferred) or ifDescr.
         """
-        def _walk_table(oid_str: str) -> Dict[int, str]:
-            if not self.snmp_engine or not nextCmd:
-                return {}
-            auth_data = self._build_auth_data()
-            if not auth_data:
-                return {}
-            results = {}
-            try:
-                for (errorIndication, errorStatus, errorIndex, varBinds) in nextCmd(
-                    self.snmp_engine, auth_data,
-                    UdpTransportTarget((self.target, self.port), timeout=2.0, retries=2),
-                    ContextData(),
-                    ObjectType(ObjectIdentity(oid_str)),
-                    lexicographicMode=False, lookupMib=False
-                ):
-                    if errorIndication or errorStatus:
-                        break
-                    for varBind in varBinds:
-                        oid = str(varBind[0])
-                        val = str(varBind[1])
-                        try:
-                            idx = int(oid.split('.')[-1])
-                            results[idx] = val
-                        except:
-                            continue
-            except Exception:
-                return {}
-            return results
-
-        status_by_idx = self.get_interface_statuses()
-        names_by_idx = _walk_table('1.3.6.1.2.1.31.1.1.1.1')  # ifName
-        if not names_by_idx:
-            names_by_idx = _walk_table('1.3.6.1.2.1.2.2.1.2')  # ifDescr
+        names_by_idx, cols = await self._aget_if_columns([IF_OPER_STATUS])
+        status_by_idx = self._oper_status_by_index(cols[IF_OPER_STATUS])
 
         result = {}
         for idx, name in names_by_idx.items():
@@ -579,67 +724,133 @@ class SnmpManager:
                 result[str(name).strip()] = st
         return result
 
-    def walk_table_column(self, oid_str: str) -> Dict[int, str]:
-        if not self.snmp_engine or not nextCmd:
-            return {}
-        auth_data = self._build_auth_data()
-        if not auth_data:
-            return {}
-        results: Dict[int, str] = {}
-        try:
-            for (errorIndication, errorStatus, errorIndex, varBinds) in nextCmd(
-                self.snmp_engine, auth_data,
-                UdpTransportTarget((self.target, self.port), timeout=2.0, retries=2),
-                ContextData(),
-                ObjectType(ObjectIdentity(oid_str)),
-                lexicographicMode=False, lookupMib=False
-            ):
-                if errorIndication or errorStatus:
-                    break
-                for varBind in varBinds:
-                    oid = str(varBind[0])
-                    val = str(varBind[1])
-                    try:
-                        idx = int(oid.split('.')[-1])
-                        results[idx] = val
-                    except Exception:
-                        continue
-        except Exception:
-            return {}
-        return results
+    async def awalk_table_column(self, oid_str: str) -> Dict[int, str]:
+        return self._rows_by_index(await self._awalk(oid_str))
 
-    def walk_oid(self, oid_str: str, max_rows: int = 5000) -> Dict[str, str]:
-        if not self.snmp_engine or not nextCmd:
-            return {}
-        auth_data = self._build_auth_data()
-        if not auth_data:
-            return {}
-        results: Dict[str, str] = {}
-        try:
-            count = 0
-            for (errorIndication, errorStatus, errorIndex, varBinds) in nextCmd(
-                self.snmp_engine, auth_data,
-                UdpTransportTarget((self.target, self.port), timeout=2.0, retries=2),
-                ContextData(),
-                ObjectType(ObjectIdentity(oid_str)),
-                lexicographicMode=False, lookupMib=False
-            ):
-                if errorIndication or errorStatus:
-                    break
-                for varBind in varBinds:
-                    results[str(varBind[0])] = str(varBind[1])
-                    count += 1
-                    if max_rows and count >= int(max_rows):
-                        return results
-        except Exception:
-            return {}
-        return results
+    async def awalk_oid(self, oid_str: str, max_rows: int = 5000) -> Dict[str, str]:
+        return dict(await self._awalk(oid_str, max_rows=max_rows))
 
-    def get_wlc_client_count(self) -> int:
-        data = self._get_request(['1.3.6.1.4.1.14179.2.1.1.1.38'])
+    async def awalk_table_columns(self, column_oids: List[str]) -> Dict[str, Dict[int, str]]:
+        """Bulk-walk several table columns at once; {column_oid: {last_sub_id: value}}."""
+        rows = await self._awalk_columns(column_oids)
+        return {col: self._rows_by_index(col_rows) for col, col_rows in rows.items()}
+
+    async def awalk_oids(self, oid_strs: List[str], max_rows: int = 5000) -> Dict[str, Dict[str, str]]:
+        """Bulk-walk several subtrees at once; {subtree_oid: {oid: value}} (``max_rows`` per subtree)."""
+        rows = await self._awalk_columns(oid_strs, max_rows=max_rows)
+        return {col: dict(col_rows) for col, col_rows in rows.items()}
+
+    async def aget_wlc_client_count(self) -> int:
+        data = await self._aget_request(['1.3.6.1.4.1.14179.2.1.1.1.38'])
         if data and '1.3.6.1.4.1.14179.2.1.1.1.38' in data:
             try:
                 return int(data['1.3.6.1.4.1.14179.2.1.1.1.38'])
             except:
                 pass
         return 0
+
+    # ------------------------------------------------------------------
+    # Sync API (thin wrappers)
+    # ------------------------------------------------------------------
+    def _get_request(self, oids):
+        return self._run(self._aget_request(oids))
+
+    def check_status(self):
+        return self._run(self.acheck_status())
+
+    def get_oids(self, oids: list[str]) -> Dict[str, str] | None:
+        return self._run(self.aget_oids(oids))
+
+    def get_system_info(self) -> Dict[str, str] | None:
+        return self._run(self.aget_system_info())
+
+    def get_total_octets(self) -> Dict[str, int]:
+        return self._run(self.aget_total_octets())
+
+    @staticmethod
+    def normalize_interface_name(name: str) -> str:
+        s = str(name or "").strip()
+        if not s:
+            return ""
+        s = s.replace(" ", "")
+        low = s.lower()
+        mapping = {
+            "gi": "gigabitethernet",
+            "fa": "fastethernet",
+            "te": "tengigabitethernet",
+            "fo": "fortygigabitethernet",
+            "hu": "hundredgigabitethernet",
+            "et": "ethernet",
+            "po": "port-channel",
+            "portchannel": "port-channel",
+            "vl": "vlan",
+        }
+        for short, full in mapping.items():
+            if low.startswith(short) and not low.startswith(full):
+                import re
+                m = re.search(r"(\d.*)", s)
+                if m:
+                    return f"{full}{m.group(1)}"
+        return low
+
+    @staticmethod
+    def normalize_mac(value) -> str:
+        if value is None:
+            return ""
+        if isinstance(value, (bytes, bytearray)):
+            b = bytes(value)
+            if len(b) < 6:
+                return ""
+            s = b[:6].hex()
+            return f"{s[0:4]}.{s[4:8]}.{s[8:12]}".lower()
+        s0 = str(value).strip()
+        if not s0:
+            return ""
+        s = s0.lower().replace("0x", "")
+        s = re.sub(r"[^0-9a-f]", "", s)
+        if len(s) < 12:
+            return ""
+        s = s[:12]
+        return f"{s[0:4]}.{s[4:8]}.{s[8:12]}".lower()
+
+    def get_interface_phys_address_map(self) -> Dict[str, str]:
+        return self._run(self.aget_interface_phys_address_map())
+
+    def get_mac_aliases(self) -> list[str]:
+        return self._run(self.aget_mac_aliases())
+
+    def get_interface_octets_map(self) -> Dict[str, Dict[str, int]]:
+        return self._run(self.aget_interface_octets_map())
+
+    def get_interface_counters_map(self) -> Dict[str, Dict[str, int]]:
+        return self._run(self.aget_interface_counters_map())
+
+    def get_interface_counters_for_ports(self, ports: list[str]) -> Dict[str, Dict[str, int]]:
+        return self._run(self.aget_interface_counters_for_ports(ports))
+
+    def get_interface_octets_for_ports(self, ports: list[str]) -> Dict[str, Dict[str, int]]:
+        return self._run(self.aget_interface_octets_for_ports(ports))
+
+    def get_resource_usage(self):
+        return self._run(self.aget_resource_usage())
+
+    def get_interface_statuses(self) -> Dict[int, str]:
+        return self._run(self.aget_interface_statuses())
+
+    def get_interface_name_status_map(self) -> Dict[str, str]:
+        return self._run(self.aget_interface_name_status_map())
+
+    def walk_table_column(self, oid_str: str) -> Dict[int, str]:
+        return self._run(self.awalk_table_column(oid_str))
+
+    def walk_oid(self, oid_str: str, max_rows: int = 5000) -> Dict[str, str]:
+        return self._run(self.awalk_oid(oid_str, max_rows=max_rows))
+
+    def walk_table_columns(self, column_oids: List[str]) -> Dict[str, Dict[int, str]]:
+        return self._run(self.awalk_table_columns(column_oids))
+
+    def walk_oids(self, oid_strs: List[str], max_rows: int = 5000) -> Dict[str, Dict[str, str]]:
+        return self._run(self.awalk_oids(oid_strs, max_rows=max_rows))
+
+    def get_wlc_client_count(self) -> int:
+        return self._run(self.aget_wlc_client_count())
@@ -4,6 +4,7 @@ import asyncio
 
 from app.db.session import SessionLocal
 from app.models.device import Device, Interface, Link
+from app.services.ip_index import ip_index_store
 from app.services.snmp_service import SnmpManager
 
 from pysnmp.entity import config, engine
@@ -79,7 +80,11 @@ class SnmpTrapServer:
 
             db = SessionLocal()
             try:
-                device = db.query(Device).filter(Device.ip_address == source_ip).first()
+                # trap 은 loopback 등 관리 IP 가 아닌 인터페이스 주소에서 올 수도 있음
+                device_id = ip_index_store.get(db).device_for_address(source_ip)
+                device = db.get(Device, device_id) if device_id is not None else None
+                if device is None:
+                    device = db.query(Device).filter(Device.ip_address == source_ip).first()
                 if not device:
                     return
 
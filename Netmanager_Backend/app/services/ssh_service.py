@@ -1,10 +1,92 @@
 from app.drivers.manager import DriverManager
+from app.services.ssh_session_pool import SessionLimitError, pool_key, ssh_session_pool
 from jinja2 import Template
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
+import ipaddress
 import logging
+import re
+import weakref
 
 logger = logging.getLogger(__name__)
 
+_ROUTE_CODES = {
+    "C": "connected",
+    "L": "local",
+    "S": "static",
+    "O": "ospf",
+    "B": "bgp",
+    "D": "eigrp",
+    "R": "rip",
+    "i": "isis",
+}
+
+_ROUTE_ENTRY = re.compile(r"^(?P<code>[A-Za-z][A-Za-z0-9*+%& ]{0,7}?)\s+(?P<net>\d+\.\d+\.\d+\.\d+)(?:/(?P<len>\d+))?\s*(?P<rest>.*)$")
+_ROUTE_SUBNETTED = re.compile(r"^\s+\d+\.\d+\.\d+\.\d+/(?P<len>\d+)\s+is\s+(?:variably\s+)?subnetted")
+_ROUTE_VIA = re.compile(r"via\s+(?P<nh>\d+\.\d+\.\d+\.\d+)(?P<tail>.*)$")
+_ROUTE_CONNECTED = re.compile(r"directly connected,\s*(?P<intf>\S+)")
+
+
+def _route_protocol(code: str) -> Optional[str]:
+    c = str(code or "").strip()
+    if not c:
+        return None
+    if c.lower() in _ROUTE_CODES.values():
+        return c.lower()
+    return _ROUTE_CODES.get(c[0], c)
+
+
+def _classful_len(net: str) -> int:
+    first = int(net.split(".")[0])
+    return 8 if first < 128 else (16 if first < 192 else 24)
+
+
+def _apply_route_tail(route: Dict[str, Any], text: str) -> None:
+    m = _ROUTE_CONNECTED.search(text)
+    if m:
+        route["outgoing_interface"] = m.group("intf").rstrip(",")
+        return
+    m = _ROUTE_VIA.search(text)
+    if m:
+        route["next_hop_ip"] = m.group("nh")
+        fields = [f.strip() for f in m.group("tail").split(",") if f.strip()]
+        # 마지막 필드가 인터페이스 (uptime 은 숫자로 시작)
+        if fields and fields[-1][0].isalpha():
+            route["outgoing_interface"] = fields[-1]
+
+
+def parse_ip_route_table(raw: str) -> List[Dict[str, Any]]:
+    """Parse IOS-style ``show ip route`` output (first path of ECMP routes only)."""
+    routes: List[Dict[str, Any]] = []
+    subnet_len = None
+    pending = None
+    for line in str(raw or "").splitlines():
+        if not line.strip():
+            continue
+        m = _ROUTE_SUBNETTED.match(line)
+        if m:
+            subnet_len = int(m.group("len"))
+            pending = None
+            continue
+        m = _ROUTE_ENTRY.match(line)
+        if m and not line[0].isspace():
+            net = m.group("net")
+            plen = int(m.group("len")) if m.group("len") else (subnet_len if subnet_len is not None else _classful_len(net))
+            try:
+                prefix = str(ipaddress.ip_network(f"{net}/{plen}", strict=False))
+            except ValueError:
+                pending = None
+                continue
+            route = {"prefix": prefix, "next_hop_ip": None, "outgoing_interface": None, "protocol": _route_protocol(m.group("code"))}
+            _apply_route_tail(route, m.group("rest"))
+            routes.append(route)
+            pending = route if not (route["next_hop_ip"] or route["outgoing_interface"]) else None
+            continue
+        if pending is not None and line[0].isspace():
+            # 긴 prefix 는 next hop 이 다음 줄로 넘어감
+            _apply_route_tail(pending, line)
+            pending = None
+    return routes
+
 class DeviceInfo:
     """
     DTO for device connection information.
@@ -23,9 +105,21 @@ class DeviceConnection:
     Service class handling device interactions via the Driver Manager.
     Acts as a facade/adapter for the core logic to access the unified driver layer.
     """
-    def __init__(self, device_info: DeviceInfo):
+    def __init__(self, device_info: DeviceInfo, pooled: bool = True):
         self.device_info = device_info
         self.last_error = None
+        # connect() 는 세션 풀에서 로그인된 driver 를 빌려오고, disconnect() 는 반납만 함
+        self.pooled = bool(pooled) and ssh_session_pool.enabled
+        self._pool_key = pool_key(
+            device_info.host,
+            device_info.port,
+            device_info.username,
+            device_info.device_type,
+            device_info.password,
+            device_info.secret,
+        )
+        self._lease = None  # (token, finalizer) while a pooled session is held
+        self._reusable = True
         
         # Instantiate the creation of the appropriate driver via Factory
         try:
@@ -42,25 +136,77 @@ class DeviceConnection:
             self.driver = None
             self.last_error = str(e)
 
+    def _open(self):
+        logger.info("Connecting to device", extra={"device_id": None})
+        try:
+            connected = self.driver.connect()
+        except Exception as e:
+            self.last_error = str(e)
+            logger.exception("Connection error")
+            return None
+        if connected:
+            logger.info("Connection established")
+            return self.driver
+        self.last_error = getattr(self.driver, "last_error", None) or self.last_error
+        logger.warning("Connection failed")
+        return None
+
     def connect(self) -> bool:
         if not self.driver:
             return False
+        if self._lease is not None:
+            return True
         try:
-            logger.info("Connecting to device", extra={"device_id": None})
-            connected = self.driver.connect()
-            if connected:
-                logger.info("Connection established")
-            else:
-                logger.warning("Connection failed")
-            return connected
+            if not self.pooled:
+                return self._open() is not None
+            leased = ssh_session_pool.acquire(self._pool_key, self._open)
+            if leased is None:
+                return False
+            driver, token = leased
+            # 이전 lease 의 rollback snapshot 등이 남아 있으면 엉뚱한 설정으로 되돌릴 수 있음
+            reset = getattr(driver, "reset_session_state", None)
+            if callable(reset):
+                reset()
+            self.driver = driver
+            # disconnect() 없이 버려진 객체도 GC 시점에 lease 를 돌려줌 (세션은 닫음)
+            finalizer = weakref.finalize(self, ssh_session_pool.release, self._pool_key, driver, token, False)
+            finalizer.atexit = False
+            self._lease = (token, finalizer)
+            self._reusable = True
+            return True
+        except SessionLimitError as e:
+            self.last_error = str(e)
+            logger.warning("SSH session limit reached", extra={"host": self.device_info.host})
+            return False
         except Exception as e:
             self.last_error = str(e)
             logger.exception("Connection error")
             return False
 
+    def discard(self):
+        """Close the session on disconnect() instead of returning it to the pool (e.g. after reload or an error)."""
+        self._reusable = False
+
     def disconnect(self):
-        if self.driver:
-            self.driver.disconnect()
+        if not self.driver:
+            return
+        if self._lease is not None:
+            token, finalizer = self._lease
+            self._lease = None
+            finalizer.detach()
+            ssh_session_pool.release(self._pool_key, self.driver, token, reusable=self._reusable)
+            return
+        self.driver.disconnect()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # 명령 도중 예외가 나면 세션 상태를 믿을 수 없으므로 풀에 돌려놓지 않음
+        if exc_type is not None:
+            self.discard()
+        self.disconnect()
+        return False
 
     def send_config_set(self, commands: List[str]) -> str:
         """
@@ -416,11 +562,14 @@ class DeviceConnection:
 
         return results
 
-    def get_arp_table(self) -> List[Dict[str, Any]]:
+    def get_arp_table(self, vrf: str = None) -> List[Dict[str, Any]]:
         if not self.driver or not getattr(self.driver, "connection", None):
             return []
 
-        cmds = ["show ip arp", "show arp", "display arp"]
+        if vrf:
+            cmds = [f"show ip arp vrf {vrf}", f"show arp vrf {vrf}"]
+        else:
+            cmds = ["show ip arp", "show arp", "display arp"]
         results: List[Dict[str, Any]] = []
         raw = ""
         for cmd in cmds:
@@ -452,6 +601,62 @@ class DeviceConnection:
                 results.append({"ip": m.group(1), "mac": m.group(2), "interface": m.group(3)})
         return results
 
+    def get_route_table(self, vrf: str = None) -> Optional[List[Dict[str, Any]]]:
+        """
+        Full IPv4 routing table (``show ip route [vrf X]``).
+        Returns [{prefix, next_hop_ip, outgoing_interface, protocol}] or None when the command failed.
+        """
+        if not self.driver or not getattr(self.driver, "connection", None):
+            return None
+
+        cmd = f"show ip route vrf {vrf}" if vrf else "show ip route"
+        parsed = self.driver.connection.send_command(cmd, use_textfsm=True)
+        if isinstance(parsed, list) and parsed:
+            routes = []
+            for e in parsed:
+                net = e.get("network") or e.get("prefix")
+                plen = e.get("prefix_length") or e.get("mask")
+                if not net:
+                    continue
+                nh = e.get("nexthop_ip") or e.get("next_hop")
+                intf = e.get("nexthop_if") or e.get("interface")
+                routes.append(
+                    {
+                        "prefix": f"{net}/{plen}" if plen and "/" not in str(net) else str(net),
+                        "next_hop_ip": nh or None,
+                        "outgoing_interface": intf or None,
+                        "protocol": _route_protocol(e.get("protocol") or ""),
+                    }
+                )
+            return routes
+
+        raw = parsed if isinstance(parsed, str) else self.driver.connection.send_command(cmd)
+        if not raw or "Invalid input" in raw or "Unknown command" in raw or raw.lstrip().startswith("%"):
+            return None
+        return parse_ip_route_table(raw)
+
+    def get_vrf_interfaces(self) -> Dict[str, str]:
+        """{interface: vrf} for interfaces outside the default VRF."""
+        if not self.driver or not getattr(self.driver, "connection", None):
+            return {}
+
+        # (명령, VRF 컬럼 위치)
+        cmds = [("show ip vrf interfaces", 2), ("show vrf interface", 1)]
+        for cmd, col in cmds:
+            out = self.driver.connection.send_command(cmd)
+            if not out or "Invalid input" in out or "Unknown command" in out:
+                continue
+            result: Dict[str, str] = {}
+            for ln in str(out).splitlines():
+                parts = ln.split()
+                if len(parts) <= col or parts[0].lower() in ("interface", "---"):
+                    continue
+                vrf = parts[col]
+                if vrf.lower() != "default":
+                    result[parts[0]] = vrf
+            return result
+        return {}
+
     def get_dhcp_snooping_bindings(self) -> List[Dict[str, Any]]:
         if not self.driver or not getattr(self.driver, "connection", None):
             return []
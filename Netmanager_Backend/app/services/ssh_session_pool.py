@@ -0,0 +1,324 @@
+"""
+Per-process SSH session pool for ``DeviceConnection``.
+
+Logging in to a device (SSH handshake, auth, enable, terminal setup) costs
+2-8 seconds on real gear, while most callers only run a handful of show
+commands. ``DeviceConnection.connect()`` therefore leases an already-logged-in
+driver from this pool and ``disconnect()`` hands it back instead of tearing the
+session down.
+
+- key: (host, port, username, device_type, credential fingerprint), so a changed
+  password or enable secret never reuses a session logged in with the old one
+- idle sessions are closed after ``idle_timeout`` seconds (below the usual vty
+  exec-timeout) and health-checked (``check_connection``) before reuse. A daemon
+  reaper thread runs ``reap()`` while the process has idle sessions, so an idle
+  worker that never calls the pool again still logs out of the device
+- at most ``max_per_device`` sessions per key (leased + idle); extra callers
+  wait up to ``lease_timeout`` for one to come back (vty lines are scarce)
+- at most ``max_idle`` idle sessions in total; the least recently used one is
+  evicted first
+- a lease held longer than ``max_lease`` seconds (a caller that never called
+  ``disconnect()``) stops counting against ``max_per_device``; the session is
+  closed instead of pooled if it is ever returned. ``DeviceConnection`` also
+  returns its lease when the object is garbage-collected
+
+The pool is per worker process. After a fork the inherited sessions share
+sockets with the parent, so the child drops them (without logging out) and
+starts empty (its reaper thread starts with the first pooled session).
+"""
+from __future__ import annotations
+
+import atexit
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+SSH_POOL_ENABLED = os.getenv("SSH_POOL_ENABLED", "true").strip().lower() in ("1", "true", "yes", "on")
+SSH_POOL_IDLE_TIMEOUT_SEC = float(os.getenv("SSH_POOL_IDLE_TIMEOUT_SEC", "120"))
+SSH_POOL_MAX_PER_DEVICE = int(os.getenv("SSH_POOL_MAX_PER_DEVICE", "2"))
+SSH_POOL_MAX_IDLE = int(os.getenv("SSH_POOL_MAX_IDLE", "256"))
+SSH_POOL_LEASE_TIMEOUT_SEC = float(os.getenv("SSH_POOL_LEASE_TIMEOUT_SEC", "60"))
+SSH_POOL_KEEPALIVE_SEC = int(os.getenv("SSH_POOL_KEEPALIVE_SEC", "30"))
+SSH_POOL_MAX_LEASE_SEC = float(os.getenv("SSH_POOL_MAX_LEASE_SEC", "1800"))
+
+PoolKey = Tuple[str, int, str, str, str]
+
+
+def pool_key(host, port, username, device_type, password=None, secret=None) -> PoolKey:
+    # 비밀값 자체 대신 지문만 키에 둠 (로그/에러 메시지에 노출되지 않도록)
+    fingerprint = hashlib.sha256(f"{password or ''}\0{secret or ''}".encode("utf-8")).hexdigest()[:16]
+    return (
+        str(host or "").strip(),
+        int(port or 22),
+        str(username or ""),
+        str(device_type or "").strip().lower(),
+        fingerprint,
+    )
+
+
+class SessionLimitError(ConnectionError):
+    pass
+
+
+def _close_driver(driver) -> None:
+    try:
+        driver.disconnect()
+    except Exception:
+        logger.debug("SSH session close failed", exc_info=True)
+
+
+def _enable_keepalive(driver, interval: int) -> None:
+    """Paramiko transport keepalive so NAT/firewalls do not drop idle pooled sessions."""
+    if interval <= 0:
+        return
+    try:
+        transport = driver.connection.remote_conn.get_transport()
+        if transport is not None:
+            transport.set_keepalive(int(interval))
+    except Exception:
+        pass
+
+
+def _healthy(driver) -> bool:
+    """Liveness check before reuse; also leaves config mode a previous caller may have left open."""
+    try:
+        if not driver.check_connection():
+            return False
+    except Exception:
+        return False
+    conn = getattr(driver, "connection", None)
+    try:
+        if conn is not None and hasattr(conn, "check_config_mode") and conn.check_config_mode():
+            conn.exit_config_mode()
+    except Exception:
+        return False
+    return True
+
+
+class SshSessionPool:
+    def __init__(
+        self,
+        idle_timeout: float = SSH_POOL_IDLE_TIMEOUT_SEC,
+        max_per_device: int = SSH_POOL_MAX_PER_DEVICE,
+        max_idle: int = SSH_POOL_MAX_IDLE,
+        lease_timeout: float = SSH_POOL_LEASE_TIMEOUT_SEC,
+        keepalive: int = SSH_POOL_KEEPALIVE_SEC,
+        enabled: bool = SSH_POOL_ENABLED,
+        max_lease: float = SSH_POOL_MAX_LEASE_SEC,
+        reap_interval: Optional[float] = None,
+    ):
+        self.idle_timeout = float(idle_timeout)
+        self.max_per_device = max(1, int(max_per_device))
+        self.max_idle = max(0, int(max_idle))
+        self.lease_timeout = float(lease_timeout)
+        self.keepalive = int(keepalive)
+        self.enabled = bool(enabled)
+        self.max_lease = float(max_lease)
+        self.reap_interval = (
+            float(reap_interval) if reap_interval is not None else max(1.0, min(self.idle_timeout / 4.0, 30.0))
+        )
+        self._cond = threading.Condition()
+        # LRU 순서의 idle 세션: id(driver) -> (key, driver, idle_since)
+        self._idle: "OrderedDict[int, Tuple[PoolKey, object, float]]" = OrderedDict()
+        # 빌려준 세션: token -> (key, leased_at). 연결 중인 자리도 token 으로 잡아둠
+        self._leases: Dict[int, Tuple[PoolKey, float]] = {}
+        self._next_token = 0
+        self._pid = os.getpid()
+        self._reaper: Optional[threading.Thread] = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.reclaimed = 0
+
+    # -- internal (call with self._cond held) -------------------------------
+
+    def _check_fork(self) -> None:
+        pid = os.getpid()
+        if pid != self._pid:
+            # 부모 프로세스의 소켓이므로 logout 하지 않고 버림
+            self._idle.clear()
+            self._leases.clear()
+            self._pid = pid
+            # 스레드는 fork 후 자식에 없음
+            self._reaper = None
+
+    def _reclaim_stale_leases(self, now: float) -> None:
+        if self.max_lease <= 0:
+            return
+        for token, (key, since) in list(self._leases.items()):
+            if now - since >= self.max_lease:
+                del self._leases[token]
+                self.reclaimed += 1
+                logger.warning("SSH session lease reclaimed", extra={"host": key[0], "held_sec": round(now - since)})
+
+    def _count(self, key: PoolKey) -> int:
+        idle = sum(1 for k, _, _ in self._idle.values() if k == key)
+        return idle + sum(1 for k, _ in self._leases.values() if k == key)
+
+    def _pop_expired(self, now: float) -> List[object]:
+        expired = []
+        for ident, (_, driver, since) in list(self._idle.items()):
+            if now - since >= self.idle_timeout:
+                del self._idle[ident]
+                expired.append(driver)
+        return expired
+
+    def _pop_idle(self, key: PoolKey) -> Optional[object]:
+        # 가장 최근에 반납된 세션부터 재사용 (오래된 세션은 idle timeout 으로 자연 정리)
+        for ident in reversed(list(self._idle.keys())):
+            k, driver, _ = self._idle[ident]
+            if k == key:
+                del self._idle[ident]
+                return driver
+        return None
+
+    def _ensure_reaper(self) -> None:
+        if self._reaper is not None or self.idle_timeout <= 0:
+            return
+        self._reaper = threading.Thread(target=self._reap_loop, name="ssh-pool-reaper", daemon=True)
+        self._reaper.start()
+
+    def _reap_loop(self) -> None:
+        me = threading.current_thread()
+        while True:
+            time.sleep(self.reap_interval)
+            with self._cond:
+                if self._reaper is not me:
+                    return
+            self.reap()
+            with self._cond:
+                # idle 세션이 없으면 종료; 다음 release 가 다시 시작
+                if not self._idle and self._reaper is me:
+                    self._reaper = None
+                    return
+
+    def _lease(self, key: PoolKey) -> int:
+        self._next_token += 1
+        self._leases[self._next_token] = (key, time.monotonic())
+        return self._next_token
+
+    def _unlease(self, token: int) -> bool:
+        return self._leases.pop(token, None) is not None
+
+    # -- public --------------------------------------------------------------
+
+    def acquire(self, key: PoolKey, connect: Callable[[], Optional[object]]) -> Optional[Tuple[object, int]]:
+        """
+        Leased ``(driver, token)`` for ``key``: a healthy idle session, or a new
+        one from ``connect()`` (returns a connected driver or None). Returns None
+        when ``connect()`` fails; raises ``SessionLimitError`` when the device
+        stays at ``max_per_device`` for ``lease_timeout`` seconds. Hand the token
+        back to ``release``.
+        """
+        deadline = time.monotonic() + self.lease_timeout
+        while True:
+            to_close: List[object] = []
+            try:
+                with self._cond:
+                    self._check_fork()
+                    now = time.monotonic()
+                    to_close.extend(self._pop_expired(now))
+                    self._reclaim_stale_leases(now)
+                    candidate = self._pop_idle(key)
+                    while candidate is None and self._count(key) >= self.max_per_device:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            raise SessionLimitError(
+                                f"SSH session limit reached for {key[0]} ({self.max_per_device} in use)"
+                            )
+                        self._cond.wait(timeout=remaining)
+                        self._check_fork()
+                        self._reclaim_stale_leases(time.monotonic())
+                        candidate = self._pop_idle(key)
+                    token = self._lease(key)
+            finally:
+                for driver in to_close:
+                    _close_driver(driver)
+
+            if candidate is not None:
+                if _healthy(candidate):
+                    with self._cond:
+                        self.hits += 1
+                    return candidate, token
+                _close_driver(candidate)
+                with self._cond:
+                    self._unlease(token)
+                    self._cond.notify_all()
+                continue
+
+            with self._cond:
+                self.misses += 1
+            try:
+                driver = connect()
+            except Exception:
+                driver = None
+                logger.debug("SSH connect raised", exc_info=True)
+            if driver is None:
+                with self._cond:
+                    self._unlease(token)
+                    self._cond.notify_all()
+                return None
+            _enable_keepalive(driver, self.keepalive)
+            return driver, token
+
+    def release(self, key: PoolKey, driver, token: int, reusable: bool = True) -> None:
+        """Return a leased driver; it is kept idle when reusable (and the lease was not reclaimed), closed otherwise."""
+        to_close: List[object] = []
+        with self._cond:
+            self._check_fork()
+            if not self._unlease(token):
+                reusable = False
+            if reusable and self.enabled and self.max_idle > 0 and getattr(driver, "connection", None) is not None:
+                self._idle[id(driver)] = (key, driver, time.monotonic())
+                self._ensure_reaper()
+                to_close.extend(self._pop_expired(time.monotonic()))
+                while len(self._idle) > self.max_idle:
+                    _, (_, lru, _) = self._idle.popitem(last=False)
+                    self.evictions += 1
+                    to_close.append(lru)
+            else:
+                to_close.append(driver)
+            self._cond.notify_all()
+        for d in to_close:
+            _close_driver(d)
+
+    def reap(self) -> int:
+        """Close idle sessions past ``idle_timeout``."""
+        with self._cond:
+            self._check_fork()
+            expired = self._pop_expired(time.monotonic())
+            if expired:
+                self._cond.notify_all()
+        for driver in expired:
+            _close_driver(driver)
+        return len(expired)
+
+    def close_all(self) -> None:
+        with self._cond:
+            self._check_fork()
+            drivers = [d for _, d, _ in self._idle.values()]
+            self._idle.clear()
+            self._cond.notify_all()
+        for driver in drivers:
+            _close_driver(driver)
+
+    def stats(self) -> Dict[str, int]:
+        with self._cond:
+            return {
+                "idle": len(self._idle),
+                "leased": len(self._leases),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "reclaimed": self.reclaimed,
+            }
+
+
+ssh_session_pool = SshSessionPool()
+atexit.register(ssh_session_pool.close_all)
@@ -15,6 +15,70 @@ IGNORED_PATTERNS = [
 
 logger = logging.getLogger(__name__)
 
+SYSLOG_BATCH_SIZE = int(os.getenv("SYSLOG_BATCH_SIZE", "500"))
+SYSLOG_BATCH_MAX_WAIT_MS = int(os.getenv("SYSLOG_BATCH_MAX_WAIT_MS", "200"))
+
+_MSG_RE = re.compile(r"%([A-Z0-9_]+)-([0-7])-([A-Z0-9_]+):\s*(.*)")
+_UPDOWN_INTF_RE = re.compile(r"Interface\s+([A-Za-z0-9\/\-\.]+)")
+_UPDOWN_STATE_RE = re.compile(r"changed state to\s+(up|down)", re.IGNORECASE)
+
+
+def _parse_message(raw_log: str) -> tuple[str, int, str]:
+    """(event_id, severity code, message) of a Cisco-style "%FAC-SEV-MNEMONIC: text" line."""
+    match = _MSG_RE.search(raw_log)
+    if not match:
+        return "SYSLOG", 6, raw_log
+    severity_code = int(match.group(2))
+    return f"%{match.group(1)}-{severity_code}-{match.group(3)}", severity_code, match.group(4).strip()
+
+
+def _classify(event_id: str, severity_code: int, message: str, raw_log: str, device_name: str) -> tuple[str, str]:
+    """(EventLog/Issue severity, issue title)"""
+    db_severity = "info"
+    issue_title = event_id
+    upper = message.upper()
+
+    if "FAN-3-FAIL" in event_id or ("FAN" in upper and "FAIL" in upper):
+        db_severity = "critical"
+        issue_title = f"Fan Failure: {device_name}"
+    elif "ENV-3-TEMP" in event_id or ("TEMPERATURE" in upper and "CRITICAL" in upper):
+        db_severity = "critical"
+        issue_title = f"Temperature Critical: {device_name}"
+    elif "POWER" in event_id and "FAIL" in event_id:
+        db_severity = "critical"
+        issue_title = f"Power Supply Failure: {device_name}"
+    elif "OSPF-5-ADJCHANGE" in event_id:
+        if "DOWN" in upper:
+            db_severity = "warning"
+            issue_title = f"OSPF Neighbor Down: {device_name}"
+    elif "BGP-5-ADJCHANGE" in event_id or "BGP-5-ADJCHANGE" in raw_log:
+        if "DOWN" in upper:
+            db_severity = "warning"
+            issue_title = f"BGP Neighbor Down: {device_name}"
+    elif "CONFIG_I" in event_id or "SYS-5-CONFIG_I" in event_id:
+        db_severity = "warning"
+        issue_title = f"Configuration Changed: {device_name}"
+    elif severity_code <= 2:
+        db_severity = "critical"
+    elif severity_code <= 4:
+        db_severity = "warning"
+    return db_severity, issue_title
+
+
+def _interface_change(event_id: str, message: str):
+    """(interface name, "up"/"down") for UPDOWN messages, else None."""
+    if "UPDOWN" not in event_id:
+        return None
+    if_match = _UPDOWN_INTF_RE.search(message)
+    state_match = _UPDOWN_STATE_RE.search(message)
+    if not (if_match and state_match):
+        return None
+    return if_match.group(1).strip(), state_match.group(1).lower()
+
+
+def _norm_if(x: str) -> str:
+    return str(x or "").strip().lower().replace(" ", "")
+
 
 def process_syslog_message(source_ip: str, raw_log: str) -> None:
     db = SessionLocal()
@@ -26,102 +90,58 @@ def process_syslog_message(source_ip: str, raw_log: str) -> None:
         if not device:
             return
 
-        match = re.search(r"%([A-Z0-9_]+)-([0-7])-([A-Z0-9_]+):\s*(.*)", raw_log)
-
-        event_id = "SYSLOG"
-        severity_code = 6
-        message = raw_log
-
-        if match:
-            facility = match.group(1)
-            severity_code = int(match.group(2))
-            mnemonic = match.group(3)
-            message = match.group(4).strip()
-            event_id = f"%{facility}-{severity_code}-{mnemonic}"
-
-        db_severity = "info"
-        issue_title = event_id
-
-        if "FAN-3-FAIL" in event_id or ("FAN" in message.upper() and "FAIL" in message.upper()):
-            db_severity = "critical"
-            issue_title = f"Fan Failure: {device.name}"
-        elif "ENV-3-TEMP" in event_id or ("TEMPERATURE" in message.upper() and "CRITICAL" in message.upper()):
-            db_severity = "critical"
-            issue_title = f"Temperature Critical: {device.name}"
-        elif "POWER" in event_id and "FAIL" in event_id:
-            db_severity = "critical"
-            issue_title = f"Power Supply Failure: {device.name}"
-        elif "OSPF-5-ADJCHANGE" in event_id:
-            if "DOWN" in message.upper():
-                db_severity = "warning"
-                issue_title = f"OSPF Neighbor Down: {device.name}"
-        elif "BGP-5-ADJCHANGE" in event_id or "BGP-5-ADJCHANGE" in raw_log:
-            if "DOWN" in message.upper():
-                db_severity = "warning"
-                issue_title = f"BGP Neighbor Down: {device.name}"
-        elif "CONFIG_I" in event_id or "SYS-5-CONFIG_I" in event_id:
-            db_severity = "warning"
-            issue_title = f"Configuration Changed: {device.name}"
-        elif severity_code <= 2:
-            db_severity = "critical"
-        elif severity_code <= 4:
-            db_severity = "warning"
+        event_id, severity_code, message = _parse_message(raw_log)
+        db_severity, issue_title = _classify(event_id, severity_code, message, raw_log, device.name)
 
-        if "UPDOWN" in event_id:
-            if_match = re.search(r"Interface\s+([A-Za-z0-9\/\-\.]+)", message)
-            state_match = re.search(r"changed state to\s+(up|down)", message, re.IGNORECASE)
-            if if_match and state_match:
-                if_name = if_match.group(1).strip()
-                new_state = state_match.group(1).lower()
+        change = _interface_change(event_id, message)
+        if change:
+            if_name, new_state = change
 
-                from app.models.device import Interface
+            from app.models.device import Interface
 
-                target_if = (
-                    db.query(Interface)
-                    .filter(Interface.device_id == device.id, Interface.name == if_name)
-                    .first()
-                )
-                if target_if:
-                    target_if.status = new_state
-                    now = datetime.now()
+            target_if = (
+                db.query(Interface)
+                .filter(Interface.device_id == device.id, Interface.name == if_name)
+                .first()
+            )
+            if target_if:
+                target_if.status = new_state
+                now = datetime.now()
+                db.commit()
+
+                normalized_if = _norm_if(if_name)
+                touched: list[int] = []
+                links = db.query(Link).filter(
+                    (Link.source_device_id == device.id) | (Link.target_device_id == device.id)
+                ).all()
+                for l in links:
+                    if l.source_device_id == device.id and _norm_if(l.source_interface_name) == normalized_if:
+                        l.status = "down" if new_state == "down" else "up"
+                        l.last_seen = now
+                        touched.append(l.id)
+                    elif l.target_device_id == device.id and _norm_if(l.target_interface_name) == normalized_if:
+                        l.status = "down" if new_state == "down" else "up"
+                        l.last_seen = now
+                        touched.append(l.id)
+
+                if touched:
                     db.commit()
+                    try:
+                        from app.services.realtime_event_bus import realtime_event_bus
 
-                    def _n(x: str) -> str:
-                        return str(x or "").strip().lower().replace(" ", "")
-
-                    normalized_if = _n(if_name)
-                    touched: list[int] = []
-                    links = db.query(Link).filter(
-                        (Link.source_device_id == device.id) | (Link.target_device_id == device.id)
-                    ).all()
-                    for l in links:
-                        if l.source_device_id == device.id and _n(l.source_interface_name) == normalized_if:
-                            l.status = "down" if new_state == "down" else "up"
-                            l.last_seen = now
-                            touched.append(l.id)
-                        elif l.target_device_id == device.id and _n(l.target_interface_name) == normalized_if:
-                            l.status = "down" if new_state == "down" else "up"
-                            l.last_seen = now
-                            touched.append(l.id)
-
-                    if touched:
-                        db.commit()
-                        try:
-                            from app.services.realtime_event_bus import realtime_event_bus
-
-                            realtime_event_bus.publish(
-                                "link_update",
-                                {
-                                    "device_id": device.id,
-                                    "device_ip": device.ip_address,
-                                    "interface": if_name,
-                                    "state": new_state,
-                                    "link_ids": touched,
-                                    "ts": now.isoformat(),
-                                },
-                            )
-                        except Exception:
-                            pass
+                        realtime_event_bus.publish(
+                            "link_update",
+                            {
+                                "device_id": device.id,
+                                "device_ip": device.ip_address,
+                                "interface": if_name,
+                                "state": new_state,
+                                "link_ids": touched,
+                                "ts": now.isoformat(),
+                            },
+                        )
+                    except Exception:
+                        pass
 
         db.add(
             EventLog(
@@ -163,12 +183,209 @@ def process_syslog_message(source_ip: str, raw_log: str) -> None:
         db.close()
 
 
+def _resolve_source_devices(db, source_ips) -> dict[str, tuple[int, str, str]]:
+    """source IP -> (device id, name, management IP), from the in-memory IP index (one query for misses)."""
+    from app.services.ip_index import ip_index_store
+
+    ids_by_ip: dict[str, int] = {}
+    misses: list[str] = []
+    try:
+        index = ip_index_store.get(db)
+    except Exception:
+        index = None
+        logger.debug("IP index unavailable for syslog source lookup", exc_info=True)
+    for ip in source_ips:
+        device_id = index.device_for_address(ip) if index is not None else None
+        if device_id is None:
+            misses.append(ip)
+        else:
+            ids_by_ip[ip] = device_id
+    if misses:
+        rows = db.query(Device.id, Device.ip_address).filter(Device.ip_address.in_(misses)).order_by(Device.id.asc()).all()
+        for device_id, ip in rows:
+            ids_by_ip.setdefault(ip, int(device_id))
+    if not ids_by_ip:
+        return {}
+    rows = db.query(Device.id, Device.name, Device.ip_address).filter(Device.id.in_(set(ids_by_ip.values()))).all()
+    info = {int(r[0]): (int(r[0]), r[1], r[2]) for r in rows}
+    return {ip: info[device_id] for ip, device_id in ids_by_ip.items() if device_id in info}
+
+
+def process_syslog_batch(items) -> dict:
+    """
+    Ingest a batch of ``(source_ip, raw_log[, received_at epoch])`` with one session:
+    source IPs are resolved through the IP index, interface/link state changes are
+    coalesced (last state per interface wins), EventLog rows go in with one bulk insert
+    and everything is committed once. ``link_update`` events are published after commit.
+
+    When the commit fails (one bad row), the batch is retried in halves down to single
+    lines, so only the offending lines are dropped.
+    """
+    parsed = []
+    for item in items:
+        source_ip, raw_log = str(item[0]), str(item[1] or "")
+        if not raw_log or any(pattern in raw_log for pattern in IGNORED_PATTERNS):
+            continue
+        received_at = datetime.fromtimestamp(float(item[2])) if len(item) > 2 and item[2] else datetime.now()
+        parsed.append((source_ip, raw_log, received_at) + _parse_message(raw_log))
+    stats = {"received": len(items), "stored": 0, "unknown_source": 0, "interface_changes": 0, "link_updates": 0, "dropped": 0}
+    if not parsed:
+        return stats
+
+    db = SessionLocal()
+    try:
+        devices = _resolve_source_devices(db, {p[0] for p in parsed})
+        if not devices:
+            stats["unknown_source"] = len(parsed)
+            return stats
+        _commit_syslog_chunk(db, parsed, devices, stats)
+        return stats
+    finally:
+        db.close()
+
+
+def _commit_syslog_chunk(db, parsed, devices, stats) -> None:
+    from sqlalchemy.exc import OperationalError
+
+    issues = None
+    try:
+        chunk_stats, link_events, issues = _stage_syslog_batch(db, parsed, devices)
+        db.commit()
+    except OperationalError:
+        # DB 연결/락 문제는 줄을 나눠도 해결되지 않음
+        db.rollback()
+        raise
+    except Exception:
+        db.rollback()
+        if issues is not None:
+            issues.discard()
+        if len(parsed) == 1:
+            stats["dropped"] += 1
+            logger.exception("Syslog line dropped", extra={"source_ip": parsed[0][0], "event_id": parsed[0][3]})
+            return
+        logger.warning("Syslog batch commit failed, retrying in halves", extra={"lines": len(parsed)}, exc_info=True)
+        mid = len(parsed) // 2
+        _commit_syslog_chunk(db, parsed[:mid], devices, stats)
+        _commit_syslog_chunk(db, parsed[mid:], devices, stats)
+        return
+
+    for key, value in chunk_stats.items():
+        stats[key] += value
+    if link_events:
+        try:
+            from app.services.realtime_event_bus import realtime_event_bus
+
+            for ev in link_events:
+                realtime_event_bus.publish("link_update", ev)
+        except Exception:
+            pass
+
+
+def _stage_syslog_batch(db, parsed, devices):
+    """EventLog rows, issues and interface/link state of ``parsed`` added to ``db`` (not committed)."""
+    from sqlalchemy import insert, or_
+
+    from app.models.device import Interface
+    from app.services.issue_upsert import IssueUpserter
+
+    stats = {"stored": 0, "unknown_source": 0, "interface_changes": 0, "link_updates": 0}
+    rows: list[dict] = []
+    # (device, interface) -> (state, 도착 순번): 같은 인터페이스는 마지막 메시지가 이김
+    changes: dict[tuple[int, str], tuple[str, int]] = {}
+    device_ids = sorted({d[0] for d in devices.values()})
+    issues = IssueUpserter(db, device_ids, source="syslog")
+    for seq, (source_ip, raw_log, received_at, event_id, severity_code, message) in enumerate(parsed):
+        dev = devices.get(source_ip)
+        if dev is None:
+            stats["unknown_source"] += 1
+            continue
+        device_id, device_name, _ = dev
+        db_severity, issue_title = _classify(event_id, severity_code, message, raw_log, device_name)
+        change = _interface_change(event_id, message)
+        if change:
+            changes[(device_id, change[0])] = (change[1], seq)
+        rows.append(
+            {
+                "device_id": device_id,
+                "severity": db_severity,
+                "event_id": event_id,
+                "message": message,
+                "source": "Syslog",
+                "timestamp": received_at,
+            }
+        )
+        if db_severity in {"critical", "warning"}:
+            issues.add(device_id, issue_title, message, db_severity, device_name)
+
+    link_events: list[dict] = []
+    if changes:
+        now = datetime.now()
+        changed_devices = {d for d, _ in changes}
+        found: dict[tuple[int, str], tuple[str, str, int]] = {}
+        for intf in (
+            db.query(Interface)
+            .filter(Interface.device_id.in_(changed_devices), Interface.name.in_({n for _, n in changes}))
+            .all()
+        ):
+            change = changes.get((intf.device_id, intf.name))
+            if change is None:
+                continue
+            intf.status = change[0]
+            found[(intf.device_id, _norm_if(intf.name))] = (intf.name, change[0], change[1])
+        stats["interface_changes"] = len(found)
+
+        touched: dict[tuple[int, str], list[int]] = {}
+        if found:
+            links = (
+                db.query(Link)
+                .filter(or_(Link.source_device_id.in_(changed_devices), Link.target_device_id.in_(changed_devices)))
+                .all()
+            )
+            for l in links:
+                # 양쪽 끝이 모두 바뀌었으면 두 장비의 link_update 에 모두 싣고, 링크 상태는 더 나중 메시지를 따름
+                ends = [
+                    key
+                    for key in ((l.source_device_id, _norm_if(l.source_interface_name)), (l.target_device_id, _norm_if(l.target_interface_name)))
+                    if key in found
+                ]
+                if not ends:
+                    continue
+                latest = max(ends, key=lambda k: found[k][2])
+                l.status = "down" if found[latest][1] == "down" else "up"
+                l.last_seen = now
+                for key in ends:
+                    touched.setdefault(key, []).append(l.id)
+        mgmt_ip = {d[0]: d[2] for d in devices.values()}
+        # 도착 순서대로 보내서 구독자에서도 마지막 메시지가 이김
+        for key, link_ids in sorted(touched.items(), key=lambda kv: found[kv[0]][2]):
+            if_name, state, _ = found[key]
+            link_events.append(
+                {
+                    "device_id": key[0],
+                    "device_ip": mgmt_ip.get(key[0]),
+                    "interface": if_name,
+                    "state": state,
+                    "link_ids": link_ids,
+                    "ts": now.isoformat(),
+                }
+            )
+        stats["link_updates"] = len({i for ids in touched.values() for i in ids})
+
+    if rows:
+        db.execute(insert(EventLog), rows)
+    issues.flush()
+    stats["stored"] = len(rows)
+    return stats, link_events, issues
+
+
 class SyslogProtocol(asyncio.DatagramProtocol):
     def __init__(self):
         super().__init__()
         self.queue_size = int(os.getenv("SYSLOG_QUEUE_SIZE", "20000"))
         self.worker_count = int(os.getenv("SYSLOG_WORKERS", "4"))
-        self.queue: asyncio.Queue[tuple[str, str]] = asyncio.Queue(maxsize=self.queue_size)
+        self.batch_size = max(1, SYSLOG_BATCH_SIZE)
+        self.batch_max_wait = max(0.0, SYSLOG_BATCH_MAX_WAIT_MS / 1000.0)
+        self.queue: asyncio.Queue[tuple[str, str, float]] = asyncio.Queue(maxsize=self.queue_size)
         self._workers: list[asyncio.Task] = []
         self._dropped = 0
         self._last_drop_log = 0.0
@@ -190,7 +407,7 @@ class SyslogProtocol(asyncio.DatagramProtocol):
             raw_log = data.decode("utf-8", errors="ignore").strip()
             source_ip = addr[0]
             try:
-                self.queue.put_nowait((source_ip, raw_log))
+                self.queue.put_nowait((source_ip, raw_log, time.time()))
             except asyncio.QueueFull:
                 if not self._enqueue_to_celery(source_ip, raw_log):
                     self._dropped += 1
@@ -205,16 +422,50 @@ class SyslogProtocol(asyncio.DatagramProtocol):
         if not self._enqueue_to_celery(source_ip, raw_log):
             await asyncio.to_thread(process_syslog_message, source_ip, raw_log)
 
+    async def _next_batch(self) -> list[tuple[str, str, float]]:
+        """Wait for one line, then keep collecting until batch_size lines or batch_max_wait elapsed."""
+        batch = [await self.queue.get()]
+        deadline = time.monotonic() + self.batch_max_wait
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self.queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), timeout=remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
     async def _worker_loop(self) -> None:
         while True:
-            source_ip, raw_log = await self.queue.get()
+            batch = await self._next_batch()
             try:
-                if not self._enqueue_to_celery(source_ip, raw_log):
-                    await asyncio.to_thread(process_syslog_message, source_ip, raw_log)
+                if not self._enqueue_batch_to_celery(batch):
+                    await asyncio.to_thread(process_syslog_batch, batch)
             except Exception:
                 logger.exception("Syslog worker error")
             finally:
-                self.queue.task_done()
+                for _ in batch:
+                    self.queue.task_done()
+
+    def _enqueue_batch_to_celery(self, batch: list[tuple[str, str, float]]) -> bool:
+        try:
+            from app.tasks.syslog_ingest import ingest_syslog_batch
+
+            if hasattr(ingest_syslog_batch, "apply_async"):
+                ingest_syslog_batch.apply_async(
+                    args=[[list(item) for item in batch]],
+                    queue=os.getenv("SYSLOG_CELERY_QUEUE", "syslog"),
+                )
+                return True
+            return False
+        except Exception:
+            return False
 
     def _enqueue_to_celery(self, source_ip: str, raw_log: str) -> bool:
         try:
@@ -42,19 +42,19 @@ def backup_single_device(device_id: int):
         # SSH 연결 시도
         conn = DeviceConnection(info)
         if conn.connect():
-            # Config 가져오기
-            config_txt = conn.get_running_config()
-
-            # DB에 백업 저장
-            backup = ConfigBackup(
-                device_id=device.id,
-                raw_config=config_txt,
-                created_at=datetime.now()
-            )
-            db.add(backup)
-            db.commit()
-
-            conn.disconnect()
+            with conn:
+                # Config 가져오기
+                config_txt = conn.get_running_config()
+
+                # DB에 백업 저장
+                backup = ConfigBackup(
+                    device_id=device.id,
+                    raw_config=config_txt,
+                    created_at=datetime.now()
+                )
+                db.add(backup)
+                db.commit()
+
             result["status"] = "success"
         else:
             result["msg"] = f"Connection failed: {conn.last_error}"
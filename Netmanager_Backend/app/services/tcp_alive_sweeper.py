@@ -0,0 +1,138 @@
+"""
+Asyncio TCP liveness sweep (discovery Phase 1 when nmap is not installed).
+
+Every candidate host gets a non-blocking connect to all probe ports at once;
+a completed handshake or an RST (connection refused) both mean "a host answered".
+The number of sockets open at any moment is capped by ``concurrency`` (hosts in
+flight = concurrency // len(ports)) and the whole sweep stops at ``deadline``
+seconds, so a /16 finishes in bounded time instead of being skipped.
+
+``TcpAliveSweep`` is an ``AliveHostStream``: it runs on its own event loop in a
+daemon thread and hands alive hosts out as they are found, so Phase 2 can start
+inspecting the first hosts while the sweep is still running. ``sweep()`` is the
+blocking convenience wrapper that returns the full list.
+"""
+from __future__ import annotations
+
+import asyncio
+import errno
+import ipaddress
+import logging
+import os
+from typing import Iterable, Iterator, List, Optional, Sequence
+
+from app.services.discovery_pipeline import AliveHostStream, scope_filter
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PORTS = (22, 23, 80, 443, 161, 830)
+TCP_SWEEP_CONCURRENCY = int(os.getenv("DISCOVERY_TCP_SWEEP_CONCURRENCY", "2048"))
+TCP_SWEEP_TIMEOUT_SEC = float(os.getenv("DISCOVERY_TCP_SWEEP_TIMEOUT_SEC", "0.5"))
+TCP_SWEEP_DEADLINE_SEC = float(os.getenv("DISCOVERY_TCP_SWEEP_DEADLINE_SEC", "120"))
+TCP_SWEEP_MAX_HOSTS = int(os.getenv("DISCOVERY_TCP_SWEEP_MAX_HOSTS", "65536"))
+
+_REFUSED = {errno.ECONNREFUSED, 10061}
+
+
+def _fd_budget(requested: int) -> int:
+    """Keep the socket cap under the process' open-file limit."""
+    try:
+        import resource
+
+        soft, _ = resource.getrlimit(resource.RLIMIT_NOFILE)
+        if soft > 0:
+            return max(16, min(int(requested), int(soft) - 128))
+    except Exception:
+        pass
+    return max(16, int(requested))
+
+
+def scoped_hosts(
+    cidr: str,
+    include_cidrs: Optional[Sequence[str]] = None,
+    exclude_cidrs: Optional[Sequence[str]] = None,
+) -> Iterator[str]:
+    """Host addresses of ``cidr`` after the discovery scope include/exclude filters (lazy)."""
+    in_scope = scope_filter(include_cidrs, exclude_cidrs)
+    for ip_obj in ipaddress.ip_network(cidr, strict=False).hosts():
+        ip = str(ip_obj)
+        if in_scope(ip):
+            yield ip
+
+
+async def _probe_port(ip: str, port: int, timeout: float) -> bool:
+    try:
+        _, writer = await asyncio.wait_for(asyncio.open_connection(ip, int(port)), timeout=timeout)
+    except ConnectionRefusedError:
+        return True
+    except OSError as e:
+        return e.errno in _REFUSED
+    except (asyncio.TimeoutError, Exception):
+        return False
+    writer.close()
+    try:
+        await writer.wait_closed()
+    except Exception:
+        pass
+    return True
+
+
+async def probe_host(ip: str, ports: Sequence[int], timeout: float) -> bool:
+    """True as soon as any port accepts or refuses the connection."""
+    tasks = [asyncio.ensure_future(_probe_port(ip, p, timeout)) for p in ports]
+    try:
+        for fut in asyncio.as_completed(tasks):
+            if await fut:
+                return True
+        return False
+    finally:
+        for t in tasks:
+            t.cancel()
+
+
+class TcpAliveSweep(AliveHostStream):
+    thread_name = "tcp-alive-sweep"
+
+    def __init__(
+        self,
+        hosts: Iterable[str],
+        ports: Optional[Sequence[int]] = None,
+        timeout: Optional[float] = None,
+        concurrency: Optional[int] = None,
+        deadline: Optional[float] = None,
+    ):
+        # 결과 큐는 제한하지 않음: event loop 안에서 put 이 막히면 진행 중인 connect 타이머가 어긋남
+        super().__init__(queue_size=0)
+        self.ports = [int(p) for p in (ports or DEFAULT_PORTS)]
+        self.timeout = float(timeout if timeout is not None else TCP_SWEEP_TIMEOUT_SEC)
+        self.deadline = float(deadline if deadline is not None else TCP_SWEEP_DEADLINE_SEC)
+        sockets = _fd_budget(concurrency or TCP_SWEEP_CONCURRENCY)
+        self.host_workers = max(1, sockets // max(1, len(self.ports)))
+        self._hosts = iter(hosts)
+
+    def _produce(self) -> None:
+        asyncio.run(self._sweep())
+
+    async def _sweep(self) -> None:
+        async def worker():
+            for ip in self._hosts:
+                if self._stopped.is_set():
+                    return
+                self.probed += 1
+                if await probe_host(ip, self.ports, self.timeout):
+                    self._emit(ip)
+
+        # 모든 worker 가 같은 host iterator 를 소비 (asyncio 단일 스레드이므로 안전)
+        workers = [asyncio.ensure_future(worker()) for _ in range(self.host_workers)]
+        try:
+            await asyncio.wait_for(asyncio.gather(*workers), timeout=self.deadline if self.deadline > 0 else None)
+        except asyncio.TimeoutError:
+            self.timed_out = True
+            logger.warning(
+                "TCP alive sweep hit its deadline",
+                extra={"deadline_sec": self.deadline, "probed": self.probed, "alive": self.alive},
+            )
+
+
+def sweep(hosts: Iterable[str], **kwargs) -> List[str]:
+    return list(TcpAliveSweep(hosts, **kwargs))
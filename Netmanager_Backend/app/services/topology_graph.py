@@ -0,0 +1,556 @@
+"""
+Process-wide, versioned in-memory topology graph.
+
+Path trace, one-click diagnosis and the topology endpoints used to reload the
+``links`` table on every request (and again per hop). ``topology_graph_store.get(db)``
+returns a ``TopologyGraph`` that is loaded once per database engine and then kept
+up to date incrementally:
+
+- ORM writes to ``Link`` are collected on flush and applied when the session
+  commits (dropped, and the graph reloaded, on rollback)
+- ``link_update`` events from other processes (syslog, SNMP trap, gNMI, topology
+  refresh) update link state via ``start_event_listener()``
+- every commit that changed ``Link`` rows publishes ``topology_graph_changed``.
+  For status-only commits it carries the new ``link_states`` and the other
+  processes patch their graphs in place; for inserted, deleted or re-wired links
+  they mark their graphs stale, so links inserted or deleted by a Celery worker
+  show up on the next API read
+- anything the events cannot describe (a new link seen from another process)
+  marks the graph stale; it is also reloaded after ``TOPOLOGY_GRAPH_MAX_AGE_SEC``
+  (the fallback when Redis is unavailable)
+
+Layout: device ids are mapped to dense node indices; each node keeps two
+parallel ``array`` s (neighbor node index, link id). Links are ``GraphLink``
+tuples with the same attribute names as the ``Link`` model, plus an interface
+index ``(device_id, normalized port) -> link ids`` for hop resolution.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import socket
+import threading
+import time
+import weakref
+from array import array
+from collections import deque
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from app.models.device import Link
+
+logger = logging.getLogger(__name__)
+
+TOPOLOGY_GRAPH_ENABLED = os.getenv("TOPOLOGY_GRAPH_ENABLED", "true").strip().lower() in ("1", "true", "yes", "on")
+TOPOLOGY_GRAPH_MAX_AGE_SEC = float(os.getenv("TOPOLOGY_GRAPH_MAX_AGE_SEC", "300"))
+
+ACTIVE_STATUSES = ("active", "up")
+
+_INTF_PREFIXES = {
+    "gi": "gigabitethernet",
+    "fa": "fastethernet",
+    "te": "tengigabitethernet",
+    "fo": "fortygigabitethernet",
+    "hu": "hundredgigabitethernet",
+    "po": "port-channel",
+    "vl": "vlan",
+    "eth": "ethernet",
+}
+
+_CHANGES_KEY = "_topology_graph_changes"
+GRAPH_CHANGED_EVENT = "topology_graph_changed"
+# 이 필드만 바뀐 링크는 상태 변경: 다른 프로세스는 재적재 없이 상태만 반영
+_STATE_FIELDS = ("status", "last_seen", "confidence")
+
+
+def _process_origin() -> str:
+    # fork 된 워커마다 달라야 하므로 매번 계산
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def normalize_intf_key(name: str) -> str:
+    if not name:
+        return ""
+    s = name.strip().lower().replace(" ", "")
+    for short, full in _INTF_PREFIXES.items():
+        if s.startswith(short) and not s.startswith(full):
+            rest = s[len(short):]
+            if rest and (rest[0].isdigit() or rest[0] == "/"):
+                return full + rest
+    return s
+
+
+class GraphLink(NamedTuple):
+    id: int
+    source_device_id: int
+    source_interface_name: Optional[str]
+    target_device_id: int
+    target_interface_name: Optional[str]
+    status: Optional[str]
+    protocol: Optional[str]
+    link_speed: Optional[str]
+
+    @property
+    def is_active(self) -> bool:
+        return str(self.status or "") in ACTIVE_STATUSES
+
+    def peer_of(self, device_id: int) -> Tuple[int, Optional[str]]:
+        """(other device id, its interface name) as seen from ``device_id``."""
+        if self.source_device_id == device_id:
+            return self.target_device_id, self.target_interface_name
+        return self.source_device_id, self.source_interface_name
+
+
+def _record(link) -> Optional[GraphLink]:
+    if link.id is None or link.source_device_id is None or link.target_device_id is None:
+        return None
+    return GraphLink(
+        int(link.id),
+        int(link.source_device_id),
+        link.source_interface_name,
+        int(link.target_device_id),
+        link.target_interface_name,
+        link.status,
+        link.protocol,
+        link.link_speed,
+    )
+
+
+class TopologyGraph:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.version = 0
+        self.loaded_at = 0.0
+        self.stale = False
+        self._index: Dict[int, int] = {}
+        self._ids = array("q")
+        self._adj_nodes: List[array] = []
+        self._adj_links: List[array] = []
+        self._links: Dict[int, GraphLink] = {}
+        self._by_intf: Dict[Tuple[int, str], List[int]] = {}
+
+    # -- build / mutate -------------------------------------------------------
+
+    def load(self, links: Iterable[GraphLink]) -> "TopologyGraph":
+        with self._lock:
+            self._index = {}
+            self._ids = array("q")
+            self._adj_nodes = []
+            self._adj_links = []
+            self._links = {}
+            self._by_intf = {}
+            for rec in links:
+                self._add(rec)
+            self.loaded_at = time.monotonic()
+            self.stale = False
+            self.version += 1
+        return self
+
+    def _node(self, device_id: int) -> int:
+        idx = self._index.get(device_id)
+        if idx is None:
+            idx = len(self._ids)
+            self._index[device_id] = idx
+            self._ids.append(device_id)
+            self._adj_nodes.append(array("i"))
+            self._adj_links.append(array("q"))
+        return idx
+
+    def _add(self, rec: GraphLink) -> None:
+        self._links[rec.id] = rec
+        a = self._node(rec.source_device_id)
+        b = self._node(rec.target_device_id)
+        self._adj_nodes[a].append(b)
+        self._adj_links[a].append(rec.id)
+        self._adj_nodes[b].append(a)
+        self._adj_links[b].append(rec.id)
+        for dev, intf in ((rec.source_device_id, rec.source_interface_name), (rec.target_device_id, rec.target_interface_name)):
+            key = normalize_intf_key(intf or "")
+            if key:
+                self._by_intf.setdefault((dev, key), []).append(rec.id)
+
+    def _remove(self, link_id: int) -> Optional[GraphLink]:
+        rec = self._links.pop(link_id, None)
+        if rec is None:
+            return None
+        for dev in {rec.source_device_id, rec.target_device_id}:
+            idx = self._index[dev]
+            links = self._adj_links[idx]
+            nodes = self._adj_nodes[idx]
+            for pos in range(len(links) - 1, -1, -1):
+                if links[pos] == link_id:
+                    del links[pos]
+                    del nodes[pos]
+        for dev, intf in ((rec.source_device_id, rec.source_interface_name), (rec.target_device_id, rec.target_interface_name)):
+            key = (dev, normalize_intf_key(intf or ""))
+            ids = self._by_intf.get(key)
+            if ids and link_id in ids:
+                ids.remove(link_id)
+                if not ids:
+                    del self._by_intf[key]
+        return rec
+
+    def upsert(self, rec: GraphLink) -> None:
+        with self._lock:
+            if self._links.get(rec.id) == rec:
+                return
+            self._remove(rec.id)
+            self._add(rec)
+            self.version += 1
+
+    def remove(self, link_id: int) -> None:
+        with self._lock:
+            if self._remove(int(link_id)) is not None:
+                self.version += 1
+
+    def remove_device(self, device_id: int) -> None:
+        with self._lock:
+            idx = self._index.get(int(device_id))
+            if idx is None:
+                return
+            for link_id in set(self._adj_links[idx]):
+                self._remove(link_id)
+            self.version += 1
+
+    def set_status(self, link_id: int, status: str) -> bool:
+        with self._lock:
+            rec = self._links.get(int(link_id))
+            if rec is None:
+                return False
+            if rec.status != status:
+                self._links[rec.id] = rec._replace(status=status)
+                self.version += 1
+            return True
+
+    def set_interface_status(self, device_id: int, interface: str, status: str) -> int:
+        with self._lock:
+            ids = list(self._by_intf.get((int(device_id), normalize_intf_key(interface or "")), []))
+            for link_id in ids:
+                self.set_status(link_id, status)
+            return len(ids)
+
+    def mark_stale(self) -> None:
+        self.stale = True
+
+    # -- queries --------------------------------------------------------------
+
+    def link(self, link_id: int) -> Optional[GraphLink]:
+        return self._links.get(int(link_id))
+
+    def links(self) -> List[GraphLink]:
+        with self._lock:
+            return list(self._links.values())
+
+    def links_for_device(self, device_id: int, active_only: bool = True) -> List[GraphLink]:
+        with self._lock:
+            idx = self._index.get(int(device_id))
+            if idx is None:
+                return []
+            out = []
+            seen = set()
+            for link_id in self._adj_links[idx]:
+                if link_id in seen:
+                    continue
+                seen.add(link_id)
+                rec = self._links[link_id]
+                if not active_only or rec.is_active:
+                    out.append(rec)
+            return out
+
+    def find_link(self, a: int, b: int, active_only: bool = False) -> Optional[GraphLink]:
+        """Lowest-id link between ``a`` and ``b`` (same pick as the old ``.first()`` query)."""
+        with self._lock:
+            idx_a = self._index.get(int(a))
+            idx_b = self._index.get(int(b))
+            if idx_a is None or idx_b is None:
+                return None
+            best = None
+            nodes = self._adj_nodes[idx_a]
+            links = self._adj_links[idx_a]
+            for pos in range(len(nodes)):
+                if nodes[pos] != idx_b:
+                    continue
+                rec = self._links[links[pos]]
+                if active_only and not rec.is_active:
+                    continue
+                if best is None or rec.id < best.id:
+                    best = rec
+            return best
+
+    def peer_on_interface(self, device_id: int, interface: str) -> Tuple[Optional[int], Optional[str]]:
+        """Active link on ``device_id``'s ``interface`` -> (peer device id, peer interface)."""
+        key = normalize_intf_key(interface or "")
+        if not key:
+            return None, None
+        with self._lock:
+            for link_id in sorted(self._by_intf.get((int(device_id), key), [])):
+                rec = self._links[link_id]
+                if rec.is_active:
+                    return rec.peer_of(int(device_id))
+        return None, None
+
+    def shortest_path(self, start_id: int, end_id: int, active_only: bool = True) -> List[int]:
+        """BFS over node indices with a parent array; returns device ids or []."""
+        with self._lock:
+            if start_id == end_id:
+                return [start_id]
+            s = self._index.get(int(start_id))
+            t = self._index.get(int(end_id))
+            if s is None or t is None:
+                return []
+            parent = array("i", [-1]) * len(self._ids)
+            parent[s] = s
+            queue = deque([s])
+            while queue:
+                node = queue.popleft()
+                if node == t:
+                    break
+                nodes = self._adj_nodes[node]
+                links = self._adj_links[node]
+                for pos in range(len(nodes)):
+                    nxt = nodes[pos]
+                    if parent[nxt] != -1:
+                        continue
+                    if active_only and not self._links[links[pos]].is_active:
+                        continue
+                    parent[nxt] = node
+                    queue.append(nxt)
+            if parent[t] == -1:
+                return []
+            path = [t]
+            while path[-1] != s:
+                path.append(parent[path[-1]])
+            return [self._ids[i] for i in reversed(path)]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"version": self.version, "nodes": len(self._ids), "links": len(self._links)}
+
+
+def _load_links(db: Session) -> List[GraphLink]:
+    rows = (
+        db.query(
+            Link.id,
+            Link.source_device_id,
+            Link.source_interface_name,
+            Link.target_device_id,
+            Link.target_interface_name,
+            Link.status,
+            Link.protocol,
+            Link.link_speed,
+        )
+        .filter(Link.source_device_id.isnot(None), Link.target_device_id.isnot(None))
+        .all()
+    )
+    return [GraphLink(int(r[0]), int(r[1]), r[2], int(r[3]), r[4], r[5], r[6], r[7]) for r in rows]
+
+
+def _has_uncommitted_link_changes(db: Session) -> bool:
+    if db.info.get(_CHANGES_KEY):
+        return True
+    return any(isinstance(o, Link) for o in list(db.new) + list(db.dirty) + list(db.deleted))
+
+
+class TopologyGraphStore:
+    def __init__(self, max_age: float = TOPOLOGY_GRAPH_MAX_AGE_SEC, enabled: bool = TOPOLOGY_GRAPH_ENABLED):
+        self.max_age = float(max_age)
+        self.enabled = bool(enabled)
+        self._lock = threading.Lock()
+        # engine -> graph (테스트/다중 DB 에서 서로 섞이지 않도록 bind 별로 보관)
+        self._graphs: "weakref.WeakKeyDictionary[object, TopologyGraph]" = weakref.WeakKeyDictionary()
+        self._listener: Optional[threading.Thread] = None
+
+    def get(self, db: Session) -> TopologyGraph:
+        """
+        Graph for ``db``'s database. A session with uncommitted ``Link`` changes gets a
+        private graph built from its own view so the shared one only ever holds committed state.
+        """
+        if not self.enabled or _has_uncommitted_link_changes(db):
+            return TopologyGraph().load(_load_links(db))
+        bind = db.get_bind()
+        with self._lock:
+            graph = self._graphs.get(bind)
+            if graph is None:
+                graph = TopologyGraph()
+                self._graphs[bind] = graph
+        if graph.loaded_at and not graph.stale and (self.max_age <= 0 or time.monotonic() - graph.loaded_at < self.max_age):
+            return graph
+        with graph._lock:
+            if not graph.loaded_at or graph.stale or (self.max_age > 0 and time.monotonic() - graph.loaded_at >= self.max_age):
+                graph.load(_load_links(db))
+        return graph
+
+    def loaded(self, bind=None) -> List[TopologyGraph]:
+        with self._lock:
+            if bind is not None:
+                g = self._graphs.get(bind)
+                return [g] if g is not None else []
+            return list(self._graphs.values())
+
+    def invalidate(self, bind=None) -> None:
+        for graph in self.loaded(bind):
+            graph.mark_stale()
+
+    def apply_event(self, data: Dict) -> None:
+        """Apply a ``link_update`` payload to every loaded graph."""
+        if not isinstance(data, dict):
+            return
+        state = str(data.get("state") or "").strip().lower()
+        if state not in ("up", "down", "active", "inactive"):
+            return  # degraded 등은 경로 계산에 영향 없음
+        for graph in self.loaded():
+            try:
+                with graph._lock:
+                    self._apply_event_to(graph, state, data)
+            except Exception:
+                logger.debug("Topology graph event apply failed", exc_info=True)
+                graph.mark_stale()
+
+    @staticmethod
+    def _apply_event_to(graph: TopologyGraph, state: str, data: Dict) -> None:
+        if data.get("link_ids"):
+            status = "down" if state == "down" else "up"
+            for link_id in data["link_ids"]:
+                if not graph.set_status(int(link_id), status):
+                    graph.mark_stale()
+        elif data.get("neighbor_device_id") is not None:
+            # topology refresh: 새 링크일 수 있으므로 못 찾으면 다음 조회 때 재적재
+            status = "active" if state in ("up", "active") else "inactive"
+            dev = int(data.get("device_id"))
+            ids = graph._by_intf.get((dev, normalize_intf_key(data.get("local_interface") or "")), [])
+            peer = int(data["neighbor_device_id"])
+            matched = [i for i in ids if peer in (graph._links[i].source_device_id, graph._links[i].target_device_id)]
+            if not matched:
+                graph.mark_stale()
+            for link_id in matched:
+                graph.set_status(link_id, status)
+        elif data.get("device_id") is not None and data.get("interface"):
+            graph.set_interface_status(int(data["device_id"]), str(data["interface"]), "down" if state == "down" else "up")
+
+    def apply_changed_event(self, data: Dict) -> None:
+        """Another process committed ``Link`` changes: apply status-only changes, otherwise reload on the next ``get``."""
+        if not isinstance(data, dict):
+            return
+        if data.get("origin") == _process_origin():
+            return  # after_commit 에서 이미 반영함
+        states = data.get("link_states")
+        if data.get("structural", True) or not isinstance(states, dict):
+            self.invalidate()
+            return
+        for graph in self.loaded():
+            with graph._lock:
+                for link_id, status in states.items():
+                    if not graph.set_status(int(link_id), status):
+                        graph.mark_stale()
+
+    def start_event_listener(self) -> None:
+        """Follow ``link_update`` / ``topology_graph_changed`` events (local and, via Redis, from workers) in a daemon thread."""
+        if self._listener is not None:
+            return
+        from app.services.realtime_event_bus import realtime_event_bus
+
+        q = realtime_event_bus.subscribe()
+
+        def _run():
+            while True:
+                msg = q.get()
+                if msg.event == "link_update":
+                    self.apply_event(msg.data)
+                elif msg.event == GRAPH_CHANGED_EVENT:
+                    self.apply_changed_event(msg.data)
+
+        self._listener = threading.Thread(target=_run, name="topology-graph-events", daemon=True)
+        self._listener.start()
+
+
+topology_graph_store = TopologyGraphStore()
+
+
+def note_device_links_removed(db: Session, device_id: int) -> None:
+    """For bulk ``Link`` deletes that bypass the ORM flush hooks."""
+    db.info.setdefault(_CHANGES_KEY, []).append(("drop_device", int(device_id)))
+
+
+def _publish_graph_changed(link_states: Optional[Dict[int, Optional[str]]] = None) -> None:
+    """``link_states`` for status-only commits; None means links were inserted, deleted or re-wired."""
+    payload = {"origin": _process_origin(), "structural": link_states is None}
+    if link_states is not None:
+        payload["link_states"] = {str(k): v for k, v in link_states.items()}
+    try:
+        from app.services.realtime_event_bus import realtime_event_bus
+
+        realtime_event_bus.publish(GRAPH_CHANGED_EVENT, payload)
+    except Exception:
+        logger.debug("Topology graph change broadcast failed", exc_info=True)
+
+
+def _structural_change(obj: Link) -> bool:
+    state = inspect(obj)
+    return any(attr.history.has_changes() for attr in state.attrs if attr.key not in _STATE_FIELDS)
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_link_changes(session: Session, flush_context) -> None:
+    changes = None
+    new = set(session.new)
+    for obj in list(new) + list(session.dirty):
+        if isinstance(obj, Link):
+            rec = _record(obj)
+            if changes is None:
+                changes = session.info.setdefault(_CHANGES_KEY, [])
+            if rec is None:
+                changes.append(("delete", obj.id))
+            else:
+                changes.append(("upsert" if obj in new or _structural_change(obj) else "state", rec))
+    for obj in session.deleted:
+        if isinstance(obj, Link) and obj.id is not None:
+            if changes is None:
+                changes = session.info.setdefault(_CHANGES_KEY, [])
+            changes.append(("delete", obj.id))
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_link_changes(session: Session) -> None:
+    changes = session.info.pop(_CHANGES_KEY, None)
+    if not changes:
+        return
+    if any(op != "state" for op, _ in changes):
+        _publish_graph_changed()
+    else:
+        # 상태만 바뀐 commit (예: 인터페이스 down) 도 다른 프로세스 그래프에 바로 반영되도록
+        _publish_graph_changed({rec.id: rec.status for _, rec in changes})
+    try:
+        graphs = topology_graph_store.loaded(session.get_bind())
+    except Exception:
+        graphs = topology_graph_store.loaded()
+    for graph in graphs:
+        try:
+            for op, arg in changes:
+                if op in ("upsert", "state"):
+                    graph.upsert(arg)
+                elif op == "delete":
+                    graph.remove(arg)
+                elif op == "drop_device":
+                    graph.remove_device(arg)
+                elif op == "invalidate":
+                    graph.mark_stale()
+        except Exception:
+            logger.debug("Topology graph update failed", exc_info=True)
+            graph.mark_stale()
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_link_changes(session: Session, previous_transaction) -> None:
+    if not session.info.get(_CHANGES_KEY):
+        return
+    if session.in_transaction():
+        # savepoint 만 rollback: 바깥 트랜잭션의 변경은 유효하지만 어느 것이 취소됐는지 모르므로 commit 시 재적재
+        session.info[_CHANGES_KEY].append(("invalidate", None))
+        return
+    session.info.pop(_CHANGES_KEY, None)
+    try:
+        topology_graph_store.invalidate(session.get_bind())
+    except Exception:
+        topology_graph_store.invalidate()
@@ -2,12 +2,36 @@ from datetime import datetime, timezone
 import json
 from typing import Any, Dict, Iterable, Optional, Tuple
 
-from sqlalchemy import func, or_
+from sqlalchemy import event, func, or_
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
 from app.models.device import Device, Link
 from app.models.topology import TopologyChangeEvent
+from app.services.topology_graph import note_device_links_removed
+
+_PENDING_LINK_EVENTS_KEY = "topology_link_events"
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_link_events(session: Session) -> None:
+    # 링크 행이 commit 된 뒤에 발행: 구독자가 아직 보이지 않거나 rollback 될 상태를 읽지 않도록
+    pending = session.info.pop(_PENDING_LINK_EVENTS_KEY, None)
+    if not pending:
+        return
+    try:
+        from app.services.realtime_event_bus import realtime_event_bus
+
+        for payload in pending:
+            realtime_event_bus.publish("link_update", payload)
+    except Exception:
+        pass
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_link_events(session: Session, previous_transaction) -> None:
+    if not session.in_transaction():
+        session.info.pop(_PENDING_LINK_EVENTS_KEY, None)
 
 
 class TopologyLinkService:
@@ -42,6 +66,7 @@ class TopologyLinkService:
                 Link.target_device_id == device_id,
             )
         ).delete(synchronize_session=False)
+        note_device_links_removed(db, device_id)
 
     @staticmethod
     def _normalize_link(
@@ -266,25 +291,21 @@ class TopologyLinkService:
                 )
 
         if touched:
-            try:
-                from app.services.realtime_event_bus import realtime_event_bus
-
-                for src_id, src_intf, dst_id, dst_intf, protocol, state in touched[:2000]:
-                    realtime_event_bus.publish(
-                        "link_update",
-                        {
-                            "device_id": src_id,
-                            "neighbor_device_id": dst_id,
-                            "local_interface": src_intf,
-                            "remote_interface": dst_intf,
-                            "protocol": protocol,
-                            "state": state,
-                            "ts": now.isoformat(),
-                            "source": "topology_refresh",
-                        },
-                    )
-            except Exception:
-                pass
+            # 호출자가 commit 하면 발행 (_publish_link_events)
+            pending = db.info.setdefault(_PENDING_LINK_EVENTS_KEY, [])
+            for src_id, src_intf, dst_id, dst_intf, protocol, state in touched[:2000]:
+                pending.append(
+                    {
+                        "device_id": src_id,
+                        "neighbor_device_id": dst_id,
+                        "local_interface": src_intf,
+                        "remote_interface": dst_intf,
+                        "protocol": protocol,
+                        "state": state,
+                        "ts": now.isoformat(),
+                        "source": "topology_refresh",
+                    }
+                )
 
             try:
                 site_id = getattr(device, "site_id", None)
@@ -104,11 +104,11 @@ def deploy_vlan_bulk_task(device_ids: list[int], vlan_id: int, vlan_name: str):
                     )
                 )
                 if conn.connect():
-                    res = conn.deploy_config_template(vlan_template, {"vlan_id": vlan_id, "vlan_name": vlan_name})
+                    with conn:
+                        res = conn.deploy_config_template(vlan_template, {"vlan_id": vlan_id, "vlan_name": vlan_name})
                     summary.append(
                         {"id": d_id, "name": dev.name, "status": "success" if res.get("success") else "failed"}
                     )
-                    conn.disconnect()
                 else:
                     summary.append({"id": d_id, "name": dev.name, "status": "failed"})
             except Exception:
@@ -1,6 +1,7 @@
 """
 Maintenance Tasks: 시스템 유지보수 작업
 - DB 데이터 보존 정책 (Log Retention)
+- 메트릭 롤업 (1m/5m/1h 다운샘플)
 """
 try:
     from celery import shared_task
@@ -13,6 +14,8 @@ except ModuleNotFoundError:
         return decorator
 from datetime import datetime, timedelta
 import logging
+import os
+from sqlalchemy import text
 from app.db.session import SessionLocal
 from app.models.device import SystemMetric, InterfaceMetric, EventLog
 from app.models.settings import SystemSetting
@@ -20,12 +23,52 @@ from app.models.settings import SystemSetting
 logger = logging.getLogger(__name__)
 
 
+def _trim_time_series(db, model, cutoff_date):
+    """
+    보존 기간이 지난 행 정리. Returns (deleted rows, dropped partitions).
+    - PostgreSQL 파티션 테이블: 기간이 지난 일 단위 파티션을 DETACH/DROP (+ default 파티션만 DELETE)
+    - 그 외(SQLite, 일반 테이블, hypertable): 기존 DELETE
+    """
+    from app.services import metric_partitions
+
+    table = model.__tablename__
+    if metric_partitions.storage_mode(db, table) == "partitioned":
+        dropped = metric_partitions.drop_partitions_before(db, table, cutoff_date)
+        deleted = db.execute(
+            text(f"DELETE FROM {table}_default WHERE timestamp < :cutoff"), {"cutoff": cutoff_date}
+        ).rowcount
+        return int(deleted or 0), len(dropped)
+    deleted = db.query(model).filter(model.timestamp < cutoff_date).delete(synchronize_session=False)
+    return deleted, 0
+
+
+@shared_task
+def ensure_metric_partitions():
+    """PostgreSQL 파티션 테이블의 미래 일 단위 파티션을 미리 생성 (METRIC_PARTITION_DAYS_AHEAD)"""
+    from app.services import metric_partitions
+
+    db = SessionLocal()
+    try:
+        created = {}
+        for table in metric_partitions.PARTITIONED_TABLES:
+            if metric_partitions.storage_mode(db, table) == "partitioned":
+                created[table] = metric_partitions.ensure_partitions(db, table)
+        db.commit()
+        return created
+    except Exception as e:
+        logger.exception("Partition maintenance failed")
+        db.rollback()
+        return f"Error: {e}"
+    finally:
+        db.close()
+
+
 @shared_task
 def run_log_retention():
     """
     [핵심] DB 데이터 보존 정책 실행
     - SystemSetting에서 backup_retention_days 값을 가져옴
-    - 해당 일수보다 오래된 SystemMetric, EventLog 삭제
+    - 해당 일수보다 오래된 SystemMetric, EventLog 삭제 (파티션 테이블이면 파티션 DROP)
     - 매일 새벽 3시에 실행되도록 celery_app에서 스케줄링
     """
     db = SessionLocal()
@@ -49,29 +92,50 @@ def run_log_retention():
         )
         
         # 2. 오래된 SystemMetric 삭제
-        metrics_deleted = db.query(SystemMetric).filter(
-            SystemMetric.timestamp < cutoff_date
-        ).delete(synchronize_session=False)
+        metrics_deleted, metric_parts = _trim_time_series(db, SystemMetric, cutoff_date)
 
         # 2-1. 오래된 InterfaceMetric 삭제
-        if_metrics_deleted = db.query(InterfaceMetric).filter(
-            InterfaceMetric.timestamp < cutoff_date
-        ).delete(synchronize_session=False)
+        if_metrics_deleted, if_metric_parts = _trim_time_series(db, InterfaceMetric, cutoff_date)
         
+        # 2-2. 롤업은 raw 보다 오래 보관 (기본 365일)
+        from app.models.device import SystemMetricRollup, InterfaceMetricRollup
+
+        rollup_cutoff = datetime.now() - timedelta(days=max(retention_days, int(os.getenv("METRIC_ROLLUP_RETENTION_DAYS", "365"))))
+        db.query(SystemMetricRollup).filter(SystemMetricRollup.bucket < rollup_cutoff).delete(synchronize_session=False)
+        db.query(InterfaceMetricRollup).filter(InterfaceMetricRollup.bucket < rollup_cutoff).delete(synchronize_session=False)
+
         # 3. 오래된 EventLog 삭제
-        logs_deleted = db.query(EventLog).filter(
-            EventLog.timestamp < cutoff_date
-        ).delete(synchronize_session=False)
+        logs_deleted, log_parts = _trim_time_series(db, EventLog, cutoff_date)
+
+        # 3-1. 오래된 Discovery job 로그 삭제 (job 요약은 DiscoveryJob.logs 에 남음)
+        from app.models.discovery import DiscoveryJobLog
+
+        db.query(DiscoveryJobLog).filter(DiscoveryJobLog.created_at < cutoff_date).delete(synchronize_session=False)
         
         db.commit()
+
+        # 4. 이전 형식(raw_config 본문)으로 저장된 config 백업을 압축 blob 으로 이전
+        #    + 삭제된 백업(장비 삭제 등)만 가리키던 blob 정리
+        try:
+            from app.db.config_store import compact_legacy_backups, prune_orphan_blobs
+
+            compact_legacy_backups(db, batch_size=int(os.getenv("CONFIG_COMPACT_BATCH", "2000")))
+            db.commit()
+            prune_orphan_blobs(db)
+            db.commit()
+        except Exception:
+            db.rollback()
+            logger.exception("Config backup compaction failed")
         
-        result_msg = f"✅ [Maintenance] Completed. Deleted: {metrics_deleted} system metrics, {if_metrics_deleted} interface metrics, {logs_deleted} event logs (older than {retention_days} days)"
+        partitions_dropped = metric_parts + if_metric_parts + log_parts
+        result_msg = f"✅ [Maintenance] Completed. Deleted: {metrics_deleted} system metrics, {if_metrics_deleted} interface metrics, {logs_deleted} event logs, dropped {partitions_dropped} partitions (older than {retention_days} days)"
         logger.info(
             "Log retention completed",
             extra={
                 "metrics_deleted": metrics_deleted,
                 "if_metrics_deleted": if_metrics_deleted,
                 "logs_deleted": logs_deleted,
+                "partitions_dropped": partitions_dropped,
                 "retention_days": retention_days,
             },
         )
@@ -83,3 +147,25 @@ def run_log_retention():
         return f"Error: {e}"
     finally:
         db.close()
+
+
+@shared_task
+def run_metric_rollups():
+    """
+    SystemMetric/InterfaceMetric 롤업 테이블을 워터마크 기준으로 증분 갱신.
+    TimescaleDB continuous aggregate 가 있으면 아무것도 하지 않음.
+    """
+    from app.services.metric_rollup import run_rollups
+
+    db = SessionLocal()
+    try:
+        written = run_rollups(db)
+        if any(written.values()):
+            logger.info("Metric rollups updated", extra={"written": written})
+        return written
+    except Exception as e:
+        logger.exception("Metric rollup failed")
+        db.rollback()
+        return f"Error: {e}"
+    finally:
+        db.close()
@@ -7,23 +7,33 @@ except ModuleNotFoundError:
         if args and callable(args[0]) and not kwargs:
             return args[0]
         return decorator
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 from app.db.session import SessionLocal
+from app.db.encrypted_types import snmp_only, ssh_login_only, without_credentials
 # [수정] Issue 모델 임포트 추가
 from app.models.device import Device, SystemMetric, InterfaceMetric, Issue
 from app.models.settings import SystemSetting
 from app.models.automation import AutomationRule # [NEW]
 from app.services.snmp_service import SnmpManager
+from app.services.snmp_async_engine import snmp_async_engine, with_deadline
+from app.services.icmp_sweeper import icmp_sweeper
+from app.services.issue_upsert import IssueUpserter
+from app.services.counter_state_store import CounterStateStore, TOTAL_IFNAME, legacy_if_state
+from app.services.counter_rate_engine import CounterRateEngine
+import asyncio
 import datetime
-import subprocess
-import platform
 from datetime import timedelta
 import logging
 import os
+import time
 import redis
 
 logger = logging.getLogger(__name__)
 
+# 장비 1대의 SNMP 폴링(상태+리소스+인터페이스 카운터) 전체에 허용되는 최대 시간
+SNMP_TARGET_DEADLINE_SEC = float(os.getenv("SNMP_TARGET_DEADLINE_SEC", "20"))
+
 
 def parse_uptime(uptime_value) -> str:
     """SNMP TimeTicks 변환 함수"""
@@ -42,79 +52,123 @@ def parse_uptime(uptime_value) -> str:
 
 def ping_device(ip_address):
     """Ping 생존 확인 함수"""
-    param = '-n' if platform.system().lower() == 'windows' else '-c'
-    timeout_param = '-w' if platform.system().lower() == 'windows' else '-W'
-    timeout_val = '1000' if platform.system().lower() == 'windows' else '1'
+    return icmp_sweeper.ping(ip_address, timeout=1.0) is not None
+
+
+def _snmp_manager_for_target(target: dict) -> SnmpManager:
+    return SnmpManager(
+        target["ip"],
+        target.get("comm") or "public",
+        port=int(target.get("snmp_port") or 161),
+        version=str(target.get("snmp_version") or "v2c"),
+        v3_username=target.get("snmp_v3_username"),
+        v3_security_level=target.get("snmp_v3_security_level"),
+        v3_auth_proto=target.get("snmp_v3_auth_proto"),
+        v3_auth_key=target.get("snmp_v3_auth_key"),
+        v3_priv_proto=target.get("snmp_v3_priv_proto"),
+        v3_priv_key=target.get("snmp_v3_priv_key"),
+    )
+
+
+def _is_wlc_target(target: dict) -> bool:
+    dev_type = str(target.get("type") or "").lower()
+    model = str(target.get("model") or "").lower()
+    return "wlc" in dev_type or "9800" in model or "cisco_wlc" in dev_type
+
+
+async def _apoll_snmp_target(target: dict) -> dict:
+    """단일 장비 SNMP 수집 (상태 -> 리소스/인터페이스 카운터 동시 수집)"""
+    snmp = _snmp_manager_for_target(target)
+    out = {"status": None, "resource_data": None, "if_counters": None, "wlc_clients": None}
+    check = await snmp.acheck_status()
+    out["status"] = check
+    if check.get("status") != "online":
+        return out
+
+    async def _counters():
+        link_ports = target.get("link_ports") or []
+        try:
+            if isinstance(link_ports, list) and len(link_ports) > 0:
+                return await snmp.aget_interface_counters_for_ports(link_ports)
+            raw = await snmp.aget_interface_counters_map()
+            norm = {}
+            if isinstance(raw, dict):
+                for k, v in raw.items():
+                    pn = snmp.normalize_interface_name(k)
+                    if pn and isinstance(v, dict):
+                        norm[pn] = v
+            return norm
+        except Exception:
+            return None
 
-    command = ['ping', param, '1', timeout_param, timeout_val, ip_address]
-    try:
-        return subprocess.call(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL) == 0
-    except Exception:
-        return False
+    out["resource_data"], out["if_counters"] = await asyncio.gather(snmp.aget_resource_usage(), _counters())
+    if _is_wlc_target(target):
+        out["wlc_clients"] = await snmp.aget_wlc_client_count()
+    return out
 
 
-def create_issue_if_not_exists(db: Session, device_id: int, title: str, desc: str, severity: str, device_name: str = None):
+def _poll_snmp_targets(targets: list[dict], deadline: float | None = None) -> dict:
     """
-    [핵심] 중복되지 않는 경우에만 이슈 생성
-    사용자가 이슈를 삭제하기 전까지는 DB에 남아있어야 함.
-    [NEW] Critical 이슈 생성 시 이메일 알림 발송
+    Poll every target concurrently on the shared asyncio SNMP engine.
+    Each target gets its own deadline, so a few dead devices cannot stretch the cycle.
+    Returns {device_id: {"status", "resource_data", "if_counters", "wlc_clients"} | {"error"}}.
     """
-    existing_issue = db.query(Issue).filter(
-        Issue.device_id == device_id,
-        Issue.title == title
-    ).first()
-
-    if not existing_issue:
-        new_issue = Issue(
-            device_id=device_id,
-            title=title,
-            description=desc,
-            severity=severity,
-            status="active"
-        )
-        db.add(new_issue)
+    deadline = SNMP_TARGET_DEADLINE_SEC if deadline is None else deadline
+
+    async def _one(target):
         try:
-            from app.services.realtime_event_bus import realtime_event_bus
+            return target["id"], await with_deadline(_apoll_snmp_target(target), deadline)
+        except asyncio.TimeoutError:
+            return target["id"], {"error": f"SNMP deadline exceeded ({deadline:.0f}s)"}
+        except Exception as e:
+            return target["id"], {"error": str(e)}
 
-            realtime_event_bus.publish(
-                "issue_update",
-                {
-                    "device_id": int(device_id),
-                    "title": str(title),
-                    "severity": str(severity),
-                    "status": "active",
-                    "description": str(desc),
-                    "ts": datetime.datetime.now().isoformat(),
-                    "source": "monitoring",
-                },
-            )
-        except Exception:
-            pass
-        
-        # [NEW] Critical 이슈는 이메일 알림 발송
-        if severity == "critical":
-            try:
-                from app.services.email_service import EmailService
-                device_label = device_name or f"Device ID {device_id}"
-                EmailService.send_email(
-                    db,
-                    to_email=None,  # None이면 기본 관리자 이메일 사용
-                    subject=f"[CRITICAL] {title} - {device_label}",
-                    content=f"장비: {device_label}\n이슈: {title}\n상세: {desc}\n\n즉시 확인이 필요합니다."
-                )
-            except Exception as e:
-                logger.exception("Alert email failed", extra={"device_id": device_id, "device_name": device_name})
-        
-        return True  # 생성됨
-    return False  # 이미 있음
+    async def _run():
+        return dict(await asyncio.gather(*[_one(t) for t in targets if t.get("ip")]))
 
+    return snmp_async_engine.run_sync(_run())
 
-def _acquire_monitor_lock():
+
+def _counter_states_for_cycle(per_device: dict, prev_states: dict, now_ts: float) -> dict:
+    """
+    모든 장비/포트 카운터를 한 번에 rate 엔진에 넣어 계산.
+    per_device: {device_id: {"if_counters": {port: {...}}, "totals": {"in_octets", "out_octets"} | None, "sys_uptime": ticks | None,
+                             "counter_bits": 64 | None}}
+    포트별 counters 의 "counter_bits"(예: 32비트 octet fallback)가 장비 값보다 우선합니다.
+    Returns {device_id: {if_name: state entry}} (TOTAL_IFNAME 은 장비 합계).
+    """
+    samples = []
+    for device_id, data in per_device.items():
+        sys_uptime = data.get("sys_uptime")
+        device_bits = data.get("counter_bits")
+        totals = data.get("totals")
+        if isinstance(totals, dict):
+            # 합계는 포트 카운터 래핑과 맞지 않으므로 감소는 항상 리셋으로 취급 (64비트 규칙)
+            samples.append({"device_id": device_id, "if_name": TOTAL_IFNAME, "counters": totals, "ts": now_ts, "sys_uptime": sys_uptime, "counter_bits": 64})
+        if_counters = data.get("if_counters") or {}
+        if not isinstance(if_counters, dict):
+            continue
+        for port_norm, v in if_counters.items():
+            if not isinstance(v, dict):
+                continue
+            counters = dict(v)
+            counters.setdefault("in_octets", v.get("in", 0))
+            counters.setdefault("out_octets", v.get("out", 0))
+            bits = counters.pop("counter_bits", None) or device_bits
+            samples.append({"device_id": device_id, "if_name": str(port_norm), "counters": counters, "ts": now_ts, "sys_uptime": sys_uptime, "counter_bits": bits})
+
+    out = {}
+    for sample, entry in zip(samples, CounterRateEngine.compute(samples, prev_states)):
+        out.setdefault(sample["device_id"], {})[sample["if_name"]] = entry
+    return out
+
+
+def _acquire_setting_lock(key: str, lease_seconds: int) -> bool:
     db = SessionLocal()
     try:
         now = datetime.datetime.utcnow()
-        lock_until = now + datetime.timedelta(seconds=120)
-        setting = db.query(SystemSetting).filter(SystemSetting.key == "monitor_all_devices_lock").first()
+        lock_until = now + datetime.timedelta(seconds=lease_seconds)
+        setting = db.query(SystemSetting).filter(SystemSetting.key == key).first()
         if setting and setting.value:
             try:
                 current = datetime.datetime.fromisoformat(setting.value)
@@ -124,9 +178,9 @@ def _acquire_monitor_lock():
                 pass
         if not setting:
             setting = SystemSetting(
-                key="monitor_all_devices_lock",
+                key=key,
                 value=lock_until.isoformat(),
-                description="monitor_all_devices_lock",
+                description=key,
                 category="system"
             )
         else:
@@ -138,10 +192,15 @@ def _acquire_monitor_lock():
         db.close()
 
 
-def _evaluate_automation_rules(db: Session, device: Device, result: dict):
+def _acquire_monitor_lock():
+    return _acquire_setting_lock("monitor_all_devices_lock", 120)
+
+
+def _evaluate_automation_rules(db: Session, device: Device, result: dict, issues: IssueUpserter):
     """
     [Auto-Trigger] Check automation rules against collected metrics.
     If condition met and cooldown passed -> Trigger Action (Log/Issue/Task).
+    Issues are queued on ``issues``; the caller flushes, commits and publishes.
     """
     try:
         # 1. Fetch enabled rules
@@ -212,9 +271,8 @@ def _evaluate_automation_rules(db: Session, device: Device, result: dict):
                 # Action Trigger!
                 logger.info(f"[Auto-Trigger] Rule '{rule.name}' triggered on device {device.name} ({device.ip_address})")
                 
-                # 1. Log to Issue (Visibility)
-                create_issue_if_not_exists(
-                    db, 
+                # 1. Log to Issue (Visibility) - 커밋 후 발행되도록 사이클의 IssueUpserter 로
+                issues.add(
                     device.id, 
                     f"Auto-Trigger: {rule.name}", 
                     f"Condition met: {rule.trigger_type} {rule.trigger_condition} {rule.trigger_value}. Action: {rule.action_type}", 
@@ -237,25 +295,155 @@ def _evaluate_automation_rules(db: Session, device: Device, result: dict):
 @shared_task
 def monitor_all_devices():
     """
-    [통합 모니터링] 30초 주기 태스크 (Parallel Optimized)
-    1. Ping First: 모든 장비에 대해 병렬로 Ping 수행 (Online 여부 결정)
-    2. SNMP Metrics: Online인 장비에 대해서만 SNMP로 CPU, Mem, Traffic 수집
-    3. ThreadPoolExecutor: Windows 호환성 및 성능을 위해 멀티스레딩 사용 (Max 30 workers)
+    [통합 모니터링] 전체 장비 일괄 수집 (MONITOR_SCHEDULER_MODE=legacy 일 때 30초 beat)
+    기본 모드에서는 schedule_monitoring 이 샤드별 monitor_shard 로 장비별 주기에 맞춰 분산 실행합니다.
     """
-    import subprocess
-    import platform
-    from concurrent.futures import ThreadPoolExecutor, as_completed
-    from app.models.device import Device, SystemMetric, Issue, Link
-    from app.services.snmp_service import SnmpManager
-    
     if not _acquire_monitor_lock():
         return
+    _run_monitor_cycle()
+
+
+@shared_task
+def schedule_monitoring():
+    """
+    짧은 tick 주기로 새 장비의 샤드를 배정(assign_shards)하고, 비어 있는(lease 만료) 샤드마다 monitor_shard 를 1건씩 발행.
+    실제 대상 선정(claim_due)은 샤드 lease 를 잡은 워커가 수행하므로, 워커를 늘리면 샤드가 분산됩니다.
+    워커가 밀려 아직 시작하지 않은 monitor_shard 가 있는 샤드는 건너뜁니다(Redis 발행 마커, 태스크 expires).
+    """
+    from app.services.monitor_shards import SHARD_COUNT, SHARD_LEASE_SEC, ShardLeaseManager
+    from app.services.poll_scheduler import PollScheduler
+
+    db = SessionLocal()
+    try:
+        # 새 장비/샤드가 바뀐 장비만 배정 (tick 당 1회; 샤드별 claim 은 자기 샤드 행만 읽음)
+        PollScheduler.assign_shards(db)
+        db.commit()
+    except Exception:
+        logger.exception("Monitor shard assignment failed")
+        db.rollback()
+    try:
+        busy = ShardLeaseManager.busy_shards(db)
+    except Exception:
+        logger.exception("Monitor shard lookup failed")
+        busy = set()
+    finally:
+        db.close()
+
+    try:
+        r = redis.Redis.from_url(os.getenv("REDIS_URL", "redis://localhost:6379/0"))
+    except Exception:
+        r = None
+
+    for shard_id in range(SHARD_COUNT):
+        if shard_id in busy:
+            continue
+        if not _mark_shard_queued(r, shard_id, SHARD_LEASE_SEC):
+            continue
+        try:
+            monitor_shard.apply_async(args=[shard_id], expires=SHARD_LEASE_SEC)
+        except Exception:
+            logger.exception("Monitor shard dispatch failed", extra={"shard_id": shard_id})
+            _clear_shard_queued(r, shard_id)
+
+
+def _shard_queued_key(shard_id: int) -> str:
+    return f"monitor_shard:{int(shard_id)}:queued"
+
+
+def _mark_shard_queued(r, shard_id: int, ttl_seconds: int) -> bool:
+    """발행 마커 설정. False 면 같은 샤드의 monitor_shard 가 아직 큐에 있음 (Redis 장애 시에는 발행 허용)."""
+    if r is None:
+        return True
+    try:
+        return bool(r.set(_shard_queued_key(shard_id), "1", nx=True, ex=max(1, int(ttl_seconds))))
+    except Exception:
+        logger.warning("Monitor shard queue marker unavailable", extra={"shard_id": shard_id})
+        return True
+
+
+def _clear_shard_queued(r, shard_id: int) -> None:
+    try:
+        if r is None:
+            r = redis.Redis.from_url(os.getenv("REDIS_URL", "redis://localhost:6379/0"))
+        r.delete(_shard_queued_key(shard_id))
+    except Exception:
+        pass
+
+
+@shared_task
+def monitor_shard(shard_id: int):
+    """
+    샤드 1개 수집: lease 획득 -> 샤드 내 due 장비 claim -> 배치별 수집/결과 기록 -> lease 반납(사이클 시간 기록).
+    lease 를 다른 워커가 들고 있으면 바로 종료합니다.
+    """
+    from app.services.monitor_shards import ShardLeaseManager, worker_identity
+    from app.services.poll_scheduler import PollScheduler
+
+    shard_id = int(shard_id)
+    _clear_shard_queued(None, shard_id)
+    owner = worker_identity()
+    db = SessionLocal()
+    try:
+        if not ShardLeaseManager.acquire(db, shard_id, owner):
+            return
+        started_at = datetime.datetime.utcnow()
+        device_count = 0
+        polled_count = 0
+        error = None
+        try:
+            batches = PollScheduler.claim_due(db, shard_id=shard_id)
+            db.commit()
+            for ids, snmp_ids in batches:
+                outcomes = _run_monitor_cycle(device_ids=ids, snmp_device_ids=set(snmp_ids))
+                PollScheduler.record_outcomes(db, outcomes)
+                db.commit()
+                device_count += len(ids)
+                polled_count += len(snmp_ids)
+                if not ShardLeaseManager.renew(db, shard_id, owner):
+                    logger.warning("Monitor shard lease lost", extra={"shard_id": shard_id})
+                    return
+        except Exception as e:
+            logger.exception("Monitor shard cycle failed", extra={"shard_id": shard_id})
+            db.rollback()
+            error = str(e)
+        ShardLeaseManager.release(db, shard_id, owner, started_at, device_count, polled_count, error)
+    finally:
+        db.close()
+
+
+def _run_monitor_cycle(device_ids: list[int] | None = None, snmp_device_ids: set | None = None) -> list[dict]:
+    """
+    1. Ping First: 대상 장비를 ICMP 스윕 1회로 확인 (Online 여부 + RTT 기록)
+    2. SNMP Metrics: Online인 장비에 대해서만 SNMP로 CPU, Mem, Traffic 수집
+       (snmp_device_ids 가 주어지면 그 장비만, 나머지는 상태 확인만)
+    3. SNMP는 공유 asyncio 엔진에서 전 장비 동시 수행 (장비별 deadline: SNMP_TARGET_DEADLINE_SEC)
+    Returns [{"id", "alive", "snmp_attempted", "snmp_ok", "error"}] for the poll scheduler.
+    """
+    from sqlalchemy import or_
+    from sqlalchemy.orm import defer
+    from app.models.device import Device, SystemMetric, Issue, Link
 
     db = SessionLocal()
     try:
-        # 전체 장비 로드
-        devices = db.query(Device).all()
-        links = db.query(Link).filter(Link.target_device_id != None).all()
+        # SSH/enable 비밀번호는 복호화하지 않음, 파싱 결과 JSON 도 사이클에서 쓰지 않음
+        target_q = db.query(Device).options(*snmp_only(Device), defer(Device.latest_parsed_data))
+        if device_ids is None:
+            # 전체 장비 로드
+            devices = target_q.all()
+            links = db.query(Link).filter(Link.target_device_id != None).all()
+        else:
+            ids = sorted({int(x) for x in device_ids if x is not None})
+            devices = target_q.filter(Device.id.in_(ids)).all() if ids else []
+            links = (
+                db.query(Link)
+                .filter(
+                    (Link.target_device_id != None)
+                    & or_(Link.source_device_id.in_(ids), Link.target_device_id.in_(ids))
+                )
+                .all()
+                if ids
+                else []
+            )
         ports_by_device = {}
         for l in links:
             if l.source_device_id and l.source_interface_name:
@@ -266,11 +454,11 @@ def monitor_all_devices():
         gnmi_ts_map = {}
         try:
             r = redis.Redis.from_url(os.getenv("REDIS_URL", "redis://localhost:6379/0"))
-            device_ids = [d.id for d in devices]
-            if device_ids:
-                keys = [f"device:{did}:last_metric_ts" for did in device_ids]
+            loaded_ids = [d.id for d in devices]
+            if loaded_ids:
+                keys = [f"device:{did}:last_metric_ts" for did in loaded_ids]
                 values = r.mget(keys)
-                for did, val in zip(device_ids, values):
+                for did, val in zip(loaded_ids, values):
                     if val:
                         gnmi_ts_map[did] = float(val)
         except Exception as e:
@@ -291,11 +479,7 @@ def monitor_all_devices():
                 "snmp_v3_priv_key": getattr(d, "snmp_v3_priv_key", None),
                 "type": d.device_type, 
                 "model": d.model,
-                # Traffic 계산을 위해 이전 데이터 필요
-                "prev_data": d.latest_parsed_data,
                 "link_ports": list(ports_by_device.get(d.id, set())),
-                # [gNMI] Creds
-                "user": d.ssh_username, "pw": d.ssh_password,
                 "gnmi_port": d.gnmi_port, "telemetry_mode": d.telemetry_mode,
                 "last_gnmi_ts": gnmi_ts_map.get(d.id)
             } 
@@ -304,130 +488,106 @@ def monitor_all_devices():
     finally:
         db.close()
 
-    def check_device_full(target):
-        """단일 장비 전체 점검 (Worker Thread)"""
-        ip = target['ip']
-        comm = target['comm'] or 'public'
-        snmp_version = str(target.get("snmp_version") or "v2c")
-        snmp_port = int(target.get("snmp_port") or 161)
-        
-        # 1. Ping Check (OS Command)
-        param = '-n' if platform.system().lower() == 'windows' else '-c'
-        timeout_param = '-w' if platform.system().lower() == 'windows' else '-W'
-        timeout_val = '500' if platform.system().lower() == 'windows' else '1' # 500ms
-        
-        is_alive = False
-        try:
-            cmd = ['ping', param, '1', timeout_param, timeout_val, ip]
-            
-            # Windows Console Suppression
-            startupinfo = None
-            if platform.system().lower() == 'windows':
-                startupinfo = subprocess.STARTUPINFO()
-                startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
-            
-            ret = subprocess.run(
-                cmd, 
-                stdout=subprocess.DEVNULL, 
-                stderr=subprocess.DEVNULL,
-                startupinfo=startupinfo,
-                timeout=1.5 # 프로세스 타임아웃
-            )
-            is_alive = (ret.returncode == 0)
-        except Exception:
-            is_alive = False
-        
+    # 1. Ping: 전체 대상을 ICMP 소켓 하나로 한 번에 스윕 (RTT ms, 무응답은 None)
+    try:
+        rtt_by_ip = icmp_sweeper.sweep([t['ip'] for t in target_list if t.get('ip')])
+    except Exception:
+        # 스윕 자체가 실패한 것은 "전 장비 다운"이 아님: 이번 사이클은 상태를 건드리지 않음
+        logger.exception("ICMP sweep failed; skipping availability update for this cycle")
+        return []
+    rtt_by_id = {t['id']: rtt_by_ip.get(str(t.get('ip') or '').strip()) for t in target_list}
+    alive_by_id = {did: rtt is not None for did, rtt in rtt_by_id.items()}
+
+    # 2. Hybrid Metrics (SNMP Fallback Decision) (Only if Alive)
+    scan_results = []
+    snmp_targets = []
+    for target in target_list:
+        is_alive = alive_by_id.get(target['id'], False)
         result = {
             "id": target['id'],
             "alive": is_alive,
+            "rtt_ms": rtt_by_id.get(target['id']),
             "snmp_data": {},
             "resource_data": None,
             "snmp_error": None,
             "wlc_clients": None,
             "if_counters": None
         }
-
-        # 2. Hybrid Metrics (SNMP Fallback Decision) (Only if Alive)
-        metrics_collected = False
-        if is_alive:
-            telemetry_mode = target.get('telemetry_mode', 'hybrid')
-            
-            if telemetry_mode in ['gnmi', 'hybrid']:
-                last_ts = target.get('last_gnmi_ts')
-                if last_ts and (datetime.datetime.now().timestamp() - last_ts) < 60:
-                    metrics_collected = True
-                    result['snmp_data'] = {'status': 'online', 'uptime': 'N/A (gNMI Active)'}
-                else:
-                    if telemetry_mode == 'gnmi':
-                        metrics_collected = True 
-                        result['gnmi_error'] = "No gNMI data received in last 60s"
-
-            # B. SNMP Fallback (If not collected yet)
-            if not metrics_collected:
-                try:
-                    snmp = SnmpManager(
-                        ip,
-                        comm,
-                        port=snmp_port,
-                        version=snmp_version,
-                        v3_username=target.get("snmp_v3_username"),
-                        v3_security_level=target.get("snmp_v3_security_level"),
-                        v3_auth_proto=target.get("snmp_v3_auth_proto"),
-                        v3_auth_key=target.get("snmp_v3_auth_key"),
-                        v3_priv_proto=target.get("snmp_v3_priv_proto"),
-                        v3_priv_key=target.get("snmp_v3_priv_key"),
-                    )
-                    check = snmp.check_status()
-                    if check['status'] == 'online':
-                        result['snmp_data'] = check
-                        result['resource_data'] = snmp.get_resource_usage()
-                        link_ports = target.get('link_ports') or []
-                        try:
-                            if isinstance(link_ports, list) and len(link_ports) > 0:
-                                result['if_counters'] = snmp.get_interface_counters_for_ports(link_ports)
-                            else:
-                                raw = snmp.get_interface_counters_map()
-                                norm = {}
-                                if isinstance(raw, dict):
-                                    for k, v in raw.items():
-                                        pn = snmp.normalize_interface_name(k)
-                                        if pn and isinstance(v, dict):
-                                            norm[pn] = v
-                                result['if_counters'] = norm
-                        except Exception:
-                            result['if_counters'] = None
-                        
-                        # WLC Clients
-                        dev_type = str(target['type']).lower()
-                        model = str(target['model']).lower()
-                        if "wlc" in dev_type or "9800" in model or "cisco_wlc" in dev_type:
-                            result['wlc_clients'] = snmp.get_wlc_client_count()
-                except Exception as e:
-                    result['snmp_error'] = str(e)
-
-        return result
-
-    # 병렬 실행
-    scan_results = []
-    max_workers = 30 # 동시 실행 30개 제한 (윈도우 안정성)
-    
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        future_map = {executor.submit(check_device_full, t): t for t in target_list}
-        for future in as_completed(future_map):
-            try:
-                scan_results.append(future.result())
-            except Exception as e:
-                logger.exception("Monitor task error")
+        scan_results.append(result)
+        if not is_alive:
+            continue
+        if snmp_device_ids is not None and target['id'] not in snmp_device_ids:
+            result['status_only'] = True
+            continue
+
+        telemetry_mode = target.get('telemetry_mode', 'hybrid')
+        if telemetry_mode in ['gnmi', 'hybrid']:
+            last_ts = target.get('last_gnmi_ts')
+            if last_ts and (datetime.datetime.now().timestamp() - last_ts) < 60:
+                result['snmp_data'] = {'status': 'online', 'uptime': 'N/A (gNMI Active)'}
+                continue
+            if telemetry_mode == 'gnmi':
+                result['gnmi_error'] = "No gNMI data received in last 60s"
+                continue
+        snmp_targets.append(target)
+
+    # 3. SNMP: 모든 대상을 공유 asyncio 엔진에서 동시에 폴링 (장비별 deadline)
+    snmp_by_id = _poll_snmp_targets(snmp_targets) if snmp_targets else {}
+    for result in scan_results:
+        polled = snmp_by_id.get(result['id'])
+        if not polled:
+            continue
+        if polled.get('error'):
+            result['snmp_error'] = polled['error']
+        check = polled.get('status') or {}
+        if check.get('status') == 'online':
+            result['snmp_data'] = check
+            result['resource_data'] = polled.get('resource_data')
+            result['if_counters'] = polled.get('if_counters')
+            result['wlc_clients'] = polled.get('wlc_clients')
+
+    outcomes = []
+    for result in scan_results:
+        snmp_attempted = bool(result['alive']) and result['id'] in snmp_by_id
+        outcomes.append({
+            "id": result['id'],
+            "alive": bool(result['alive']),
+            "snmp_attempted": snmp_attempted,
+            "snmp_ok": snmp_attempted and result['snmp_data'].get('status') == 'online',
+            "error": result.get('snmp_error') if result['alive'] else "ping timeout",
+        })
 
     # DB Bulk Update Loop
     save_db = SessionLocal()
     try:
         if not scan_results:
-            return
+            return outcomes
         target_ids = [res["id"] for res in scan_results]
         devices_by_id = {
-            d.id: d for d in save_db.query(Device).filter(Device.id.in_(target_ids)).all()
+            d.id: d
+            for d in save_db.query(Device).options(*without_credentials(Device)).filter(Device.id.in_(target_ids)).all()
         }
+        issues = IssueUpserter(save_db, target_ids)
+        if_states = CounterStateStore.load(save_db, target_ids)
+        states_to_save = {}
+
+        # 이번 사이클의 모든 카운터를 한 번에 rate 계산 (wrap / 재부팅 처리 포함)
+        now_ts = datetime.datetime.now().timestamp()
+        per_device = {}
+        for res in scan_results:
+            device = devices_by_id.get(res['id'])
+            r_data = res.get('resource_data')
+            if not device or not res['alive'] or res['snmp_data'].get('status') != 'online' or not r_data:
+                continue
+            if device.id not in if_states:
+                # 최초 1회는 기존 JSON 상태를 이어받음
+                if_states[device.id] = legacy_if_state(device.latest_parsed_data)
+            per_device[device.id] = {
+                "if_counters": res.get('if_counters'),
+                "totals": {"in_octets": r_data.get('raw_octets_in', 0), "out_octets": r_data.get('raw_octets_out', 0)},
+                "sys_uptime": res['snmp_data'].get('uptime'),
+            }
+        rates_by_device = _counter_states_for_cycle(per_device, if_states, now_ts)
         updates_made = False
         metrics_to_add = []
         if_metrics_to_add = []
@@ -448,7 +608,7 @@ def monitor_all_devices():
             # Issue Generation (Ping Failed)
             if not res['alive']:
                 # 기존 로직: Device Unreachable 이슈 생성
-                create_issue_if_not_exists(save_db, device.id, "Device Unreachable", "Ping check failed.", "critical", device.name)
+                issues.add(device.id, "Device Unreachable", "Ping check failed.", "critical", device.name)
 
             # SNMP Metrics Parsing
             if res['alive'] and res['snmp_data'].get('status') == 'online':
@@ -462,159 +622,67 @@ def monitor_all_devices():
                     cpu = r_data.get('cpu_usage', 0)
                     mem = r_data.get('memory_usage', 0)
                     
-                    # Traffic Calculation logic (Keep existing logic)
-                    traffic_in_bps = 0.0
-                    traffic_out_bps = 0.0
-                    
-                    current_in = r_data.get('raw_octets_in', 0)
-                    current_out = r_data.get('raw_octets_out', 0)
-                    now_ts = datetime.datetime.now().timestamp()
-                    
-                    # 이전 데이터 참조
-                    prev_meta = device.latest_parsed_data if device.latest_parsed_data else {}
-                    t_state = prev_meta.get("traffic_state", {})
-                    prev_in = t_state.get("in", 0)
-                    prev_out = t_state.get("out", 0)
-                    prev_ts = t_state.get("ts", 0)
-                    
-                    # BPS 계산 (시간차 1초 이상일 때만)
-                    if prev_ts > 0 and (now_ts - prev_ts) >= 1:
-                        dt = now_ts - prev_ts
-                        din = current_in - prev_in
-                        dout = current_out - prev_out
-                        if din >= 0 and dout >= 0:
-                            traffic_in_bps = (din * 8) / dt
-                            traffic_out_bps = (dout * 8) / dt
-                    
-                    # Metadata Update
-                    if not device.latest_parsed_data: device.latest_parsed_data = {}
-                    new_meta = dict(device.latest_parsed_data)
-                    new_meta["traffic_state"] = {"in": current_in, "out": current_out, "ts": now_ts}
-
-                    if_counters = res.get('if_counters') or {}
-                    if isinstance(if_counters, dict) and if_counters:
-                        prev_if_state = prev_meta.get("if_traffic_state", {}) if isinstance(prev_meta, dict) else {}
-                        if not isinstance(prev_if_state, dict):
-                            prev_if_state = {}
-                        next_if_state = dict(prev_if_state)
-                        for port_norm, v in if_counters.items():
-                            try:
-                                port_in = int(v.get("in_octets", v.get("in", 0)) or 0)
-                            except Exception:
-                                port_in = 0
-                            try:
-                                port_out = int(v.get("out_octets", v.get("out", 0)) or 0)
-                            except Exception:
-                                port_out = 0
-                            try:
-                                port_in_err = int(v.get("in_errors", 0) or 0)
-                            except Exception:
-                                port_in_err = 0
-                            try:
-                                port_out_err = int(v.get("out_errors", 0) or 0)
-                            except Exception:
-                                port_out_err = 0
-                            try:
-                                port_in_dis = int(v.get("in_discards", 0) or 0)
-                            except Exception:
-                                port_in_dis = 0
-                            try:
-                                port_out_dis = int(v.get("out_discards", 0) or 0)
-                            except Exception:
-                                port_out_dis = 0
-
-                            prev_entry = next_if_state.get(port_norm, {}) if isinstance(next_if_state.get(port_norm), dict) else {}
-                            prev_port_in = prev_entry.get("in_octets", prev_entry.get("in", 0)) or 0
-                            prev_port_out = prev_entry.get("out_octets", prev_entry.get("out", 0)) or 0
-                            prev_port_in_err = prev_entry.get("in_errors", 0) or 0
-                            prev_port_out_err = prev_entry.get("out_errors", 0) or 0
-                            prev_port_in_dis = prev_entry.get("in_discards", 0) or 0
-                            prev_port_out_dis = prev_entry.get("out_discards", 0) or 0
-                            prev_port_ts = prev_entry.get("ts", 0) or 0
-
-                            port_in_bps = 0.0
-                            port_out_bps = 0.0
-                            in_err_per_sec = 0.0
-                            out_err_per_sec = 0.0
-                            in_dis_per_sec = 0.0
-                            out_dis_per_sec = 0.0
-                            if prev_port_ts and (now_ts - float(prev_port_ts)) >= 1:
-                                dt = now_ts - float(prev_port_ts)
-                                din = port_in - int(prev_port_in)
-                                dout = port_out - int(prev_port_out)
-                                if din >= 0 and dout >= 0:
-                                    port_in_bps = (din * 8) / dt
-                                    port_out_bps = (dout * 8) / dt
-                                derr_in = port_in_err - int(prev_port_in_err)
-                                derr_out = port_out_err - int(prev_port_out_err)
-                                ddis_in = port_in_dis - int(prev_port_in_dis)
-                                ddis_out = port_out_dis - int(prev_port_out_dis)
-                                if derr_in >= 0:
-                                    in_err_per_sec = derr_in / dt
-                                if derr_out >= 0:
-                                    out_err_per_sec = derr_out / dt
-                                if ddis_in >= 0:
-                                    in_dis_per_sec = ddis_in / dt
-                                if ddis_out >= 0:
-                                    out_dis_per_sec = ddis_out / dt
-
-                            next_if_state[port_norm] = {
-                                "in_octets": port_in,
-                                "out_octets": port_out,
-                                "in_errors": port_in_err,
-                                "out_errors": port_out_err,
-                                "in_discards": port_in_dis,
-                                "out_discards": port_out_dis,
-                                "ts": now_ts,
-                                "in_bps": float(port_in_bps),
-                                "out_bps": float(port_out_bps),
-                                "in_errors_per_sec": float(in_err_per_sec),
-                                "out_errors_per_sec": float(out_err_per_sec),
-                                "in_discards_per_sec": float(in_dis_per_sec),
-                                "out_discards_per_sec": float(out_dis_per_sec),
-                            }
-                            if_metrics_to_add.append(InterfaceMetric(
-                                device_id=device.id,
-                                interface_name=str(port_norm),
-                                traffic_in_bps=float(port_in_bps),
-                                traffic_out_bps=float(port_out_bps),
-                                in_errors_per_sec=float(in_err_per_sec),
-                                out_errors_per_sec=float(out_err_per_sec),
-                                in_discards_per_sec=float(in_dis_per_sec),
-                                out_discards_per_sec=float(out_dis_per_sec),
-                            ))
-                            total_err = float(in_err_per_sec) + float(out_err_per_sec)
-                            total_drop = float(in_dis_per_sec) + float(out_dis_per_sec)
-                            if total_err >= 5.0:
-                                create_issue_if_not_exists(
-                                    save_db,
-                                    device.id,
-                                    f"Interface Errors ({port_norm})",
-                                    f"errors/s={total_err:.2f}",
-                                    "warning",
-                                    device.name,
-                                )
-                            if total_drop >= 5.0:
-                                create_issue_if_not_exists(
-                                    save_db,
-                                    device.id,
-                                    f"Interface Drops ({port_norm})",
-                                    f"drops/s={total_drop:.2f}",
-                                    "warning",
-                                    device.name,
-                                )
-                        new_meta["if_traffic_state"] = next_if_state
-                    
-                    # WLC Clients Update
+                    # 카운터 상태/rate 는 사이클 단위로 계산된 결과 사용
+                    next_if_state = rates_by_device.get(device.id, {})
+                    total_state = next_if_state.get(TOTAL_IFNAME, {})
+                    traffic_in_bps = float(total_state.get("in_bps", 0.0))
+                    traffic_out_bps = float(total_state.get("out_bps", 0.0))
+
+                    # latest_parsed_data 는 바뀔 때만 기록
+                    prev_meta = device.latest_parsed_data if isinstance(device.latest_parsed_data, dict) else {}
+                    new_meta = None
+                    if "traffic_state" in prev_meta or "if_traffic_state" in prev_meta:
+                        # 예전 방식으로 JSON에 남아 있던 카운터 상태는 한 번만 정리
+                        new_meta = {k: v for k, v in prev_meta.items() if k not in ("traffic_state", "if_traffic_state")}
+
+                    for port_norm, e in next_if_state.items():
+                        if port_norm == TOTAL_IFNAME:
+                            continue
+                        if_metrics_to_add.append(InterfaceMetric(
+                            device_id=device.id,
+                            interface_name=str(port_norm),
+                            traffic_in_bps=e["in_bps"],
+                            traffic_out_bps=e["out_bps"],
+                            in_errors_per_sec=e["in_errors_per_sec"],
+                            out_errors_per_sec=e["out_errors_per_sec"],
+                            in_discards_per_sec=e["in_discards_per_sec"],
+                            out_discards_per_sec=e["out_discards_per_sec"],
+                        ))
+                        total_err = e["in_errors_per_sec"] + e["out_errors_per_sec"]
+                        total_drop = e["in_discards_per_sec"] + e["out_discards_per_sec"]
+                        if total_err >= 5.0:
+                            issues.add(
+                                device.id,
+                                f"Interface Errors ({port_norm})",
+                                f"errors/s={total_err:.2f}",
+                                "warning",
+                                device.name,
+                            )
+                        if total_drop >= 5.0:
+                            issues.add(
+                                device.id,
+                                f"Interface Drops ({port_norm})",
+                                f"drops/s={total_drop:.2f}",
+                                "warning",
+                                device.name,
+                            )
+                    states_to_save[device.id] = next_if_state
+
+                    # WLC Clients Update (값이 바뀐 경우에만 JSON 재기록)
                     if res['wlc_clients'] is not None:
-                         if "wireless" in new_meta and isinstance(new_meta["wireless"], dict):
-                            w_copy = dict(new_meta["wireless"])
-                            w_copy["total_clients"] = res['wlc_clients']
-                            new_meta["wireless"] = w_copy
-                         else:
+                        base_meta = new_meta if new_meta is not None else prev_meta
+                        if "wireless" in base_meta and isinstance(base_meta["wireless"], dict):
+                            if base_meta["wireless"].get("total_clients") != res['wlc_clients']:
+                                new_meta = dict(base_meta)
+                                w_copy = dict(base_meta["wireless"])
+                                w_copy["total_clients"] = res['wlc_clients']
+                                new_meta["wireless"] = w_copy
+                        elif base_meta.get("total_clients") != res['wlc_clients']:
+                            new_meta = dict(base_meta)
                             new_meta["total_clients"] = res['wlc_clients']
-                    
-                    device.latest_parsed_data = new_meta
+
+                    if new_meta is not None:
+                        device.latest_parsed_data = new_meta
                     
                     # Metric History Add
                     metrics_to_add.append(SystemMetric(
@@ -622,14 +690,15 @@ def monitor_all_devices():
                         cpu_usage=cpu,
                         memory_usage=mem,
                         traffic_in=traffic_in_bps,
-                        traffic_out=traffic_out_bps
+                        traffic_out=traffic_out_bps,
+                        rtt_ms=res.get('rtt_ms'),
                     ))
                     
                     # CPU Issue
                     if cpu >= 80:
-                        create_issue_if_not_exists(save_db, device.id, "High CPU", f"CPU: {cpu}%", "warning", device.name)
+                        issues.add(device.id, "High CPU", f"CPU: {cpu}%", "warning", device.name)
                     if mem >= 85:
-                        create_issue_if_not_exists(save_db, device.id, "High Memory", f"Memory: {mem}%", "warning", device.name)
+                        issues.add(device.id, "High Memory", f"Memory: {mem}%", "warning", device.name)
                         
             updates_made = True
 
@@ -639,14 +708,21 @@ def monitor_all_devices():
         if if_metrics_to_add:
             save_db.add_all(if_metrics_to_add)
             updates_made = True
+        if CounterStateStore.save(save_db, states_to_save):
+            updates_made = True
+        if issues.flush():
+            updates_made = True
         if updates_made:
             save_db.commit()
+            # 이벤트/알림 메일은 커밋이 끝난 뒤에만 발송
+            issues.publish()
 
     except Exception as e:
         logger.exception("Monitor all devices failed")
         save_db.rollback()
     finally:
         save_db.close()
+    return outcomes
 
 
 def _acquire_gnmi_lock():
@@ -678,13 +754,33 @@ def _acquire_gnmi_lock():
         db.close()
 
 
+def _gnmi_streamed_device_ids() -> set:
+    """gNMI 구독 매니저(별도 프로세스)의 스트림이 살아 있는 장비 id. 이 장비들만 주기 수집에서 제외"""
+    try:
+        from app.services.gnmi_subscription_manager import HEARTBEAT_KEY, LIVE_DEVICES_KEY
+
+        r = redis.Redis.from_url(os.getenv("REDIS_URL", "redis://localhost:6379/0"))
+        if not r.exists(HEARTBEAT_KEY):
+            return set()
+        return {int(x) for x in r.smembers(LIVE_DEVICES_KEY)}
+    except Exception:
+        return set()
+
+
 @shared_task
 def collect_gnmi_metrics():
+    streamed = _gnmi_streamed_device_ids()
     if not _acquire_gnmi_lock():
         return
     db = SessionLocal()
     try:
-        devices = db.query(Device).filter(Device.ip_address != None).all()
+        # gNMI 는 SSH 계정만 필요: SNMP/enable 비밀값은 읽지(복호화하지) 않음
+        devices = (
+            db.query(Device)
+            .options(*ssh_login_only(Device))
+            .filter(Device.ip_address != None, func.lower(Device.telemetry_mode).in_(("gnmi", "hybrid")))
+            .all()
+        )
         targets = [
             {
                 "id": d.id,
@@ -696,7 +792,7 @@ def collect_gnmi_metrics():
                 "gnmi_port": d.gnmi_port,
             }
             for d in devices
-            if str(d.telemetry_mode or "").lower() in ("gnmi", "hybrid")
+            if str(d.telemetry_mode or "").lower() in ("gnmi", "hybrid") and d.id not in streamed
         ]
     finally:
         db.close()
@@ -734,10 +830,19 @@ def collect_gnmi_metrics():
             except Exception:
                 continue
 
+    _save_gnmi_results(results)
+
+
+def _save_gnmi_results(results: list, oper_events_published: bool = False):
+    """
+    gNMI 수집 결과 저장 (rate 계산, InterfaceMetric/SystemMetric, 이슈, realtime 이벤트).
+    results: [{"id", "ok", "data": {cpu_usage, memory_usage, raw_octets_in, raw_octets_out, if_counters}}]
+    oper_events_published: 구독 매니저가 oper-status 변경을 이미 즉시 발행한 경우 True
+    """
+    if not results:
+        return
     save_db = SessionLocal()
     try:
-        if not results:
-            return
         metrics_to_add = []
         if_metrics_to_add = []
         metric_events = []
@@ -747,10 +852,38 @@ def collect_gnmi_metrics():
             realtime_event_bus = None
         now = datetime.datetime.now()
         now_ts = now.timestamp()
+        ok_ids = [int(res["id"]) for res in results if res.get("ok")]
+        devices_by_id = (
+            {d.id: d for d in save_db.query(Device).options(*without_credentials(Device)).filter(Device.id.in_(ok_ids)).all()}
+            if ok_ids
+            else {}
+        )
+        issues = IssueUpserter(save_db, ok_ids)
+        if_states = CounterStateStore.load(save_db, ok_ids)
+        states_to_save = {}
+
+        # 이번 수집분의 모든 카운터를 한 번에 rate 계산
+        per_device = {}
+        for res in results:
+            device = devices_by_id.get(int(res["id"])) if res.get("ok") else None
+            if not device:
+                continue
+            if device.id not in if_states:
+                # 최초 1회는 기존 JSON 상태를 이어받음
+                if_states[device.id] = legacy_if_state(device.latest_parsed_data)
+            r_data = res.get("data") or {}
+            per_device[device.id] = {
+                "if_counters": r_data.get("if_counters"),
+                "totals": {"in_octets": r_data.get("raw_octets_in", 0), "out_octets": r_data.get("raw_octets_out", 0)},
+                # OpenConfig 인터페이스 카운터는 전부 uint64
+                "counter_bits": 64,
+            }
+        rates_by_device = _counter_states_for_cycle(per_device, if_states, now_ts)
+
         for res in results:
             if not res.get("ok"):
                 continue
-            device = save_db.query(Device).filter(Device.id == int(res["id"])).first()
+            device = devices_by_id.get(int(res["id"]))
             if not device:
                 continue
             device.status = "online"
@@ -769,94 +902,20 @@ def collect_gnmi_metrics():
             except Exception:
                 mem = 0
 
-            traffic_in_bps = 0.0
-            traffic_out_bps = 0.0
-            current_in = r_data.get('raw_octets_in', 0)
-            current_out = r_data.get('raw_octets_out', 0)
-            prev_meta = device.latest_parsed_data if device.latest_parsed_data else {}
-            t_state = prev_meta.get("traffic_state", {})
-            prev_in = t_state.get("in", 0)
-            prev_out = t_state.get("out", 0)
-            prev_ts = t_state.get("ts", 0)
-            if prev_ts > 0 and (now_ts - prev_ts) >= 1:
-                dt = now_ts - prev_ts
-                din = current_in - prev_in
-                dout = current_out - prev_out
-                if din >= 0 and dout >= 0:
-                    traffic_in_bps = (din * 8) / dt
-                    traffic_out_bps = (dout * 8) / dt
-
-            if not device.latest_parsed_data:
-                device.latest_parsed_data = {}
-            new_meta = dict(device.latest_parsed_data)
-            new_meta["traffic_state"] = {"in": current_in, "out": current_out, "ts": now_ts}
+            prev_meta = device.latest_parsed_data if isinstance(device.latest_parsed_data, dict) else {}
+            prev_if_state = if_states.get(device.id) or {}
+            next_if_state = rates_by_device.get(device.id, {})
+            total_state = next_if_state.get(TOTAL_IFNAME, {})
+            traffic_in_bps = float(total_state.get("in_bps", 0.0))
+            traffic_out_bps = float(total_state.get("out_bps", 0.0))
 
             if_counters = r_data.get("if_counters") or {}
             if isinstance(if_counters, dict) and if_counters:
-                prev_if_state = prev_meta.get("if_traffic_state", {}) if isinstance(prev_meta, dict) else {}
-                if not isinstance(prev_if_state, dict):
-                    prev_if_state = {}
-                next_if_state = dict(prev_if_state)
                 for port_norm, v in if_counters.items():
-                    try:
-                        port_in = int(v.get("in_octets", v.get("in", 0)) or 0)
-                    except Exception:
-                        port_in = 0
-                    try:
-                        port_out = int(v.get("out_octets", v.get("out", 0)) or 0)
-                    except Exception:
-                        port_out = 0
-                    try:
-                        port_in_err = int(v.get("in_errors", 0) or 0)
-                    except Exception:
-                        port_in_err = 0
-                    try:
-                        port_out_err = int(v.get("out_errors", 0) or 0)
-                    except Exception:
-                        port_out_err = 0
-                    try:
-                        port_in_dis = int(v.get("in_discards", 0) or 0)
-                    except Exception:
-                        port_in_dis = 0
-                    try:
-                        port_out_dis = int(v.get("out_discards", 0) or 0)
-                    except Exception:
-                        port_out_dis = 0
-
-                    prev_entry = next_if_state.get(port_norm, {}) if isinstance(next_if_state.get(port_norm), dict) else {}
-                    prev_port_in = prev_entry.get("in_octets", prev_entry.get("in", 0)) or 0
-                    prev_port_out = prev_entry.get("out_octets", prev_entry.get("out", 0)) or 0
-                    prev_port_in_err = prev_entry.get("in_errors", 0) or 0
-                    prev_port_out_err = prev_entry.get("out_errors", 0) or 0
-                    prev_port_in_dis = prev_entry.get("in_discards", 0) or 0
-                    prev_port_out_dis = prev_entry.get("out_discards", 0) or 0
-                    prev_port_ts = prev_entry.get("ts", 0) or 0
-
-                    port_in_bps = 0.0
-                    port_out_bps = 0.0
-                    in_err_per_sec = 0.0
-                    out_err_per_sec = 0.0
-                    in_dis_per_sec = 0.0
-                    out_dis_per_sec = 0.0
-                    if prev_port_ts and (now_ts - float(prev_port_ts)) >= 1:
-                        dt = now_ts - float(prev_port_ts)
-                        din = port_in - int(prev_port_in)
-                        dout = port_out - int(prev_port_out)
-                        if din >= 0 and dout >= 0:
-                            port_in_bps = (din * 8) / dt
-                            port_out_bps = (dout * 8) / dt
-                        derr_in = port_in_err - int(prev_port_in_err)
-                        derr_out = port_out_err - int(prev_port_out_err)
-                        ddis_in = port_in_dis - int(prev_port_in_dis)
-                        ddis_out = port_out_dis - int(prev_port_out_dis)
-                        if derr_in >= 0:
-                            in_err_per_sec = derr_in / dt
-                        if derr_out >= 0:
-                            out_err_per_sec = derr_out / dt
-                        if ddis_in >= 0:
-                            in_dis_per_sec = ddis_in / dt
-                        if ddis_out >= 0:
-                            out_dis_per_sec = ddis_out / dt
+                    e = next_if_state.get(str(port_norm))
+                    if not isinstance(v, dict) or e is None:
+                        continue
+                    prev_entry = prev_if_state.get(port_norm, {}) if isinstance(prev_if_state.get(port_norm), dict) else {}
 
                     oper_status = None
                     try:
@@ -871,44 +930,34 @@ def collect_gnmi_metrics():
                     if is_up is None and oper_status is not None:
                         is_up = str(oper_status).strip().lower() in {"up", "active", "true", "1"}
 
-                    next_if_state[port_norm] = {
-                        "in_octets": port_in,
-                        "out_octets": port_out,
-                        "in_errors": port_in_err,
-                        "out_errors": port_out_err,
-                        "in_discards": port_in_dis,
-                        "out_discards": port_out_dis,
-                        "ts": now_ts,
-                        "in_bps": float(port_in_bps),
-                        "out_bps": float(port_out_bps),
-                        "in_errors_per_sec": float(in_err_per_sec),
-                        "out_errors_per_sec": float(out_err_per_sec),
-                        "in_discards_per_sec": float(in_dis_per_sec),
-                        "out_discards_per_sec": float(out_dis_per_sec),
-                        "oper_status": oper_status,
-                        "is_up": is_up,
-                    }
+                    e["oper_status"] = oper_status
+                    e["is_up"] = is_up
                     if_metrics_to_add.append(InterfaceMetric(
                         device_id=device.id,
                         interface_name=str(port_norm),
-                        traffic_in_bps=float(port_in_bps),
-                        traffic_out_bps=float(port_out_bps),
-                        in_errors_per_sec=float(in_err_per_sec),
-                        out_errors_per_sec=float(out_err_per_sec),
-                        in_discards_per_sec=float(in_dis_per_sec),
-                        out_discards_per_sec=float(out_dis_per_sec),
+                        traffic_in_bps=e["in_bps"],
+                        traffic_out_bps=e["out_bps"],
+                        in_errors_per_sec=e["in_errors_per_sec"],
+                        out_errors_per_sec=e["out_errors_per_sec"],
+                        in_discards_per_sec=e["in_discards_per_sec"],
+                        out_discards_per_sec=e["out_discards_per_sec"],
                     ))
-                    total_err = float(in_err_per_sec) + float(out_err_per_sec)
-                    total_drop = float(in_dis_per_sec) + float(out_dis_per_sec)
+                    total_err = e["in_errors_per_sec"] + e["out_errors_per_sec"]
+                    total_drop = e["in_discards_per_sec"] + e["out_discards_per_sec"]
                     health = "degraded" if (total_err >= 5.0 or total_drop >= 5.0) else "ok"
-                    prev_health = prev_entry.get("health", "ok")
+                    prev_health = prev_entry.get("health") or "ok"
                     prev_is_up = prev_entry.get("is_up")
                     if prev_is_up is None and prev_entry.get("oper_status") is not None:
                         prev_is_up = str(prev_entry.get("oper_status")).strip().lower() in {"up", "active", "true", "1"}
-                    next_if_state[port_norm]["health"] = health
+                    e["health"] = health
 
                     if realtime_event_bus is not None:
-                        if is_up is not None and prev_is_up is not None and bool(is_up) != bool(prev_is_up):
+                        if (
+                            not oper_events_published
+                            and is_up is not None
+                            and prev_is_up is not None
+                            and bool(is_up) != bool(prev_is_up)
+                        ):
                             realtime_event_bus.publish(
                                 "link_update",
                                 {
@@ -936,8 +985,7 @@ def collect_gnmi_metrics():
                                 },
                             )
                     if total_err >= 5.0:
-                        create_issue_if_not_exists(
-                            save_db,
+                        issues.add(
                             device.id,
                             f"Interface Errors ({port_norm})",
                             f"errors/s={total_err:.2f}",
@@ -945,17 +993,20 @@ def collect_gnmi_metrics():
                             device.name,
                         )
                     if total_drop >= 5.0:
-                        create_issue_if_not_exists(
-                            save_db,
+                        issues.add(
                             device.id,
                             f"Interface Drops ({port_norm})",
                             f"drops/s={total_drop:.2f}",
                             "warning",
                             device.name,
                         )
-                new_meta["if_traffic_state"] = next_if_state
 
-            device.latest_parsed_data = new_meta
+            states_to_save[device.id] = next_if_state
+            if "traffic_state" in prev_meta or "if_traffic_state" in prev_meta:
+                # 예전 방식으로 JSON에 남아 있던 카운터 상태는 한 번만 정리
+                device.latest_parsed_data = {
+                    k: v for k, v in prev_meta.items() if k not in ("traffic_state", "if_traffic_state")
+                }
             metrics_to_add.append(SystemMetric(
                 device_id=device.id,
                 cpu_usage=cpu,
@@ -975,15 +1026,18 @@ def collect_gnmi_metrics():
                 }
             )
             if cpu >= 80:
-                create_issue_if_not_exists(save_db, device.id, "High CPU", f"CPU: {cpu}%", "warning", device.name)
+                issues.add(device.id, "High CPU", f"CPU: {cpu}%", "warning", device.name)
             if mem >= 85:
-                create_issue_if_not_exists(save_db, device.id, "High Memory", f"Memory: {mem}%", "warning", device.name)
+                issues.add(device.id, "High Memory", f"Memory: {mem}%", "warning", device.name)
 
         if metrics_to_add:
             save_db.add_all(metrics_to_add)
         if if_metrics_to_add:
             save_db.add_all(if_metrics_to_add)
+        CounterStateStore.save(save_db, states_to_save)
+        issues.flush()
         save_db.commit()
+        issues.publish()
 
         if metric_events:
             try:
@@ -1018,14 +1072,20 @@ def collect_gnmi_metrics():
 def monitor_devices(device_ids: list[int]):
     if not device_ids:
         return
-    from concurrent.futures import ThreadPoolExecutor, as_completed
     from sqlalchemy import or_
+    from sqlalchemy.orm import defer
     from app.models.device import Link
 
     ids = sorted({int(x) for x in device_ids if x is not None})
     db = SessionLocal()
     try:
-        devices = db.query(Device).filter(Device.id.in_(ids)).all()
+        # _run_monitor_cycle 과 같은 projection: SSH/enable 비밀번호는 복호화하지 않음
+        devices = (
+            db.query(Device)
+            .options(*snmp_only(Device), defer(Device.latest_parsed_data))
+            .filter(Device.id.in_(ids))
+            .all()
+        )
         if not devices:
             return
         links = (
@@ -1067,68 +1127,63 @@ def monitor_devices(device_ids: list[int]):
     finally:
         db.close()
 
-    def _poll(t):
-        ip = t["ip"]
-        if not ip:
-            return {"id": t["id"], "alive": False}
-        alive = ping_device(ip)
-        if not alive:
-            return {"id": t["id"], "alive": False}
-        comm = t["comm"] or "public"
-        snmp_version = str(t.get("snmp_version") or "v2c")
-        snmp_port = int(t.get("snmp_port") or 161)
-        try:
-            snmp = SnmpManager(
-                ip,
-                comm,
-                port=snmp_port,
-                version=snmp_version,
-                v3_username=t.get("snmp_v3_username"),
-                v3_security_level=t.get("snmp_v3_security_level"),
-                v3_auth_proto=t.get("snmp_v3_auth_proto"),
-                v3_auth_key=t.get("snmp_v3_auth_key"),
-                v3_priv_proto=t.get("snmp_v3_priv_proto"),
-                v3_priv_key=t.get("snmp_v3_priv_key"),
-            )
-            st = snmp.check_status()
-            if st.get("status") != "online":
-                return {"id": t["id"], "alive": True, "snmp_online": False}
-            res = snmp.get_resource_usage()
-            link_ports = t.get("link_ports") or []
-            if_counters = None
-            try:
-                if isinstance(link_ports, list) and len(link_ports) > 0:
-                    if_counters = snmp.get_interface_counters_for_ports(link_ports)
-                else:
-                    raw = snmp.get_interface_counters_map()
-                    norm = {}
-                    if isinstance(raw, dict):
-                        for k, v in raw.items():
-                            pn = snmp.normalize_interface_name(k)
-                            if pn and isinstance(v, dict):
-                                norm[pn] = v
-                    if_counters = norm
-            except Exception:
-                if_counters = None
-            return {"id": t["id"], "alive": True, "snmp_online": True, "uptime": st.get("uptime"), "res": res, "if_counters": if_counters}
-        except Exception as e:
-            return {"id": t["id"], "alive": True, "snmp_online": False, "err": str(e)}
+    try:
+        rtt_by_ip = icmp_sweeper.sweep([t["ip"] for t in targets if t["ip"]])
+    except Exception:
+        logger.exception("ICMP sweep failed; skipping availability update")
+        return
+    rtt_by_id = {t["id"]: rtt_by_ip.get(str(t["ip"] or "").strip()) for t in targets}
+    alive_by_id = {did: rtt is not None for did, rtt in rtt_by_id.items()}
 
+    snmp_by_id = _poll_snmp_targets([t for t in targets if alive_by_id.get(t["id"])])
     polled = []
-    with ThreadPoolExecutor(max_workers=min(20, len(targets) or 1)) as ex:
-        futs = [ex.submit(_poll, t) for t in targets]
-        for fut in as_completed(futs):
-            try:
-                polled.append(fut.result())
-            except Exception:
-                continue
+    for t in targets:
+        if t["id"] not in alive_by_id:
+            continue
+        if not alive_by_id[t["id"]]:
+            polled.append({"id": t["id"], "alive": False})
+            continue
+        snmp_res = snmp_by_id.get(t["id"]) or {}
+        st = snmp_res.get("status") or {}
+        if st.get("status") != "online":
+            polled.append({"id": t["id"], "alive": True, "snmp_online": False, "err": snmp_res.get("error")})
+            continue
+        polled.append({
+            "id": t["id"],
+            "alive": True,
+            "snmp_online": True,
+            "rtt_ms": rtt_by_id.get(t["id"]),
+            "uptime": st.get("uptime"),
+            "res": snmp_res.get("resource_data"),
+            "if_counters": snmp_res.get("if_counters"),
+        })
 
     db = SessionLocal()
     try:
         now = datetime.datetime.now()
         now_ts = now.timestamp()
+        polled_ids = [int(r["id"]) for r in polled]
+        devices_by_id = (
+            {d.id: d for d in db.query(Device).options(*without_credentials(Device)).filter(Device.id.in_(polled_ids)).all()}
+            if polled_ids
+            else {}
+        )
+        issues = IssueUpserter(db, polled_ids)
+        if_states = CounterStateStore.load(db, polled_ids)
+        states_to_save = {}
+
+        per_device = {}
+        for r in polled:
+            d = devices_by_id.get(int(r["id"]))
+            if not d or not r.get("snmp_online"):
+                continue
+            if d.id not in if_states:
+                if_states[d.id] = legacy_if_state(d.latest_parsed_data)
+            per_device[d.id] = {"if_counters": r.get("if_counters"), "totals": None, "sys_uptime": r.get("uptime")}
+        rates_by_device = _counter_states_for_cycle(per_device, if_states, now_ts)
+
         for r in polled:
-            d = db.query(Device).filter(Device.id == int(r["id"])).first()
+            d = devices_by_id.get(int(r["id"]))
             if not d:
                 continue
             if not r.get("alive"):
@@ -1158,105 +1213,29 @@ def monitor_devices(device_ids: list[int]):
                 meta = d.latest_parsed_data if isinstance(d.latest_parsed_data, dict) else {}
                 if not isinstance(meta, dict):
                     meta = {}
-                prev_if_state = meta.get("if_traffic_state", {}) if isinstance(meta.get("if_traffic_state", {}), dict) else {}
-                next_if_state = dict(prev_if_state) if isinstance(prev_if_state, dict) else {}
+                next_if_state = rates_by_device.get(d.id, {})
                 total_in_bps = 0.0
                 total_out_bps = 0.0
                 if_counters = r.get("if_counters") or {}
                 if isinstance(if_counters, dict) and if_counters:
-                    for port_norm, v in if_counters.items():
-                        if not isinstance(v, dict):
+                    for port_norm in if_counters:
+                        e = next_if_state.get(str(port_norm))
+                        if e is None:
                             continue
-                        try:
-                            port_in = int(v.get("in_octets", v.get("in", 0)) or 0)
-                        except Exception:
-                            port_in = 0
-                        try:
-                            port_out = int(v.get("out_octets", v.get("out", 0)) or 0)
-                        except Exception:
-                            port_out = 0
-                        try:
-                            port_in_err = int(v.get("in_errors", 0) or 0)
-                        except Exception:
-                            port_in_err = 0
-                        try:
-                            port_out_err = int(v.get("out_errors", 0) or 0)
-                        except Exception:
-                            port_out_err = 0
-                        try:
-                            port_in_dis = int(v.get("in_discards", 0) or 0)
-                        except Exception:
-                            port_in_dis = 0
-                        try:
-                            port_out_dis = int(v.get("out_discards", 0) or 0)
-                        except Exception:
-                            port_out_dis = 0
-
-                        prev_entry = next_if_state.get(port_norm, {}) if isinstance(next_if_state.get(port_norm), dict) else {}
-                        prev_port_in = prev_entry.get("in_octets", prev_entry.get("in", 0)) or 0
-                        prev_port_out = prev_entry.get("out_octets", prev_entry.get("out", 0)) or 0
-                        prev_port_in_err = prev_entry.get("in_errors", 0) or 0
-                        prev_port_out_err = prev_entry.get("out_errors", 0) or 0
-                        prev_port_in_dis = prev_entry.get("in_discards", 0) or 0
-                        prev_port_out_dis = prev_entry.get("out_discards", 0) or 0
-                        prev_port_ts = prev_entry.get("ts", 0) or 0
-
-                        port_in_bps = 0.0
-                        port_out_bps = 0.0
-                        in_err_per_sec = 0.0
-                        out_err_per_sec = 0.0
-                        in_dis_per_sec = 0.0
-                        out_dis_per_sec = 0.0
-                        if prev_port_ts and (now_ts - float(prev_port_ts)) >= 1:
-                            dt = now_ts - float(prev_port_ts)
-                            din = port_in - int(prev_port_in)
-                            dout = port_out - int(prev_port_out)
-                            if din >= 0 and dout >= 0:
-                                port_in_bps = (din * 8) / dt
-                                port_out_bps = (dout * 8) / dt
-                            derr_in = port_in_err - int(prev_port_in_err)
-                            derr_out = port_out_err - int(prev_port_out_err)
-                            ddis_in = port_in_dis - int(prev_port_in_dis)
-                            ddis_out = port_out_dis - int(prev_port_out_dis)
-                            if derr_in >= 0:
-                                in_err_per_sec = derr_in / dt
-                            if derr_out >= 0:
-                                out_err_per_sec = derr_out / dt
-                            if ddis_in >= 0:
-                                in_dis_per_sec = ddis_in / dt
-                            if ddis_out >= 0:
-                                out_dis_per_sec = ddis_out / dt
-
-                        next_if_state[port_norm] = {
-                            "in_octets": port_in,
-                            "out_octets": port_out,
-                            "in_errors": port_in_err,
-                            "out_errors": port_out_err,
-                            "in_discards": port_in_dis,
-                            "out_discards": port_out_dis,
-                            "ts": now_ts,
-                            "in_bps": float(port_in_bps),
-                            "out_bps": float(port_out_bps),
-                            "in_errors_per_sec": float(in_err_per_sec),
-                            "out_errors_per_sec": float(out_err_per_sec),
-                            "in_discards_per_sec": float(in_dis_per_sec),
-                            "out_discards_per_sec": float(out_dis_per_sec),
-                        }
                         db.add(InterfaceMetric(
                             device_id=d.id,
                             interface_name=str(port_norm),
-                            traffic_in_bps=float(port_in_bps),
-                            traffic_out_bps=float(port_out_bps),
-                            in_errors_per_sec=float(in_err_per_sec),
-                            out_errors_per_sec=float(out_err_per_sec),
-                            in_discards_per_sec=float(in_dis_per_sec),
-                            out_discards_per_sec=float(out_dis_per_sec),
+                            traffic_in_bps=e["in_bps"],
+                            traffic_out_bps=e["out_bps"],
+                            in_errors_per_sec=e["in_errors_per_sec"],
+                            out_errors_per_sec=e["out_errors_per_sec"],
+                            in_discards_per_sec=e["in_discards_per_sec"],
+                            out_discards_per_sec=e["out_discards_per_sec"],
                         ))
-                        total_err = float(in_err_per_sec) + float(out_err_per_sec)
-                        total_drop = float(in_dis_per_sec) + float(out_dis_per_sec)
+                        total_err = e["in_errors_per_sec"] + e["out_errors_per_sec"]
+                        total_drop = e["in_discards_per_sec"] + e["out_discards_per_sec"]
                         if total_err >= 5.0:
-                            create_issue_if_not_exists(
-                                db,
+                            issues.add(
                                 d.id,
                                 f"Interface Errors ({port_norm})",
                                 f"errors/s={total_err:.2f}",
@@ -1264,31 +1243,34 @@ def monitor_devices(device_ids: list[int]):
                                 d.name,
                             )
                         if total_drop >= 5.0:
-                            create_issue_if_not_exists(
-                                db,
+                            issues.add(
                                 d.id,
                                 f"Interface Drops ({port_norm})",
                                 f"drops/s={total_drop:.2f}",
                                 "warning",
                                 d.name,
                             )
-                        total_in_bps += float(port_in_bps)
-                        total_out_bps += float(port_out_bps)
-                new_meta = dict(meta)
+                        total_in_bps += e["in_bps"]
+                        total_out_bps += e["out_bps"]
                 if next_if_state:
-                    new_meta["if_traffic_state"] = next_if_state
-                d.latest_parsed_data = new_meta
-                db.add(SystemMetric(device_id=d.id, cpu_usage=cpu, memory_usage=mem, traffic_in=total_in_bps, traffic_out=total_out_bps))
+                    states_to_save[d.id] = next_if_state
+                if "traffic_state" in meta or "if_traffic_state" in meta:
+                    # 예전 방식으로 JSON에 남아 있던 카운터 상태는 한 번만 정리
+                    d.latest_parsed_data = {k: v for k, v in meta.items() if k not in ("traffic_state", "if_traffic_state")}
+                db.add(SystemMetric(device_id=d.id, cpu_usage=cpu, memory_usage=mem, traffic_in=total_in_bps, traffic_out=total_out_bps, rtt_ms=r.get("rtt_ms")))
                 if mem >= 85:
-                    create_issue_if_not_exists(db, d.id, "High Memory", f"Memory: {mem}%", "warning", d.name)
+                    issues.add(d.id, "High Memory", f"Memory: {mem}%", "warning", d.name)
                 
                 # [NEW] Evaluate Automation Rules
                 r['resource_data'] = r.get('res')
-                _evaluate_automation_rules(db, d, r)
+                _evaluate_automation_rules(db, d, r, issues)
             else:
                 d.status = "unknown"
             db.add(d)
+        CounterStateStore.save(db, states_to_save)
+        issues.flush()
         db.commit()
+        issues.publish()
     finally:
         db.close()
 
@@ -1315,67 +1297,281 @@ def burst_monitor_devices(device_ids: list[int], repeats: int = 3, interval_sec:
         except Exception:
             pass
 
-@shared_task
-def full_ssh_sync_all():
+
+FULL_SSH_SYNC_CONCURRENCY = int(os.getenv("FULL_SSH_SYNC_CONCURRENCY", "32"))
+FULL_SSH_SYNC_PER_SITE = int(os.getenv("FULL_SSH_SYNC_PER_SITE", "4"))
+FULL_SSH_SYNC_LOCK_SEC = int(os.getenv("FULL_SSH_SYNC_LOCK_SEC", "10800"))
+FULL_SSH_SYNC_PROGRESS_SEC = float(os.getenv("FULL_SSH_SYNC_PROGRESS_SEC", "10"))
+FULL_SSH_SYNC_COLLECTORS = ("facts", "running_config", "neighbors", "wireless")
+
+
+def _release_setting_lock(key: str) -> None:
+    db = SessionLocal()
+    try:
+        setting = db.query(SystemSetting).filter(SystemSetting.key == key).first()
+        if setting:
+            setting.value = datetime.datetime.utcnow().isoformat()
+            db.commit()
+    except Exception:
+        db.rollback()
+    finally:
+        db.close()
+
+
+def _run_site_bounded(items, fn, global_limit: int, per_site_limit: int, on_done=None):
     """
-    [핵심] 1시간 주기 태스크: 전 장비 SSH 기반 풀 동기화 (Config, Neighbors, Inventory).
-    순차적으로 진행하여 네트워크 및 서버 부하를 제어합니다.
+    items: [(item_id, site_key)]. fn(item_id) 를 스레드 풀에서 실행하되
+    전체 동시 실행은 global_limit, 같은 site 는 per_site_limit 개까지만 허용.
+    site 들을 번갈아 꺼내므로 큰 site 하나가 풀 전체를 차지하지 않습니다.
+    site_key 가 None 인 장비(site 미지정)는 서로 다른 위치일 수 있으므로 site 한도 없이 global_limit 만 적용합니다.
+    """
+    from collections import OrderedDict, deque
+    from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+    pending = OrderedDict()
+    for item_id, site in items:
+        pending.setdefault(site, deque()).append(item_id)
+    global_limit = max(1, int(global_limit))
+    per_site_limit = max(1, int(per_site_limit))
+    running = {}
+    site_load = {}
+    results = {}
+
+    def submit_ready(ex):
+        progressed = True
+        while progressed and len(running) < global_limit:
+            progressed = False
+            for site in list(pending.keys()):
+                if len(running) >= global_limit:
+                    break
+                if site is not None and site_load.get(site, 0) >= per_site_limit:
+                    continue
+                item_id = pending[site].popleft()
+                if not pending[site]:
+                    del pending[site]
+                running[ex.submit(fn, item_id)] = (item_id, site)
+                site_load[site] = site_load.get(site, 0) + 1
+                progressed = True
+
+    with ThreadPoolExecutor(max_workers=global_limit, thread_name_prefix="ssh-sync") as ex:
+        submit_ready(ex)
+        while running:
+            done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+            for fut in done:
+                item_id, site = running.pop(fut)
+                site_load[site] -= 1
+                try:
+                    results[item_id] = fut.result()
+                except Exception:
+                    logger.exception("Site-bounded task failed", extra={"device_id": item_id})
+                    results[item_id] = None
+                if on_done:
+                    on_done(item_id, results[item_id])
+            submit_ready(ex)
+    return results
+
+
+def _full_ssh_sync_device(d_id: int) -> str:
+    """
+    장비 1대 SSH 동기화. SSH 작업 동안에는 DB 세션/트랜잭션을 잡지 않고,
+    수집이 끝난 뒤 새 세션에서 짧게 갱신 후 commit 합니다.
+    config 변경이 감지되지 않은 장비는 running config 를 다시 읽지 않습니다 (ConfigChangeDetector).
     """
     from app.services.ssh_service import DeviceConnection, DeviceInfo
     from app.services.topology_link_service import TopologyLinkService
+    from app.services.config_change_detector import ConfigChangeDetector
+    from app.models.device import ConfigBackup
+    from app.db.config_store import config_hash
     import re
-    
+
     db = SessionLocal()
     try:
-        device_ids = [d.id for d in db.query(Device).all()]
+        device = db.query(Device).filter(Device.id == d_id).first()
+        if not device:
+            return "skipped"
+        inf = DeviceInfo(device.ip_address, device.ssh_username or "admin", device.ssh_password, device.enable_password, device.ssh_port or 22, device.device_type or "cisco_ios")
+        device_name = device.name
+        is_wlc = "wlc" in str(device.device_type).lower() or "9800" in str(device.model)
+        full_reason, stored_marker = ConfigChangeDetector.precheck(db, device)
+    finally:
+        db.close()
+
+    conn = DeviceConnection(inf)
+    if not conn.connect():
+        return "unreachable"
+    try:
+        logger.info("SSH sync connected", extra={"device_id": d_id, "device_name": device_name})
+        decision = ConfigChangeDetector.conclude(full_reason, stored_marker, ConfigChangeDetector.read_marker(device, conn))
+        run = decision.collectors(FULL_SSH_SYNC_COLLECTORS)
+        facts = conn.get_facts()
+        config = conn.get_running_config() if "running_config" in run else None
+        # [NEW] Neighbors 탐색
+        neighbors = conn.get_neighbors()
+
+        # 무선 데이터 수집 (WLC)
+        wireless_summary = None
+        if is_wlc and "wireless" in run:
+            try:
+                ap_parsed = conn.driver.connection.send_command("show ap summary", use_textfsm=True)
+                if isinstance(ap_parsed, list):
+                    wireless_summary = {"ap_list": ap_parsed}
+                    # 클라이언트 수 재확인
+                    client_out = conn.driver.connection.send_command("show wireless client summary")
+                    m = re.search(r"Number of Clients\s*:\s*(\d+)", client_out, re.IGNORECASE)
+                    wireless_summary["total_clients"] = int(m.group(1)) if m else 0
+            except Exception:
+                pass
+    finally:
+        conn.disconnect()
+
+    db = SessionLocal()
+    try:
+        device = db.query(Device).filter(Device.id == d_id).first()
+        if not device:
+            return "skipped"
+        # Facts 업데이트
+        if facts:
+            device.model = facts.get("model", device.model)
+            device.os_version = facts.get("os_version", device.os_version)
+            device.serial_number = facts.get("serial_number", device.serial_number)
+        if wireless_summary is not None:
+            device.latest_parsed_data = wireless_summary
+
+        device.last_seen = datetime.datetime.now()
+        device.status = "online"
+
+        if config:
+            latest = (
+                db.query(ConfigBackup.config_hash)
+                .filter(ConfigBackup.device_id == d_id)
+                .order_by(ConfigBackup.id.desc())
+                .first()
+            )
+            if latest is None or latest[0] != config_hash(config):
+                db.add(ConfigBackup(device_id=d_id, raw_config=config))
+
+        TopologyLinkService.refresh_links_for_device(db, device, neighbors)
+        ConfigChangeDetector.record(db, d_id, decision)
+
+        db.commit()
+        return "ok" if decision.full else "light"
+    except Exception:
+        db.rollback()
+        raise
     finally:
         db.close()
 
-    for d_id in device_ids:
+
+@shared_task
+def full_ssh_sync_all():
+    """
+    [핵심] 1시간 주기 태스크: 전 장비 SSH 기반 풀 동기화 (Config, Neighbors, Inventory).
+    FULL_SSH_SYNC_CONCURRENCY(전체) / FULL_SSH_SYNC_PER_SITE(site 당) 한도 안에서 병렬로 진행하고,
+    진행 상황은 로그와 ssh_sync_progress 이벤트로 알립니다. 이전 실행이 끝나지 않았으면 건너뜁니다.
+    config 가 바뀌지 않은 장비는 경량 동기화(light)로 처리되어, 실행 비용은 장비 수가 아니라 변경 건수에 비례합니다.
+    """
+    lock_key = "full_ssh_sync_lock"
+    if not _acquire_setting_lock(lock_key, FULL_SSH_SYNC_LOCK_SEC):
+        logger.info("Full SSH sync already running, skipping")
+        return {"status": "skipped"}
+
+    try:
         db = SessionLocal()
         try:
-            device = db.query(Device).filter(Device.id == d_id).first()
-            if not device: continue
-            
-            inf = DeviceInfo(device.ip_address, device.ssh_username or "admin", device.ssh_password, device.enable_password, device.ssh_port or 22, device.device_type or "cisco_ios")
-            conn = DeviceConnection(inf)
-            if conn.connect():
-                logger.info("SSH sync connected", extra={"device_id": device.id, "device_name": device.name})
-                facts = conn.get_facts()
-                config = conn.get_running_config()
-                # [NEW] Neighbors 탐색
-                neighbors = conn.get_neighbors()
-
-                # Facts 업데이트
-                if facts:
-                    device.model = facts.get("model", device.model)
-                    device.os_version = facts.get("os_version", device.os_version)
-                    device.serial_number = facts.get("serial_number", device.serial_number)
-                
-                # 무선 데이터 수집 (WLC)
-                if "wlc" in str(device.device_type).lower() or "9800" in str(device.model):
-                    try:
-                        from app.drivers.cisco.wlc_driver import CiscoWLCDriver
-                        # 드라이버가 WLC 드라이버인지 확인 (또는 직접 명령 실행)
-                        ap_parsed = conn.driver.connection.send_command("show ap summary", use_textfsm=True)
-                        if isinstance(ap_parsed, list):
-                            summary = {"ap_list": ap_parsed}
-                            # 클라이언트 수 재확인
-                            client_out = conn.driver.connection.send_command("show wireless client summary")
-                            m = re.search(r"Number of Clients\s*:\s*(\d+)", client_out, re.IGNORECASE)
-                            summary["total_clients"] = int(m.group(1)) if m else 0
-                            device.latest_parsed_data = summary
-                    except: pass
-                
-                device.last_seen = datetime.datetime.now()
-                device.status = "online"
+            items = [(row[0], row[1]) for row in db.query(Device.id, Device.site_id).order_by(Device.id).all()]
+        finally:
+            db.close()
 
-                TopologyLinkService.refresh_links_for_device(db, device, neighbors)
+        from app.services.realtime_event_bus import realtime_event_bus
 
-                db.commit()
-                conn.disconnect()
-        except Exception as e:
-            logger.exception("SSH sync failed", extra={"device_id": d_id})
-            db.rollback()
+        total = len(items)
+        counts = {"ok": 0, "light": 0, "unreachable": 0, "failed": 0, "skipped": 0}
+        started = time.monotonic()
+        last_report = [started]
+
+        def report(final: bool = False):
+            done = sum(counts.values())
+            payload = {"done": done, "total": total, **counts, "elapsed_sec": round(time.monotonic() - started, 1)}
+            logger.info("Full SSH sync progress", extra=payload)
+            try:
+                realtime_event_bus.publish("ssh_sync_progress", {**payload, "finished": final})
+            except Exception:
+                pass
+
+        def sync_one(d_id):
+            try:
+                return _full_ssh_sync_device(d_id)
+            except Exception:
+                logger.exception("SSH sync failed", extra={"device_id": d_id})
+                return "failed"
+
+        def on_done(_d_id, status):
+            counts[status if status in counts else "failed"] += 1
+            now = time.monotonic()
+            if now - last_report[0] >= FULL_SSH_SYNC_PROGRESS_SEC:
+                last_report[0] = now
+                report()
+
+        _run_site_bounded(items, sync_one, FULL_SSH_SYNC_CONCURRENCY, FULL_SSH_SYNC_PER_SITE, on_done=on_done)
+        report(final=True)
+        return {"status": "ok", "total": total, **counts}
+    finally:
+        _release_setting_lock(lock_key)
+
+
+L3_TABLE_CONCURRENCY = int(os.getenv("L3_TABLE_CONCURRENCY", "16"))
+L3_TABLE_LOCK_SEC = int(os.getenv("L3_TABLE_LOCK_SEC", "1800"))
+
+
+def _collect_l3_tables_device(d_id: int) -> str:
+    from app.services.route_lookup_cache import collect_device_tables
+
+    db = SessionLocal()
+    try:
+        device = db.get(Device, d_id)
+        if device is None:
+            return "failed"
+        row = collect_device_tables(db, device)
+        db.commit()
+        return "ok" if row.error is None else "failed"
+    finally:
+        db.close()
+
+
+@shared_task
+def collect_l3_tables():
+    """
+    경로 추적용 FIB/ARP/VRF 테이블 수집 (L3 인터페이스가 있는 장비만).
+    SNMP route MIB 를 먼저 시도하고, 지원하지 않으면 SSH 로 수집합니다.
+    """
+    lock_key = "l3_table_collect_lock"
+    if not _acquire_setting_lock(lock_key, L3_TABLE_LOCK_SEC):
+        logger.info("L3 table collection already running, skipping")
+        return {"status": "skipped"}
+
+    try:
+        from app.services.route_lookup_cache import l3_device_ids
+
+        db = SessionLocal()
+        try:
+            ids = list(l3_device_ids(db))
+            items = [(row[0], row[1]) for row in db.query(Device.id, Device.site_id).filter(Device.id.in_(ids)).order_by(Device.id).all()] if ids else []
         finally:
             db.close()
+
+        counts = {"ok": 0, "failed": 0}
+
+        def collect_one(d_id):
+            try:
+                return _collect_l3_tables_device(d_id)
+            except Exception:
+                logger.exception("L3 table collection failed", extra={"device_id": d_id})
+                return "failed"
+
+        def on_done(_d_id, status):
+            counts[status if status in counts else "failed"] += 1
+
+        _run_site_bounded(items, collect_one, L3_TABLE_CONCURRENCY, FULL_SSH_SYNC_PER_SITE, on_done=on_done)
+        return {"status": "ok", "total": len(items), **counts}
+    finally:
+        _release_setting_lock(lock_key)
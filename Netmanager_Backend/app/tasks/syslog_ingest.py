@@ -10,7 +10,7 @@ except ModuleNotFoundError:
 
 import logging
 
-from app.services.syslog_service import process_syslog_message
+from app.services.syslog_service import process_syslog_batch, process_syslog_message
 
 logger = logging.getLogger(__name__)
 
@@ -22,3 +22,12 @@ def ingest_syslog(source_ip: str, raw_log: str) -> None:
     except Exception:
         logger.exception("Syslog ingest failed")
 
+
+
+@shared_task(name="app.tasks.syslog_ingest.ingest_syslog_batch")
+def ingest_syslog_batch(items) -> None:
+    """items: [[source_ip, raw_log, received_at epoch], ...] collected by the UDP receiver."""
+    try:
+        process_syslog_batch(items)
+    except Exception:
+        logger.exception("Syslog batch ingest failed", extra={"lines": len(items or [])})
@@ -31,6 +31,7 @@ discovery_rate_limit = os.getenv("DISCOVERY_TASK_RATE_LIMIT", "30/m")
 neighbor_rate_limit = os.getenv("NEIGHBOR_CRAWL_RATE_LIMIT", "30/m")
 ssh_sync_rate_limit = os.getenv("SSH_SYNC_TASK_RATE_LIMIT", "120/m")
 syslog_rate_limit = os.getenv("SYSLOG_TASK_RATE_LIMIT", "300/m")
+monitor_scheduler_mode = os.getenv("MONITOR_SCHEDULER_MODE", "adaptive").strip().lower()
 
 celery_conf = dict(
     task_serializer="json",
@@ -55,14 +56,21 @@ celery_conf = dict(
         "app.tasks.device_sync.ssh_sync_device": {"queue": "ssh", "routing_key": "ssh"},
         "app.tasks.device_sync.enqueue_ssh_sync_batch": {"queue": "ssh", "routing_key": "ssh"},
         "app.tasks.monitoring.monitor_all_devices": {"queue": "monitoring", "routing_key": "monitoring"},
+        "app.tasks.monitoring.schedule_monitoring": {"queue": "monitoring", "routing_key": "monitoring"},
+        "app.tasks.monitoring.monitor_shard": {"queue": "monitoring", "routing_key": "monitoring"},
         "app.tasks.monitoring.collect_gnmi_metrics": {"queue": "monitoring", "routing_key": "monitoring"},
         "app.tasks.smart_alerting.run_dynamic_thresholds": {"queue": "monitoring", "routing_key": "monitoring"},
         "app.tasks.smart_alerting.run_correlations": {"queue": "monitoring", "routing_key": "monitoring"},
         "app.tasks.monitoring.full_ssh_sync_all": {"queue": "monitoring", "routing_key": "monitoring"},
+        "app.tasks.monitoring.collect_l3_tables": {"queue": "monitoring", "routing_key": "monitoring"},
         "app.tasks.maintenance.run_log_retention": {"queue": "maintenance", "routing_key": "maintenance"},
+        "app.tasks.maintenance.run_metric_rollups": {"queue": "maintenance", "routing_key": "maintenance"},
+        "app.tasks.maintenance.ensure_metric_partitions": {"queue": "maintenance", "routing_key": "maintenance"},
         "app.tasks.compliance.run_scheduled_compliance_scan": {"queue": "maintenance", "routing_key": "maintenance"},
         "app.tasks.compliance.run_scheduled_config_drift_checks": {"queue": "maintenance", "routing_key": "maintenance"},
         "app.tasks.syslog_ingest.ingest_syslog": {"queue": "syslog", "routing_key": "syslog"},
+        # 배치 태스크는 메시지 하나에 최대 SYSLOG_BATCH_SIZE 줄이므로 줄 단위 rate_limit 을 적용하지 않음
+        "app.tasks.syslog_ingest.ingest_syslog_batch": {"queue": "syslog", "routing_key": "syslog"},
     },
     task_annotations={
         "app.tasks.discovery.run_discovery_job": {"rate_limit": discovery_rate_limit},
@@ -72,12 +80,23 @@ celery_conf = dict(
     },
 
     beat_schedule={
-        # 30초 주기: 전체 장비 상태 및 모니터링 (Ping -> SNMP)
-        # NMS 표준 반응성을 위해 30초로 단축하고 단일 태스크로 통합하여 충돌 방지
-        "monitor-all-devices-every-30s": {
-            "task": "app.tasks.monitoring.monitor_all_devices",
-            "schedule": 30.0,
-        },
+        # 모니터링 (Ping -> SNMP): 장비별 polling_interval/status_interval 기준 분산 스케줄링
+        # MONITOR_SCHEDULER_MODE=legacy 이면 기존처럼 30초마다 전체 장비 일괄 수집
+        **(
+            {
+                "monitor-all-devices-every-30s": {
+                    "task": "app.tasks.monitoring.monitor_all_devices",
+                    "schedule": 30.0,
+                },
+            }
+            if monitor_scheduler_mode == "legacy"
+            else {
+                "monitor-scheduler-tick": {
+                    "task": "app.tasks.monitoring.schedule_monitoring",
+                    "schedule": float(os.getenv("MONITOR_SCHEDULER_TICK_SEC", "5")),
+                },
+            }
+        ),
         "collect-gnmi-metrics-every-5s": {
             "task": "app.tasks.monitoring.collect_gnmi_metrics",
             "schedule": float(os.getenv("GNMI_COLLECT_INTERVAL_SEC", "5")),
@@ -95,11 +114,26 @@ celery_conf = dict(
             "task": "app.tasks.monitoring.full_ssh_sync_all",
             "schedule": 3600.0,
         },
+        # 경로 추적용 FIB/ARP/VRF 테이블 수집
+        "collect-l3-tables": {
+            "task": "app.tasks.monitoring.collect_l3_tables",
+            "schedule": float(os.getenv("L3_TABLE_COLLECT_INTERVAL_SEC", "300")),
+        },
         # [NEW] 매일 03:00 - DB 데이터 보존 정책 실행 (오래된 로그 삭제)
         "run-log-retention-daily": {
             "task": "app.tasks.maintenance.run_log_retention",
             "schedule": crontab(hour=3, minute=0),
         },
+        # PostgreSQL 파티션 테이블: 미래 일 단위 파티션 미리 생성
+        "ensure-metric-partitions-daily": {
+            "task": "app.tasks.maintenance.ensure_metric_partitions",
+            "schedule": crontab(hour=2, minute=50),
+        },
+        # 메트릭 롤업 (1m/5m/1h) 증분 갱신
+        "run-metric-rollups-every-60s": {
+            "task": "app.tasks.maintenance.run_metric_rollups",
+            "schedule": float(os.getenv("METRIC_ROLLUP_INTERVAL_SEC", "60")),
+        },
         "run-config-drift-daily": {
             "task": "app.tasks.compliance.run_scheduled_config_drift_checks",
             "schedule": crontab(hour=3, minute=10),
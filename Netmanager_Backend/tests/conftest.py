@@ -7,3 +7,143 @@ if str(root) not in sys.path:
     sys.path.insert(0, str(root))
 
 os.environ.setdefault("SECRET_KEY", "test-secret-key")
+
+import socket
+import threading
+
+import pytest
+
+
+class FakeSnmpAgent:
+    """
+    Minimal in-process SNMP v1/v2c agent (snmpsim stand-in) on 127.0.0.1.
+    Serves GET/GETNEXT/GETBULK from a static MIB and counts requests per PDU type.
+    """
+
+    def __init__(self, mib=None, community="public", silent=False):
+        from pysnmp.proto import api
+        from pysnmp.proto import rfc1902
+
+        self._api = api
+        self.community = community
+        self.silent = silent
+        self.requests = {"get": 0, "getnext": 0, "getbulk": 0}
+        self.mib = {}
+        for oid, value in (mib or {}).items():
+            if isinstance(value, int) and not isinstance(value, bool):
+                value = rfc1902.Counter64(value) if value > 0x7FFFFFFF else rfc1902.Integer32(value)
+            elif isinstance(value, (str, bytes)):
+                value = rfc1902.OctetString(value)
+            self.mib[tuple(int(x) for x in oid.split("."))] = value
+        self._oids = sorted(self.mib)
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind(("127.0.0.1", 0))
+        self.sock.settimeout(0.2)
+        self.port = self.sock.getsockname()[1]
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+        self._thread.start()
+
+    @property
+    def total_requests(self) -> int:
+        return sum(self.requests.values())
+
+    def close(self):
+        self._stop.set()
+        self._thread.join(1.0)
+        self.sock.close()
+
+    def _next(self, oid, v1=False):
+        from pysnmp.proto import rfc1902
+
+        for candidate in self._oids:
+            # v1 agents skip Counter64 objects on GETNEXT (RFC 2576 4.2.2.1)
+            if candidate > oid and not (v1 and isinstance(self.mib[candidate], rfc1902.Counter64)):
+                return candidate
+        return None
+
+    def _serve(self):
+        from pyasn1.codec.ber import decoder, encoder
+        from pysnmp.proto import rfc1905
+
+        api = self._api
+        while not self._stop.is_set():
+            try:
+                data, addr = self.sock.recvfrom(65535)
+            except socket.timeout:
+                continue
+            except OSError:
+                return
+            if self.silent:
+                continue
+            version = int(api.decodeMessageVersion(data))
+            p = api.protoModules[version]
+            msg, _ = decoder.decode(data, asn1Spec=p.Message())
+            if str(p.apiMessage.getCommunity(msg)) != self.community:
+                continue
+            req = p.apiMessage.getPDU(msg)
+            rsp = p.apiPDU.getResponse(req)
+            p.apiPDU.setDefaults(rsp)
+            p.apiPDU.setRequestID(rsp, p.apiPDU.getRequestID(req))
+            end = rfc1905.endOfMibView
+            out = []
+            if req.isSameTypeWith(p.GetRequestPDU()):
+                self.requests["get"] += 1
+                for oid, _ in p.apiPDU.getVarBinds(req):
+                    out.append((oid, self.mib.get(tuple(oid), rfc1905.noSuchObject)))
+            elif req.isSameTypeWith(p.GetNextRequestPDU()):
+                self.requests["getnext"] += 1
+                for i, (oid, _) in enumerate(p.apiPDU.getVarBinds(req)):
+                    nxt = self._next(tuple(oid), v1=version == api.protoVersion1)
+                    if nxt is None:
+                        if version == api.protoVersion1:
+                            if not int(p.apiPDU.getErrorStatus(rsp)):
+                                p.apiPDU.setErrorStatus(rsp, 2)
+                                p.apiPDU.setErrorIndex(rsp, i + 1)
+                            out.append((oid, p.Null("")))
+                        else:
+                            out.append((oid, end))
+                    else:
+                        out.append((nxt, self.mib[nxt]))
+            elif version != api.protoVersion1 and req.isSameTypeWith(p.GetBulkRequestPDU()):
+                self.requests["getbulk"] += 1
+                non_rep = int(p.apiBulkPDU.getNonRepeaters(req))
+                max_rep = int(p.apiBulkPDU.getMaxRepetitions(req))
+                cols = [tuple(oid) for oid, _ in p.apiBulkPDU.getVarBinds(req)]
+                for oid in cols[:non_rep]:
+                    nxt = self._next(oid)
+                    out.append((nxt or oid, self.mib[nxt] if nxt else end))
+                cursors = cols[non_rep:]
+                for _ in range(max_rep):
+                    if not cursors:
+                        break
+                    row = []
+                    for i, oid in enumerate(cursors):
+                        nxt = self._next(oid) if oid is not None else None
+                        row.append((nxt or cols[non_rep + i], self.mib[nxt] if nxt else end))
+                        cursors[i] = nxt
+                    out.extend(row)
+                    if all(c is None for c in cursors):
+                        break
+            else:
+                continue
+            p.apiPDU.setVarBinds(rsp, out)
+            p.apiMessage.setPDU(msg, rsp)
+            try:
+                self.sock.sendto(encoder.encode(msg), addr)
+            except OSError:
+                return
+
+
+@pytest.fixture()
+def snmp_agent():
+    agents = []
+
+    def _start(mib=None, **kwargs):
+        agent = FakeSnmpAgent(mib, **kwargs)
+        agents.append(agent)
+        return agent
+
+    yield _start
+    for agent in agents:
+        agent.close()
@@ -37,6 +37,8 @@ def test_deploy_worker_rolls_back_and_saves_backup(monkeypatch, db_engine):
         def rollback(self) -> bool:
             return True
 
+    discarded = []
+
     class FakeConn:
         def __init__(self, info):
             self.driver = FakeDriver()
@@ -45,9 +47,19 @@ def test_deploy_worker_rolls_back_and_saves_backup(monkeypatch, db_engine):
         def connect(self):
             return True
 
+        def discard(self):
+            discarded.append(True)
+
         def disconnect(self):
             return None
 
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            self.disconnect()
+            return False
+
         def get_running_config(self):
             return "hostname before"
 
@@ -70,6 +82,7 @@ def test_deploy_worker_rolls_back_and_saves_backup(monkeypatch, db_engine):
     )
 
     assert res["status"] == "failed"
+    assert discarded  # 실패한 세션은 풀로 돌아가지 않음
     assert res["rollback_attempted"] is True
     assert res["rollback_success"] is True
     assert res["backup_id"] is not None
@@ -99,6 +112,8 @@ def test_deploy_worker_post_check_failure_triggers_rollback(monkeypatch, db_engi
         def rollback(self) -> bool:
             return True
 
+    discarded = []
+
     class FakeConn:
         def __init__(self, info):
             self.driver = FakeDriver()
@@ -107,9 +122,19 @@ def test_deploy_worker_post_check_failure_triggers_rollback(monkeypatch, db_engi
         def connect(self):
             return True
 
+        def discard(self):
+            discarded.append(True)
+
         def disconnect(self):
             return None
 
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            self.disconnect()
+            return False
+
         def get_running_config(self):
             return "hostname before"
 
@@ -132,6 +157,7 @@ def test_deploy_worker_post_check_failure_triggers_rollback(monkeypatch, db_engi
     )
 
     assert res["status"] == "failed"
+    assert discarded  # 실패한 세션은 풀로 돌아가지 않음
     assert res["rollback_attempted"] is True
     assert res["rollback_success"] is True
 
@@ -164,6 +190,8 @@ def test_post_check_profile_resolves_from_settings(monkeypatch, db_engine):
         def rollback(self) -> bool:
             return True
 
+    discarded = []
+
     class FakeConn:
         def __init__(self, info):
             self.driver = FakeDriver()
@@ -172,9 +200,19 @@ def test_post_check_profile_resolves_from_settings(monkeypatch, db_engine):
         def connect(self):
             return True
 
+        def discard(self):
+            discarded.append(True)
+
         def disconnect(self):
             return None
 
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            self.disconnect()
+            return False
+
         def get_running_config(self):
             return "hostname before"
 
@@ -199,4 +237,5 @@ def test_post_check_profile_resolves_from_settings(monkeypatch, db_engine):
     )
 
     assert res["status"] == "success"
+    assert not discarded
     assert res["post_check"]["command"] == "show version"
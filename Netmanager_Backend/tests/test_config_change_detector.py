@@ -0,0 +1,134 @@
+import datetime
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.db.session import Base
+from app.models.credentials import SnmpCredentialProfile  # noqa: F401  (sites.snmp_profile_id FK target)
+from app.models.device import ConfigBackup, Device, DeviceSyncState, EventLog, Interface
+from app.services import config_change_detector as ccd
+from app.services.config_change_detector import ConfigChangeDetector
+
+
+@pytest.fixture()
+def db(monkeypatch):
+    monkeypatch.setattr(ccd, "snmp_marker", lambda device: None)
+    engine = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False})
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    Base.metadata.create_all(bind=engine)
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+class FakeConn:
+    marker_line = "! Last configuration change at 10:00:00 UTC Mon Jan 5 2026 by admin"
+
+    def __init__(self, device_info=None):
+        self.device_info = device_info
+        self.last_error = None
+        self.commands = []
+        self.driver = None
+
+    def connect(self):
+        return True
+
+    def disconnect(self):
+        return None
+
+    def send_command(self, cmd, **kwargs):
+        self.commands.append(cmd)
+        if "Last configuration change" in cmd:
+            return FakeConn.marker_line
+        return ""
+
+    def get_facts(self):
+        self.commands.append("facts")
+        return {"model": "C9300", "os_version": "17.9", "hostname": "sw1", "uptime": 3600}
+
+    def get_running_config(self):
+        self.commands.append("running_config")
+        return "hostname sw1"
+
+    def get_neighbors(self):
+        self.commands.append("neighbors")
+        return []
+
+    def get_detailed_interfaces(self):
+        self.commands.append("interfaces")
+        return [{"name": "Gi1/0/1", "is_up": True, "is_enabled": True}]
+
+
+def _device(db):
+    d = Device(name="sw1", ip_address="10.0.0.1", device_type="cisco_ios", owner_id=1, snmp_community="")
+    db.add(d)
+    db.commit()
+    return d
+
+
+def test_decide_goes_light_only_when_marker_unchanged(db):
+    device = _device(db)
+    conn = FakeConn()
+    t0 = datetime.datetime(2026, 1, 5, 10, 0, 0)
+
+    first = ConfigChangeDetector.decide(db, device, conn, now=t0)
+    assert first.full and first.reason == "first_sync" and first.marker.startswith("cli:")
+    ConfigChangeDetector.record(db, device.id, first, now=t0)
+    db.commit()
+
+    same = ConfigChangeDetector.decide(db, device, conn, now=t0 + datetime.timedelta(hours=1))
+    assert not same.full and same.reason == "unchanged"
+    # WLC AP/client 수는 운영 상태이므로 config 변경과 무관하게 매번 갱신
+    assert same.collectors(["facts", "running_config", "neighbors", "wireless"]) == ["facts", "neighbors", "wireless"]
+    assert same.collectors(["facts", "running_config", "neighbors", "interfaces"]) == ["facts", "neighbors"]
+    ConfigChangeDetector.record(db, device.id, same, now=t0 + datetime.timedelta(hours=1))
+    db.commit()
+    state = db.get(DeviceSyncState, device.id)
+    assert state.last_mode == "light" and state.skipped_collectors == ["running_config", "interfaces"]
+    assert state.last_full_sync_at == t0 and state.full_syncs == 1 and state.light_syncs == 1
+
+    db.add(EventLog(device_id=device.id, event_id="%SYS-5-CONFIG_I", message="Configured from console by admin",
+                    source="Syslog", timestamp=t0 + datetime.timedelta(minutes=30)))
+    db.commit()
+    assert ConfigChangeDetector.decide(db, device, conn, now=t0 + datetime.timedelta(hours=2)).reason == "syslog"
+
+    db.query(EventLog).delete()
+    FakeConn.marker_line = "! Last configuration change at 11:30:00 UTC Mon Jan 5 2026 by admin"
+    try:
+        changed = ConfigChangeDetector.decide(db, device, conn, now=t0 + datetime.timedelta(hours=2))
+    finally:
+        FakeConn.marker_line = "! Last configuration change at 10:00:00 UTC Mon Jan 5 2026 by admin"
+    assert changed.full and changed.reason == "marker_changed"
+
+    assert ConfigChangeDetector.decide(db, device, conn, now=t0 + datetime.timedelta(days=2)).reason == "max_age"
+    assert ConfigChangeDetector.decide(db, device, None, now=t0 + datetime.timedelta(hours=1)).reason == "no_detector"
+
+
+def test_manual_sync_device_collects_everything_and_records_the_marker(db, monkeypatch):
+    import app.services.device_sync_service as mod
+    from app.services.device_sync_service import DeviceSyncService
+
+    conns = []
+
+    def make_conn(info):
+        c = FakeConn(info)
+        conns.append(c)
+        return c
+
+    monkeypatch.setattr(mod, "DeviceConnection", make_conn)
+    monkeypatch.setattr(mod.TopologyLinkService, "refresh_links_for_device", staticmethod(lambda db, device, neighbors: None))
+    monkeypatch.setattr(mod.EntityMibService, "refresh_device_inventory", staticmethod(lambda db, device: 1))
+    device = _device(db)
+
+    for _ in range(2):
+        DeviceSyncService.sync_device(db, device.id)
+        assert "running_config" in conns[-1].commands and "interfaces" in conns[-1].commands
+    assert db.query(ConfigBackup).count() == 2 and db.query(Interface).count() == 1
+
+    # 수동 동기화는 항상 전체 수집이지만, 주기 동기화가 비교할 marker 는 남김
+    state = db.get(DeviceSyncState, device.id)
+    assert state.last_mode == "full" and state.last_reason == "forced" and state.full_syncs == 2
+    assert state.change_marker and state.change_marker.startswith("cli:")
@@ -0,0 +1,144 @@
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm.exc import DetachedInstanceError
+
+from app.db import config_store
+from app.db.session import Base
+from app.models.credentials import SnmpCredentialProfile  # noqa: F401  (sites.snmp_profile_id FK target)
+from app.models.device import ConfigBackup, ConfigBlob, Device
+
+
+@pytest.fixture()
+def db():
+    engine = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False})
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    Base.metadata.create_all(bind=engine)
+    config_store.text_cache.clear()
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+        config_store.text_cache.clear()
+
+
+def _config(n=400, changed=None):
+    lines = ["hostname core-sw1"]
+    for i in range(n):
+        desc = "UPLINK" if changed == i else f"user port {i}"
+        lines.append(f"interface GigabitEthernet1/0/{i}\n description {desc}\n switchport access vlan {10 + i % 20}\n!")
+    return "\n".join(lines) + "\n"
+
+
+def _device(db):
+    d = Device(name="core-sw1", ip_address="10.9.0.1", device_type="cisco_ios", owner_id=1)
+    db.add(d)
+    db.commit()
+    return d
+
+
+def test_identical_pulls_share_one_blob_and_changes_are_deltas(db):
+    d = _device(db)
+    base = _config()
+    changed = _config(changed=7)
+
+    for cfg in (base, base, changed):
+        db.add(ConfigBackup(device_id=d.id, raw_config=cfg))
+        db.commit()
+
+    blobs = {b.hash: b for b in db.query(ConfigBlob).all()}
+    assert len(blobs) == 2
+    full = blobs[config_store.config_hash(base)]
+    delta = blobs[config_store.config_hash(changed)]
+    assert full.base_hash is None and full.stored_size < full.size
+    assert delta.base_hash == full.hash and delta.depth == 1
+    assert delta.stored_size < full.stored_size * config_store.CONFIG_DELTA_MAX_RATIO
+
+    config_store.text_cache.clear()
+    db.expire_all()
+    rows = db.query(ConfigBackup).order_by(ConfigBackup.id).all()
+    assert [r.raw_config for r in rows] == [base, base, changed]
+    assert rows[0].config_hash == rows[1].config_hash
+    assert db.execute(text("SELECT COUNT(*) FROM config_backups WHERE raw_config IS NOT NULL")).scalar() == 0
+
+
+def test_delta_chain_is_capped(db, monkeypatch):
+    monkeypatch.setattr(config_store, "CONFIG_DELTA_MAX_CHAIN", 2)
+    d = _device(db)
+    for i in range(5):
+        db.add(ConfigBackup(device_id=d.id, raw_config=_config(changed=i)))
+        db.commit()
+
+    depths = [b.depth for b in db.query(ConfigBlob).order_by(ConfigBlob.created_at, ConfigBlob.stored_size.desc()).all()]
+    assert max(depths) <= 2 and depths.count(0) >= 2
+
+    config_store.text_cache.clear()
+    db.expire_all()
+    assert [r.raw_config for r in db.query(ConfigBackup).order_by(ConfigBackup.id)] == [_config(changed=i) for i in range(5)]
+
+
+def test_legacy_rows_are_readable_and_compacted(db):
+    d = _device(db)
+    cfg = _config(n=50)
+    db.execute(
+        text("INSERT INTO config_backups (device_id, raw_config, is_golden) VALUES (:d, :c, 0)"),
+        {"d": d.id, "c": cfg},
+    )
+    db.commit()
+
+    row = db.query(ConfigBackup).one()
+    assert row.config_hash is None and row.raw_config == cfg
+
+    assert config_store.compact_legacy_backups(db) == 1
+    db.commit()
+    assert config_store.compact_legacy_backups(db) == 0
+
+    config_store.text_cache.clear()
+    db.expire_all()
+    row = db.query(ConfigBackup).one()
+    assert row.config_hash == config_store.config_hash(cfg)
+    assert row.legacy_raw_config is None and row.raw_config == cfg
+
+
+def test_detached_backup_loads_its_blob(db):
+    d = _device(db)
+    cfg = _config(n=30)
+    db.add(ConfigBackup(device_id=d.id, raw_config=cfg))
+    db.commit()
+
+    row = db.query(ConfigBackup).one()
+    db.expunge(row)
+    config_store.text_cache.clear()
+    assert row.raw_config == cfg
+
+    orphan = ConfigBackup(device_id=d.id, config_hash=config_store.config_hash("never stored"))
+    with pytest.raises(DetachedInstanceError):
+        orphan.raw_config
+
+
+def test_orphan_blobs_are_pruned_with_their_delta_bases(db):
+    d = _device(db)
+    keep = Device(name="core-sw2", ip_address="10.9.0.2", device_type="cisco_ios", owner_id=1)
+    db.add(keep)
+    db.commit()
+    for i in range(3):
+        db.add(ConfigBackup(device_id=d.id, raw_config=_config(changed=i)))
+        db.commit()
+    db.add(ConfigBackup(device_id=keep.id, raw_config=_config(n=20)))
+    db.commit()
+    assert db.query(ConfigBlob).filter(ConfigBlob.base_hash.isnot(None)).count() == 2
+    assert config_store.prune_orphan_blobs(db) == 0
+
+    # 마지막 백업만 남기면 delta 체인의 base 는 계속 필요함
+    first, second, last = db.query(ConfigBackup).filter(ConfigBackup.device_id == d.id).order_by(ConfigBackup.id).all()
+    db.delete(first)
+    db.delete(second)
+    db.commit()
+    assert config_store.prune_orphan_blobs(db) == 0
+
+    db.delete(d)
+    db.commit()
+    assert config_store.prune_orphan_blobs(db, batch_size=1) == 3
+    db.commit()
+    assert [b.hash for b in db.query(ConfigBlob)] == [config_store.config_hash(_config(n=20))]
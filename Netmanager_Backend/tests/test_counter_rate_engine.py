@@ -0,0 +1,114 @@
+import random
+
+import pytest
+
+import app.services.counter_rate_engine as counter_rate_engine
+from app.services.counter_rate_engine import CounterRateEngine, counter_delta
+
+
+@pytest.fixture(params=["numpy", "python"])
+def engine(request, monkeypatch):
+    if request.param == "numpy":
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(counter_rate_engine, "np", None)
+    return CounterRateEngine
+
+
+def _sample(in_octets, ts, sys_uptime=None, **extra):
+    counters = {"in_octets": in_octets}
+    counters.update(extra)
+    return {"device_id": 1, "if_name": "Gi1/0/1", "counters": counters, "ts": ts, "sys_uptime": sys_uptime}
+
+
+def _prev(in_octets, ts, sys_uptime=None, **extra):
+    entry = {"in_octets": in_octets, "ts": ts, "sys_uptime": sys_uptime}
+    entry.update(extra)
+    return {1: {"Gi1/0/1": entry}}
+
+
+def test_counter_delta_wrap_rules():
+    assert counter_delta(10, 30) == 20
+    assert counter_delta(2**32 - 100, 50, bits=32) == 150
+    # big drop of a 32-bit counter is a clear, not a wrap
+    assert counter_delta(1_000_000_000, 5, bits=32) is None
+    # a 64-bit counter never wraps in practice: any drop is a reset
+    assert counter_delta(2**64 - 100, 50, bits=64) is None
+    assert counter_delta(2**32 - 100, 50, bits=64) is None
+    assert counter_delta(2**40, 5) is None
+
+
+def test_rates_and_wraps(engine):
+    (e,) = engine.compute([_sample(11_000, 110.0)], _prev(1_000, 100.0))
+    assert e["in_bps"] == pytest.approx(8000.0) and not e["discontinuity"]
+
+    # 32-bit octets (no ifXTable) wrap
+    sample = dict(_sample(900, 110.0), counter_bits={"in_octets": 32})
+    (e,) = engine.compute([sample], _prev(2**32 - 100, 100.0))
+    assert e["in_bps"] == pytest.approx(1000 * 8 / 10.0) and not e["discontinuity"]
+
+    # Counter32 error counters wrap by default
+    (e,) = engine.compute([_sample(0, 110.0, in_errors=10)], _prev(0, 100.0, in_errors=2**32 - 10))
+    assert e["in_errors_per_sec"] == pytest.approx(2.0)
+
+
+def test_hc_counter_drop_is_a_reset_not_a_wrap(engine):
+    # "clear counters" on an HC counter that was still below 2^32
+    (e,) = engine.compute([_sample(900, 110.0)], _prev(2**32 - 100, 100.0))
+    assert e["discontinuity"] and e["in_bps"] == 0.0 and e["in_octets"] == 900
+
+    (e,) = engine.compute([_sample(900, 110.0)], _prev(2**64 - 100, 100.0))
+    assert e["discontinuity"] and e["in_bps"] == 0.0
+
+    # gNMI marks every field 64-bit, errors included
+    sample = dict(_sample(0, 110.0, in_errors=10), counter_bits=64)
+    (e,) = engine.compute([sample], _prev(0, 100.0, in_errors=2**32 - 10))
+    assert e["discontinuity"] and e["in_errors_per_sec"] == 0.0
+
+
+def test_clear_counters_and_reboot_are_discontinuities(engine):
+    (e,) = engine.compute([_sample(5, 110.0, in_errors=3)], _prev(1_000_000_000, 100.0, in_errors=1))
+    assert e["discontinuity"] and e["in_bps"] == 0.0
+    # other counters of the same port are still usable
+    assert e["in_errors_per_sec"] == pytest.approx(0.2)
+    assert e["in_octets"] == 5
+
+    # counters look like a wrap, but sysUpTime went back: device rebooted
+    sample = dict(_sample(900, 110.0, sys_uptime=500), counter_bits=32)
+    (e,) = engine.compute([sample], _prev(2**32 - 100, 100.0, sys_uptime=9_000_000))
+    assert e["discontinuity"] and e["in_bps"] == 0.0
+
+    # sysUpTime wrapped after ~497 days, not a reboot
+    (e,) = engine.compute([_sample(11_000, 110.0, sys_uptime=500)], _prev(1_000, 100.0, sys_uptime=2**32 - 500))
+    assert not e["discontinuity"] and e["in_bps"] == pytest.approx(8000.0)
+
+
+def test_short_interval_or_missing_prev_gives_zero(engine):
+    (e,) = engine.compute([_sample(11_000, 100.5)], _prev(1_000, 100.0))
+    assert e["in_bps"] == 0.0 and e["ts"] == 100.5
+    (e,) = engine.compute([_sample(11_000, 100.0)], {})
+    assert e["in_bps"] == 0.0 and not e["discontinuity"]
+
+
+def test_numpy_and_python_paths_agree(monkeypatch):
+    pytest.importorskip("numpy")
+    rnd = random.Random(7)
+    samples, prev = [], {}
+    for did in range(50):
+        up = rnd.choice([None, 1000, 2**32 - 10])
+        for port in range(48):
+            name = f"Gi1/0/{port + 1}"
+            old = {f: rnd.choice([0, rnd.randrange(2**32), rnd.randrange(2**64)]) for f in counter_rate_engine.COUNTER_FIELDS}
+            new = {f: (v + rnd.randrange(10**6)) % rnd.choice([2**32, 2**64]) for f, v in old.items()}
+            prev.setdefault(did, {})[name] = dict(old, ts=100.0, sys_uptime=up)
+            samples.append({"device_id": did, "if_name": name, "counters": new, "ts": 130.0, "sys_uptime": rnd.choice([up, 5]),
+                            "counter_bits": rnd.choice([None, 32, 64, {"in_octets": 32}])})
+
+    fast = CounterRateEngine.compute(samples, prev)
+    monkeypatch.setattr(counter_rate_engine, "np", None)
+    slow = CounterRateEngine.compute(samples, prev)
+    assert len(fast) == len(slow) == 50 * 48
+    for a, b in zip(fast, slow):
+        assert a.keys() == b.keys()
+        for k in a:
+            assert a[k] == pytest.approx(b[k]), k
@@ -0,0 +1,135 @@
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app.db.session import Base
+from app.models.credentials import SnmpCredentialProfile  # noqa: F401  (sites.snmp_profile_id FK target)
+from app.models.device import Device, InterfaceCounterState
+from app.services.counter_state_store import TOTAL_IFNAME, CounterStateStore, legacy_if_state
+import app.tasks.monitoring as monitoring
+
+
+@pytest.fixture()
+def session_factory():
+    engine = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+@pytest.fixture()
+def db(session_factory):
+    session = session_factory()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+def test_save_upserts_only_given_ports(db):
+    dev = Device(name="sw1", ip_address="10.3.0.1", device_type="cisco_ios", owner_id=1)
+    db.add(dev)
+    db.commit()
+
+    CounterStateStore.save(db, {dev.id: {"Gi1/0/1": {"in_octets": 100, "ts": 1.0}, "Gi1/0/2": {"in_octets": 5, "ts": 1.0}}})
+    db.commit()
+    CounterStateStore.save(db, {dev.id: {"Gi1/0/1": {"in_octets": 900, "in_bps": 640.0, "ts": 11.0, "health": "ok"}}})
+    db.commit()
+
+    state = CounterStateStore.load(db, [dev.id])[dev.id]
+    assert state["Gi1/0/1"]["in_octets"] == 900 and state["Gi1/0/1"]["in_bps"] == 640.0
+    assert state["Gi1/0/2"]["in_octets"] == 5
+    assert db.query(InterfaceCounterState).count() == 2
+    assert CounterStateStore.link_rates(db, if_names=["Gi1/0/1"]) == {
+        dev.id: {"Gi1/0/1": {"in_bps": 640.0, "out_bps": 0.0, "ts": 11.0, "health": "ok", "is_up": None}}
+    }
+
+
+def test_legacy_blob_state_is_readable():
+    meta = {"traffic_state": {"in": 10, "out": 20, "ts": 5.0}, "if_traffic_state": {"Gi1/0/1": {"in": 7, "ts": 5.0}}}
+    state = legacy_if_state(meta)
+    assert state[TOTAL_IFNAME] == {"in_octets": 10, "out_octets": 20, "ts": 5.0}
+    assert state["Gi1/0/1"]["in_octets"] == 7
+
+
+def test_monitor_cycle_keeps_counters_out_of_latest_parsed_data(session_factory, db, monkeypatch):
+    blob = {"mac_aliases": ["aaaa.bbbb.cccc"], "traffic_state": {"in": 0, "out": 0, "ts": 0}}
+    dev = Device(
+        name="sw1", ip_address="10.3.0.1", device_type="cisco_ios", owner_id=1, latest_parsed_data=blob, ssh_password="secret"
+    )
+    db.add(dev)
+    db.commit()
+    device_id = dev.id
+
+    counters = {"in_octets": 1000, "out_octets": 2000}
+    seen_targets = []
+
+    def fake_poll(targets, deadline=None):
+        seen_targets.extend(targets)
+        return {
+            t["id"]: {
+                "status": {"status": "online", "uptime": "1 day"},
+                "resource_data": {"cpu_usage": 5, "memory_usage": 10, "raw_octets_in": counters["in_octets"], "raw_octets_out": counters["out_octets"]},
+                "if_counters": {"Gi1/0/1": dict(counters)},
+                "wlc_clients": None,
+            }
+            for t in targets
+        }
+
+    monkeypatch.setattr(monitoring, "SessionLocal", session_factory)
+    monkeypatch.setattr(monitoring.icmp_sweeper, "sweep", lambda hosts, **kw: {h: 1.0 for h in hosts})
+    monkeypatch.setattr(monitoring, "_poll_snmp_targets", fake_poll)
+
+    monitoring._run_monitor_cycle()
+    # SNMP 대상에는 SSH 자격증명/파싱 JSON 을 싣지 않음
+    assert seen_targets and not {"user", "pw", "prev_data"} & set(seen_targets[0])
+    db.expire_all()
+    # legacy counter keys are dropped once, everything else in the blob is kept
+    assert db.get(Device, device_id).latest_parsed_data == {"mac_aliases": ["aaaa.bbbb.cccc"]}
+
+    # pretend the first sample is 10 s old, then poll again with 10 kB more traffic
+    db.query(InterfaceCounterState).update({InterfaceCounterState.ts: InterfaceCounterState.ts - 10})
+    db.commit()
+    counters["in_octets"] += 10000
+    writes = []
+
+    def _on_set(target, value, oldvalue, initiator):
+        writes.append(value)
+
+    event.listen(Device.latest_parsed_data, "set", _on_set)
+    try:
+        monitoring._run_monitor_cycle()
+    finally:
+        event.remove(Device.latest_parsed_data, "set", _on_set)
+    assert writes == []
+
+    db.expire_all()
+    rates = CounterStateStore.load(db, [device_id])[device_id]
+    assert rates["Gi1/0/1"]["in_bps"] == pytest.approx(8000.0, rel=0.05)
+    assert rates[TOTAL_IFNAME]["in_bps"] == pytest.approx(8000.0, rel=0.05)
+
+
+def test_monitor_devices_never_selects_ssh_credentials(session_factory, db, monkeypatch):
+    dev = Device(name="sw1", ip_address="10.3.0.1", device_type="cisco_ios", owner_id=1, ssh_password="secret", enable_password="en")
+    db.add(dev)
+    db.commit()
+    device_id = dev.id
+
+    statements = []
+
+    def _record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    monkeypatch.setattr(monitoring, "SessionLocal", session_factory)
+    monkeypatch.setattr(monitoring.icmp_sweeper, "sweep", lambda hosts, **kw: {})
+    engine = session_factory.kw["bind"]
+    event.listen(engine, "before_cursor_execute", _record)
+    try:
+        monitoring.monitor_devices([device_id])
+    finally:
+        event.remove(engine, "before_cursor_execute", _record)
+
+    selects = [s for s in statements if s.lstrip().upper().startswith("SELECT") and "FROM devices" in s]
+    assert selects
+    assert not any("ssh_password" in s or "enable_password" in s for s in selects)
+    db.expire_all()
+    assert db.get(Device, device_id).status == "offline"
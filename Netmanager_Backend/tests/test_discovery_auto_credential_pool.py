@@ -29,3 +29,72 @@ def test_scan_single_host_tries_credential_pool(monkeypatch):
     assert res["snmp_status"] == "reachable"
     assert res["evidence"].get("snmp_profile_id") == 2
 
+
+
+def test_credential_race_returns_first_valid_reply_and_remembers_subnet(monkeypatch):
+    import asyncio
+    import time
+
+    from app.services import discovery_service as mod
+    from app.services.discovery_service import DiscoveryService
+
+    calls = []
+
+    class FakeSnmp:
+        def __init__(self, ip, community, port=161, version="v2c", **kwargs):
+            self.community = community
+
+        async def aget_system_info(self):
+            calls.append(self.community)
+            if self.community == "good":
+                await asyncio.sleep(0.05)
+                return {"sysName": "sw", "sysDescr": "Cisco IOS Software", "sysObjectID": "1.3.6.1.4.1.9.1.1208"}
+            await asyncio.sleep(1.0)  # 잘못된 community 는 타임아웃처럼 응답 없음
+            return None
+
+        def get_oids(self, oids):
+            return {}
+
+    monkeypatch.setattr(mod, "SnmpManager", FakeSnmp)
+    pool = [{"profile_id": i, "community": f"bad{i}"} for i in range(1, 8)]
+    pool.append({"profile_id": 8, "community": "good"})
+    profile = {"community": "bad", "credential_pool": pool}
+
+    svc = DiscoveryService(db=None)
+    started = time.monotonic()
+    res = svc._scan_single_host("10.0.5.10", profile)
+    assert time.monotonic() - started < 0.9
+    assert res["evidence"].get("snmp_profile_id") == 8
+    assert svc.subnet_credentials.preferred("10.0.5.99") == 8
+
+    # 같은 /24 의 다음 호스트는 기억된 자격증명 하나만으로 끝남
+    calls.clear()
+    res = svc._scan_single_host("10.0.5.11", profile)
+    assert res["evidence"].get("snmp_profile_id") == 8
+    assert calls == ["good"]
+
+
+def test_subnet_credential_memory_persists_pool_profiles():
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+
+    from app.db.session import Base
+    from app.models.credentials import SnmpCredentialProfile  # noqa: F401  (FK target)
+    from app.models.discovery import DiscoverySubnetCredential
+    from app.services.snmp_credential_race import JOB_PROFILE, SubnetCredentialMemory
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine, tables=[SnmpCredentialProfile.__table__, DiscoverySubnetCredential.__table__])
+    db = sessionmaker(bind=engine)()
+
+    mem = SubnetCredentialMemory()
+    mem.remember("10.1.2.3", 5)
+    mem.remember("10.9.9.9", JOB_PROFILE)
+    assert mem.save(db) == 1
+    db.commit()
+
+    fresh = SubnetCredentialMemory()
+    fresh.load(db)
+    assert fresh.preferred("10.1.2.200") == 5
+    assert fresh.preferred("10.9.9.1") is None
+    assert fresh.preferred_index("10.1.2.7", [{"community": "x"}, {"profile_id": 5}]) == 1
@@ -0,0 +1,88 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.db.session import Base
+from app.models.discovery import DiscoveryJob, DiscoveryJobLog
+from app.services.discovery_service import DiscoveryService
+from app.api.v1.endpoints.discovery import get_job_logs
+
+
+@pytest.fixture()
+def db():
+    engine = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False})
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    Base.metadata.create_all(bind=engine)
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+def test_append_job_log_inserts_rows_and_keeps_small_summary(db, monkeypatch):
+    from app.services import realtime_event_bus as bus_mod
+
+    published = []
+    monkeypatch.setattr(bus_mod.realtime_event_bus, "publish", lambda event, data: published.append((event, data)))
+
+    svc = DiscoveryService(db)
+    job = svc.create_scan_job("10.0.0.0/24", "public")
+    published.clear()
+    for i in range(300):
+        svc._append_job_log(job, f"  [+] 10.0.0.{i}: Cisco IOS (reachable)")
+    # nothing is announced before the rows are committed (the SSE reader would find nothing)
+    assert published == []
+    db.commit()
+    assert len(published) == 300
+
+    rows = db.query(DiscoveryJobLog).filter(DiscoveryJobLog.job_id == job.id).order_by(DiscoveryJobLog.id).all()
+    assert len(rows) == 301
+    assert rows[0].message == "Job Created. Waiting for worker..."
+    assert rows[-1].message.startswith("  [+] 10.0.0.299")
+
+    db.refresh(job)
+    assert len(job.logs) <= 2000
+    assert job.logs.endswith("10.0.0.299: Cisco IOS (reachable)")
+    assert job.logs.startswith("  [+] 10.0.0.")  # 잘린 첫 줄은 버림
+
+    assert published[-1][0] == "discovery_log"
+    assert published[-1][1]["job_id"] == job.id and published[-1][1]["id"] == rows[-1].id
+
+
+def test_job_logs_endpoint_pages_by_cursor(db):
+    svc = DiscoveryService(db)
+    job = svc.create_scan_job("10.0.0.0/24", "public")
+    for i in range(9):
+        svc._append_job_log(job, f"line {i}")
+    db.commit()
+
+    tail = get_job_logs(job.id, after=None, before=None, limit=3, db=db)
+    assert [e["message"] for e in tail["items"]] == ["line 6", "line 7", "line 8"]
+    assert tail["has_more"] is True
+
+    older = get_job_logs(job.id, after=None, before=tail["first_cursor"], limit=3, db=db)
+    assert [e["message"] for e in older["items"]] == ["line 3", "line 4", "line 5"]
+
+    forward = get_job_logs(job.id, after=0, before=None, limit=4, db=db)
+    assert [e["message"] for e in forward["items"]] == ["Job Created. Waiting for worker...", "line 0", "line 1", "line 2"]
+    nxt = get_job_logs(job.id, after=forward["next_cursor"], before=None, limit=100, db=db)
+    assert nxt["items"][0]["message"] == "line 3" and nxt["has_more"] is False
+
+    empty = get_job_logs(job.id, after=nxt["next_cursor"], before=None, limit=100, db=db)
+    assert empty["items"] == [] and empty["next_cursor"] == nxt["next_cursor"]
+
+
+def test_rolled_back_job_logs_are_not_published(db, monkeypatch):
+    from app.services import realtime_event_bus as bus_mod
+
+    published = []
+    monkeypatch.setattr(bus_mod.realtime_event_bus, "publish", lambda event, data: published.append((event, data)))
+
+    svc = DiscoveryService(db)
+    job = svc.create_scan_job("10.0.0.0/24", "public")
+    published.clear()
+    svc._append_job_log(job, "never committed")
+    db.rollback()
+    db.commit()
+    assert published == []
@@ -58,19 +58,15 @@ def test_neighbor_crawl_rejects_seed_outside_scope(db):
 
 
 def test_tcp_alive_sweep_respects_scope_filters(db, monkeypatch):
-    import socket as sockmod
+    from app.services import tcp_alive_sweeper
 
-    class FakeSocket:
-        def __init__(self, *args, **kwargs):
-            self._closed = False
-        def settimeout(self, *args, **kwargs):
-            return None
-        def connect_ex(self, *args, **kwargs):
-            return 0
-        def close(self):
-            self._closed = True
+    probed = []
 
-    monkeypatch.setattr(sockmod, "socket", lambda *args, **kwargs: FakeSocket())
+    async def fake_probe(ip, ports, timeout):
+        probed.append(ip)
+        return True
+
+    monkeypatch.setattr(tcp_alive_sweeper, "probe_host", fake_probe)
 
     svc = DiscoveryService(db)
     alive = svc._tcp_alive_sweep(
@@ -82,4 +78,192 @@ def test_tcp_alive_sweep_respects_scope_filters(db, monkeypatch):
         exclude_cidrs=["10.0.0.3/32"],
     )
     assert alive == ["10.0.0.2"]
+    assert probed == ["10.0.0.2"]
+
+
+def test_tcp_alive_sweep_covers_a_slash16_within_deadline(db, monkeypatch):
+    import asyncio
+    import time
+
+    from app.services import tcp_alive_sweeper
+
+    async def fake_probe(ip, ports, timeout):
+        await asyncio.sleep(0.01)
+        return ip.endswith(".1")
+
+    monkeypatch.setattr(tcp_alive_sweeper, "probe_host", fake_probe)
+
+    started = time.monotonic()
+    stream = DiscoveryService(db)._tcp_alive_stream("10.20.0.0/16")
+    first = stream.get(timeout=5)
+    assert first is not None and first.endswith(".1")  # 첫 호스트는 sweep 이 끝나기 전에 나옴
+    rest = list(stream)
+    assert time.monotonic() - started < 20
+    assert stream.probed == 65534
+    assert len(rest) + 1 == 256
+
+
+def test_tcp_probe_treats_refused_port_as_alive():
+    import asyncio
+    import socket
+
+    from app.services.tcp_alive_sweeper import probe_host
+
+    listener = socket.socket()
+    listener.bind(("127.0.0.1", 0))
+    listener.listen(1)
+    open_port = listener.getsockname()[1]
+    closed = socket.socket()
+    closed.bind(("127.0.0.1", 0))
+    closed_port = closed.getsockname()[1]
+    closed.close()
+    try:
+        assert asyncio.run(probe_host("127.0.0.1", [open_port], 1.0)) is True
+        assert asyncio.run(probe_host("127.0.0.1", [closed_port], 1.0)) is True
+    finally:
+        listener.close()
+
+
+def test_nmap_stream_retries_with_tcp_ping_only_when_nmap_fails():
+    from app.services.discovery_pipeline import NMAP_TCP_PING_ARGS, AliveHostStream, NmapPingStream
+
+    with pytest.raises(TypeError):
+        AliveHostStream()
+
+    class FakeScanner:
+        def __init__(self, icmp_up, broken=()):
+            self.icmp_up = icmp_up
+            self.broken = set(broken)
+            self.calls = []
+            self._up = []
+
+        def scan(self, hosts, arguments):
+            self.calls.append((hosts, arguments))
+            tcp = arguments == NMAP_TCP_PING_ARGS
+            if hosts in self.broken and not tcp:
+                raise RuntimeError("nmap: Failed to open device eth0")
+            self._up = [hosts.replace("0/24", "7")] if tcp else list(self.icmp_up.get(hosts, []))
+
+    def run(scanner):
+        stream = NmapPingStream(lambda: scanner, "10.0.0.0/22", lambda nm: nm._up)
+        return sorted(stream), stream
+
+    # 응답 없는 chunk(10.0.1.0/24)는 재시도하지 않고, nmap 이 실패한 chunk 만 TCP ping
+    scanner = FakeScanner({"10.0.0.0/24": ["10.0.0.5"]}, broken={"10.0.2.0/24"})
+    hosts, stream = run(scanner)
+    assert hosts == ["10.0.0.5", "10.0.2.7"]
+    assert [h for h, args in scanner.calls if args == NMAP_TCP_PING_ARGS] == ["10.0.2.0/24"]
+    assert stream.tcp_fallback_chunks == 1
+
+    # 대역 전체가 ICMP 에 침묵하면 (필터링) 전체를 TCP ping 으로 한 번 더
+    scanner = FakeScanner({})
+    hosts, _ = run(scanner)
+    assert hosts == ["10.0.0.7", "10.0.1.7", "10.0.2.7", "10.0.3.7"]
+    assert len(scanner.calls) == 8
+
+
+def test_run_scan_worker_streams_nmap_chunks_into_phase2(db, monkeypatch):
+    import threading
+
+    from app.services import discovery_service as mod
+
+    chunk_gate = threading.Event()
+    inspected = []
+
+    class FakeHost:
+        def state(self):
+            return "up"
+
+    class FakeScanner:
+        def __init__(self):
+            self._up = []
+
+        def scan(self, hosts, arguments):
+            if hosts == "10.0.1.0/24":
+                # 두 번째 chunk 는 첫 호스트가 Phase 2 에 들어간 뒤에야 끝남
+                assert chunk_gate.wait(5)
+            self._up = [hosts.replace("0/24", "10")] if "-PE" in arguments else []
 
+        def all_hosts(self):
+            return list(self._up)
+
+        def __getitem__(self, host):
+            return FakeHost()
+
+    class FakeNmap:
+        PortScanner = FakeScanner
+
+    def fake_scan(ip, profile):
+        inspected.append(ip)
+        chunk_gate.set()
+        return {"ip_address": ip, "hostname": ip, "snmp_status": "unreachable"}
+
+    job = DiscoveryJob(cidr="10.0.0.0/23", snmp_community="public", status="pending", logs="")
+    db.add(job)
+    db.commit()
+
+    monkeypatch.setattr(mod, "nmap", FakeNmap)
+    monkeypatch.setattr(mod, "SessionLocal", lambda: db)
+    monkeypatch.setattr(db, "close", lambda: None)
+    svc = DiscoveryService(db)
+    monkeypatch.setattr(svc, "_scan_single_host", fake_scan)
+    monkeypatch.setattr(DiscoveryService, "auto_approve_job", lambda self, job_id: None)
+
+    svc.run_scan_worker(job.id)
+    db.refresh(job)
+    assert job.status == "completed", job.logs
+    assert inspected == ["10.0.0.10", "10.0.1.10"]
+    assert job.total_ips == 2 and job.scanned_ips == 2
+
+
+def test_run_scan_worker_total_follows_phase1_not_the_inflight_window(db, monkeypatch):
+    import time
+
+    from app.services import discovery_service as mod
+
+    seen = []
+
+    class FakeHost:
+        def state(self):
+            return "up"
+
+    class FakeScanner:
+        def scan(self, hosts, arguments):
+            pass
+
+        def all_hosts(self):
+            return [f"10.0.0.{i}" for i in range(1, 31)]
+
+        def __getitem__(self, host):
+            return FakeHost()
+
+    class FakeNmap:
+        PortScanner = FakeScanner
+
+    def fake_scan(ip, profile):
+        if not seen:
+            # Phase 1 이 30대를 모두 찾을 시간을 줌 (Phase 2 창은 20대)
+            time.sleep(0.8)
+        seen.append((job.scanned_ips, job.total_ips))
+        return None
+
+    # in-flight 창 = max_workers(10) * multiplier(2) = 20 < 발견된 호스트 수
+    db.add(SystemSetting(key="discovery_max_workers", value="10", description="", category="system"))
+    db.add(SystemSetting(key="discovery_inflight_multiplier", value="2", description="", category="system"))
+    job = DiscoveryJob(cidr="10.0.0.0/24", snmp_community="public", status="pending", logs="")
+    db.add(job)
+    db.commit()
+
+    monkeypatch.setattr(mod, "nmap", FakeNmap)
+    monkeypatch.setattr(mod, "SessionLocal", lambda: db)
+    monkeypatch.setattr(db, "close", lambda: None)
+    svc = DiscoveryService(db)
+    monkeypatch.setattr(svc, "_scan_single_host", fake_scan)
+    monkeypatch.setattr(DiscoveryService, "auto_approve_job", lambda self, job_id: None)
+
+    svc.run_scan_worker(job.id)
+    db.refresh(job)
+    assert job.status == "completed", job.logs
+    # 검사 도중에도 분모는 발견된 호스트 수 전체
+    assert seen[0] == (0, 30)
+    assert job.total_ips == 30 and job.scanned_ips == 30
@@ -14,3 +14,72 @@ def test_encrypted_string_plaintext_backcompat():
     plain = t.process_result_value("legacy_plain", None)
     assert plain == "legacy_plain"
 
+
+
+def test_decrypt_uses_cache_for_repeated_ciphertext(monkeypatch):
+    import app.db.encrypted_types as et
+
+    et.decrypted_cache.clear()
+    t = EncryptedString()
+    stored = t.process_bind_param("secret123", None)
+
+    real = et.get_fernet()
+    calls = {"n": 0}
+
+    class CountingFernet:
+        def decrypt(self, token):
+            calls["n"] += 1
+            return real.decrypt(token)
+
+    monkeypatch.setattr(et, "get_fernet", lambda: CountingFernet())
+    assert t.process_result_value(stored, None) == "secret123"
+    assert t.process_result_value(stored, None) == "secret123"
+    assert calls["n"] == 1
+    assert et.decrypted_cache.hits == 1
+    et.decrypted_cache.clear()
+
+
+def test_decrypted_value_cache_ttl_and_bound(monkeypatch):
+    import app.db.encrypted_types as et
+
+    now = {"t": 1000.0}
+    monkeypatch.setattr(et.time, "monotonic", lambda: now["t"])
+    cache = et.DecryptedValueCache(max_entries=2, ttl_sec=10)
+    cache.put(b"a", "1")
+    cache.put(b"b", "2")
+    assert cache.get(b"a") == "1"
+    cache.put(b"c", "3")  # evicts least recently used "b"
+    assert cache.get(b"b") is None
+    assert len(cache) == 2
+    now["t"] += 11
+    assert cache.get(b"a") is None
+
+
+def test_without_credentials_skips_encrypted_columns():
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+
+    from app.db.encrypted_types import without_credentials
+    from app.models.device import Device
+
+    engine = create_engine("sqlite://")
+    db = sessionmaker(bind=engine)()
+    sql = str(db.query(Device).options(*without_credentials(Device)).statement.compile(engine))
+    assert "devices.ip_address" in sql
+    for col in ("snmp_community", "snmp_v3_auth_key", "snmp_v3_priv_key", "ssh_password", "enable_password"):
+        assert f"devices.{col}" not in sql
+
+    from app.db.encrypted_types import ssh_login_only
+
+    sql = str(db.query(Device).options(*ssh_login_only(Device)).statement.compile(engine))
+    assert "devices.ssh_password" in sql
+    for col in ("snmp_community", "snmp_v3_auth_key", "snmp_v3_priv_key", "enable_password"):
+        assert f"devices.{col}" not in sql
+
+    from app.db.encrypted_types import snmp_only
+
+    sql = str(db.query(Device).options(*snmp_only(Device)).statement.compile(engine))
+    for col in ("snmp_community", "snmp_v3_auth_key", "snmp_v3_priv_key"):
+        assert f"devices.{col}" in sql
+    for col in ("ssh_password", "enable_password"):
+        assert f"devices.{col}" not in sql
@@ -0,0 +1,156 @@
+import threading
+import time
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.db.session import Base
+from app.models.credentials import SnmpCredentialProfile  # noqa: F401  (sites.snmp_profile_id FK target)
+from app.models.device import Device
+import app.tasks.monitoring as monitoring
+
+
+@pytest.fixture()
+def session_factory(tmp_path):
+    # 장비별 세션이 여러 스레드에서 동시에 열리므로 in-memory 대신 파일 DB 사용
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'ssh_sync.db'}",
+        connect_args={"check_same_thread": False, "timeout": 30},
+    )
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def test_run_site_bounded_respects_global_and_per_site_limits():
+    lock = threading.Lock()
+    running = {"all": 0, "peak": 0}
+    per_site = {}
+    per_site_peak = {}
+    site_of = {}
+
+    items = []
+    for i in range(60):
+        site = "a" if i < 40 else ("b" if i < 55 else None)
+        items.append((i, site))
+        site_of[i] = site
+
+    def work(item_id):
+        site = site_of[item_id]
+        with lock:
+            running["all"] += 1
+            running["peak"] = max(running["peak"], running["all"])
+            per_site[site] = per_site.get(site, 0) + 1
+            per_site_peak[site] = max(per_site_peak.get(site, 0), per_site[site])
+        time.sleep(0.01)
+        with lock:
+            running["all"] -= 1
+            per_site[site] -= 1
+        return item_id * 2
+
+    done = []
+    results = monitoring._run_site_bounded(items, work, global_limit=6, per_site_limit=3, on_done=lambda i, r: done.append(i))
+
+    assert results == {i: i * 2 for i in range(60)}
+    assert sorted(done) == list(range(60))
+    assert running["peak"] <= 6
+    assert all(peak <= 3 for site, peak in per_site_peak.items() if site is not None)
+    assert per_site_peak["a"] == 3 and per_site_peak["b"] == 3
+
+
+def test_run_site_bounded_does_not_cap_unsited_devices():
+    lock = threading.Lock()
+    running = {"all": 0, "peak": 0}
+
+    def work(item_id):
+        with lock:
+            running["all"] += 1
+            running["peak"] = max(running["peak"], running["all"])
+        time.sleep(0.05)
+        with lock:
+            running["all"] -= 1
+        return item_id
+
+    # site 가 없는 배포(기본): 모든 장비가 site_id=None
+    items = [(i, None) for i in range(24)]
+    results = monitoring._run_site_bounded(items, work, global_limit=8, per_site_limit=2)
+
+    assert results == {i: i for i in range(24)}
+    assert running["peak"] == 8
+
+
+def test_full_ssh_sync_all_syncs_every_device_in_parallel(session_factory, monkeypatch):
+    db = session_factory()
+    db.add_all(
+        Device(name=f"sw{i}", ip_address=f"10.2.0.{i + 1}", device_type="cisco_ios", owner_id=1)
+        for i in range(12)
+    )
+    db.add(Device(name="dead", ip_address="10.2.0.200", device_type="cisco_ios", owner_id=1))
+    db.commit()
+    db.close()
+
+    lock = threading.Lock()
+    state = {"active": 0, "peak": 0}
+
+    class FakeConn:
+        def __init__(self, info):
+            self.info = info
+
+        def connect(self):
+            return self.info.host != "10.2.0.200"
+
+        def get_facts(self):
+            with lock:
+                state["active"] += 1
+                state["peak"] = max(state["peak"], state["active"])
+            time.sleep(0.05)
+            with lock:
+                state["active"] -= 1
+            return {"model": "C9300", "os_version": "17.9", "serial_number": f"SN-{self.info.host}"}
+
+        def get_running_config(self):
+            with lock:
+                state["configs"] = state.get("configs", 0) + 1
+            return "hostname x"
+
+        def send_command(self, cmd, **kwargs):
+            return "! Last configuration change at 10:00:00 UTC Mon Jan 5 2026"
+
+        def get_neighbors(self):
+            return []
+
+        def disconnect(self):
+            return None
+
+    import app.services.ssh_service as ssh_service
+    from app.services.topology_link_service import TopologyLinkService
+    from app.services.realtime_event_bus import realtime_event_bus
+
+    events = []
+    monkeypatch.setattr(ssh_service, "DeviceConnection", FakeConn)
+    monkeypatch.setattr(TopologyLinkService, "refresh_links_for_device", staticmethod(lambda db, device, neighbors: None))
+    monkeypatch.setattr(realtime_event_bus, "publish", lambda event, data: events.append((event, data)))
+    monkeypatch.setattr(monitoring, "SessionLocal", session_factory)
+    monkeypatch.setattr(monitoring, "FULL_SSH_SYNC_CONCURRENCY", 8)
+    monkeypatch.setattr("app.services.config_change_detector.snmp_marker", lambda device: None)
+
+    res = monitoring.full_ssh_sync_all()
+
+    assert res["total"] == 13 and res["ok"] == 12 and res["unreachable"] == 1
+    assert state["peak"] > 1
+    assert events[-1][0] == "ssh_sync_progress" and events[-1][1]["finished"] is True
+
+    db = session_factory()
+    synced = db.query(Device).filter(Device.name != "dead").all()
+    assert all(d.status == "online" and d.model == "C9300" for d in synced)
+    assert db.query(Device).filter(Device.name == "dead").one().status != "online"
+    db.close()
+
+    # 두 번째 실행: config 변경이 없으므로 running config 는 다시 읽지 않음
+    res2 = monitoring.full_ssh_sync_all()
+    assert res2["light"] == 12 and res2["ok"] == 0
+    assert state["configs"] == 12
+
+    # 실행이 끝나면 lock 이 반납되고, 다른 실행이 lock 을 잡고 있으면 건너뜀
+    assert monitoring._acquire_setting_lock("full_ssh_sync_lock", 60)
+    assert monitoring.full_ssh_sync_all() == {"status": "skipped"}
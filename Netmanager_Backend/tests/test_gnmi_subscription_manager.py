@@ -0,0 +1,150 @@
+import threading
+import time
+
+from app.services import gnmi_subscription_manager as gsm
+from app.services.gnmi_subscription_manager import GnmiSubscriptionManager
+
+
+def _manager(events, saved, driver_factory=None):
+    return GnmiSubscriptionManager(
+        driver_factory=driver_factory or (lambda t: None),
+        save_results=lambda results, **kw: saved.append((results, kw)),
+        publish=lambda name, data: events.append((name, data)),
+    )
+
+
+def test_updates_merge_and_oper_change_is_published_immediately():
+    events, saved = [], []
+    m = _manager(events, saved)
+    m._states[1] = gsm._DeviceState()
+    m._targets[1] = {"id": 1, "ip": "10.6.0.1"}
+
+    m.consume(1, [
+        {"cpu": [10.0, 30.0], "memory": [], "if_counters": {"Gi1": {"oper_status": "UP", "is_up": True}}},
+        None,
+        {"cpu": [], "memory": [], "if_counters": {"Gi1": {"in_octets": 100, "out_octets": 50}}},
+        {"cpu": [], "memory": [40.0], "if_counters": {"Gi1": {"oper_status": "DOWN", "is_up": False}}},
+    ])
+    assert [(n, d["interface"], d["state"]) for n, d in events] == [("link_update", "Gi1", "down")]
+
+    assert m.flush() == 1
+    (results, kw), = saved
+    assert kw == {"oper_events_published": True}
+    data = results[0]["data"]
+    assert results[0]["id"] == 1 and data["cpu_usage"] == 20.0 and data["memory_usage"] == 40.0
+    assert data["if_counters"]["Gi1"] == {"oper_status": "DOWN", "is_up": False, "in_octets": 100, "out_octets": 50}
+    assert data["raw_octets_in"] == 100
+    # nothing new since the last flush
+    assert m.flush() == 0
+
+
+def test_stream_reconnects_with_backoff(monkeypatch):
+    monkeypatch.setattr(gsm, "reconnect_delay", lambda failures: 0.01)
+    connects = []
+    stop = threading.Event()
+
+    class FakeDriver:
+        def iter_gnmi_updates(self, port, sample_interval_sec):
+            connects.append(port)
+            if len(connects) < 3:
+                raise ConnectionError("unreachable")
+            yield {"cpu": [5.0], "memory": [], "if_counters": {}}
+            while not stop.is_set():
+                yield None
+                time.sleep(0.01)
+
+    events, saved = [], []
+    m = _manager(events, saved, driver_factory=lambda t: FakeDriver())
+    m.sync_targets([{"id": 7, "ip": "10.6.0.7", "gnmi_port": 57400}])
+    deadline = time.time() + 5
+    while time.time() < deadline and not m.status()[0]["connected"]:
+        time.sleep(0.01)
+    status = m.status()[0]
+    assert len(connects) == 3 and status["connected"] and status["failures"] == 0
+    assert m.flush() == 1
+
+    stop.set()
+    m.sync_targets([])
+    assert m.status() == []
+
+
+def test_backoff_grows_and_is_capped():
+    assert gsm.reconnect_delay(1, rnd=lambda: 0.5) == gsm.RECONNECT_MIN_SEC
+    assert gsm.reconnect_delay(3, rnd=lambda: 0.5) == gsm.RECONNECT_MIN_SEC * 4
+    assert gsm.reconnect_delay(50, rnd=lambda: 0.5) == gsm.RECONNECT_MAX_SEC
+
+
+def test_dead_pygnmi_stream_raises_and_triggers_reconnect(monkeypatch):
+    """pygnmi keeps raising TimeoutError after its subscribe thread dies; the driver must surface that."""
+    import pygnmi.client
+    from app.drivers.generic_driver import GenericDriver
+
+    monkeypatch.setattr(gsm, "reconnect_delay", lambda failures: 0.01)
+    opened = []
+
+    class DeadAfterOneUpdate:
+        def __init__(self):
+            self.error = None
+            self._subscribe_thread = threading.Thread(target=lambda: None)
+            self._subscribe_thread.start()
+            self._sent = False
+
+        def get_update(self, timeout):
+            if not self._sent:
+                self._sent = True
+                return {"update": {"update": [{"path": "system/state/memory/utilization", "val": 42}]}}
+            # the gRPC stream broke: the subscriber thread recorded the error and exited
+            self.error = RuntimeError("StatusCode.UNAVAILABLE")
+            raise TimeoutError("No update from target")
+
+        def close(self):
+            pass
+
+    class FakeClient:
+        def __init__(self, **kw):
+            pass
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+        def subscribe_stream(self, subscribe):
+            opened.append(subscribe)
+            return DeadAfterOneUpdate()
+
+    monkeypatch.setattr(pygnmi.client, "gNMIclient", FakeClient)
+
+    driver = GenericDriver("10.6.0.9", "admin", "pw")
+
+    updates = driver.iter_gnmi_updates(poll_timeout_sec=0.01)
+    assert next(updates)["memory"] == [42.0]
+    try:
+        next(updates)
+        raise AssertionError("dead stream was not reported")
+    except ConnectionError as e:
+        assert "UNAVAILABLE" in str(e)
+
+    events, saved = [], []
+    m = _manager(events, saved, driver_factory=lambda t: driver)
+    m.sync_targets([{"id": 9, "ip": "10.6.0.9", "gnmi_port": 57400}])
+    deadline = time.time() + 5
+    while time.time() < deadline and len(opened) < 4:
+        time.sleep(0.01)
+    m.sync_targets([])
+    # every dead stream led to a new subscription instead of idling on None forever
+    assert len(opened) >= 4
+
+
+def test_only_devices_with_fresh_data_count_as_live():
+    m = _manager([], [])
+    for did in (1, 2, 3):
+        m._states[did] = gsm._DeviceState()
+    now = time.time()
+    m._states[1].connected, m._states[1].last_update = True, now - 1
+    # stream still open but silent for too long
+    m._states[2].connected, m._states[2].last_update = True, now - gsm.LIVE_MAX_AGE_SEC - 5
+    # reconnecting after a failure
+    m._states[3].connected, m._states[3].last_update = False, now - 1
+    assert m.live_device_ids(now=now) == [1]
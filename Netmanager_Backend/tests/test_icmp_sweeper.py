@@ -0,0 +1,92 @@
+import time
+
+import pytest
+
+from app.services import icmp_sweeper as mod
+from app.services.icmp_sweeper import IcmpSweeper, _checksum, _echo_request
+
+
+def test_echo_request_checksum_verifies():
+    packet = _echo_request(0x1234, 7, b"payload!")
+    assert _checksum(packet) == 0
+    assert packet[0] == mod.ICMP_ECHO_REQUEST
+
+
+def test_loopback_sweep_records_rtt():
+    sweeper = IcmpSweeper()
+    sock, _ = sweeper._open_socket()
+    if sock is None:
+        pytest.skip("no ICMP socket permission in this environment")
+    sock.close()
+
+    started = time.monotonic()
+    res = sweeper.sweep(["127.0.0.1", "127.0.0.2", "127.0.0.1", ""], timeout=2.0)
+    elapsed = time.monotonic() - started
+
+    assert set(res) == {"127.0.0.1", "127.0.0.2"}
+    assert all(isinstance(v, float) and v >= 0 for v in res.values())
+    # every target answered, so the sweep must not sit out the timeout window
+    assert elapsed < 1.0
+
+
+def test_falls_back_to_subprocess_without_socket(monkeypatch):
+    calls = []
+
+    def fake_ping(host, timeout):
+        calls.append(host)
+        return 1.5 if host != "10.0.0.9" else None
+
+    monkeypatch.setattr(mod, "_ping_subprocess", fake_ping)
+    sweeper = IcmpSweeper()
+    monkeypatch.setattr(sweeper, "_open_socket", lambda: (None, None))
+
+    res = sweeper.sweep(["10.0.0.1", "10.0.0.9", "2001:db8::1"], timeout=0.2)
+    assert res == {"10.0.0.1": 1.5, "10.0.0.9": None, "2001:db8::1": 1.5}
+    assert sorted(calls) == ["10.0.0.1", "10.0.0.9", "2001:db8::1"]
+
+
+def test_subprocess_mode_never_opens_socket(monkeypatch):
+    monkeypatch.setattr(mod, "_ping_subprocess", lambda host, timeout: 0.0)
+    sweeper = IcmpSweeper(mode="subprocess")
+    assert sweeper.ping("192.0.2.10") == 0.0
+    assert sweeper.socket_kind == "subprocess"
+
+
+def test_socket_sweep_failure_falls_back_instead_of_all_down(monkeypatch):
+    class _Sock:
+        def close(self):
+            pass
+
+    def broken_sweep(*args, **kwargs):
+        raise ValueError("filedescriptor out of range in select()")
+
+    monkeypatch.setattr(mod, "_ping_subprocess", lambda host, timeout: 2.0)
+    sweeper = IcmpSweeper()
+    monkeypatch.setattr(sweeper, "_open_socket", lambda: (_Sock(), "dgram"))
+    monkeypatch.setattr(sweeper, "_sweep_socket", broken_sweep)
+
+    assert sweeper.sweep(["10.0.0.1", "10.0.0.2"], timeout=0.2) == {"10.0.0.1": 2.0, "10.0.0.2": 2.0}
+
+
+def test_socket_sweep_handles_fd_above_fd_setsize():
+    resource = pytest.importorskip("resource")
+    import os
+    import socket
+
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if hard != resource.RLIM_INFINITY and hard <= 1500:
+        pytest.skip("fd limit too low")
+    resource.setrlimit(resource.RLIMIT_NOFILE, (max(soft, 2048), hard))
+    base = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    try:
+        os.dup2(base.fileno(), 1500)
+        sock = socket.socket(fileno=1500)
+        sock.setblocking(False)
+        try:
+            # select.select() would raise ValueError for this fd
+            assert IcmpSweeper()._sweep_socket(sock, "dgram", ["127.0.0.1"], 0.05) == {}
+        finally:
+            sock.close()
+    finally:
+        base.close()
+        resource.setrlimit(resource.RLIMIT_NOFILE, (soft, hard))
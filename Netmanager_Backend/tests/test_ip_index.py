@@ -0,0 +1,126 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.db.session import Base
+from app.models.credentials import SnmpCredentialProfile  # noqa: F401  (sites.snmp_profile_id FK target)
+from app.models.device import Device, Interface
+from app.services.ip_index import ip_index_store, note_device_interfaces_changed
+from app.services.path_trace_service import PathTraceService
+
+
+@pytest.fixture()
+def db():
+    engine = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False})
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    Base.metadata.create_all(bind=engine)
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+def _devices(db):
+    core = Device(name="CORE", hostname="CORE", ip_address="10.255.0.1", device_type="cisco_ios")
+    dist = Device(name="DIST", hostname="DIST", ip_address="10.255.0.2", device_type="cisco_ios")
+    db.add_all([core, dist])
+    db.flush()
+    db.add_all(
+        [
+            Interface(device_id=core.id, name="Vlan10", ip_address="10.10.0.1/16"),
+            Interface(device_id=core.id, name="Loopback0", ip_address="1.1.1.1/32"),
+            Interface(device_id=dist.id, name="Vlan11", ip_address="10.10.11.1/24"),
+            Interface(device_id=dist.id, name="Loopback1", ip_address="10.10.11.77"),
+        ]
+    )
+    db.commit()
+    return core, dist
+
+
+def test_longest_prefix_and_exact_matches(db):
+    core, dist = _devices(db)
+    index = ip_index_store.get(db)
+
+    assert index.lookup("10.10.11.5").interface_name == "Vlan11"
+    assert index.lookup("10.10.12.5").device_id == core.id
+    assert index.lookup("10.10.11.77").interface_name == "Loopback1"  # 마스크 없는 주소는 정확히 일치할 때만
+    assert index.lookup("192.0.2.1") is None
+    assert index.best_interface(core.id, "10.10.11.5").interface_name == "Vlan10"
+    assert index.best_interface(dist.id, "10.20.0.1") is None
+    assert index.device_for_address("1.1.1.1") == core.id
+    assert index.device_for_address("10.255.0.2") == dist.id
+    assert index.device_for_address("10.10.11.5") is None
+
+    svc = PathTraceService(db)
+    dev, intf = svc._find_device_by_ip("10.10.11.5")
+    assert dev.id == dist.id and intf.name == "Vlan11"
+    dev, intf = svc._find_device_by_ip("10.255.0.1")
+    assert dev.id == core.id and intf.name == "Mgmt"
+    assert svc._find_device_by_ip("bogus") == (None, None)
+
+
+def test_index_follows_commits_per_device(db):
+    core, dist = _devices(db)
+    index = ip_index_store.get(db)
+    loaded_at = index.loaded_at
+
+    db.add(Interface(device_id=core.id, name="Vlan20", ip_address="10.20.0.1/24"))
+    db.commit()
+    assert ip_index_store.get(db) is index and index.loaded_at == loaded_at
+    assert index.lookup("10.20.0.9").interface_name == "Vlan20"
+
+    # device sync 처럼 bulk delete 후 재작성
+    db.query(Interface).filter(Interface.device_id == dist.id).delete()
+    note_device_interfaces_changed(db, dist.id)
+    db.add(Interface(device_id=dist.id, name="Vlan12", ip_address="10.10.12.1/24"))
+    db.commit()
+    ip_index_store.get(db)
+    assert index.lookup("10.10.11.5").interface_name == "Vlan10"
+    assert index.lookup("10.10.12.5").interface_name == "Vlan12"
+    assert index.device_for_address("10.10.11.77") is None
+
+    # 상태 변경만으로는 재적재하지 않음
+    version = index.version
+    intf = db.query(Interface).filter(Interface.name == "Vlan20").one()
+    intf.status = "down"
+    db.commit()
+    ip_index_store.get(db)
+    assert index.version == version
+
+    dist.ip_address = "10.255.0.22"
+    db.commit()
+    ip_index_store.get(db)
+    assert index.device_for_address("10.255.0.22") == dist.id
+    assert index.device_for_address("10.255.0.2") is None
+
+
+def test_rows_inserted_elsewhere_are_picked_up_by_polling(db, monkeypatch):
+    core, _ = _devices(db)
+    index = ip_index_store.get(db)
+    monkeypatch.setattr(ip_index_store, "poll_sec", 0)
+
+    # 다른 프로세스(worker 의 device sync)가 쓴 것처럼 ORM hook 을 거치지 않고 삽입
+    db.execute(Interface.__table__.insert().values(device_id=core.id, name="Vlan40", ip_address="10.40.0.1/24"))
+    db.execute(Device.__table__.insert().values(name="EDGE", hostname="EDGE", ip_address="10.255.0.9", device_type="cisco_ios"))
+    db.commit()
+    assert index.lookup("10.40.0.9") is None
+
+    assert ip_index_store.get(db) is index
+    assert index.lookup("10.40.0.9").interface_name == "Vlan40"
+    assert index.management_owner("10.255.0.9") is not None
+
+
+def test_uncommitted_changes_use_a_private_index(db):
+    core, _ = _devices(db)
+    shared = ip_index_store.get(db)
+
+    db.add(Interface(device_id=core.id, name="Vlan30", ip_address="10.30.0.1/24"))
+    db.flush()
+    private = ip_index_store.get(db)
+    assert private is not shared and private.lookup("10.30.0.5").interface_name == "Vlan30"
+    assert shared.lookup("10.30.0.5") is None
+
+    db.rollback()
+    assert ip_index_store.get(db) is shared
+    assert shared.lookup("10.30.0.5") is None
@@ -0,0 +1,134 @@
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app.db.session import Base
+from app.models.automation import AutomationRule
+from app.models.credentials import SnmpCredentialProfile  # noqa: F401  (sites.snmp_profile_id FK target)
+from app.models.device import Device, Issue
+from app.services.issue_upsert import IssueUpserter
+
+
+@pytest.fixture()
+def engine():
+    eng = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=eng)
+    return eng
+
+
+@pytest.fixture()
+def db(engine):
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture()
+def published(monkeypatch):
+    from app.services.realtime_event_bus import realtime_event_bus
+
+    events = []
+    monkeypatch.setattr(realtime_event_bus, "publish", lambda name, data: events.append((name, data)))
+    return events
+
+
+@pytest.fixture()
+def emails(monkeypatch):
+    from app.services.email_service import EmailService
+
+    sent = []
+    monkeypatch.setattr(EmailService, "send_email", staticmethod(lambda db, to_email, subject, content: sent.append(subject)))
+    return sent
+
+
+def _devices(db, n):
+    devices = [Device(name=f"sw{i}", ip_address=f"10.2.0.{i + 1}", device_type="cisco_ios", owner_id=1) for i in range(n)]
+    db.add_all(devices)
+    db.commit()
+    return devices
+
+
+def test_many_port_issues_cost_constant_queries(engine, db, published, emails):
+    devices = _devices(db, 20)
+    db.add(Issue(device_id=devices[0].id, title="Interface Errors (Gi1/0/1)", severity="warning", status="active"))
+    db.add(Issue(device_id=devices[1].id, title="Interface Errors (Gi1/0/1)", severity="warning", status="resolved"))
+    db.commit()
+    targets = [(d.id, d.name) for d in devices]
+
+    statements = []
+
+    def _record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", _record)
+    try:
+        issues = IssueUpserter(db, [device_id for device_id, _ in targets])
+        created = 0
+        for device_id, name in targets:
+            for port in range(48):
+                created += issues.add(device_id, f"Interface Errors (Gi1/0/{port + 1})", "errors/s=9.00", "warning", name)
+            created += issues.add(device_id, "Interface Errors (Gi1/0/1)", "duplicate in the same cycle", "warning", name)
+        assert issues.flush() == created
+        db.commit()
+    finally:
+        event.remove(engine, "before_cursor_execute", _record)
+
+    selects = [s for s in statements if s.lstrip().upper().startswith("SELECT")]
+    assert len(selects) == 1
+    # only the active issue blocks a duplicate; the resolved one does not
+    assert created == 20 * 48 - 1
+    assert db.query(Issue).filter(Issue.status == "active").count() == 20 * 48
+
+
+def test_events_and_emails_only_after_commit(db, published, emails):
+    (dev,) = _devices(db, 1)
+    issues = IssueUpserter(db, [dev.id])
+    assert issues.add(dev.id, "Device Unreachable", "Ping check failed.", "critical", dev.name)
+    assert issues.add(dev.id, "High CPU", "CPU: 95%", "warning", dev.name)
+    issues.flush()
+    assert published == [] and emails == []
+
+    db.commit()
+    issues.publish()
+    assert [(name, data["title"]) for name, data in published] == [
+        ("issue_update", "Device Unreachable"),
+        ("issue_update", "High CPU"),
+    ]
+    assert published[0][1]["source"] == "monitoring"
+    assert emails == ["[CRITICAL] Device Unreachable - sw0"]
+
+    # publishing twice must not resend
+    issues.publish()
+    assert len(published) == 2 and len(emails) == 1
+
+
+def test_discard_after_rollback_publishes_nothing(db, published, emails):
+    (dev,) = _devices(db, 1)
+    issues = IssueUpserter(db, [dev.id])
+    issues.add(dev.id, "Device Unreachable", "Ping check failed.", "critical", dev.name)
+    issues.flush()
+    db.rollback()
+    issues.discard()
+    issues.publish()
+    assert published == [] and emails == []
+    assert db.query(Issue).count() == 0
+
+
+def test_automation_rule_issue_waits_for_the_cycle_commit(db, published, emails):
+    from app.tasks.monitoring import _evaluate_automation_rules
+
+    (dev,) = _devices(db, 1)
+    db.add(AutomationRule(name="cpu-hot", trigger_type="cpu", trigger_condition=">=", trigger_value="90", action_type="workflow"))
+    db.commit()
+
+    issues = IssueUpserter(db, [dev.id])
+    _evaluate_automation_rules(db, dev, {"resource_data": {"cpu_usage": 95}}, issues)
+    issues.flush()
+    assert published == []
+
+    db.commit()
+    issues.publish()
+    assert [(name, data["title"]) for name, data in published] == [("issue_update", "Auto-Trigger: cpu-hot")]
+    assert db.query(Issue).filter(Issue.device_id == dev.id).count() == 1
@@ -0,0 +1,190 @@
+import re
+from contextlib import nullcontext
+from datetime import date, datetime, timedelta, timezone
+
+import pytest
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.db.session import Base
+from app.models.credentials import SnmpCredentialProfile  # noqa: F401  (sites.snmp_profile_id FK target)
+from app.models.device import Device, EventLog, SystemMetric
+from app.models.discovery import DiscoveryJobLog  # noqa: F401  (pruned by run_log_retention)
+from app.services import metric_partitions
+import app.tasks.maintenance as maintenance
+
+
+def test_partition_bounds_pick_whole_days_before_cutoff():
+    bounds = [
+        ("system_metrics_legacy", "FOR VALUES FROM (MINVALUE) TO ('2026-03-02 00:00:00+00')"),
+        ("system_metrics_p20260302", "FOR VALUES FROM ('2026-03-02 00:00:00+00') TO ('2026-03-03 00:00:00+00')"),
+        ("system_metrics_p20260303", "FOR VALUES FROM ('2026-03-03 00:00:00+00') TO ('2026-03-04 00:00:00+00')"),
+        ("system_metrics_default", "DEFAULT"),
+    ]
+    assert metric_partitions.bound_upper_day(bounds[0][1]) == date(2026, 3, 2)
+    assert metric_partitions.bound_upper_day("DEFAULT") is None
+    # the partition holding the cutoff itself is kept until the next run
+    assert metric_partitions.partitions_to_drop(bounds, datetime(2026, 3, 3, 12, 0, tzinfo=timezone.utc)) == [
+        "system_metrics_legacy",
+        "system_metrics_p20260302",
+    ]
+    assert metric_partitions.partition_name("event_logs", date(2026, 3, 4)) == "event_logs_p20260304"
+
+
+def test_sqlite_retention_keeps_delete_path(monkeypatch):
+    engine = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    monkeypatch.setattr(maintenance, "SessionLocal", factory)
+
+    db = factory()
+    dev = Device(name="sw1", ip_address="10.5.0.1", device_type="cisco_ios", owner_id=1)
+    db.add(dev)
+    db.commit()
+    old = datetime.now() - timedelta(days=40)
+    db.add_all([
+        SystemMetric(device_id=dev.id, cpu_usage=1.0, timestamp=old),
+        SystemMetric(device_id=dev.id, cpu_usage=2.0, timestamp=datetime.now()),
+        EventLog(device_id=dev.id, message="old", timestamp=old),
+    ])
+    db.commit()
+    assert metric_partitions.storage_mode(db, "system_metrics") == "delete"
+    db.close()
+
+    msg = maintenance.run_log_retention()
+    assert "Deleted: 1 system metrics" in msg and "1 event logs" in msg and "dropped 0 partitions" in msg
+
+    db = factory()
+    assert [m.cpu_usage for m in db.query(SystemMetric).all()] == [2.0]
+    assert db.query(EventLog).count() == 0
+    db.close()
+
+
+def test_partition_bound_in_session_time_zone_is_read_as_utc():
+    expr = "FOR VALUES FROM ('2026-03-02 09:00:00+09') TO ('2026-03-03 09:00:00+09')"
+    assert metric_partitions.bound_upper_day(expr) == date(2026, 3, 3)
+
+
+class _FakePartitionedConn:
+    """Just enough of a PostgreSQL connection for ensure_partitions: the partition catalog and CREATE ... PARTITION OF."""
+
+    def __init__(self, partitions):
+        self.partitions = dict(partitions)
+
+    def begin_nested(self):
+        return nullcontext()
+
+    def execute(self, stmt, params=None):
+        sql = str(stmt)
+        if "FROM pg_inherits" in sql:
+            rows = sorted(self.partitions.items())
+            return type("Result", (), {"all": lambda self: rows})()
+        m = re.match(r"CREATE TABLE IF NOT EXISTS (\w+) PARTITION OF \w+ (.*)", sql)
+        if m:
+            self.partitions.setdefault(m.group(1), m.group(2))
+            return None
+        raise AssertionError(sql)
+
+
+def test_ensure_partitions_keeps_a_fixed_horizon():
+    today = datetime.now(timezone.utc).date()
+    tomorrow = today + timedelta(days=1)
+    conn = _FakePartitionedConn({
+        "system_metrics_legacy": f"FOR VALUES FROM (MINVALUE) TO ('{tomorrow:%Y-%m-%d} 00:00:00+00')",
+    })
+
+    # what convert_to_partitioned does, then the startup/daily runs
+    assert metric_partitions.ensure_partitions(conn, "system_metrics", start=tomorrow, days_ahead=7) == 7
+    first = dict(conn.partitions)
+    assert metric_partitions.ensure_partitions(conn, "system_metrics", days_ahead=7) == 0
+    assert metric_partitions.ensure_partitions(conn, "system_metrics", days_ahead=7) == 0
+    assert conn.partitions == first
+
+    days = sorted(n for n in conn.partitions if n.startswith("system_metrics_p"))
+    assert days[0] == metric_partitions.partition_name("system_metrics", tomorrow)
+    assert days[-1] == metric_partitions.partition_name("system_metrics", today + timedelta(days=7))
+    assert "system_metrics_default" in conn.partitions
+
+
+def test_ensure_partitions_fills_only_missing_days():
+    today = datetime.now(timezone.utc).date()
+    day2 = today + timedelta(days=2)
+    conn = _FakePartitionedConn({
+        metric_partitions.partition_name("system_metrics", day2): (
+            f"FOR VALUES FROM ('{day2:%Y-%m-%d} 00:00:00+00') TO ('{day2 + timedelta(days=1):%Y-%m-%d} 00:00:00+00')"
+        ),
+        "system_metrics_default": "DEFAULT",
+    })
+    assert metric_partitions.ensure_partitions(conn, "system_metrics", days_ahead=3) == 3
+    assert sorted(n for n in conn.partitions if n.startswith("system_metrics_p")) == [
+        metric_partitions.partition_name("system_metrics", today + timedelta(days=i)) for i in range(4)
+    ]
+
+
+class _RecordingPgConn:
+    """Records the conversion's statements; catalog queries answer as for a plain table with one FK."""
+
+    dialect = type("Dialect", (), {"name": "postgresql"})()
+
+    def __init__(self, null_rows=0):
+        self.null_rows = null_rows
+        self.statements = []
+
+    def begin_nested(self):
+        return nullcontext()
+
+    def execute(self, stmt, params=None):
+        sql = str(stmt)
+        self.statements.append(sql)
+
+        def result(scalar=None, rows=()):
+            rows = list(rows)
+            return type(
+                "Result",
+                (),
+                {"scalar": lambda self: scalar, "all": lambda self: rows, "first": lambda self: rows[0] if rows else None},
+            )()
+
+        if "FROM pg_partitioned_table" in sql or "FROM pg_extension" in sql or "FROM pg_inherits" in sql:
+            return result()
+        if "to_regclass(:t) IS NOT NULL" in sql:
+            return result(True)
+        if "SELECT count(*)" in sql:
+            return result(self.null_rows)
+        if "pg_get_serial_sequence" in sql:
+            return result("public.system_metrics_id_seq")
+        if "FROM pg_indexes" in sql:
+            return result(rows=[(
+                "ix_system_metrics_device_id",
+                "CREATE INDEX ix_system_metrics_device_id ON public.system_metrics USING btree (device_id)",
+            )])
+        if "contype = 'f'" in sql:
+            return result(rows=[("system_metrics_device_id_fkey", "FOREIGN KEY (device_id) REFERENCES devices(id)")])
+        return result()
+
+
+def test_convert_quarantines_null_rows_and_keeps_foreign_keys():
+    conn = _RecordingPgConn(null_rows=3)
+    assert metric_partitions.convert_to_partitioned(conn, "system_metrics") is True
+    sql = conn.statements
+
+    def first(fragment):
+        return next(i for i, s in enumerate(sql) if fragment in s)
+
+    # NULL-timestamp rows are moved, never just deleted
+    assert not any(s.startswith("DELETE") for s in sql)
+    assert "INSERT INTO system_metrics_null_ts" in sql[first("DELETE FROM system_metrics WHERE timestamp IS NULL")]
+    # the bound CHECK is validated before the table scans would happen
+    assert first("NOT VALID") < first("VALIDATE CONSTRAINT") < first("SET NOT NULL") < first("ATTACH PARTITION")
+    # LIKE drops FKs: the parent gets them back, and indexes are recreated
+    assert first("ADD CONSTRAINT system_metrics_device_id_fkey FOREIGN KEY (device_id)") < first("ATTACH PARTITION")
+    assert any(s.startswith("CREATE INDEX ix_system_metrics_device_id ON public.system_metrics") for s in sql)
+
+
+def test_startup_migrations_never_convert(monkeypatch):
+    from app.db import migrations
+
+    monkeypatch.setattr(metric_partitions, "convert_to_partitioned", lambda *a, **k: pytest.fail("converted at startup"))
+    engine = create_engine("sqlite:///:memory:")
+    migrations._partition_time_series(engine)
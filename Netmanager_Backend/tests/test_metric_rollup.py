@@ -0,0 +1,149 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.db.session import Base
+from app.models.credentials import SnmpCredentialProfile  # noqa: F401  (sites.snmp_profile_id FK target)
+from app.models.device import Device, InterfaceMetric, InterfaceMetricRollup, SystemMetric, SystemMetricRollup
+from app.services import metric_rollup
+
+
+@pytest.fixture()
+def db():
+    engine = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+T0 = datetime(2026, 1, 5, 10, 0, 0)
+
+
+def _device(db):
+    dev = Device(name="sw1", ip_address="10.4.0.1", device_type="cisco_ios", owner_id=1)
+    db.add(dev)
+    db.commit()
+    return dev
+
+
+def _samples(db, device_id, start_min, end_min):
+    # one sample every 10 s, cpu = minute index + 0..5
+    for sec in range(start_min * 60, end_min * 60, 10):
+        ts = T0 + timedelta(seconds=sec)
+        db.add(SystemMetric(device_id=device_id, cpu_usage=float(sec // 60 + (sec % 60) // 10), memory_usage=50.0, timestamp=ts))
+        db.add(InterfaceMetric(device_id=device_id, interface_name="Gi1/0/1", traffic_in_bps=float(sec % 60), timestamp=ts))
+    db.commit()
+
+
+def test_pick_tier_by_range():
+    assert metric_rollup.pick_tier(3600) == "raw"
+    assert metric_rollup.pick_tier(6 * 3600) == "1m"
+    assert metric_rollup.pick_tier(24 * 3600) == "5m"
+    assert metric_rollup.pick_tier(7 * 24 * 3600) == "1h"
+
+
+def test_rollup_is_incremental_and_idempotent(db):
+    dev = _device(db)
+    _samples(db, dev.id, 0, 11)
+
+    metric_rollup.run_rollups(db)
+    rows = (
+        db.query(SystemMetricRollup)
+        .filter(SystemMetricRollup.tier == "1m")
+        .order_by(SystemMetricRollup.bucket)
+        .all()
+    )
+    # minute 10 is still open (the newest sample lives there)
+    assert len(rows) == 10
+    first = rows[0]
+    assert first.samples == 6
+    assert (first.cpu_usage_min, first.cpu_usage_max, first.cpu_usage_avg, first.cpu_usage_p95) == (0.0, 5.0, 2.5, 5.0)
+    assert db.query(SystemMetricRollup).filter(SystemMetricRollup.tier == "5m").count() == 2
+    assert db.query(SystemMetricRollup).filter(SystemMetricRollup.tier == "1h").count() == 0
+
+    if_row = db.query(InterfaceMetricRollup).filter(InterfaceMetricRollup.tier == "1m").first()
+    assert (if_row.interface_name, if_row.in_bps_max, if_row.in_bps_avg) == ("Gi1/0/1", 50.0, 25.0)
+
+    # nothing new -> nothing rewritten
+    assert not any(metric_rollup.run_rollups(db).values())
+
+    _samples(db, dev.id, 11, 15)
+    written = metric_rollup.run_rollups(db)
+    assert written["system_metrics:1m"] == 4
+    assert db.query(SystemMetricRollup).filter(SystemMetricRollup.tier == "1m").count() == 14
+    assert db.query(SystemMetricRollup).filter(SystemMetricRollup.tier == "5m").count() == 2
+
+
+def test_watermark_leaves_room_for_late_commits(db, monkeypatch):
+    dev = _device(db)
+    monkeypatch.setattr(metric_rollup, "ROLLUP_GRACE_SEC", 300)
+    base = metric_rollup.floor_bucket(datetime.utcnow(), 60) - timedelta(minutes=10)
+    for sec in range(0, 10 * 60, 10):
+        db.add(SystemMetric(device_id=dev.id, cpu_usage=1.0, memory_usage=1.0, timestamp=base + timedelta(seconds=sec)))
+    db.commit()
+
+    metric_rollup.run_rollups(db)
+    closed = {r.bucket for r in db.query(SystemMetricRollup).filter_by(tier="1m")}
+    assert closed and max(closed) <= base + timedelta(minutes=5)
+
+    # a slow poll transaction commits a row dated inside the grace window, behind newer visible samples
+    late_ts = base + timedelta(minutes=7, seconds=5)
+    db.add(SystemMetric(device_id=dev.id, cpu_usage=99.0, memory_usage=1.0, timestamp=late_ts))
+    db.commit()
+    monkeypatch.setattr(metric_rollup, "ROLLUP_GRACE_SEC", 0)
+    metric_rollup.run_rollups(db)
+    row = db.query(SystemMetricRollup).filter_by(tier="1m", bucket=base + timedelta(minutes=7)).one()
+    assert (row.samples, row.cpu_usage_max) == (7, 99.0)
+
+
+def test_timeseries_endpoint_reads_rollup_tier(db):
+    from app.api.v1.endpoints.observability import get_device_timeseries
+
+    dev = _device(db)
+    _samples(db, dev.id, 0, 11)
+    metric_rollup.run_rollups(db)
+    db.add(SystemMetric(device_id=dev.id, cpu_usage=1.0, memory_usage=1.0, timestamp=datetime.utcnow()))
+    db.commit()
+
+    raw = get_device_timeseries(dev.id, minutes=60, limit=720, tier="auto", db=db)
+    assert raw["range"]["tier"] == "raw" and len(raw["points"]) == 1
+
+    since_t0 = int((datetime.utcnow() - T0).total_seconds() // 60) + 5
+    res = get_device_timeseries(dev.id, minutes=since_t0, limit=720, tier="1m", db=db)
+    assert res["range"]["tier"] == "1m"
+    assert len(res["points"]) == 10
+    assert res["points"][0]["cpu_max"] == 5.0 and res["points"][0]["cpu"] == 2.5
+
+    # no rollup rows for the requested tier -> raw fallback
+    res = get_device_timeseries(dev.id, minutes=since_t0, limit=720, tier="1h", db=db)
+    assert res["range"]["tier"] == "raw"
+
+
+def test_p95_is_nearest_rank_and_fleet_series_groups_devices(db):
+    dev1 = _device(db)
+    dev2 = Device(name="sw2", ip_address="10.4.0.2", device_type="cisco_ios", owner_id=1)
+    db.add(dev2)
+    db.commit()
+    # 20 samples in minute 0: cpu 1..20 (shuffled order), nearest-rank p95 is the 19th value
+    for i, cpu in enumerate([7, 3, 20, 1, 15, 9, 12, 18, 2, 5, 11, 19, 4, 16, 8, 14, 6, 17, 10, 13]):
+        db.add(SystemMetric(device_id=dev1.id, cpu_usage=float(cpu), memory_usage=10.0, timestamp=T0 + timedelta(seconds=i * 3)))
+    db.add(SystemMetric(device_id=dev2.id, cpu_usage=40.0, memory_usage=30.0, timestamp=T0 + timedelta(seconds=5)))
+    # opens minute 1, so minute 0 is closed
+    db.add(SystemMetric(device_id=dev1.id, cpu_usage=0.0, memory_usage=0.0, timestamp=T0 + timedelta(seconds=61)))
+    db.commit()
+
+    metric_rollup.run_rollups(db)
+    row = db.query(SystemMetricRollup).filter_by(tier="1m", device_id=dev1.id).one()
+    assert (row.samples, row.cpu_usage_min, row.cpu_usage_max, row.cpu_usage_p95) == (20, 1.0, 20.0, 19.0)
+    assert row.cpu_usage_avg == pytest.approx(10.5)
+
+    (point,) = metric_rollup.fleet_series(db, T0 - timedelta(minutes=1), "1m")
+    assert point["bucket"] == T0
+    assert point["cpu_usage_avg"] == pytest.approx((10.5 + 40.0) / 2)
+    assert point["cpu_usage_max"] == 40.0
+    assert point["memory_usage_avg"] == pytest.approx(20.0) and point["memory_usage_max"] == 30.0
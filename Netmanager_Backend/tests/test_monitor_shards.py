@@ -0,0 +1,205 @@
+import datetime
+from collections import Counter
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.db.session import Base
+from app.models.credentials import SnmpCredentialProfile  # noqa: F401  (sites.snmp_profile_id FK target)
+from app.models.device import Device, DevicePollState, MonitorShardLease
+from app.services.monitor_shards import ShardLeaseManager, jump_hash, shard_for
+from app.services.poll_scheduler import PollScheduler
+import app.tasks.monitoring as monitoring
+
+
+NOW = datetime.datetime(2026, 1, 1, 12, 0, 0)
+
+
+@pytest.fixture()
+def session_factory():
+    engine = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False})
+    factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    Base.metadata.create_all(bind=engine)
+    return factory
+
+
+@pytest.fixture()
+def db(session_factory):
+    session = session_factory()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+def _add_devices(db, n, site_id=None):
+    devices = [
+        Device(
+            name=f"sw{i}",
+            ip_address=f"10.1.{i // 250}.{i % 250 + 1}",
+            device_type="cisco_ios",
+            owner_id=1,
+            site_id=site_id,
+            snmp_community="public",
+            polling_interval=60,
+            status_interval=60,
+        )
+        for i in range(n)
+    ]
+    db.add_all(devices)
+    db.commit()
+    return devices
+
+
+def test_jump_hash_is_balanced_and_moves_few_keys_when_growing():
+    keys = range(1, 20001)
+    before = [jump_hash(k, 16) for k in keys]
+    after = [jump_hash(k, 17) for k in keys]
+
+    per_shard = Counter(before)
+    assert len(per_shard) == 16
+    assert max(per_shard.values()) < 1.15 * (20000 / 16)
+
+    moved = sum(1 for a, b in zip(before, after) if a != b)
+    # ideal is 1/17 of the keys, and every moved key lands on the new shard
+    assert moved < 20000 / 17 * 1.2
+    assert all(b == 16 for a, b in zip(before, after) if a != b)
+
+
+def test_site_key_keeps_a_site_on_one_shard():
+    shards = {shard_for(device_id, 7, 16, key="site") for device_id in range(1, 200)}
+    assert len(shards) == 1
+    # devices without a site still spread by device id
+    assert len({shard_for(device_id, None, 16, key="site") for device_id in range(1, 200)}) > 1
+
+
+def test_lease_is_exclusive_until_it_expires(db):
+    assert ShardLeaseManager.acquire(db, 3, "w1:1", lease_seconds=60, now=NOW)
+    assert not ShardLeaseManager.acquire(db, 3, "w2:2", lease_seconds=60, now=NOW + datetime.timedelta(seconds=30))
+    # the holder may extend its own lease
+    assert ShardLeaseManager.acquire(db, 3, "w1:1", lease_seconds=60, now=NOW + datetime.timedelta(seconds=30))
+    # a dead worker's shard is taken over after expiry
+    assert ShardLeaseManager.acquire(db, 3, "w2:2", lease_seconds=60, now=NOW + datetime.timedelta(seconds=120))
+    assert db.get(MonitorShardLease, 3).owner == "w2:2"
+    assert not ShardLeaseManager.renew(db, 3, "w1:1")
+
+
+def test_claim_due_per_shard_partitions_the_fleet(db):
+    devices = _add_devices(db, 120)
+    for d in devices:
+        db.add(DevicePollState(device_id=d.id, next_poll_at=NOW, next_status_at=NOW, consecutive_failures=0))
+    db.commit()
+    # 배정 전에는 어느 샤드도 장비를 가져가지 않음
+    assert PollScheduler.claim_due(db, now=NOW, shard_id=0, shard_count=4) == []
+    assert PollScheduler.assign_shards(db, now=NOW, shard_count=4, key="device") == 120
+    db.commit()
+    assert PollScheduler.assign_shards(db, now=NOW, shard_count=4, key="device") == 0
+
+    claimed = []
+    for shard_id in range(4):
+        for ids, _ in PollScheduler.claim_due(db, now=NOW, shard_id=shard_id, shard_count=4):
+            assert all(shard_for(i, None, 4) == shard_id for i in ids)
+            claimed.extend(ids)
+        db.commit()
+    assert sorted(claimed) == sorted(d.id for d in devices)
+
+
+def test_assign_shards_creates_state_and_follows_count_and_site_changes(db):
+    devices = _add_devices(db, 40)
+    assert PollScheduler.assign_shards(db, now=NOW, shard_count=4, key="site") == 40
+    db.commit()
+    states = {s.device_id: s for s in db.query(DevicePollState).all()}
+    assert all(states[d.id].shard_id == shard_for(d.id, None, 4, "site") for d in devices)
+    assert all(NOW <= states[d.id].next_poll_at < NOW + datetime.timedelta(seconds=60) for d in devices)
+
+    # site 이동 -> 그 장비만 재배정
+    devices[0].site_id = 7
+    db.commit()
+    assert PollScheduler.assign_shards(db, now=NOW, shard_count=4, key="site") == 1
+    db.commit()
+    assert db.get(DevicePollState, devices[0].id).shard_id == shard_for(devices[0].id, 7, 4, "site")
+
+    # 샤드 수 변경 -> 전체 재배정, next-due 는 유지
+    due = db.get(DevicePollState, devices[1].id).next_poll_at
+    assert PollScheduler.assign_shards(db, now=NOW, shard_count=8, key="site") == 40
+    db.commit()
+    assert db.get(DevicePollState, devices[1].id).next_poll_at == due
+    assert {s.shard_basis for s in db.query(DevicePollState).all()} == {"site:8"}
+
+
+def test_monitor_shard_runs_cycle_and_records_stats(session_factory, db, monkeypatch):
+    devices = _add_devices(db, 30)
+    for d in devices:
+        db.add(DevicePollState(device_id=d.id, next_poll_at=NOW, next_status_at=NOW, consecutive_failures=0))
+    db.commit()
+    PollScheduler.assign_shards(db)
+    db.commit()
+    shard_id = shard_for(devices[0].id)
+    expected = sorted(d.id for d in devices if shard_for(d.id) == shard_id)
+
+    polled = []
+
+    def fake_cycle(device_ids=None, snmp_device_ids=None):
+        polled.extend(device_ids)
+        return [{"id": i, "alive": True, "snmp_attempted": True, "snmp_ok": True} for i in device_ids]
+
+    monkeypatch.setattr(monitoring, "SessionLocal", session_factory)
+    monkeypatch.setattr(monitoring, "_run_monitor_cycle", fake_cycle)
+
+    monitoring.monitor_shard(shard_id)
+
+    assert sorted(polled) == expected
+    db.expire_all()
+    lease = db.get(MonitorShardLease, shard_id)
+    assert lease.owner and lease.last_device_count == len(expected)
+    assert lease.last_cycle_ms is not None and lease.last_error is None
+    assert shard_id not in ShardLeaseManager.busy_shards(db)
+
+    # while another worker holds the lease the task is a no-op
+    assert ShardLeaseManager.acquire(db, shard_id, "other:1", lease_seconds=600)
+    polled.clear()
+    monitoring.monitor_shard(shard_id)
+    assert polled == []
+
+
+class _FakeRedis:
+    def __init__(self):
+        self.store = {}
+
+    def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.store:
+            return None
+        self.store[key] = value
+        return True
+
+    def delete(self, key):
+        self.store.pop(key, None)
+
+
+def test_schedule_monitoring_skips_shards_with_a_queued_task(session_factory, monkeypatch):
+    fake = _FakeRedis()
+    sent = []
+
+    class _Task:
+        @staticmethod
+        def apply_async(args=None, expires=None):
+            sent.append((args[0], expires))
+
+    monkeypatch.setattr(monitoring, "SessionLocal", session_factory)
+    monkeypatch.setattr(monitoring.redis.Redis, "from_url", staticmethod(lambda url: fake))
+    monkeypatch.setattr(monitoring, "monitor_shard", _Task)
+
+    monitoring.schedule_monitoring()
+    first = sorted(shard for shard, _ in sent)
+    assert first and all(expires for _, expires in sent)
+
+    # workers are backed up: nothing has started yet, so the next tick sends nothing
+    sent.clear()
+    monitoring.schedule_monitoring()
+    assert sent == []
+
+    # once a shard's task starts, that shard can be queued again
+    monitoring._clear_shard_queued(fake, first[0])
+    monitoring.schedule_monitoring()
+    assert [shard for shard, _ in sent] == [first[0]]
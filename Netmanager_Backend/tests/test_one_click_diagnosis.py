@@ -72,6 +72,7 @@ def test_one_click_diagnosis_marks_link_down_abnormal(db, monkeypatch):
 
     monkeypatch.setattr(pts.PathTraceService, "trace_path", lambda self, src_ip, dst_ip: fake_trace)
     monkeypatch.setattr("app.services.diagnosis_service._ping_once", lambda ip, timeout_ms=1000: True)
+    monkeypatch.setattr("app.services.diagnosis_service._ping_many", lambda ips, timeout_ms=1000: {ip: True for ip in ips})
 
     res = OneClickDiagnosisService(db).run(
         "192.0.2.1",
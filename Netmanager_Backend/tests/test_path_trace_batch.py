@@ -0,0 +1,152 @@
+import asyncio
+import json
+import threading
+import time
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.db.session import Base
+from app.models.credentials import SnmpCredentialProfile  # noqa: F401  (sites.snmp_profile_id FK target)
+from app.models.device import Device, Interface, Link
+from app.services.path_trace_batch import iter_path_trace_batch
+from app.services.path_trace_service import PathTraceService
+
+
+@pytest.fixture()
+def engine(tmp_path):
+    # flow 마다 별도 thread/session 을 쓰므로 파일 DB 사용
+    engine = create_engine(f"sqlite:///{tmp_path / 'trace.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    return engine
+
+
+@pytest.fixture()
+def db(engine):
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture()
+def chain(db):
+    devs = [Device(name=n, hostname=n, ip_address=f"10.255.0.{i + 1}", device_type="cisco_ios") for i, n in enumerate("ABC")]
+    db.add_all(devs)
+    db.flush()
+    db.add_all(
+        [
+            Interface(device_id=devs[0].id, name="Vlan10", ip_address="10.1.0.1/24"),
+            Interface(device_id=devs[2].id, name="Vlan30", ip_address="10.3.0.1/24"),
+        ]
+    )
+    for a, b in zip(devs, devs[1:]):
+        db.add(
+            Link(
+                source_device_id=a.id,
+                source_interface_name="GigabitEthernet0/2",
+                target_device_id=b.id,
+                target_interface_name="GigabitEthernet0/1",
+                status="active",
+            )
+        )
+    db.commit()
+    return devs
+
+
+def _fake_route_lookups(monkeypatch):
+    calls = []
+    lock = threading.Lock()
+
+    def fake(self, device, dst_ip, ingress_interface_name=None):
+        with lock:
+            calls.append((device.name, dst_ip, ingress_interface_name))
+        return {"next_hop_ip": None, "outgoing_interface": "GigabitEthernet0/2", "protocol": "ospf", "vrf": None}
+
+    monkeypatch.setattr(PathTraceService, "_lookup_route_hint", fake)
+    return calls
+
+
+def test_batch_shares_hop_lookups_and_dedupes_flows(engine, chain, monkeypatch):
+    calls = _fake_route_lookups(monkeypatch)
+    flows = [
+        {"src_ip": "10.1.0.5", "dst_ip": "10.3.0.9", "id": "app-1"},
+        {"src_ip": "10.1.0.6", "dst_ip": "10.3.0.9", "id": "app-2"},
+        {"src_ip": "10.1.0.5", "dst_ip": "10.3.0.9", "id": "app-1-dup"},
+        {"src_ip": "192.0.2.1", "dst_ip": "10.3.0.9", "id": "unknown"},
+    ]
+
+    items = list(iter_path_trace_batch(engine, flows, concurrency=4))
+    results = {i["index"]: i for i in items if i["type"] == "result"}
+    summary = items[-1]
+
+    assert sorted(results) == [0, 1, 2, 3]
+    for i in (0, 1, 2):
+        assert results[i]["status"] == "success"
+        assert [n["name"] for n in results[i]["result"]["path"]] == ["A", "B", "C"]
+    assert results[2]["id"] == "app-1-dup" and results[2]["result"] == results[0]["result"]
+    assert results[3]["status"] == "not_found"
+
+    # A, B 의 route lookup 은 flow 수와 관계없이 한 번씩만
+    assert sorted(c[0] for c in calls) == ["A", "B"]
+    assert summary["type"] == "summary"
+    assert summary["flows"] == 4 and summary["unique_flows"] == 3
+    assert summary["status_counts"] == {"success": 3, "not_found": 1}
+    assert summary["hops"]["computed"]["route"] == 2
+    assert summary["hops"]["shared"]["route"] == 2
+
+
+def test_batch_traces_compute_each_device_lookup_once(db):
+    from app.services.path_trace_service import PathTraceHopCache
+
+    hop_cache = PathTraceHopCache()
+    calls = []
+    gate = threading.Barrier(8)
+
+    class SlowIndex:
+        def best_interface(self, device_id, target_ip):
+            calls.append((device_id, target_ip))
+            time.sleep(0.05)
+            return None
+
+    def trace():
+        svc = PathTraceService(db, hop_cache=hop_cache)
+        svc._ip_index = SlowIndex()
+        gate.wait()
+        return svc._find_best_interface_name_on_device(1, "10.3.0.5")
+
+    threads = [threading.Thread(target=trace) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    # 배치의 trace 스레드들은 lock 이 걸린 hop cache 를 통해 한 번만 계산
+    assert calls == [(1, "10.3.0.5")]
+    assert hop_cache.stats()["computed"]["best_intf"] == 1
+
+
+def test_batch_endpoint_streams_ndjson(engine, db, chain, monkeypatch):
+    from app.api.v1.endpoints import topology as topology_endpoint
+
+    _fake_route_lookups(monkeypatch)
+    req = topology_endpoint.PathTraceBatchRequest(
+        flows=[{"src_ip": "10.1.0.5", "dst_ip": "10.3.0.9"}, {"src_ip": "10.1.0.6", "dst_ip": "10.3.0.9"}]
+    )
+    resp = topology_endpoint.path_trace_batch(req, db=db, current_user=None)
+    assert resp.media_type == "application/x-ndjson"
+
+    async def _read():
+        return [chunk async for chunk in resp.body_iterator]
+
+    lines = [json.loads(x) for x in "".join(asyncio.run(_read())).splitlines()]
+    assert [l["type"] for l in lines] == ["result", "result", "summary"]
+    assert {l["index"] for l in lines[:2]} == {0, 1}
+
+    bad = topology_endpoint.PathTraceBatchRequest(flows=[{"src_ip": "10.1.0.5", "dst_ip": "nope"}])
+    with pytest.raises(HTTPException) as exc:
+        topology_endpoint.path_trace_batch(bad, db=db, current_user=None)
+    assert exc.value.status_code == 422 and exc.value.detail["field"] == "flows[0].dst_ip"
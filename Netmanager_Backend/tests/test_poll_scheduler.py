@@ -0,0 +1,138 @@
+import datetime
+from collections import Counter
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.db.session import Base
+from app.models.credentials import SnmpCredentialProfile  # noqa: F401  (sites.snmp_profile_id FK target)
+from app.models.device import Device, DevicePollState, Issue
+from app.services.poll_scheduler import PollScheduler
+
+
+NOW = datetime.datetime(2026, 1, 1, 12, 0, 0)
+
+
+@pytest.fixture()
+def db():
+    engine = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False})
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    Base.metadata.create_all(bind=engine)
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+def _add_devices(db, n, polling_interval=60, status_interval=60):
+    devices = [
+        Device(
+            name=f"sw{i}",
+            ip_address=f"10.0.{i // 250}.{i % 250 + 1}",
+            device_type="cisco_ios",
+            owner_id=1,
+            snmp_community="public",
+            polling_interval=polling_interval,
+            status_interval=status_interval,
+        )
+        for i in range(n)
+    ]
+    db.add_all(devices)
+    db.commit()
+    return devices
+
+
+def _claimed(batches):
+    polled = [i for ids, snmp_ids in batches if snmp_ids for i in ids]
+    status_only = [i for ids, snmp_ids in batches if not snmp_ids for i in ids]
+    return polled, status_only
+
+
+def test_first_claim_spreads_devices_across_interval(db):
+    _add_devices(db, 240)
+    assert PollScheduler.claim_due(db, now=NOW) == []
+    db.commit()
+
+    offsets = [(s.next_poll_at - NOW).total_seconds() for s in db.query(DevicePollState).all()]
+    assert len(offsets) == 240
+    assert all(0 <= o < 60 for o in offsets)
+    # twelve 5-second ticks: each should get about 20 devices, never a herd
+    per_tick = Counter(int(o // 5) for o in offsets)
+    assert len(per_tick) == 12
+    assert max(per_tick.values()) <= 30
+
+
+def test_each_device_is_claimed_once_per_interval(db):
+    _add_devices(db, 50)
+    PollScheduler.claim_due(db, now=NOW)
+    db.commit()
+
+    seen = []
+    for tick in range(1, 13):
+        polled, status_only = _claimed(PollScheduler.claim_due(db, now=NOW + datetime.timedelta(seconds=5 * tick)))
+        db.commit()
+        assert status_only == []
+        seen.extend(polled)
+    assert sorted(seen) == sorted(d.id for d in db.query(Device).all())
+
+
+def test_status_interval_shorter_than_polling_interval_pings_in_between(db):
+    (dev,) = _add_devices(db, 1, polling_interval=120, status_interval=30)
+    state = DevicePollState(device_id=dev.id, next_poll_at=NOW, next_status_at=NOW, consecutive_failures=0)
+    db.add(state)
+    db.commit()
+
+    assert _claimed(PollScheduler.claim_due(db, now=NOW)) == ([dev.id], [])
+    assert _claimed(PollScheduler.claim_due(db, now=NOW + datetime.timedelta(seconds=31))) == ([], [dev.id])
+    assert _claimed(PollScheduler.claim_due(db, now=NOW + datetime.timedelta(seconds=45))) == ([], [])
+
+
+def test_failing_devices_back_off_and_recover(db):
+    (dev,) = _add_devices(db, 1)
+    db.add(DevicePollState(device_id=dev.id, next_poll_at=NOW, next_status_at=NOW, consecutive_failures=0))
+    db.commit()
+
+    for _ in range(3):
+        PollScheduler.record_outcomes(db, [{"id": dev.id, "alive": True, "snmp_attempted": True, "snmp_ok": False, "error": "SNMP deadline exceeded"}])
+    db.commit()
+    state = db.get(DevicePollState, dev.id)
+    assert state.consecutive_failures == 3
+    assert state.last_error == "SNMP deadline exceeded"
+
+    PollScheduler.claim_due(db, now=NOW)
+    db.commit()
+    assert state.effective_interval == 240
+    assert state.next_poll_at == NOW + datetime.timedelta(seconds=240)
+
+    PollScheduler.record_outcomes(db, [{"id": dev.id, "alive": True, "snmp_attempted": True, "snmp_ok": True}])
+    db.commit()
+    assert state.consecutive_failures == 0 and state.last_error is None
+
+
+def test_open_issue_speeds_up_polling(db):
+    (dev,) = _add_devices(db, 1)
+    db.add(DevicePollState(device_id=dev.id, next_poll_at=NOW, next_status_at=NOW, consecutive_failures=0))
+    db.add(Issue(device_id=dev.id, title="High CPU", severity="warning", status="active"))
+    db.commit()
+
+    PollScheduler.claim_due(db, now=NOW)
+    db.commit()
+    state = db.get(DevicePollState, dev.id)
+    assert state.effective_interval == 30
+    assert state.next_poll_at == NOW + datetime.timedelta(seconds=30)
+
+
+def test_effective_interval_bounds():
+    assert PollScheduler.effective_interval(60, failures=1) == 60
+    assert PollScheduler.effective_interval(60, failures=2) == 120
+    assert PollScheduler.effective_interval(60, failures=50) == 480
+    assert PollScheduler.effective_interval(5) == 10
+    assert PollScheduler.effective_interval(20, has_open_issue=True) == 10
+
+
+def test_advance_skips_missed_slots_but_keeps_phase():
+    prev = NOW
+    nxt = PollScheduler.advance(prev, NOW + datetime.timedelta(seconds=185), 60)
+    assert nxt == NOW + datetime.timedelta(seconds=240)
@@ -0,0 +1,184 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.db.session import Base
+from app.models.credentials import SnmpCredentialProfile  # noqa: F401  (sites.snmp_profile_id FK target)
+from app.models.device import Device, DeviceL3Table, Interface, Link
+from app.services import route_lookup_cache as rlc
+from app.services.path_trace_service import PathTraceService
+from app.services.ssh_service import parse_ip_route_table
+
+
+@pytest.fixture()
+def db():
+    engine = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False})
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    Base.metadata.create_all(bind=engine)
+    rlc.route_lookup_cache.invalidate()
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+        rlc.route_lookup_cache.invalidate()
+
+
+SHOW_IP_ROUTE = """Codes: L - local, C - connected, S - static, R - RIP, M - mobile, B - BGP
+Gateway of last resort is 10.0.0.254 to network 0.0.0.0
+
+S*    0.0.0.0/0 [1/0] via 10.0.0.254
+      10.0.0.0/8 is variably subnetted, 3 subnets, 2 masks
+C        10.0.0.0/24 is directly connected, GigabitEthernet0/1
+L        10.0.0.1/32 is directly connected, GigabitEthernet0/1
+O        10.20.0.0/16 [110/2] via 10.0.0.2, 00:01:02, GigabitEthernet0/1
+                      [110/2] via 10.0.0.3, 00:01:02, GigabitEthernet0/1
+      172.16.0.0/24 is subnetted, 1 subnets
+O IA     172.16.1.0 [110/3] via 10.0.0.3, 1w2d, GigabitEthernet0/1
+B        203.0.113.0/24 [20/0] via 10.20.5.1, 2d01h
+"""
+
+
+def test_parse_show_ip_route_and_longest_prefix_match():
+    routes = parse_ip_route_table(SHOW_IP_ROUTE)
+    by_prefix = {r["prefix"]: r for r in routes}
+    assert by_prefix["172.16.1.0/24"]["next_hop_ip"] == "10.0.0.3"
+    assert by_prefix["10.20.0.0/16"]["outgoing_interface"] == "GigabitEthernet0/1"
+    assert by_prefix["0.0.0.0/0"]["protocol"] == "static"
+
+    table = rlc.PrefixTable()
+    for r in routes:
+        table.add(r["prefix"], r)
+    assert table.lookup("10.20.7.7")[1]["prefix"] == "10.20.0.0/16"
+    assert table.lookup("10.0.0.1")[0] == 32
+    assert table.lookup("8.8.8.8")[1]["prefix"] == "0.0.0.0/0"
+    assert table.lookup("not-an-ip") is None
+
+
+def test_inet_cidr_route_index_is_decoded():
+    # dest 10.1.0.0/16, policy 0.0, next hop 10.0.0.2
+    parts = [1, 4, 10, 1, 0, 0, 16, 2, 0, 0, 1, 4, 10, 0, 0, 2]
+    assert rlc._parse_inet_cidr_index(parts) == ("10.1.0.0/16", "10.0.0.2")
+    assert rlc._parse_ip_cidr_index([10, 1, 0, 0, 255, 255, 0, 0, 0, 10, 0, 0, 2]) == ("10.1.0.0/16", "10.0.0.2")
+
+
+def _two_router_topology(db):
+    a = Device(name="A", hostname="A", ip_address="10.0.0.1", ssh_username="u", ssh_password="p", device_type="cisco_ios")
+    b = Device(name="B", hostname="B", ip_address="10.0.0.2", ssh_username="u", ssh_password="p", device_type="cisco_ios")
+    db.add_all([a, b])
+    db.flush()
+    db.add_all(
+        [
+            Interface(device_id=a.id, name="Vlan10", ip_address="192.168.10.1/24"),
+            Interface(device_id=b.id, name="Vlan20", ip_address="10.20.5.1/24"),
+            Link(
+                source_device_id=a.id,
+                source_interface_name="GigabitEthernet0/1",
+                target_device_id=b.id,
+                target_interface_name="GigabitEthernet0/1",
+                status="active",
+            ),
+        ]
+    )
+    return a, b
+
+
+def test_path_trace_routes_from_cached_tables_without_ssh(db, monkeypatch):
+    a, b = _two_router_topology(db)
+    now = datetime.now()
+    db.add_all(
+        [
+            DeviceL3Table(
+                device_id=a.id,
+                source="ssh",
+                routes=[dict(r, vrf=None) for r in parse_ip_route_table(SHOW_IP_ROUTE)],
+                arp=[],
+                vrfs=[],
+                interface_vrfs={},
+                collected_at=now,
+            ),
+            DeviceL3Table(
+                device_id=b.id,
+                source="ssh",
+                routes=[{"prefix": "10.20.5.0/24", "vrf": None, "next_hop_ip": None, "outgoing_interface": "Vlan20", "protocol": "connected"}],
+                collected_at=now,
+            ),
+        ]
+    )
+    db.commit()
+
+    class NoSsh:
+        def __init__(self, *args, **kwargs):
+            raise AssertionError("live SSH lookup should not be needed")
+
+    monkeypatch.setattr("app.services.ssh_service.DeviceConnection", NoSsh)
+
+    svc = PathTraceService(db)
+    hint = svc._get_route_hint(a, "203.0.113.9")
+    # BGP next hop 10.20.5.1 -> 10.20.0.0/16 via Gi0/1 (recursive)
+    assert hint["next_hop_ip"] == "10.20.5.1" and hint["outgoing_interface"] == "GigabitEthernet0/1"
+    assert hint["source"] == "cache"
+
+    res = svc._trace_path_l3(a, b, None, None, "10.20.5.9")
+    assert res["status"] == "success"
+    assert [n["name"] for n in res["path"]] == ["A", "B"]
+    assert res["path"][0]["evidence"]["lookup"] == "cache"
+
+
+def test_stale_tables_fall_back_to_live_lookup(db):
+    a, _ = _two_router_topology(db)
+    db.add(
+        DeviceL3Table(
+            device_id=a.id,
+            source="ssh",
+            routes=[{"prefix": "0.0.0.0/0", "vrf": None, "next_hop_ip": "10.0.0.254", "outgoing_interface": None, "protocol": "static"}],
+            collected_at=datetime.now() - timedelta(seconds=rlc.ROUTE_TABLE_MAX_AGE_SEC + 60),
+        )
+    )
+    db.commit()
+    assert rlc.route_lookup_cache.get(db, a.id) is None
+
+
+def test_collector_prefers_snmp_and_falls_back_to_ssh(db, monkeypatch):
+    a, _ = _two_router_topology(db)
+    db.commit()
+
+    class FakeConn:
+        def __init__(self, *args, **kwargs):
+            self.last_error = None
+
+        def connect(self):
+            return True
+
+        def disconnect(self):
+            return None
+
+        def get_vrfs(self):
+            return ["BLUE"]
+
+        def get_route_table(self, vrf=None):
+            if vrf == "BLUE":
+                return [{"prefix": "172.31.0.0/16", "next_hop_ip": None, "outgoing_interface": "Vlan99", "protocol": "connected"}]
+            return parse_ip_route_table(SHOW_IP_ROUTE)
+
+        def get_arp_table(self, vrf=None):
+            return [{"ip": "10.0.0.2", "mac": "aaaa.bbbb.cccc", "interface": "GigabitEthernet0/1"}] if vrf is None else []
+
+        def get_vrf_interfaces(self):
+            return {"Vlan99": "BLUE"}
+
+    monkeypatch.setattr(rlc, "collect_snmp", lambda device: None)
+    monkeypatch.setattr("app.services.ssh_service.DeviceConnection", FakeConn)
+
+    row = rlc.collect_device_tables(db, a)
+    db.commit()
+    assert row.source == "ssh" and row.error is None
+    assert row.route_count == len(parse_ip_route_table(SHOW_IP_ROUTE)) + 1
+
+    view = rlc.route_lookup_cache.get(db, a.id)
+    assert view.route("172.31.4.4")["prefix"] == "0.0.0.0/0"
+    assert view.route("172.31.4.4", vrf="BLUE")["outgoing_interface"] == "Vlan99"
+    assert view.interface_vrf("Vl99") == "BLUE"
+    assert view.arp("10.0.0.2")["mac"] == "aaaa.bbbb.cccc"
@@ -0,0 +1,65 @@
+import time
+
+from app.services.snmp_async_engine import snmp_async_engine, with_deadline
+from app.services.snmp_service import SnmpManager
+
+
+SYSTEM_MIB = {
+    "1.3.6.1.2.1.1.1.0": "Cisco IOS Software, C9300",
+    "1.3.6.1.2.1.1.2.0": "1.3.6.1.4.1.9.1.2494",
+    "1.3.6.1.2.1.1.3.0": 123456,
+    "1.3.6.1.2.1.1.5.0": "core-sw1",
+    "1.3.6.1.2.1.2.2.1.8.1": 1,
+    "1.3.6.1.2.1.2.2.1.8.2": 2,
+    "1.3.6.1.2.1.31.1.1.1.1.1": "Gi1/0/1",
+    "1.3.6.1.2.1.31.1.1.1.1.2": "Gi1/0/2",
+    "1.3.6.1.2.1.31.1.1.1.6.1": 5_000_000_000,
+    "1.3.6.1.2.1.31.1.1.1.6.2": 200,
+    "1.3.6.1.2.1.31.1.1.1.10.1": 7_000_000_000,
+    "1.3.6.1.2.1.31.1.1.1.10.2": 300,
+}
+
+
+def test_sync_wrappers_use_async_engine(snmp_agent):
+    agent = snmp_agent(SYSTEM_MIB)
+    snmp = SnmpManager("127.0.0.1", "public", port=agent.port, timeout=0.5, retries=0)
+
+    info = snmp.get_system_info()
+    assert info["sysName"] == "core-sw1"
+    assert snmp.check_status()["status"] == "online"
+    assert snmp.walk_table_column("1.3.6.1.2.1.31.1.1.1.1") == {1: "Gi1/0/1", 2: "Gi1/0/2"}
+    assert snmp.get_interface_name_status_map() == {"Gi1/0/1": "up", "Gi1/0/2": "down"}
+    assert snmp.get_total_octets() == {"in": 5_000_000_200, "out": 7_000_000_300}
+
+
+def test_wrong_community_times_out_quietly(snmp_agent):
+    agent = snmp_agent(SYSTEM_MIB, community="secret")
+    snmp = SnmpManager("127.0.0.1", "public", port=agent.port, timeout=0.2, retries=0)
+    assert snmp.get_system_info() is None
+    assert snmp.walk_oid("1.3.6.1.2.1.1") == {}
+
+
+def test_many_targets_in_flight_with_per_target_deadline(snmp_agent):
+    live = [snmp_agent(SYSTEM_MIB) for _ in range(5)]
+    dead = [snmp_agent(SYSTEM_MIB, silent=True) for _ in range(5)]
+
+    async def _poll_all():
+        import asyncio
+
+        async def _one(agent):
+            mgr = SnmpManager("127.0.0.1", "public", port=agent.port, timeout=1.0, retries=3)
+            try:
+                return await with_deadline(mgr.aget_system_info(), 0.5)
+            except asyncio.TimeoutError:
+                return "deadline"
+
+        return await asyncio.gather(*[_one(a) for a in live + dead])
+
+    started = time.monotonic()
+    results = snmp_async_engine.run_sync(_poll_all())
+    elapsed = time.monotonic() - started
+
+    assert all(r and r["sysName"] == "core-sw1" for r in results[:5])
+    assert results[5:] == ["deadline"] * 5
+    # Dead targets are bounded by the deadline, not timeout * (retries + 1), and run concurrently.
+    assert elapsed < 2.0
@@ -0,0 +1,152 @@
+from app.services.snmp_l2_service import SnmpL2Service
+from app.services.snmp_service import SnmpManager
+
+
+PORTS = 400
+
+COUNTER_COLUMNS = {
+    "1.3.6.1.2.1.31.1.1.1.6": lambda i: 10_000_000_000 + i,  # ifHCInOctets
+    "1.3.6.1.2.1.31.1.1.1.10": lambda i: 20_000_000_000 + i,  # ifHCOutOctets
+    "1.3.6.1.2.1.2.2.1.13": lambda i: i % 3,  # ifInDiscards
+    "1.3.6.1.2.1.2.2.1.14": lambda i: i % 5,  # ifInErrors
+    "1.3.6.1.2.1.2.2.1.19": lambda i: i % 7,  # ifOutDiscards
+    "1.3.6.1.2.1.2.2.1.20": lambda i: i % 11,  # ifOutErrors
+}
+
+
+def _chassis_mib(ports: int = PORTS) -> dict:
+    mib = {"1.3.6.1.2.1.1.5.0": "chassis-1"}
+    for i in range(1, ports + 1):
+        mib[f"1.3.6.1.2.1.31.1.1.1.1.{i}"] = f"Gi1/0/{i}"
+        mib[f"1.3.6.1.2.1.2.2.1.2.{i}"] = f"GigabitEthernet1/0/{i}"
+        mib[f"1.3.6.1.2.1.2.2.1.10.{i}"] = i * 10  # ifInOctets
+        mib[f"1.3.6.1.2.1.2.2.1.16.{i}"] = i * 20  # ifOutOctets
+        for col, value in COUNTER_COLUMNS.items():
+            mib[f"{col}.{i}"] = value(i)
+    # a trailing subtree so the walk has to notice it left the table
+    mib["1.3.6.1.4.1.9.9.109.1.1.1.1.5.1"] = 7
+    return mib
+
+
+def _mgr(agent, **kw) -> SnmpManager:
+    return SnmpManager("127.0.0.1", "public", port=agent.port, timeout=1.0, retries=0, **kw)
+
+
+def _assert_counters(counters: dict, ports: int = PORTS, hc: bool = True) -> None:
+    assert len(counters) == ports
+    expected = {
+        "in_octets": 10_000_000_001 if hc else 10,
+        "out_octets": 20_000_000_001 if hc else 20,
+        "in_errors": 1,
+        "out_errors": 1,
+        "in_discards": 1,
+        "out_discards": 1,
+    }
+    if not hc:
+        # the 32-bit fallback is flagged so the rate engine may treat a drop as a wrap
+        expected["counter_bits"] = {"in_octets": 32, "out_octets": 32}
+    assert counters["Gi1/0/1"] == expected
+    assert counters[f"Gi1/0/{ports}"]["in_octets"] == (10_000_000_000 + ports if hc else ports * 10)
+
+
+def test_counters_map_uses_one_bulk_stream(snmp_agent):
+    agent = snmp_agent(_chassis_mib())
+    counters = _mgr(agent, max_repetitions=25).get_interface_counters_map()
+
+    _assert_counters(counters)
+    assert agent.requests["getnext"] == 0
+    # 400 rows / 25 per response, plus the response that runs off the table
+    assert agent.requests["getbulk"] <= PORTS // 25 + 2
+
+
+def test_v1_agent_falls_back_to_multi_varbind_getnext(snmp_agent):
+    agent = snmp_agent(_chassis_mib(ports=40))
+    snmp = _mgr(agent, version="v1")
+    counters = snmp.get_interface_counters_map()
+
+    # v1 cannot carry Counter64, so the agent hides ifHC* and we fall back to ifIn/OutOctets
+    _assert_counters(counters, ports=40, hc=False)
+    assert agent.requests["getbulk"] == 0
+    # one GETNEXT per row carrying all seven columns, then one per row for the 32-bit pair
+    assert agent.requests["getnext"] <= 2 * (40 + 2)
+
+
+def test_v1_walk_drops_columns_that_hit_end_of_mib(snmp_agent):
+    agent = snmp_agent({
+        "1.3.6.1.2.1.2.2.1.2.1": "eth0",
+        "1.3.6.1.2.1.2.2.1.2.2": "eth1",
+        "1.3.6.1.9.1": "last",
+        "1.3.6.1.9.2": "last",
+    })
+    cols = _mgr(agent, version="v1").walk_table_columns(["1.3.6.1.2.1.2.2.1.2", "1.3.6.1.9"])
+    assert cols == {"1.3.6.1.2.1.2.2.1.2": {1: "eth0", 2: "eth1"}, "1.3.6.1.9": {1: "last", 2: "last"}}
+
+
+def test_walk_oids_caps_rows_per_subtree(snmp_agent):
+    agent = snmp_agent(_chassis_mib(ports=30))
+    walked = _mgr(agent, max_repetitions=8).walk_oids(
+        ["1.3.6.1.2.1.31.1.1.1.1", "1.3.6.1.2.1.2.2.1.13"], max_rows=10
+    )
+    assert len(walked["1.3.6.1.2.1.31.1.1.1.1"]) == 10
+    assert len(walked["1.3.6.1.2.1.2.2.1.13"]) == 10
+    assert walked["1.3.6.1.2.1.31.1.1.1.1"]["1.3.6.1.2.1.31.1.1.1.1.10"] == "Gi1/0/10"
+
+
+def test_total_octets_falls_back_to_32bit_columns(snmp_agent):
+    agent = snmp_agent({
+        "1.3.6.1.2.1.2.2.1.10.1": 100,
+        "1.3.6.1.2.1.2.2.1.10.2": 50,
+        "1.3.6.1.2.1.2.2.1.16.1": 10,
+        "1.3.6.1.2.1.2.2.1.16.2": 5,
+    })
+    assert _mgr(agent).get_total_octets() == {"in": 150, "out": 15}
+
+
+def test_lldp_neighbors_from_bulk_stream(snmp_agent):
+    rem = "1.0.8802.1.1.2.1.4.1.1"
+    agent = snmp_agent({
+        f"{SnmpL2Service.LLDP_LOC_PORT_ID}.5": "Gi1/0/5",
+        f"{rem}.4.0.5.1": 4,
+        f"{rem}.5.0.5.1": bytes.fromhex("001122334455"),
+        f"{rem}.7.0.5.1": "Gi0/1",
+        f"{rem}.9.0.5.1": "dist-sw1",
+        f"{SnmpL2Service.LLDP_REM_MAN_ADDR}.0.5.1.1.4.10.0.0.2": 2,
+    })
+    rows = SnmpL2Service.get_lldp_neighbors(_mgr(agent))
+    assert rows == [{
+        "local_interface": "Gi1/0/5",
+        "remote_interface": "Gi0/1",
+        "neighbor_name": "dist-sw1",
+        "mgmt_ip": "10.0.0.2",
+        "protocol": "LLDP",
+        "discovery_source": "snmp_lldp",
+    }]
+    assert agent.requests["getnext"] == 0
+
+
+def test_round_trip_benchmark(snmp_agent):
+    """
+    Round trips for one 400-port counters poll (ifName + 6 counter columns).
+    The old per-column GETNEXT walk cost 7 * (400 + 1) = 2807 round trips.
+    Run with ``-s`` to see the table.
+    """
+    legacy = len(COUNTER_COLUMNS) + 1
+    legacy *= PORTS + 1
+    results = {}
+    for label, kw in (
+        ("v1 getnext", {"version": "v1"}),
+        ("bulk x10", {"max_repetitions": 10}),
+        ("bulk x25", {"max_repetitions": 25}),
+        ("bulk x50", {"max_repetitions": 50}),
+    ):
+        agent = snmp_agent(_chassis_mib())
+        _assert_counters(_mgr(agent, **kw).get_interface_counters_map(), hc="version" not in kw)
+        results[label] = agent.total_requests
+
+    print(f"\n{'per-column getnext':>20}: {legacy}")
+    for label, trips in results.items():
+        print(f"{label:>20}: {trips}")
+
+    assert results["v1 getnext"] < legacy / 3
+    assert results["bulk x25"] * 100 < legacy
+    assert results["bulk x50"] <= results["bulk x25"] <= results["bulk x10"]
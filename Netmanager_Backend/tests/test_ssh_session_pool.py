@@ -0,0 +1,232 @@
+import gc
+import threading
+import time
+
+import pytest
+
+from app.services import ssh_service
+from app.services.ssh_session_pool import SessionLimitError, SshSessionPool, pool_key
+
+
+class FakeNetmiko:
+    def __init__(self):
+        self.config_mode = False
+        self.exits = 0
+
+    def check_config_mode(self):
+        return self.config_mode
+
+    def exit_config_mode(self):
+        self.exits += 1
+        self.config_mode = False
+
+    def send_command(self, command, use_textfsm=False, **kwargs):
+        return f"out:{command}"
+
+
+class FakeDriver:
+    logins = 0
+
+    def __init__(self, hostname="10.0.0.1", **kwargs):
+        self.hostname = hostname
+        self.connection = None
+        self.alive = True
+        self.closed = 0
+
+    def connect(self):
+        FakeDriver.logins += 1
+        self.connection = FakeNetmiko()
+        return True
+
+    def disconnect(self):
+        self.closed += 1
+        self.connection = None
+
+    def check_connection(self):
+        return self.connection is not None and self.alive
+
+
+def _open():
+    d = FakeDriver()
+    d.connect()
+    return d
+
+
+KEY = pool_key("10.0.0.1", 22, "admin", "cisco_ios")
+
+
+def test_released_session_is_reused_after_health_check():
+    pool = SshSessionPool(idle_timeout=60, max_per_device=2, max_idle=8, lease_timeout=1, keepalive=0)
+    d1, t1 = pool.acquire(KEY, _open)
+    d1.connection.config_mode = True  # 이전 caller 가 config mode 로 남겨둔 세션
+    pool.release(KEY, d1, t1)
+
+    d2, t2 = pool.acquire(KEY, _open)
+    assert d2 is d1
+    assert d1.connection.exits == 1
+    pool.release(KEY, d2, t2)
+
+    d1.alive = False
+    d3, _ = pool.acquire(KEY, _open)
+    assert d3 is not d1 and d1.closed == 1
+    assert pool.stats()["hits"] == 1
+
+
+def test_idle_sessions_expire_and_lru_is_evicted():
+    pool = SshSessionPool(idle_timeout=0.05, max_per_device=2, max_idle=2, lease_timeout=1, keepalive=0)
+    keys = [pool_key(f"10.0.0.{i}", 22, "admin", "cisco_ios") for i in range(3)]
+    leases = [pool.acquire(k, _open) for k in keys]
+    drivers = [d for d, _ in leases]
+    for k, (d, t) in zip(keys, leases):
+        pool.release(k, d, t)
+    assert drivers[0].closed == 1  # max_idle=2 -> 가장 오래된 세션 정리
+    assert pool.stats()["idle"] == 2
+
+    time.sleep(0.1)
+    assert pool.reap() == 2
+    assert all(d.closed == 1 for d in drivers)
+    assert pool.stats()["idle"] == 0
+
+
+def test_reaper_closes_idle_sessions_without_further_pool_calls():
+    pool = SshSessionPool(idle_timeout=0.05, max_per_device=2, max_idle=8, lease_timeout=1, keepalive=0, reap_interval=0.02)
+    d1, t1 = pool.acquire(KEY, _open)
+    pool.release(KEY, d1, t1)
+    assert pool.stats()["idle"] == 1
+
+    # 이후 acquire/release 없이도 (유휴 워커) 세션이 닫혀야 함
+    deadline = time.monotonic() + 2.0
+    while d1.closed == 0 and time.monotonic() < deadline:
+        time.sleep(0.02)
+    assert d1.closed == 1 and pool.stats()["idle"] == 0
+    # idle 세션이 없으면 reaper 스레드도 종료
+    while pool._reaper is not None and time.monotonic() < deadline:
+        time.sleep(0.02)
+    assert pool._reaper is None
+
+
+def test_per_device_limit_waits_for_release():
+    pool = SshSessionPool(idle_timeout=60, max_per_device=1, max_idle=8, lease_timeout=0.1, keepalive=0)
+    d1, t1 = pool.acquire(KEY, _open)
+    with pytest.raises(SessionLimitError):
+        pool.acquire(KEY, _open)
+
+    pool.lease_timeout = 5
+    threading.Timer(0.1, pool.release, args=(KEY, d1, t1)).start()
+    d2, _ = pool.acquire(KEY, _open)
+    assert d2 is d1
+
+
+def test_pool_key_changes_with_credentials():
+    base = pool_key("10.0.0.1", 22, "admin", "cisco_ios", "pw1", "en1")
+    assert pool_key("10.0.0.1", 22, "admin", "cisco_ios", "pw1", "en1") == base
+    assert pool_key("10.0.0.1", 22, "admin", "cisco_ios", "pw2", "en1") != base
+    assert pool_key("10.0.0.1", 22, "admin", "cisco_ios", "pw1", "en2") != base
+    assert "pw1" not in repr(base) and base[0] == "10.0.0.1"
+
+
+def test_stale_lease_is_reclaimed_and_closed_on_return():
+    pool = SshSessionPool(idle_timeout=60, max_per_device=1, max_idle=8, lease_timeout=0.05, keepalive=0, max_lease=0.1)
+    d1, t1 = pool.acquire(KEY, _open)  # 반납하지 않는 caller
+    with pytest.raises(SessionLimitError):
+        pool.acquire(KEY, _open)
+
+    time.sleep(0.15)
+    d2, t2 = pool.acquire(KEY, _open)
+    assert d2 is not d1 and pool.stats()["reclaimed"] == 1
+
+    # 늦게 돌아온 세션은 풀에 넣지 않고 닫음
+    pool.release(KEY, d1, t1)
+    assert d1.closed == 1 and pool.stats()["idle"] == 0
+    pool.release(KEY, d2, t2)
+    assert pool.stats()["idle"] == 1 and pool.stats()["leased"] == 0
+
+
+def test_device_connection_leases_from_pool(monkeypatch):
+    pool = SshSessionPool(idle_timeout=60, max_per_device=2, max_idle=8, lease_timeout=1, keepalive=0)
+    monkeypatch.setattr(ssh_service, "ssh_session_pool", pool)
+    monkeypatch.setattr(ssh_service.DriverManager, "get_driver", staticmethod(lambda **kw: FakeDriver(**kw)))
+    FakeDriver.logins = 0
+
+    info = ssh_service.DeviceInfo("10.0.0.9", "admin", "pw", device_type="cisco_ios")
+    for _ in range(3):
+        conn = ssh_service.DeviceConnection(info)
+        assert conn.connect()
+        assert conn.send_command("show clock") == "out:show clock"
+        conn.disconnect()
+    assert FakeDriver.logins == 1
+
+    conn = ssh_service.DeviceConnection(info)
+    assert conn.connect()
+    conn.discard()
+    conn.disconnect()
+    assert pool.stats()["idle"] == 0
+
+    conn = ssh_service.DeviceConnection(info, pooled=False)
+    assert conn.connect()
+    conn.disconnect()
+    assert FakeDriver.logins == 2
+
+
+def test_leased_session_forgets_the_previous_jobs_rollback_snapshot(monkeypatch):
+    from app.drivers.base import NetworkDriver
+
+    class SnapshotDriver(FakeDriver):
+        reset_session_state = NetworkDriver.reset_session_state
+
+    pool = SshSessionPool(idle_timeout=60, max_per_device=1, max_idle=8, lease_timeout=1, keepalive=0)
+    monkeypatch.setattr(ssh_service, "ssh_session_pool", pool)
+    monkeypatch.setattr(ssh_service.DriverManager, "get_driver", staticmethod(lambda **kw: SnapshotDriver(**kw)))
+
+    info = ssh_service.DeviceInfo("10.0.0.9", "admin", "pw", device_type="cisco_ios")
+    conn = ssh_service.DeviceConnection(info)
+    assert conn.connect()
+    conn.driver._rollback_ref = "flash:rollback_1_old.cfg"
+    conn.driver.last_error = "push failed"
+    first = conn.driver
+    conn.disconnect()
+
+    conn = ssh_service.DeviceConnection(info)
+    assert conn.connect()
+    assert conn.driver is first
+    assert conn.driver._rollback_ref is None and conn.driver.last_error is None
+    conn.disconnect()
+
+
+def test_device_connection_context_discards_session_on_error(monkeypatch):
+    pool = SshSessionPool(idle_timeout=60, max_per_device=1, max_idle=8, lease_timeout=0.1, keepalive=0)
+    monkeypatch.setattr(ssh_service, "ssh_session_pool", pool)
+    monkeypatch.setattr(ssh_service.DriverManager, "get_driver", staticmethod(lambda **kw: FakeDriver(**kw)))
+
+    info = ssh_service.DeviceInfo("10.0.0.9", "admin", "pw", device_type="cisco_ios")
+    conn = ssh_service.DeviceConnection(info)
+    assert conn.connect()
+    with pytest.raises(RuntimeError):
+        with conn:
+            raise RuntimeError("parse failed")
+    assert pool.stats()["leased"] == 0 and pool.stats()["idle"] == 0
+    assert conn.driver.closed == 1
+
+    conn = ssh_service.DeviceConnection(info)
+    assert conn.connect()
+    with conn:
+        conn.send_command("show clock")
+    assert pool.stats()["idle"] == 1
+
+
+def test_abandoned_device_connection_returns_its_lease(monkeypatch):
+    pool = SshSessionPool(idle_timeout=60, max_per_device=1, max_idle=8, lease_timeout=0.1, keepalive=0)
+    monkeypatch.setattr(ssh_service, "ssh_session_pool", pool)
+    monkeypatch.setattr(ssh_service.DriverManager, "get_driver", staticmethod(lambda **kw: FakeDriver(**kw)))
+
+    info = ssh_service.DeviceInfo("10.0.0.9", "admin", "pw", device_type="cisco_ios")
+    conn = ssh_service.DeviceConnection(info)
+    assert conn.connect()
+    driver = conn.driver
+    del conn  # disconnect() 없이 버려짐 (예외 경로)
+    gc.collect()
+    assert driver.closed == 1 and pool.stats()["leased"] == 0
+
+    conn = ssh_service.DeviceConnection(info)
+    assert conn.connect()
+    conn.disconnect()
@@ -0,0 +1,160 @@
+import asyncio
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app.db.session import Base
+from app.models.credentials import SnmpCredentialProfile  # noqa: F401  (sites.snmp_profile_id FK target)
+from app.models.device import Device, EventLog, Interface, Issue, Link
+from app.services import realtime_event_bus as reb
+from app.services import syslog_service
+from app.services.syslog_service import SyslogProtocol, process_syslog_batch
+
+
+@pytest.fixture()
+def engine():
+    engine = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    return engine
+
+
+@pytest.fixture()
+def db(engine, monkeypatch):
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    monkeypatch.setattr(syslog_service, "SessionLocal", SessionLocal)
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+def _topology(db):
+    core = Device(name="Core-SW", hostname="Core-SW", ip_address="192.168.1.1", device_type="cisco_ios")
+    access = Device(name="Access-SW", hostname="Access-SW", ip_address="192.168.1.2", device_type="cisco_ios")
+    db.add_all([core, access])
+    db.flush()
+    db.add_all(
+        [
+            Interface(device_id=core.id, name="GigabitEthernet1/0/1", status="up"),
+            Interface(device_id=core.id, name="Loopback0", ip_address="10.9.9.9/32", status="up"),
+            Link(
+                source_device_id=core.id,
+                source_interface_name="GigabitEthernet1/0/1",
+                target_device_id=access.id,
+                target_interface_name="GigabitEthernet0/1",
+                status="up",
+            ),
+        ]
+    )
+    db.commit()
+    return core, access
+
+
+def _updown(state):
+    return f"<187>80: *Feb 10 17:55:01.000: %LINK-3-UPDOWN: Interface GigabitEthernet1/0/1, changed state to {state}"
+
+
+def test_batch_bulk_inserts_and_coalesces_state_changes(engine, db):
+    core, _ = _topology(db)
+    fan = "<186>81: %FAN-3-FAIL: Fan 1 has failed"
+    batch = [
+        ("192.168.1.1", _updown("down"), 1700000000.0),
+        ("192.168.1.1", _updown("up"), 1700000000.1),
+        ("192.168.1.1", _updown("down"), 1700000000.2),
+        ("10.9.9.9", fan, 1700000000.3),  # loopback 주소에서 온 로그도 장비로 매핑
+        ("10.9.9.9", fan, 1700000000.4),
+        ("192.168.1.1", "<190>%IP_SNMP-4-NOTRAPIP: ignored", 1700000000.5),
+        ("203.0.113.7", "<190>%SYS-5-RESTART: unknown source", 1700000000.6),
+    ]
+
+    inserts = []
+
+    def _record(conn, cursor, statement, params, context, executemany):
+        if statement.lstrip().upper().startswith("INSERT INTO EVENT_LOGS"):
+            inserts.append(executemany)
+
+    event.listen(engine, "before_cursor_execute", _record)
+    try:
+        with patch.object(reb.realtime_event_bus, "publish") as mock_publish:
+            stats = process_syslog_batch(batch)
+    finally:
+        event.remove(engine, "before_cursor_execute", _record)
+
+    assert stats["stored"] == 5 and stats["unknown_source"] == 1
+    assert inserts == [True]
+    db.expire_all()
+    assert db.query(EventLog).filter(EventLog.device_id == core.id).count() == 5
+    assert db.query(Interface).filter(Interface.name == "GigabitEthernet1/0/1").one().status == "down"
+    assert db.query(Link).one().status == "down"
+    assert [i.title for i in db.query(Issue).filter(Issue.severity == "critical").all()] == ["Fan Failure: Core-SW"]
+
+    # 같은 인터페이스의 down/up/down 은 최종 상태 하나의 link_update 로
+    # (topology_graph_changed 는 그래프 캐시용 별도 이벤트)
+    updates = [c[0] for c in mock_publish.call_args_list if c[0][0] == "link_update"]
+    assert len(updates) == 1
+    name, data = updates[0]
+    assert data["device_id"] == core.id and data["state"] == "down" and data["interface"] == "GigabitEthernet1/0/1"
+
+
+def test_receiver_collects_lines_into_batches():
+    async def _run():
+        protocol = SyslogProtocol()
+        protocol.batch_size = 2
+        protocol.batch_max_wait = 0.05
+        for i in range(3):
+            protocol.queue.put_nowait(("192.168.1.1", f"line {i}", 0.0))
+        first = await protocol._next_batch()
+        second = await protocol._next_batch()
+        return first, second
+
+    first, second = asyncio.run(_run())
+    assert [x[1] for x in first] == ["line 0", "line 1"]
+    assert [x[1] for x in second] == ["line 2"]
+
+
+def test_both_link_ends_changing_in_one_batch_follow_the_latest_message(db):
+    core, access = _topology(db)
+    db.add(Interface(device_id=access.id, name="GigabitEthernet0/1", status="up"))
+    db.commit()
+    access_down = "<187>%LINK-3-UPDOWN: Interface GigabitEthernet0/1, changed state to down"
+    batch = [
+        ("192.168.1.2", access_down, 1700000000.0),
+        ("192.168.1.1", _updown("down"), 1700000000.1),
+        ("192.168.1.1", _updown("up"), 1700000000.2),
+    ]
+    with patch.object(reb.realtime_event_bus, "publish") as mock_publish:
+        stats = process_syslog_batch(batch)
+
+    link = db.query(Link).one()
+    db.refresh(link)
+    assert link.status == "up" and stats["link_updates"] == 1
+    events = [c[0][1] for c in mock_publish.call_args_list if c[0][0] == "link_update"]
+    assert [(e["device_id"], e["state"], e["link_ids"]) for e in events] == [
+        (access.id, "down", [link.id]),
+        (core.id, "up", [link.id]),
+    ]
+
+
+def test_failed_batch_commit_falls_back_to_smaller_chunks(engine, db):
+    core, _ = _topology(db)
+    batch = [("192.168.1.1", f"<190>%SYS-5-RESTART: line {i}", 1700000000.0 + i) for i in range(8)]
+
+    def _reject_bad_line(conn, cursor, statement, params, context, executemany):
+        if statement.lstrip().upper().startswith("INSERT INTO EVENT_LOGS"):
+            rows = params if executemany else [params]
+            if any("line 5" in str(r) for r in rows):
+                raise ValueError("bad row")
+
+    event.listen(engine, "before_cursor_execute", _reject_bad_line)
+    try:
+        stats = process_syslog_batch(batch)
+    finally:
+        event.remove(engine, "before_cursor_execute", _reject_bad_line)
+
+    assert stats["stored"] == 7 and stats["dropped"] == 1
+    db.expire_all()
+    messages = sorted(m for (m,) in db.query(EventLog.message).filter(EventLog.device_id == core.id))
+    assert messages == [f"line {i}" for i in range(8) if i != 5]
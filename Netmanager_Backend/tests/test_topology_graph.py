@@ -0,0 +1,163 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.db.session import Base
+from app.models.credentials import SnmpCredentialProfile  # noqa: F401  (sites.snmp_profile_id FK target)
+from app.models.device import Device, Link
+from app.services.path_trace_service import PathTraceService
+from app.services.topology_graph import GRAPH_CHANGED_EVENT, topology_graph_store
+from app.services.topology_link_service import TopologyLinkService
+
+
+@pytest.fixture()
+def db():
+    engine = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False})
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    Base.metadata.create_all(bind=engine)
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+def _chain(db, n=4):
+    devs = [Device(name=f"D{i}", hostname=f"D{i}", ip_address=f"10.5.0.{i + 1}", device_type="cisco_ios") for i in range(n)]
+    db.add_all(devs)
+    db.flush()
+    for a, b in zip(devs, devs[1:]):
+        db.add(
+            Link(
+                source_device_id=a.id,
+                source_interface_name="GigabitEthernet0/2",
+                target_device_id=b.id,
+                target_interface_name="GigabitEthernet0/1",
+                status="active",
+            )
+        )
+    db.commit()
+    return devs
+
+
+def test_graph_is_loaded_once_and_follows_commits(db):
+    d = _chain(db)
+    graph = topology_graph_store.get(db)
+    assert graph.shortest_path(d[0].id, d[3].id) == [x.id for x in d]
+    assert graph.peer_on_interface(d[1].id, "Gi0/2") == (d[2].id, "GigabitEthernet0/1")
+
+    # 직접 연결 추가 -> commit 시 반영 (재적재 없이)
+    loaded_at = graph.loaded_at
+    db.add(Link(source_device_id=d[0].id, source_interface_name="Gi0/9", target_device_id=d[3].id, target_interface_name="Gi0/9", status="up"))
+    db.commit()
+    assert topology_graph_store.get(db) is graph and graph.loaded_at == loaded_at
+    assert graph.shortest_path(d[0].id, d[3].id) == [d[0].id, d[3].id]
+
+    # 링크 down -> active 경로에서 제외, 전체 경로 탐색에서는 유지
+    shortcut = db.query(Link).filter(Link.source_interface_name == "Gi0/9").one()
+    shortcut.status = "down"
+    db.commit()
+    assert graph.shortest_path(d[0].id, d[3].id) == [x.id for x in d]
+    assert graph.shortest_path(d[0].id, d[3].id, active_only=False) == [d[0].id, d[3].id]
+
+    version = graph.version
+    TopologyLinkService.delete_links_for_device(db, d[3].id)
+    db.commit()
+    assert graph.version > version
+    assert graph.shortest_path(d[0].id, d[3].id, active_only=False) == []
+
+
+def test_uncommitted_changes_stay_private_and_rollback_reloads(db):
+    d = _chain(db, 3)
+    graph = topology_graph_store.get(db)
+
+    link = db.query(Link).filter(Link.source_device_id == d[0].id).one()
+    link.status = "down"
+    db.flush()
+    private = topology_graph_store.get(db)
+    assert private is not graph and private.shortest_path(d[0].id, d[2].id) == []
+    assert graph.shortest_path(d[0].id, d[2].id) == [x.id for x in d]
+
+    db.rollback()
+    assert graph.stale
+    assert topology_graph_store.get(db).shortest_path(d[0].id, d[2].id) == [x.id for x in d]
+
+
+def test_link_update_events_change_link_state(db):
+    d = _chain(db, 3)
+    graph = topology_graph_store.get(db)
+    link = graph.find_link(d[0].id, d[1].id)
+
+    topology_graph_store.apply_event({"device_id": d[1].id, "interface": "Gi0/1", "state": "down", "source": "gnmi_oper_status"})
+    assert graph.link(link.id).status == "down"
+    assert graph.shortest_path(d[0].id, d[2].id) == []
+
+    topology_graph_store.apply_event({"device_id": d[0].id, "interface": "Gi0/2", "state": "up", "link_ids": [link.id]})
+    assert graph.shortest_path(d[0].id, d[2].id) == [x.id for x in d]
+
+    # 모르는 링크(다른 프로세스에서 새로 생성) -> 다음 조회 때 재적재
+    topology_graph_store.apply_event(
+        {"device_id": d[0].id, "neighbor_device_id": d[2].id, "local_interface": "Gi0/5", "remote_interface": "Gi0/5", "state": "active"}
+    )
+    assert graph.stale
+
+
+def test_commits_in_other_processes_mark_the_graph_stale(db, monkeypatch):
+    from app.services import realtime_event_bus as bus_mod
+
+    published = []
+    monkeypatch.setattr(bus_mod.realtime_event_bus, "publish", lambda event, data: published.append((event, data)))
+    d = _chain(db, 3)
+    graph = topology_graph_store.get(db)
+    assert published and published[-1][0] == GRAPH_CHANGED_EVENT
+
+    # 상태만 바뀐 commit 은 새 상태를 실어 보내고, 다른 프로세스는 재적재 없이 반영
+    published.clear()
+    link = db.query(Link).filter(Link.source_device_id == d[0].id).one()
+    link.status = "down"
+    db.commit()
+    assert [e for e, _ in published] == [GRAPH_CHANGED_EVENT]
+    assert published[-1][1]["structural"] is False and published[-1][1]["link_states"] == {str(link.id): "down"}
+    link.status = "active"
+    db.commit()
+    graph.set_status(link.id, "active")
+    topology_graph_store.apply_changed_event(dict(published[0][1], origin="worker-1:4242"))
+    assert not graph.stale and graph.shortest_path(d[0].id, d[2].id) == []
+    graph.set_status(link.id, "active")
+
+    published.clear()
+    link.target_interface_name = "Gi0/3"
+    db.commit()
+    assert [e for e, _ in published] == [GRAPH_CHANGED_EVENT] and published[-1][1]["structural"] is True
+
+    # 같은 프로세스가 보낸 알림은 이미 반영됨
+    topology_graph_store.apply_changed_event(published[-1][1])
+    assert not graph.stale
+
+    # Celery 워커가 ORM hook 을 거치지 않는 이 프로세스 밖에서 새 링크를 commit
+    with db.get_bind().begin() as conn:
+        conn.execute(
+            Link.__table__.insert().values(
+                source_device_id=d[0].id, source_interface_name="Gi0/9", target_device_id=d[2].id, target_interface_name="Gi0/9", status="up"
+            )
+        )
+    assert topology_graph_store.get(db).shortest_path(d[0].id, d[2].id) == [x.id for x in d]
+    topology_graph_store.apply_changed_event({"origin": "worker-1:4242"})
+    assert graph.stale
+    assert topology_graph_store.get(db).shortest_path(d[0].id, d[2].id) == [d[0].id, d[2].id]
+
+
+def test_path_trace_reads_links_from_graph(db, monkeypatch):
+    d = _chain(db, 3)
+    topology_graph_store.get(db)
+
+    calls = []
+    monkeypatch.setattr(
+        "app.services.topology_graph._load_links",
+        lambda session: calls.append(1) or [],
+    )
+    svc = PathTraceService(db)
+    assert svc._find_shortest_path(d[0].id, d[2].id) == [x.id for x in d]
+    assert svc._resolve_next_hop_by_topology(d[0].id, "Gi0/2", "") == (d[1].id, "GigabitEthernet0/1")
+    assert svc._find_link(d[2].id, d[1].id).target_device_id == d[2].id
+    assert calls == []
@@ -46,6 +46,8 @@ def test_refresh_links_emits_link_update_events(db, monkeypatch):
         }
     ]
     TopologyLinkService.refresh_links_for_device(db, a, neighbors)
+    # 커밋 전에는 발행하지 않음 (구독자가 아직 보이지 않는 링크를 읽지 않도록)
+    assert not any(evt == "link_update" for evt, _ in published)
     db.commit()
 
     assert any(evt == "link_update" and d.get("state") == "active" for evt, d in published)
@@ -57,3 +59,8 @@ def test_refresh_links_emits_link_update_events(db, monkeypatch):
 
     assert any(evt == "link_update" and d.get("state") == "down" for evt, d in published)
 
+    # rollback 된 변경은 발행하지 않음
+    published.clear()
+    TopologyLinkService.refresh_links_for_device(db, a, neighbors)
+    db.rollback()
+    assert not any(evt == "link_update" for evt, _ in published)
@@ -242,6 +242,7 @@ export const DiscoveryService = {
   startScan: (data) => api.post('/discovery/scan', data),
   startNeighborCrawl: (data) => api.post('/discovery/crawl', data),
   getJobStatus: (id) => api.get(`/discovery/jobs/${id}`),
+  getJobLogs: (id, params) => api.get(`/discovery/jobs/${id}/logs`, { params }),
   getJobResults: (id) => api.get(`/discovery/jobs/${id}/results`),
   approveDevice: (id) => api.post(`/discovery/approve/${id}`),
   ignoreDevice: (id) => api.post(`/discovery/ignore/${id}`),
@@ -45,6 +45,18 @@ const DiscoveryPage = () => {
     const [expanded, setExpanded] = useState({});
     const logEndRef = useRef(null);
     const esRef = useRef(null);
+    const logCursorRef = useRef(0);
+
+    // job 로그는 append-only (id = cursor) 이므로 이미 받은 id 이후만 이어 붙임
+    const appendLogEntries = (entries) => {
+        const fresh = (Array.isArray(entries) ? entries : []).filter(e => e && e.id > logCursorRef.current);
+        if (fresh.length === 0) return;
+        logCursorRef.current = fresh[fresh.length - 1].id;
+        setLogs(prev => {
+            const next = (prev ? prev + '\n' : '') + fresh.map(e => e.message).join('\n');
+            return next.length > 200000 ? next.slice(-200000) : next;
+        });
+    };
 
     const parseCidrList = (raw) => {
         const parts = String(raw || '').replaceAll('\n', ',').split(',');
@@ -108,8 +120,12 @@ const DiscoveryPage = () => {
                 try {
                     const res = await DiscoveryService.getJobStatus(jobId);
                     setJobStatus(res.data.status);
-                    setLogs(res.data.logs);
                     setProgress(res.data.progress);
+                    if (!esRef.current) {
+                        // SSE 가 끊긴 경우에만 cursor 페이징으로 로그 보충
+                        const logRes = await DiscoveryService.getJobLogs(jobId, { after: logCursorRef.current, limit: 1000 });
+                        appendLogEntries(logRes.data?.items);
+                    }
 
                     if (res.data.status === 'completed' || res.data.status === 'failed') {
                         clearInterval(interval);
@@ -134,7 +150,7 @@ const DiscoveryPage = () => {
         }
 
         const API_BASE_URL = import.meta.env.VITE_API_BASE_URL || 'http://localhost:8000/api/v1';
-        const url = `${API_BASE_URL}/discovery/jobs/${jobId}/stream`;
+        const url = `${API_BASE_URL}/discovery/jobs/${jobId}/stream?log_after=${logCursorRef.current}`;
         const es = new EventSource(url);
         esRef.current = es;
 
@@ -153,6 +169,12 @@ const DiscoveryPage = () => {
             } catch (e) { void e; }
         });
 
+        es.addEventListener('log', (evt) => {
+            try {
+                appendLogEntries([JSON.parse(evt.data)]);
+            } catch (e) { void e; }
+        });
+
         es.addEventListener('progress', (evt) => {
             try {
                 const p = JSON.parse(evt.data);
@@ -285,6 +307,7 @@ const DiscoveryPage = () => {
             setResults([]);
             setExpanded({});
             setStep(2);
+            logCursorRef.current = 0;
             setLogs("Initializing scan job...");
             setProgress(0);
         } catch (err) {